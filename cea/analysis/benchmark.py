@@ -11,6 +11,7 @@ import pandas as pd
 from geopandas import GeoDataFrame as gpdf
 
 from cea import inputlocator
+from cea.utilities import xlsreader
 
 __author__ = "Martin Mosteiro Romero"
 __copyright__ = "Copyright 2016, Architecture and Building Systems - ETH Zurich"
@@ -174,7 +175,7 @@ def calc_benchmark_targets(locator):
     targets = {}
     area_study = 0
 
-    factors = pd.read_excel(data_benchmark, sheetname=categories[0])
+    factors = xlsreader.read_excel(data_benchmark, categories[0])
 
     for i in range(len(factors['code'])):
         if factors['code'][i] in occupancy:
@@ -184,7 +185,7 @@ def calc_benchmark_targets(locator):
     for category in categories:
         # the targets for the area are set for the existing building stock, i.e., retrofit targets are used
         # (instead of new building targets)
-        factors = pd.read_excel(data_benchmark, sheetname=category)
+        factors = xlsreader.read_excel(data_benchmark, category)
         vt = factors['code']
         pt = factors['NRE_target_retrofit']
         gt = factors['CO2_target_retrofit']
@@ -260,14 +261,14 @@ def calc_benchmark_today(locator):
     values_today = {}
     area_study = 0
 
-    factors = pd.read_excel(data_benchmark_today, sheetname=categories[0])
+    factors = xlsreader.read_excel(data_benchmark_today, categories[0])
     for i in range(len(factors['code'])):
         if factors['code'][i] in occupancy:
             if factors['NRE_today'][i] > 0 and factors['CO2_today'][i] > 0:
                 area_study += (occupancy['GFA_m2'] * occupancy[factors['code'][i]]).sum()
 
     for category in categories:
-        factors = pd.read_excel(data_benchmark_today, sheetname=category)
+        factors = xlsreader.read_excel(data_benchmark_today, category)
         vt = factors['code']
         pt = factors['NRE_today']
         gt = factors['CO2_today']
@@ -14,6 +14,7 @@ import pandas as pd
 from cea.demand.preprocessing.properties import calc_mainuse
 from cea.demand.preprocessing.properties import calc_category
 from cea.utilities.dbfreader import dbf_to_dataframe
+from cea.utilities import xlsreader
 from geopandas import GeoDataFrame as Gdf
 import cea.globalvar
 import cea.inputlocator
@@ -187,7 +188,7 @@ def calculate_contributions(archetype, cat_df, gv, locator, year_to_calculate, t
     :rtype result: DataFrame
     """
     # get archetype properties from the database
-    database_df = pd.read_excel(locator.get_life_cycle_inventory_building_systems(), archetype)
+    database_df = xlsreader.read_excel(locator.get_life_cycle_inventory_building_systems(), archetype)
     database_df['Code'] = database_df.apply(lambda x: calc_code(x['building_use'], x['year_start'],
                                                                         x['year_end'], x['standard']), axis=1)
 
@@ -12,6 +12,7 @@ import pandas as pd
 from geopandas import GeoDataFrame as gpdf
 
 from cea import inputlocator
+from cea.utilities import xlsreader
 
 reload(inputlocator)
 
@@ -65,7 +66,7 @@ def lca_mobility(locator):
     # local files
     demand = pd.read_csv(locator.get_total_demand())
     prop_occupancy = gpdf.from_file(locator.get_building_occupancy()).drop('geometry', axis=1)#.set_index('Name')
-    factors_mobility = pd.read_excel(locator.get_data_benchmark(), sheetname='MOBILITY').drop('Description', axis=1)
+    factors_mobility = xlsreader.read_excel(locator.get_data_benchmark(), 'MOBILITY').drop('Description', axis=1)
 
     # calculate total_LCA_mobility: .csv
     occupancy_type = factors_mobility['code']
@@ -7,6 +7,7 @@ import pandas as pd
 from geopandas import GeoDataFrame as gpdf
 import cea.globalvar
 import cea.inputlocator
+from cea.utilities import xlsreader
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -28,10 +29,10 @@ def operation_costs(locator, Qww_flag=True, Qhs_flag=True, Qcs_flag=True, Qcdata
     supply_systems = gpdf.from_file(locator.get_building_supply()).drop('geometry', axis=1)
     ## get the non-renewable primary energy and greenhouse gas emissions factors for each supply system in the database
     data_LCI = locator.get_life_cycle_inventory_supply_systems()
-    factors_heating = pd.read_excel(data_LCI, sheetname='heating')
-    factors_dhw = pd.read_excel(data_LCI, sheetname='dhw')
-    factors_cooling = pd.read_excel(data_LCI, sheetname='cooling')
-    factors_electricity = pd.read_excel(data_LCI, sheetname='electricity')
+    factors_heating = xlsreader.read_excel(data_LCI, 'heating')
+    factors_dhw = xlsreader.read_excel(data_LCI, 'dhw')
+    factors_cooling = xlsreader.read_excel(data_LCI, 'cooling')
+    factors_electricity = xlsreader.read_excel(data_LCI, 'electricity')
 
     # local variables
     QC_flag = E_flag = True # minimum output values
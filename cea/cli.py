@@ -27,8 +27,14 @@ def demand(args):
         except:
             pass
     print 'use_dynamic_infiltration_calculation:', args.use_dynamic_infiltration_calculation
+    print 'use_fast_rc_model:', args.use_fast_rc_model
+    print 'batch_size:', args.batch_size
+    print 'incremental:', args.incremental
+    print 'number_of_processes:', args.number_of_processes
     cea.demand.demand_main.run_as_script(scenario_path=args.scenario, weather_path=args.weather,
-                                         use_dynamic_infiltration_calculation=args.use_dynamic_infiltration_calculation)
+                                         use_dynamic_infiltration_calculation=args.use_dynamic_infiltration_calculation,
+                                         use_fast_rc_model=args.use_fast_rc_model, batch_size=args.batch_size,
+                                         incremental=args.incremental, number_of_processes=args.number_of_processes)
 
 
 def data_helper(args):
@@ -281,6 +287,13 @@ def compile(args):
     import cea.utilities.compile_pyd_files
     cea.utilities.compile_pyd_files.main()
 
+
+def kernels(_):
+    """show which version (compiled ahead of time, compiled with Numba or python) of each kernel is in use"""
+    import cea.utilities.kernels
+    cea.utilities.kernels.main()
+
+
 def retrofit_potential(args):
     """Run the ``cea.analysis.retrofit.retrofit_potential`` module on the scenario"""
     import cea.analysis.retrofit.retrofit_potential as retrofit_potential
@@ -348,6 +361,8 @@ def main():
     import argparse
     parser = argparse.ArgumentParser(formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     parser.add_argument('-s', '--scenario', help='Path to the scenario folder', default=os.curdir)
+    parser.add_argument('--profile-import', action='store_true',
+                        help='Report the time spent importing each module to STDERR')
     subparsers = parser.add_subparsers()
 
     demand_parser = subparsers.add_parser('demand',
@@ -355,6 +370,15 @@ def main():
     demand_parser.add_argument('-w', '--weather', help='Path to the weather file')
     demand_parser.add_argument('--use-dynamic-infiltration-calculation', action='store_true',
                                help='Use the dynamic infiltration calculation instead of default')
+    demand_parser.add_argument('--use-fast-rc-model', action='store_true',
+                               help='Calculate the R-C-model for the whole year at once (faster, same results)')
+    demand_parser.add_argument('--batch-size', type=int, default=None,
+                               help='Calculate the buildings in batches of this size (R-C-model vectorized over '
+                                    'buildings)')
+    demand_parser.add_argument('--incremental', action='store_true',
+                               help='Only calculate the buildings whose inputs changed since the last run')
+    demand_parser.add_argument('--number-of-processes', type=int, default=None,
+                               help='Calculate the buildings in this number of worker processes (1: no multiprocessing)')
     demand_parser.set_defaults(func=demand)
 
     data_helper_parser = subparsers.add_parser('data-helper',
@@ -530,6 +554,9 @@ def main():
     compile_parser = subparsers.add_parser('compile', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     compile_parser.set_defaults(func=compile)
 
+    kernels_parser = subparsers.add_parser('kernels', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    kernels_parser.set_defaults(func=kernels)
+
     read_config_parser = subparsers.add_parser('read-config', formatter_class=argparse.ArgumentDefaultsHelpFormatter)
     read_config_parser.add_argument('--section', help='section to read from')
     read_config_parser.add_argument('--key', help='key to read')
@@ -552,8 +579,51 @@ def main():
     dbf_to_excel_parser.set_defaults(func=dbf_to_excel)
 
     parsed_args = parser.parse_args()
+    if parsed_args.profile_import:
+        _profile_imports()
     parsed_args.func(parsed_args)
 
 
+def _profile_imports():
+    """
+    Time the imports of all modules imported from now on and print a report to STDERR when the program exits. The
+    subcommands should only import the (heavy) modules they need - use this to check the startup time of a subcommand.
+    """
+    import __builtin__
+    import atexit
+    import sys
+    import time
+
+    original_import = __builtin__.__import__
+    timings = {}  # module name -> (cumulative time, time excluding the imports done by the module)
+    nested_times = []  # the time spent in nested imports, for each import currently running
+    t_start = time.time()
+
+    def timed_import(name, *args, **kwargs):
+        if name in sys.modules:
+            return original_import(name, *args, **kwargs)
+        nested_times.append(0.0)
+        t0 = time.time()
+        try:
+            return original_import(name, *args, **kwargs)
+        finally:
+            elapsed = time.time() - t0
+            nested = nested_times.pop()
+            if nested_times:
+                nested_times[-1] += elapsed
+            cumulative, own = timings.get(name, (0.0, 0.0))
+            timings[name] = (cumulative + elapsed, own + elapsed - nested)
+
+    def report():
+        __builtin__.__import__ = original_import
+        sys.stderr.write('%10s %10s  %s\n' % ('cumulative', 'self', 'module'))
+        for name, (cumulative, own) in sorted(timings.items(), key=lambda item: item[1][0], reverse=True)[:40]:
+            sys.stderr.write('%9.3fs %9.3fs  %s\n' % (cumulative, own, name))
+        sys.stderr.write('imported %i modules, total time: %.3fs\n' % (len(timings), time.time() - t_start))
+
+    __builtin__.__import__ = timed_import
+    atexit.register(report)
+
+
 if __name__ == '__main__':
     main()
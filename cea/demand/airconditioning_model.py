@@ -53,6 +53,40 @@ def calc_hvac_cooling(tsd, hoy, gv):
     temp_ext = tsd['T_ext'][hoy]  # exterior air temperature
     temp_mech_vent = tsd['theta_ve_mech'][hoy]  # air temperature of mechanical ventilation air
 
+    q_cs_sen_hvac, q_cs_lat_hvac, ma_sup_cs, ta_sup_cs, ta_re_cs, m_ve_hvac_recirculation = _calc_hvac_cooling(
+        temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext, temp_ext, temp_mech_vent, gv.temp_sup_cool_hvac)
+
+    # construct output dict
+    air_con_model_loads_flows_temperatures = {'q_cs_sen_hvac': q_cs_sen_hvac,
+                                              'q_cs_lat_hvac': q_cs_lat_hvac,
+                                              'ma_sup_cs': ma_sup_cs,
+                                              'ta_sup_cs': ta_sup_cs,
+                                              'ta_re_cs': ta_re_cs,
+                                              'm_ve_hvac_recirculation' : m_ve_hvac_recirculation}
+
+    if m_ve_mech + m_ve_hvac_recirculation < 0:
+        raise ValueError
+
+    return air_con_model_loads_flows_temperatures
+
+
+def _calc_hvac_cooling(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext, temp_ext, temp_mech_vent,
+                       temp_sup_cool_hvac):
+    """
+    Calculation of :py:func:`calc_hvac_cooling` for a single time step with scalar inputs (no `tsd`, no `gv`)
+
+    :param temp_zone_set: zone set temperature (°C)
+    :param qe_sen: sensible load from the RC model (kW)
+    :param m_ve_mech: mechanical ventilation flow rate (kg/s)
+    :param wint: internal moisture gains (kg/s)
+    :param rel_humidity_ext: exterior relative humidity (%)
+    :param temp_ext: exterior air temperature (°C)
+    :param temp_mech_vent: air temperature of mechanical ventilation air (°C)
+    :param temp_sup_cool_hvac: supply air temperature of the AC unit (°C), see ``gv.temp_sup_cool_hvac``
+    :return: q_cs_sen_hvac, q_cs_lat_hvac, ma_sup_cs, ta_sup_cs, ta_re_cs, m_ve_hvac_recirculation
+    :rtype: tuple
+    """
+
     # indoor air set point
     t5 = temp_zone_set
 
@@ -75,7 +109,7 @@ def calc_hvac_cooling(tsd, hoy, gv):
         w5_prime = (wint + w3v * m_ve_mech) / m_ve_mech
 
         # supply air condition
-        t3 = gv.temp_sup_cool_hvac
+        t3 = temp_sup_cool_hvac
 
         # room supply moisture content:
         # algorithm for cooling case
@@ -102,7 +136,7 @@ def calc_hvac_cooling(tsd, hoy, gv):
     elif m_ve_mech == 0:  # mechanical ventilation system is not active, only recirculation air gets conditioned
 
         # supply air condition
-        t3 = gv.temp_sup_cool_hvac
+        t3 = temp_sup_cool_hvac
 
         # State of Supply
         ts = t3  # minus expected delta T rise in the ducts TODO: check and document value of temp decrease
@@ -131,18 +165,7 @@ def calc_hvac_cooling(tsd, hoy, gv):
     ta_sup_cs = ts
     ta_re_cs = (m_ve_mech * t2 + m_ve_hvac_recirculation * t5) / ma_sup_cs  # temperature mixing proportional to mass flow rates
 
-    # construct output dict
-    air_con_model_loads_flows_temperatures = {'q_cs_sen_hvac': q_cs_sen_hvac,
-                                              'q_cs_lat_hvac': q_cs_lat_hvac,
-                                              'ma_sup_cs': ma_sup_cs,
-                                              'ta_sup_cs': ta_sup_cs,
-                                              'ta_re_cs': ta_re_cs,
-                                              'm_ve_hvac_recirculation' : m_ve_hvac_recirculation}
-
-    if m_ve_mech + m_ve_hvac_recirculation < 0:
-        raise ValueError
-
-    return air_con_model_loads_flows_temperatures
+    return q_cs_sen_hvac, q_cs_lat_hvac, ma_sup_cs, ta_sup_cs, ta_re_cs, m_ve_hvac_recirculation
 
 
 def calc_hvac_heating(tsd, hoy, gv):
@@ -172,6 +195,43 @@ def calc_hvac_heating(tsd, hoy, gv):
     temp_ext = tsd['T_ext'][hoy]  # exterior air temperature
     temp_mech_vent = tsd['theta_ve_mech'][hoy]  # air temperature of mechanical ventilation air
 
+    q_hs_sen_hvac, q_hs_lat_hvac, ma_sup_hs, ta_sup_hs, ta_re_hs, e_hs_lat_aux, m_ve_hvac_recirculation = \
+        _calc_hvac_heating(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext, temp_ext, temp_mech_vent,
+                           gv.temp_sup_heat_hvac, gv.temp_comf_max, gv.rhum_comf_max)
+
+    air_con_model_loads_flows_temperatures = {'q_hs_sen_hvac': q_hs_sen_hvac,
+                                              'q_hs_lat_hvac': q_hs_lat_hvac,
+                                              'ma_sup_hs': ma_sup_hs,
+                                              'ta_sup_hs': ta_sup_hs,
+                                              'ta_re_hs': ta_re_hs,
+                                              'e_hs_lat_aux': e_hs_lat_aux,
+                                              'm_ve_hvac_recirculation': m_ve_hvac_recirculation}
+
+    if m_ve_mech + m_ve_hvac_recirculation < 0:
+        raise ValueError
+
+    return air_con_model_loads_flows_temperatures
+
+
+def _calc_hvac_heating(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext, temp_ext, temp_mech_vent,
+                       temp_sup_heat_hvac, temp_comf_max, rhum_comf_max):
+    """
+    Calculation of :py:func:`calc_hvac_heating` for a single time step with scalar inputs (no `tsd`, no `gv`)
+
+    :param temp_zone_set: zone set temperature (°C)
+    :param qe_sen: sensible load from the RC model (kW)
+    :param m_ve_mech: mechanical ventilation flow rate (kg/s)
+    :param wint: internal moisture gains (kg/s)
+    :param rel_humidity_ext: exterior relative humidity (%)
+    :param temp_ext: exterior air temperature (°C)
+    :param temp_mech_vent: air temperature of mechanical ventilation air (°C)
+    :param temp_sup_heat_hvac: supply air temperature of the AC unit (°C), see ``gv.temp_sup_heat_hvac``
+    :param temp_comf_max: limit of comfort in zone (°C), see ``gv.temp_comf_max``
+    :param rhum_comf_max: limit of comfort in zone (%), see ``gv.rhum_comf_max``
+    :return: q_hs_sen_hvac, q_hs_lat_hvac, ma_sup_hs, ta_sup_hs, ta_re_hs, e_hs_lat_aux, m_ve_hvac_recirculation
+    :rtype: tuple
+    """
+
     # indoor air set point
     t5 = temp_zone_set
 
@@ -194,11 +254,11 @@ def calc_hvac_heating(tsd, hoy, gv):
         w5_prime = (wint + w3v * m_ve_mech) / m_ve_mech
 
         # supply air condition
-        t3 = gv.temp_sup_heat_hvac
+        t3 = temp_sup_heat_hvac
 
         # room supply moisture content:
         # algorithm for cooling case
-        w3 = calc_w3_heating_case(t5, w2, w5_prime, t3, gv)
+        w3 = _calc_w3_heating_case(t5, w2, w5_prime, t3, temp_comf_max, rhum_comf_max)
 
         # State of Supply
         ts = t3  # minus expected delta T rise in the ducts TODO: check and document value of temp decrease
@@ -224,7 +284,7 @@ def calc_hvac_heating(tsd, hoy, gv):
     elif m_ve_mech == 0:  # mechanical ventilation system is not active, only recirculation air gets conditioned
 
         # supply air condition
-        t3 = gv.temp_sup_heat_hvac
+        t3 = temp_sup_heat_hvac
 
         # State of Supply
         ts = t3  # minus expected delta T rise in the ducts TODO: check and document value of temp decrease
@@ -255,18 +315,7 @@ def calc_hvac_heating(tsd, hoy, gv):
     ta_re_hs = (
                m_ve_mech * t2 + m_ve_hvac_recirculation * t5) / ma_sup_hs  # temperature mixing proportional to mass flow rates
 
-    air_con_model_loads_flows_temperatures = {'q_hs_sen_hvac': q_hs_sen_hvac,
-                                              'q_hs_lat_hvac': q_hs_lat_hvac,
-                                              'ma_sup_hs': ma_sup_hs,
-                                              'ta_sup_hs': ta_sup_hs,
-                                              'ta_re_hs': ta_re_hs,
-                                              'e_hs_lat_aux': e_hs_lat_aux,
-                                              'm_ve_hvac_recirculation': m_ve_hvac_recirculation}
-
-    if m_ve_mech + m_ve_hvac_recirculation < 0:
-        raise ValueError
-
-    return air_con_model_loads_flows_temperatures
+    return q_hs_sen_hvac, q_hs_lat_hvac, ma_sup_hs, ta_sup_hs, ta_re_hs, e_hs_lat_aux, m_ve_hvac_recirculation
 
 
 # Moisture balance
@@ -295,10 +344,16 @@ def calc_w3_heating_case(t5, w2, w5, t3, gv):
     :rtype: numpy.float64
     """
 
-    # get constants and properties
-    temp_comf_max = gv.temp_comf_max  # limits of comfort in zone TODO: get from properties
-    hum_comf_max = gv.rhum_comf_max  # limits of comfort in zone TODO: get from properties
+    return _calc_w3_heating_case(t5, w2, w5, t3, gv.temp_comf_max, gv.rhum_comf_max)
 
+
+def _calc_w3_heating_case(t5, w2, w5, t3, temp_comf_max, hum_comf_max):
+    """
+    Calculation of :py:func:`calc_w3_heating_case` with the comfort limits passed in instead of `gv`
+
+    :param temp_comf_max: limits of comfort in zone (°C) TODO: get from properties
+    :param hum_comf_max: limits of comfort in zone (%) TODO: get from properties
+    """
     w_liminf = calc_w(t5, 30)  # TODO: document
     w_limsup = calc_w(t5, 70)  # TODO: document
     w_comf_max = calc_w(temp_comf_max, hum_comf_max)  # moisture content at maximum comfortable state
@@ -16,6 +16,7 @@ import pandas as pd
 import os, csv
 
 from cea.demand.calibration.clustering.sax import SAX
+from cea.demand.demand_writers import read_demand_results
 from cea.demand.calibration.clustering.sax_optimization import sax_optimization
 from cea.plots.pareto_frontier_plot import frontier_2D_3OB
 from cea.analysis.mcda import mcda_cluster_main
@@ -124,8 +125,7 @@ def demand_CEA_reader(locator, building_name, building_load, type="simulated"):
     # import data
     #location of data
     if type == 'simulation':
-        data = pd.read_csv(locator.get_demand_results_file(building_name),
-                           usecols=['DATE', building_load], index_col='DATE')
+        data = read_demand_results(locator, [building_name], columns=['DATE', building_load])[0].set_index('DATE')
     elif type== 'measured':
         data = pd.read_csv(locator.get_demand_measured_file(building_name),
                            usecols=['DATE', building_load], index_col='DATE')
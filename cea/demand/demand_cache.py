@@ -0,0 +1,162 @@
+"""
+Fingerprints of the inputs of the demand calculation of a building. These are used by
+:py:func:`cea.demand.demand_main.demand_calculation` (``incremental=True``) to skip the buildings whose inputs did not
+change since their results were written.
+
+The fingerprint of a building is a hash of its effective inputs: the `BuildingPropertiesRow` (including the overrides),
+the weather data, the schedules and archetype values of its uses, the constants in `gv` and the demand writer used. It
+is stored next to the results of the building (see `InputLocator.get_demand_results_fingerprint`).
+"""
+from __future__ import division
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+import cea
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+# variables of `gv` that do not affect the results of a building
+GV_VARIABLES_IGNORED = {'demand_writer', 'multiprocessing', 'number_of_processes', 'scenario_reference',
+                        'simulate_building_list'}
+
+# variables of the demand writer that are not settings (`totals` changes with each building calculated)
+DEMAND_WRITER_VARIABLES_IGNORED = {'gv', 'totals'}
+
+
+def calc_scenario_fingerprints(weather_data, date, usage_schedules, gv, use_dynamic_infiltration_calculation):
+    """
+    Hash the inputs shared by all the buildings of the scenario - these are only hashed once and passed to
+    `calc_building_fingerprint`.
+
+    :param weather_data: the weather data as used by the demand calculation
+    :type weather_data: pandas.DataFrame
+    :param date: the hours of the year
+    :type date: pandas.DatetimeIndex
+    :param usage_schedules: the schedules of the uses of the scenario (see
+        :py:func:`cea.demand.thermal_loads.calc_thermal_loads`)
+    :type usage_schedules: dict
+    :param gv: global variables
+    :type gv: cea.globalvar.GlobalVariables
+    :param use_dynamic_infiltration_calculation: the infiltration model used changes the results
+    :type use_dynamic_infiltration_calculation: bool
+    :returns: the fingerprint of the inputs shared by all buildings and the fingerprint of the schedules and archetype
+        values of each use
+    :rtype: (str, dict[str, str])
+    """
+    h = hashlib.sha1()
+    _update_hash(h, cea.__version__)
+    _update_hash(h, weather_data)
+    _update_hash(h, date)
+    _update_hash(h, bool(use_dynamic_infiltration_calculation))
+    _update_hash(h, dict((key, value) for key, value in vars(gv).items() if key not in GV_VARIABLES_IGNORED))
+    _update_hash(h, type(gv.demand_writer).__name__)
+    _update_hash(h, dict((key, value) for key, value in vars(gv.demand_writer).items()
+                         if key not in DEMAND_WRITER_VARIABLES_IGNORED))
+
+    use_fingerprints = {}
+    for i, use in enumerate(usage_schedules['list_uses']):
+        h_use = hashlib.sha1()
+        _update_hash(h_use, usage_schedules['archetype_schedules'][i])
+        _update_hash(h_use, dict((key, values[i]) for key, values in usage_schedules['archetype_values'].items()))
+        use_fingerprints[use] = h_use.hexdigest()
+    return h.hexdigest(), use_fingerprints
+
+
+def calc_building_fingerprint(bpr, scenario_fingerprints):
+    """
+    Hash the inputs of the demand calculation of a building.
+
+    :param bpr: the properties of the building
+    :type bpr: cea.demand.thermal_loads.BuildingPropertiesRow
+    :param scenario_fingerprints: the result of `calc_scenario_fingerprints`
+    :type scenario_fingerprints: (str, dict[str, str])
+    :returns: the fingerprint of the building (hex digest)
+    :rtype: str
+    """
+    scenario_fingerprint, use_fingerprints = scenario_fingerprints
+    h = hashlib.sha1()
+    _update_hash(h, scenario_fingerprint)
+    _update_hash(h, vars(bpr))
+    # the schedules and archetype values of the uses of the building
+    _update_hash(h, dict((use, fingerprint) for use, fingerprint in use_fingerprints.items()
+                         if bpr.occupancy[use] > 0))
+    return h.hexdigest()
+
+
+def is_up_to_date(building_name, fingerprint, gv, locator):
+    """
+    True, if the results of the building were calculated with the same inputs (``fingerprint``) and still exist.
+    """
+    fingerprint_file = locator.get_demand_results_fingerprint(building_name)
+    if not os.path.exists(fingerprint_file):
+        return False
+    if not all(os.path.exists(f) for f in gv.demand_writer.get_result_files(building_name, locator)):
+        return False
+    with open(fingerprint_file, 'r') as f:
+        return f.read().strip() == fingerprint
+
+
+def write_fingerprint(building_name, fingerprint, locator):
+    """Store the fingerprint of the inputs the results of the building were calculated with"""
+    with open(locator.get_demand_results_fingerprint(building_name), 'w') as f:
+        f.write(fingerprint)
+
+
+def remove_fingerprint(building_name, locator):
+    """Invalidate the results of the building (called before they are overwritten)"""
+    if os.path.exists(locator.get_demand_results_fingerprint(building_name)):
+        os.remove(locator.get_demand_results_fingerprint(building_name))
+
+
+def _update_hash(h, value):
+    """Update the hash ``h`` with a canonical representation of ``value`` (independent of the order of dicts)"""
+    if isinstance(value, (pd.Series, pd.DataFrame, pd.Index)):
+        _update_hash(h, type(value).__name__)
+        if not isinstance(value, pd.Index):
+            _update_hash(h, value.index)
+        if isinstance(value, pd.DataFrame):
+            _update_hash(h, value.columns)
+            for column in value.columns:
+                _update_hash(h, value[column].values)
+        else:
+            _update_hash(h, value.values)
+    elif isinstance(value, np.ndarray):
+        if value.dtype == object:
+            _update_hash(h, list(value))
+        else:
+            h.update('array%s%s:' % (value.dtype.str, value.shape))
+            h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        h.update('dict%i:' % len(value))
+        for key in sorted(value.keys()):
+            _update_hash(h, key)
+            _update_hash(h, value[key])
+    elif isinstance(value, (list, tuple)):
+        array = np.asarray(value)
+        if array.dtype.kind in 'biuf':
+            # hashing long lists of numbers (schedules) item by item is slow
+            _update_hash(h, array)
+            return
+        h.update('list%i:' % len(value))
+        for item in value:
+            _update_hash(h, item)
+    elif hasattr(value, '__dict__'):
+        _update_hash(h, type(value).__name__)
+        _update_hash(h, vars(value))
+    elif hasattr(value, '__slots__'):
+        _update_hash(h, type(value).__name__)
+        _update_hash(h, dict((slot, getattr(value, slot, None)) for slot in value.__slots__))
+    else:
+        # numbers, strings, None, numpy scalars
+        h.update('%s:%r;' % (type(value).__name__, value))
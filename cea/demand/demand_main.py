@@ -12,10 +12,11 @@ import time
 
 import cea.globalvar
 import cea.inputlocator
+from cea.demand import demand_cache
 from cea.demand import occupancy_model
 from cea.demand import thermal_loads
 from cea.demand.thermal_loads import BuildingProperties
-from cea.utilities import epwreader
+from cea.utilities import epwreader, kernels
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -27,7 +28,8 @@ __email__ = "cea@arch.ethz.ch"
 __status__ = "Production"
 
 
-def demand_calculation(locator, weather_path, gv, use_dynamic_infiltration_calculation=False):
+def demand_calculation(locator, weather_path, gv, use_dynamic_infiltration_calculation=False,
+                       use_fast_rc_model=False, batch_size=None, incremental=False):
     """
     Algorithm to calculate the hourly demand of energy services in buildings
     using the integrated model of [Fonseca2015]_.
@@ -46,8 +48,25 @@ def demand_calculation(locator, weather_path, gv, use_dynamic_infiltration_calcu
     :param gv: global variables
     :type gv: cea.globalvar.GlobalVariables
 
-    :returns: None
-    :rtype: NoneType
+    :param use_dynamic_infiltration_calculation: calculate infiltration with the detailed natural ventilation model
+    :type use_dynamic_infiltration_calculation: bool
+
+    :param use_fast_rc_model: calculate the R-C-model for the whole year at once with
+        :py:mod:`cea.demand.rc_model_crank_nicholson_year` instead of hour by hour
+    :type use_fast_rc_model: bool
+
+    :param batch_size: calculate the buildings in batches of this size, with the R-C-model vectorized over the
+        buildings of a batch (see :py:func:`cea.demand.thermal_loads.calc_thermal_loads_batch`). ``None`` calculates
+        the buildings one by one.
+    :type batch_size: int
+
+    :param incremental: only calculate the buildings whose inputs changed since their results were written (see
+        :py:mod:`cea.demand.demand_cache`)
+    :type incremental: bool
+
+    :returns: if ``gv.print_totals``, the yearly totals of the buildings and the results of each building (read from
+        disk only when accessed, see :py:class:`cea.demand.demand_writers.LazyDemandResults`), else None
+    :rtype: (pandas.DataFrame, cea.demand.demand_writers.LazyDemandResults)
 
     .. [Fonseca2015] Fonseca, Jimeno A., and Arno Schlueter. “Integrated Model for Characterization of
         Spatiotemporal Building Energy Consumption Patterns in Neighborhoods and City Districts.”
@@ -72,19 +91,47 @@ def demand_calculation(locator, weather_path, gv, use_dynamic_infiltration_calcu
     schedules_dict = {'list_uses': list_uses, 'archetype_schedules': archetype_schedules, 'occupancy_densities':
         archetype_values['people'], 'archetype_values': archetype_values}
 
+    # the yearly totals of the buildings are collected by the demand writer
+    gv.demand_writer.totals.clear()
+
     # in case gv passes a list of specific buildings to simulate.
     if gv.simulate_building_list:
         list_building_names = gv.simulate_building_list
     else:
         list_building_names = building_properties.list_building_names()
 
+    # skip the buildings whose results were calculated with the same inputs
+    fingerprints = None
+    if incremental:
+        fingerprints = calc_fingerprints(building_properties, list_building_names, weather_data, date,
+                                         schedules_dict, gv, use_dynamic_infiltration_calculation)
+        num_buildings = len(list_building_names)
+        up_to_date = [building for building in list_building_names
+                      if demand_cache.is_up_to_date(building, fingerprints[building], gv, locator)]
+        if gv.print_totals:
+            # the yearly totals of the buildings skipped are read from the last run
+            up_to_date = set(gv.demand_writer.read_totals(up_to_date, locator))
+        list_building_names = [building for building in list_building_names if building not in up_to_date]
+        for building in list_building_names:
+            demand_cache.remove_fingerprint(building, locator)
+        gv.log('Skipping %(num_skipped)i unchanged buildings out of %(num_buildings)i',
+               num_skipped=num_buildings - len(list_building_names), num_buildings=num_buildings)
+
     # demand
-    if gv.multiprocessing and mp.cpu_count() > 1:
+    if len(list_building_names) == 0:
+        pass
+    elif batch_size:
+        thermal_loads_all_buildings_batch(building_properties, date, gv, locator, list_building_names, schedules_dict,
+                                          weather_data, use_dynamic_infiltration_calculation, batch_size,
+                                          fingerprints)
+    elif gv.multiprocessing and get_number_of_processes(gv) > 1:
         thermal_loads_all_buildings_multiprocessing(building_properties, date, gv, locator, list_building_names,
-                                                    schedules_dict, weather_data, use_dynamic_infiltration_calculation)
+                                                    schedules_dict, weather_data, use_dynamic_infiltration_calculation,
+                                                    use_fast_rc_model, fingerprints)
     else:
         thermal_loads_all_buildings(building_properties, date, gv, locator, list_building_names, schedules_dict,
-                                    weather_data, use_dynamic_infiltration_calculation)
+                                    weather_data, use_dynamic_infiltration_calculation, use_fast_rc_model,
+                                    fingerprints)
 
     if gv.print_totals:
         totals, time_series = gv.demand_writer.write_totals_csv(building_properties, locator)
@@ -93,36 +140,168 @@ def demand_calculation(locator, weather_path, gv, use_dynamic_infiltration_calcu
 
 
 def thermal_loads_all_buildings(building_properties, date, gv, locator, list_building_names, usage_schedules,
-                                weather_data, use_dynamic_infiltration_calculation):
+                                weather_data, use_dynamic_infiltration_calculation, use_fast_rc_model=False,
+                                fingerprints=None):
     num_buildings = len(list_building_names)
     for i, building in enumerate(list_building_names):
         bpr = building_properties[building]
         thermal_loads.calc_thermal_loads(building, bpr, weather_data, usage_schedules, date, gv, locator,
-                                         use_dynamic_infiltration_calculation)
+                                         use_dynamic_infiltration_calculation, use_fast_rc_model)
+        write_fingerprints([building], fingerprints, locator)
         gv.log('Building No. %(bno)i completed out of %(num_buildings)i: %(building)s', bno=i + 1,
                num_buildings=num_buildings, building=building)
 
 
 def thermal_loads_all_buildings_multiprocessing(building_properties, date, gv, locator, list_building_names, usage_schedules,
-                                                weather_data, use_dynamic_infiltration_calculation):
-    pool = mp.Pool()
-    gv.log("Using %i CPU's" % mp.cpu_count())
-    joblist = []
-    num_buildings = len(list_building_names)
-    for building in list_building_names:
-        bpr = building_properties[building]
-        job = pool.apply_async(thermal_loads.calc_thermal_loads,
-                               [building, bpr, weather_data, usage_schedules, date, gv, locator,
-                                use_dynamic_infiltration_calculation])
-        joblist.append(job)
-    for i, job in enumerate(joblist):
-        job.get(240)
-        gv.log('Building No. %(bno)i completed out of %(num_buildings)i', bno=i + 1, num_buildings=num_buildings)
+                                                weather_data, use_dynamic_infiltration_calculation,
+                                                use_fast_rc_model=False, fingerprints=None):
+    pool = create_worker_pool(gv, locator, date, weather_data, usage_schedules, use_dynamic_infiltration_calculation,
+                              use_fast_rc_model)
+    # the largest buildings are dispatched first, so no long job is left running alone at the end
+    jobs = sorted(((building, building_properties[building]) for building in list_building_names),
+                  key=lambda job: job[1].rc_model['Af'], reverse=True)
+    num_buildings = len(jobs)
+    try:
+        for i, (building, totals) in enumerate(pool.imap_unordered(_calc_thermal_loads_worker, jobs)):
+            gv.demand_writer.totals.update(totals)
+            write_fingerprints([building], fingerprints, locator)
+            gv.log('Building No. %(bno)i completed out of %(num_buildings)i: %(building)s', bno=i + 1,
+                   num_buildings=num_buildings, building=building)
+    except:
+        # don't leave the workers running
+        pool.terminate()
+        pool.join()
+        raise
     pool.close()
+    pool.join()
+
+
+def thermal_loads_all_buildings_batch(building_properties, date, gv, locator, list_building_names, usage_schedules,
+                                      weather_data, use_dynamic_infiltration_calculation, batch_size,
+                                      fingerprints=None):
+    batches = [list_building_names[i:i + batch_size] for i in range(0, len(list_building_names), batch_size)]
+    num_batches = len(batches)
+    if gv.multiprocessing and get_number_of_processes(gv) > 1:
+        pool = create_worker_pool(gv, locator, date, weather_data, usage_schedules,
+                                  use_dynamic_infiltration_calculation)
+        jobs = ((batch, [building_properties[building] for building in batch]) for batch in batches)
+        try:
+            for i, (batch, totals) in enumerate(pool.imap_unordered(_calc_thermal_loads_batch_worker, jobs)):
+                gv.demand_writer.totals.update(totals)
+                write_fingerprints(batch, fingerprints, locator)
+                gv.log('Batch No. %(bno)i completed out of %(num_batches)i: %(buildings)s', bno=i + 1,
+                       num_batches=num_batches, buildings=', '.join(batch))
+        except:
+            # don't leave the workers running
+            pool.terminate()
+            pool.join()
+            raise
+        pool.close()
+        pool.join()
+    else:
+        for i, batch in enumerate(batches):
+            bprs = [building_properties[building] for building in batch]
+            thermal_loads.calc_thermal_loads_batch(batch, bprs, weather_data, usage_schedules, date, gv, locator,
+                                                   use_dynamic_infiltration_calculation)
+            write_fingerprints(batch, fingerprints, locator)
+            gv.log('Batch No. %(bno)i completed out of %(num_batches)i: %(buildings)s', bno=i + 1,
+                   num_batches=num_batches, buildings=', '.join(batch))
+
+
+def calc_fingerprints(building_properties, list_building_names, weather_data, date, usage_schedules, gv,
+                      use_dynamic_infiltration_calculation):
+    """
+    Calculate the fingerprints of the inputs of the buildings (see :py:mod:`cea.demand.demand_cache`).
+
+    :returns: the fingerprint of each building
+    :rtype: dict[str, str]
+    """
+    scenario_fingerprints = demand_cache.calc_scenario_fingerprints(weather_data, date, usage_schedules, gv,
+                                                                    use_dynamic_infiltration_calculation)
+    return dict((building, demand_cache.calc_building_fingerprint(building_properties[building],
+                                                                  scenario_fingerprints))
+                for building in list_building_names)
+
+
+def write_fingerprints(building_names, fingerprints, locator):
+    """Store the fingerprints of the buildings calculated (if running incrementally)"""
+    if fingerprints is not None:
+        for building in building_names:
+            demand_cache.write_fingerprint(building, fingerprints[building], locator)
+
+
+def get_number_of_processes(gv):
+    """
+    The number of worker processes to use for multiprocessing: ``gv.number_of_processes`` if set, else one per CPU.
+    """
+    return gv.number_of_processes or mp.cpu_count()
+
+
+def create_worker_pool(gv, locator, date, weather_data, usage_schedules, use_dynamic_infiltration_calculation=False,
+                       use_fast_rc_model=False):
+    """
+    Create a pool of worker processes for the demand calculation. The inputs shared by all buildings (weather data,
+    schedules, ``gv``, ``locator``...) are sent once to each worker when it starts, the jobs only contain the
+    building properties (see :py:func:`_calc_thermal_loads_worker`).
+
+    :returns: the pool of workers
+    :rtype: multiprocessing.Pool
+    """
+    number_of_processes = get_number_of_processes(gv)
+    gv.log("Using %i CPU's" % number_of_processes)
+    return mp.Pool(number_of_processes, initializer=_initialize_worker,
+                   initargs=(gv, locator, date, weather_data, usage_schedules, use_dynamic_infiltration_calculation,
+                             use_fast_rc_model))
+
+
+# the inputs shared by all the jobs of a worker process, set by `_initialize_worker`
+_worker_inputs = {}
+
+
+def _initialize_worker(gv, locator, date, weather_data, usage_schedules, use_dynamic_infiltration_calculation,
+                       use_fast_rc_model):
+    _worker_inputs.update(gv=gv, locator=locator, date=date, weather_data=weather_data,
+                          usage_schedules=usage_schedules,
+                          use_dynamic_infiltration_calculation=use_dynamic_infiltration_calculation,
+                          use_fast_rc_model=use_fast_rc_model)
+
+
+def _calc_thermal_loads_worker(job):
+    """
+    Calculate the thermal loads of a building in a worker process. Returns the name of the building and its yearly
+    totals (to be collected by the demand writer of the parent process).
+    """
+    building, bpr = job
+    w = _worker_inputs
+    thermal_loads.calc_thermal_loads(building, bpr, w['weather_data'], w['usage_schedules'], w['date'], w['gv'],
+                                     w['locator'], w['use_dynamic_infiltration_calculation'], w['use_fast_rc_model'])
+    return building, _pop_totals([building])
+
+
+def _calc_thermal_loads_batch_worker(job):
+    """
+    Calculate the thermal loads of a batch of buildings in a worker process. Returns the names of the buildings and
+    their yearly totals.
+    """
+    batch, bprs = job
+    w = _worker_inputs
+    thermal_loads.calc_thermal_loads_batch(batch, bprs, w['weather_data'], w['usage_schedules'], w['date'], w['gv'],
+                                           w['locator'], w['use_dynamic_infiltration_calculation'])
+    return batch, _pop_totals(batch)
+
+
+def _pop_totals(building_names):
+    """Remove the yearly totals of the buildings from the demand writer of the worker process and return them"""
+    totals = _worker_inputs['gv'].demand_writer.totals
+    return dict((building, totals.pop(building)) for building in building_names if building in totals)
 
 
-def run_as_script(scenario_path=None, weather_path=None, use_dynamic_infiltration_calculation=False):
+def run_as_script(scenario_path=None, weather_path=None, use_dynamic_infiltration_calculation=False,
+                  use_fast_rc_model=False, batch_size=None, incremental=False, number_of_processes=None):
     gv = cea.globalvar.GlobalVariables()
+    if number_of_processes is not None:
+        gv.multiprocessing = number_of_processes > 1
+        gv.number_of_processes = number_of_processes
     if scenario_path is None:
         scenario_path = gv.scenario_reference
     locator = cea.inputlocator.InputLocator(scenario_path=scenario_path)
@@ -132,8 +311,10 @@ def run_as_script(scenario_path=None, weather_path=None, use_dynamic_infiltratio
 
     gv.log('Running demand calculation for scenario %(scenario)s', scenario=scenario_path)
     gv.log('Running demand calculation with weather file %(weather)s', weather=weather_path)
+    gv.log('Kernels in use (%(kernels)s), run `cea kernels` for details', kernels=kernels.summarize())
     demand_calculation(locator=locator, weather_path=weather_path, gv=gv,
-                       use_dynamic_infiltration_calculation=use_dynamic_infiltration_calculation)
+                       use_dynamic_infiltration_calculation=use_dynamic_infiltration_calculation,
+                       use_fast_rc_model=use_fast_rc_model, batch_size=batch_size, incremental=incremental)
 
 
 if __name__ == '__main__':
@@ -144,7 +325,17 @@ if __name__ == '__main__':
     parser.add_argument('-w', '--weather', help='Path to the weather file')
     parser.add_argument('--use-dynamic-infiltration-calculation', action='store_true',
                         help='Use the dynamic infiltration calculation instead of default')
+    parser.add_argument('--use-fast-rc-model', action='store_true',
+                        help='Calculate the R-C-model for the whole year at once (faster, same results)')
+    parser.add_argument('--batch-size', type=int, default=None,
+                        help='Calculate the buildings in batches of this size (R-C-model vectorized over buildings)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only calculate the buildings whose inputs changed since the last run')
+    parser.add_argument('--number-of-processes', type=int, default=None,
+                        help='Calculate the buildings in this number of worker processes (1: no multiprocessing)')
     args = parser.parse_args()
 
     run_as_script(scenario_path=args.scenario, weather_path=args.weather,
-                  use_dynamic_infiltration_calculation=args.use_dynamic_infiltration_calculation)
+                  use_dynamic_infiltration_calculation=args.use_dynamic_infiltration_calculation,
+                  use_fast_rc_model=args.use_fast_rc_model, batch_size=args.batch_size,
+                  incremental=args.incremental, number_of_processes=args.number_of_processes)
@@ -3,8 +3,17 @@ A collection of classes that write out the demand results files. The `cea.global
 variable references the `DemandWriter` to use. The default is `HourlyDemandWriter`. A `MonthlyDemandWriter` is provided
 that sums the values up monthly. See the `cea.analysis.sensitivity.sensitivity_demand` module for an example of using
 the `MonthlyDemandWriter`.
+
+The `ColumnarDemandWriter` writes the hourly results of all buildings to a single binary file (see
+`cea.inputlocator.InputLocator.get_demand_results_store`) instead of a csv file per building. Use
+`read_demand_results` to read the hourly results of buildings, independent of the writer used.
+
+The yearly totals of the buildings are kept in memory by the `DemandWriter` (in worker processes, they are returned
+to the parent process, see `cea.demand.demand_main`) and written to ``Total_demand.csv`` by `write_totals_csv`.
 """
+import os
 
+import numpy as np
 import pandas as pd
 
 # index into the `vars_to_print` structure, that corresponds to `gv.demand_building_csv_columns`
@@ -28,6 +37,7 @@ class DemandWriter(object):
     def __init__(self, gv):
         self.gv = gv
         self.vars_to_print = gv.demand_building_csv_columns
+        self.totals = {}  # the yearly totals of each building calculated (a dict of column -> value)
 
     def results_to_csv(self, tsd, bpr, locator, date, building_name):
 
@@ -63,19 +73,58 @@ class DemandWriter(object):
             if self.gv.print_yearly_peak:
                 data.update(dict((x + '0_kW', tsd[x].max() / 1000) for x in self.vars_to_print[LOAD_VARS]))
 
-            # get order of columns
-            keys = data.keys()
-            columns = ['Name', 'Af_m2', 'Aroof_m2', 'GFA_m2', 'people0']
-            columns.extend(keys)
-
             # add other default elements
             data.update({'Name': building_name, 'Af_m2': bpr.rc_model['Af'], 'Aroof_m2': bpr.rc_model['Aroof'],
                          'GFA_m2': bpr.rc_model['GFA_m2'], 'people0': tsd['people'].max()})
 
-            # save to disc
-            pd.DataFrame(data, index=[0]).to_csv(
-                locator.get_temporary_file('%(building_name)sT.csv' % locals()),
-                index=False, columns=columns, float_format='%.3f')
+            # keep in memory, see `write_totals_csv` (rounded as in ``Total_demand.csv``)
+            self.totals[building_name] = dict((key, value if key == 'Name' else float(FLOAT_FORMAT % value))
+                                              for key, value in data.items())
+
+    def get_totals_columns(self):
+        """The columns of ``Total_demand.csv``"""
+        columns = ['Name', 'Af_m2', 'Aroof_m2', 'GFA_m2', 'people0']
+        columns.extend(x + '_MWhyr' for x in self.vars_to_print[LOAD_VARS])
+        if self.gv.print_yearly_peak:
+            columns.extend(x + '0_kW' for x in self.vars_to_print[LOAD_VARS])
+        return columns
+
+    def read_totals(self, building_names, locator):
+        """
+        Read the yearly totals of buildings from the ``Total_demand.csv`` file of the last run (for buildings that are
+        not recalculated, see `cea.demand.demand_main.demand_calculation`).
+
+        :returns: the names of the buildings found in ``Total_demand.csv``
+        :rtype: list[str]
+        """
+        if not os.path.exists(locator.get_total_demand()):
+            return []
+        df = pd.read_csv(locator.get_total_demand(), float_precision='round_trip')
+        if set(df.columns) != set(self.get_totals_columns()):
+            return []
+        df = df.set_index('Name', drop=False)
+        found = [building_name for building_name in building_names if building_name in df.index]
+        for building_name in found:
+            self.totals[building_name] = df.loc[building_name].to_dict()
+        return found
+
+    def write_totals_csv(self, building_properties, locator):
+        """
+        Write the yearly totals of the buildings calculated to ``Total_demand.csv``.
+
+        :returns: the yearly totals and the results of each building (read from disk when accessed)
+        :rtype: (pandas.DataFrame, LazyDemandResults)
+        """
+        building_names = [name for name in building_properties.list_building_names() if name in self.totals]
+        df = pd.DataFrame.from_records([self.totals[name] for name in building_names],
+                                       columns=self.get_totals_columns())
+        df.to_csv(locator.get_total_demand(), index=False, float_format=FLOAT_FORMAT)
+        return df, LazyDemandResults(locator, building_names)
+
+    def get_result_files(self, building_name, locator):
+        """The files written for a building - used to check if the results of the building still exist"""
+        return [locator.get_demand_results_file(building_name)]
+
 
 class HourlyDemandWriter(DemandWriter):
     """Write out the hourly demand results"""
@@ -86,22 +135,48 @@ class HourlyDemandWriter(DemandWriter):
     def write_to_csv(self, building_name, columns, hourly_data, locator):
         hourly_data.to_csv(locator.get_demand_results_file(building_name), columns=columns, float_format=FLOAT_FORMAT)
 
-    def write_totals_csv(self, building_properties, locator):
-        """read in the temporary results files and append them to the Totals.csv file."""
-        df = None
-        for name in building_properties.list_building_names():
-            temporary_file = locator.get_temporary_file('%(name)sT.csv' % locals())
-            if df is None:
-                df = pd.read_csv(temporary_file)
-            else:
-                df = df.append(pd.read_csv(temporary_file), ignore_index=True)
-        df.to_csv(locator.get_total_demand(), index=False, float_format='%.3f')
 
-        """read saved data of hourly values and return as totals"""
-        hourly_data_buildings = [pd.read_csv(locator.get_demand_results_file(building_name)) for building_name in
-                                 building_properties.list_building_names()]
+class ColumnarDemandWriter(HourlyDemandWriter):
+    """
+    Write out the hourly demand results of all buildings to a single numpy ``.npz`` file (one typed array per building
+    and column, stored as ``{building_name}/{column}``) instead of a csv file per building. The file can be read
+    lazily - only the columns of the buildings accessed are loaded (see `read_demand_results`).
+
+    The buildings are written to a file per building first (the buildings may be calculated in parallel, see
+    `cea.inputlocator.InputLocator.get_demand_building_store`), these are collected into the results file by
+    `write_totals_csv`. The results of the buildings not collected yet are read from their own file.
+    """
+
+    def __init__(self, gv, dtype=np.float64):
+        super(ColumnarDemandWriter, self).__init__(gv)
+        self.dtype = dtype
+
+    def write_to_csv(self, building_name, columns, hourly_data, locator):
+        data = dict((column, hourly_data[column].values.astype(self.dtype)) for column in columns if column != 'Name')
+        data['DATE'] = hourly_data.index.values
+        data['_columns'] = np.array(columns)  # npz files don't keep the order of the arrays
+        np.savez(locator.get_demand_building_store(building_name), **data)
 
-        return df, hourly_data_buildings
+        # the csv file of a previous run would be read instead of the results file
+        if os.path.exists(locator.get_demand_results_file(building_name)):
+            os.remove(locator.get_demand_results_file(building_name))
+
+    def get_result_files(self, building_name, locator):
+        return [locator.get_demand_building_store(building_name)]
+
+    def write_totals_csv(self, building_properties, locator):
+        self.write_results_store([name for name in building_properties.list_building_names() if name in self.totals],
+                                 locator)
+        return super(ColumnarDemandWriter, self).write_totals_csv(building_properties, locator)
+
+    def write_results_store(self, building_names, locator):
+        """collect the files of the buildings into the results file"""
+        data = {}
+        for building_name in building_names:
+            with np.load(locator.get_demand_building_store(building_name)) as building_data:
+                data.update(('%s/%s' % (building_name, column), building_data[column])
+                            for column in building_data.files)
+        np.savez(locator.get_demand_results_store(), **data)
 
 
 class MonthlyDemandWriter(DemandWriter):
@@ -128,18 +203,88 @@ class MonthlyDemandWriter(DemandWriter):
         monthly_data_new['Name'] = building_name
         monthly_data_new.to_csv(locator.get_demand_results_file(building_name), index=False, float_format=FLOAT_FORMAT)
 
-    def write_totals_csv(self, building_properties, locator):
-        """read in the temporary results files and append them to the Totals.csv file."""
-        df = None
-        for name in building_properties.list_building_names():
-            temporary_file = locator.get_temporary_file('%(name)sT.csv' % locals())
-            if df is None:
-                df = pd.read_csv(temporary_file)
+
+def read_demand_results(locator, building_names, columns=None):
+    """
+    Read the hourly demand results of buildings, either from the csv file of each building (`HourlyDemandWriter`) or
+    from the results file of the scenario (`ColumnarDemandWriter`).
+
+    :param locator: the locator of the scenario
+    :type locator: cea.inputlocator.InputLocator
+    :param building_names: the names of the buildings to read
+    :type building_names: list[str]
+    :param columns: the columns to read (like ``usecols`` of ``pd.read_csv``), None for all columns
+    :type columns: list[str]
+    :return: the hourly demand results of the buildings, in the order of `building_names`
+    :rtype: list[pd.DataFrame]
+    """
+    return list(iter_demand_results(locator, building_names, columns))
+
+
+def iter_demand_results(locator, building_names, columns=None):
+    """
+    Same as `read_demand_results`, but reads the results of one building at a time. The results of a building are read
+    from its csv file, else from the file of the building written by the `ColumnarDemandWriter` if it is newer than the
+    results file of the scenario (which is only collected by `DemandWriter.write_totals_csv`), else from the results
+    file.
+    """
+    store = None
+    try:
+        for building_name in building_names:
+            csv_file = locator.get_demand_results_file(building_name)
+            building_store = locator.get_demand_building_store(building_name)
+            if os.path.exists(csv_file):
+                yield pd.read_csv(csv_file, usecols=columns)
+                continue
+            if store is None and os.path.exists(locator.get_demand_results_store()):
+                store = np.load(locator.get_demand_results_store())
+            in_store = store is not None and building_name + '/_columns' in store.files
+            if os.path.exists(building_store) and (not in_store or os.path.getmtime(building_store) >
+                                                   os.path.getmtime(locator.get_demand_results_store())):
+                with np.load(building_store) as building_data:
+                    yield _read_building_store(building_data, '', building_name, columns)
+            elif in_store:
+                yield _read_building_store(store, building_name + '/', building_name, columns)
             else:
-                df = df.append(pd.read_csv(temporary_file), ignore_index=True)
-        df.to_csv(locator.get_total_demand(), index=False, float_format='%.3f')
+                # raises the error of a missing file
+                yield pd.read_csv(csv_file, usecols=columns)
+    finally:
+        if store is not None:
+            store.close()
+
+
+def _read_building_store(store, prefix, building_name, columns):
+    """The results of a building from an ``.npz`` file written by the `ColumnarDemandWriter`"""
+    building_columns = ['DATE'] + list(store[prefix + '_columns'])
+    if columns is not None:
+        missing = set(columns) - set(building_columns)
+        if missing:
+            raise ValueError('Columns %s not found in the demand results of %s' % (sorted(missing), building_name))
+        building_columns = [column for column in building_columns if column in columns]
+    data = dict((column, store[prefix + column]) for column in building_columns if column != 'Name')
+    if 'Name' in building_columns:
+        data['Name'] = building_name
+    return pd.DataFrame(data, columns=building_columns)
+
+
+class LazyDemandResults(object):
+    """
+    The results of buildings as returned by `DemandWriter.write_totals_csv`: A read-only sequence of DataFrames (one
+    per building) that are only read from disk when accessed - so they are not read at all if not needed and are not
+    all kept in memory at the same time when iterating.
+    """
+
+    def __init__(self, locator, building_names):
+        self.locator = locator
+        self.building_names = list(building_names)
+
+    def __len__(self):
+        return len(self.building_names)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return read_demand_results(self.locator, self.building_names[index])
+        return read_demand_results(self.locator, [self.building_names[index]])[0]
 
-        """read saved data of monthly values and return as totals"""
-        monthly_data_buildings = [pd.read_csv(locator.get_demand_results_file(building_name)) for building_name in
-                                  building_properties.list_building_names()]
-        return df, monthly_data_buildings
+    def __iter__(self):
+        return iter_demand_results(self.locator, self.building_names)
@@ -192,18 +192,20 @@ def calc_Qww_st_ls(T_ext, Ta, Qww, Vww, Qww_dis_ls_r, Qww_dis_ls_nr, gv):
     Qwwf = np.zeros(8760)
     Qww_st_ls = np.zeros(8760)
     Tww_st = np.zeros(8760)
-    Qd = np.zeros(8760)
     # calculate DHW tank size [in m3] based on the peak DHW demand in the building
     Vww_0 = Vww.max()
     Tww_st_0 = gv.Tww_setpoint
 
     if Vww_0 > 0:
-        for k in range(8760):
-            Qww_st_ls[k], Qd[k], Qwwf[k] = sto_m.calc_Qww_ls_st(Ta[k], T_ext[k], Tww_st_0, Vww_0, Qww[k], Qww_dis_ls_r[k],
-                                                                Qww_dis_ls_nr[k], gv)
-            Tww_st[k] = sto_m.solve_ode_storage(Tww_st_0, Qww_st_ls[k], Qd[k], Qwwf[k], Vww_0, gv)
-            Tww_st_0 = Tww_st[k]
+        # the heat flows that do not depend on the tank temperature (see `storagetank.calc_Qww_ls_st`)
+        Ta = np.asarray(Ta, dtype=float)
+        tamb = Ta - gv.Bf * (Ta - np.asarray(T_ext, dtype=float))  # temperature in basement according to EN
+        Qww = np.asarray(Qww, dtype=float)
+        Qd = Qww + np.asarray(Qww_dis_ls_r, dtype=float) + np.asarray(Qww_dis_ls_nr, dtype=float)
+        Atank = sto_m.calc_tank_surface_area(Vww_0, gv)
+        sto_m.calc_dhw_tank_operation(tamb, Qww, Qd, float(Tww_st_0), float(Vww_0), float(Atank),
+                                      float(gv.U_dhwtank), float(gv.Tww_setpoint), float(gv.Pwater), float(gv.Cpw),
+                                      Qww_st_ls, Qwwf, Tww_st)
     else:
-        for k in range(8760):
-            Tww_st[k] = np.nan
+        Tww_st[:] = np.nan
     return Qww_st_ls, Tww_st, Qwwf
\ No newline at end of file
@@ -7,8 +7,10 @@ Query schedules according to database
 # D. Thomas   documentation               10.08.2016
 
 from __future__ import division
+import collections
 import pandas as pd
 import numpy as np
+from cea.utilities import xlsreader
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -19,6 +21,9 @@ __maintainer__ = "Daren Thomas"
 __email__ = "cea@arch.ethz.ch"
 __status__ = "Production"
 
+# the maximum number of occupancy mixes kept by `get_building_schedules` (the schedules of a mix take up ~1MB)
+SCHEDULES_CACHE_SIZE = 64
+
 
 def calc_schedules(list_uses, archetype_schedules, occupancy, archetype_values):
     """
@@ -71,10 +76,6 @@ def calc_schedules(list_uses, archetype_schedules, occupancy, archetype_values):
     schedule_code_dict = {'people': 0, 've': 0, 'Qs': 0, 'X': 0, 'Ea': 1, 'El': 1, 'Ere': 1, 'Ed': 1, 'Vww': 2,
                           'Vw': 2, 'Epro': 3, 'Qhpro': 3}
 
-    # define function to calculated the weighted average of schedules
-    def calc_average(last, current, share_of_use):
-        return last + current * share_of_use
-
     # calculate average occupant density for the building
     people_per_square_meter = 0
     for num in range(len(list_uses)):
@@ -101,8 +102,9 @@ def calc_schedules(list_uses, archetype_schedules, occupancy, archetype_values):
                     share_time_occupancy_density = current_archetype_values[num] * current_share_of_use
                     normalizing_value += share_time_occupancy_density
 
-                current_schedule = np.vectorize(calc_average)(current_schedule, archetype_schedules[num][code],
-                                                              share_time_occupancy_density)
+                # weighted average of schedules
+                current_schedule = current_schedule + np.asarray(archetype_schedules[num][code],
+                                                                 dtype=float) * share_time_occupancy_density
         if label == 'people':
             schedules[label] = current_schedule
         elif normalizing_value == 0:
@@ -112,6 +114,33 @@ def calc_schedules(list_uses, archetype_schedules, occupancy, archetype_values):
 
     return schedules
 
+
+def get_building_schedules(usage_schedules, occupancy):
+    """
+    Same as :py:func:`calc_schedules` for the uses in ``usage_schedules`` (see
+    :py:func:`cea.demand.thermal_loads.calc_thermal_loads`), but the schedules are only calculated once for each
+    occupancy mix: they are cached in ``usage_schedules['building_schedules']`` (the last `SCHEDULES_CACHE_SIZE` mixes).
+    The schedules returned are shared by all buildings with the same occupancy mix and must not be modified.
+
+    :param usage_schedules: dict containing schedules and function names of buildings.
+    :type usage_schedules: dict
+    :param occupancy: dict containing the share of the current building used by each type of occupancy
+    :type occupancy: dict[str:float]
+    :rtype: dict[array]
+    """
+    list_uses = usage_schedules['list_uses']
+    cache = usage_schedules.setdefault('building_schedules', collections.OrderedDict())
+    occupancy_mix = tuple(occupancy[use] for use in list_uses)
+    if occupancy_mix in cache:
+        return cache[occupancy_mix]
+    schedules = calc_schedules(list_uses, usage_schedules['archetype_schedules'], occupancy,
+                               usage_schedules['archetype_values'])
+    if len(cache) >= SCHEDULES_CACHE_SIZE:
+        cache.popitem(last=False)
+    cache[occupancy_mix] = schedules
+    return schedules
+
+
 # read schedules and archetypal values from excel file
 def schedule_maker(dates, locator, list_uses):
     """
@@ -126,7 +155,7 @@ def schedule_maker(dates, locator, list_uses):
     :type list_uses: list
 
     :return schedules: yearly schedule for each occupancy type used in the project
-    :type schedules: list[tuple]
+    :type schedules: list[tuple[ndarray]]
     :return occ_densities: occupant density in people per square meter for each occupancy type used in the project
     :type occ_densities: list[float]
     :return internal_loads: dictionary containing the internal loads for each occupancy type used in the project
@@ -157,21 +186,16 @@ def schedule_maker(dates, locator, list_uses):
         :type month_schedule: ndarray
 
         :return occ: occupancy schedule for each hour of the year
-        :type occ: list[float]
+        :type occ: ndarray
         :return el: electricity schedule for each hour of the year
-        :type el: list[float]
+        :type el: ndarray
         :return dhw: domestic hot water schedule for each hour of the year
-        :type dhw: list[float]
+        :type dhw: ndarray
         :return pro: process electricity schedule for each hour of the year
-        :type pro: list[float]
+        :type pro: ndarray
 
         """
 
-        occ = []
-        el = []
-        dhw = []
-        pro = []
-
         if dhw_schedules[0].sum() != 0:
             dhw_weekday_max = dhw_schedules[0].sum() ** -1
         else: dhw_weekday_max = 0
@@ -184,31 +208,25 @@ def schedule_maker(dates, locator, list_uses):
             dhw_sun_max = dhw_schedules[2].sum() ** -1
         else: dhw_sun_max = 0
 
-        for date in dates:
-            month_year = month_schedule[date.month - 1]
-            hour_day = date.hour
-            dayofweek = date.dayofweek
-            if 0 <= dayofweek < 5:  # weekday
-                occ.append(occ_schedules[0][hour_day] * month_year)
-                el.append(el_schedules[0][hour_day] * month_year)
-                dhw.append(dhw_schedules[0][hour_day] * month_year * dhw_weekday_max) # normalized dhw demand flow rates
-                pro.append(pro_schedules[0][hour_day] * month_year)
-            elif dayofweek is 5:  # saturday
-                occ.append(occ_schedules[1][hour_day] * month_year)
-                el.append(el_schedules[1][hour_day] * month_year)
-                dhw.append(dhw_schedules[1][hour_day] * month_year * dhw_sat_max) # normalized dhw demand flow rates
-                pro.append(pro_schedules[1][hour_day] * month_year)
-            else:  # sunday
-                occ.append(occ_schedules[2][hour_day] * month_year)
-                el.append(el_schedules[2][hour_day] * month_year)
-                dhw.append(dhw_schedules[2][hour_day] * month_year * dhw_sun_max) # normalized dhw demand flow rates
-                pro.append(pro_schedules[2][hour_day] * month_year)
+        # look up the values of each hour by day type (0: weekday, 1: saturday, 2: sunday), hour of the day and month
+        dayofweek = np.asarray(dates.dayofweek)
+        day_type = np.where(dayofweek < 5, 0, np.where(dayofweek == 5, 1, 2))
+        hour_day = np.asarray(dates.hour)
+        month_year = np.asarray(month_schedule, dtype=float)[np.asarray(dates.month) - 1]
+        dhw_max = np.array([dhw_weekday_max, dhw_sat_max, dhw_sun_max], dtype=float)[day_type]
+
+        occ = np.asarray(occ_schedules, dtype=float)[day_type, hour_day] * month_year
+        el = np.asarray(el_schedules, dtype=float)[day_type, hour_day] * month_year
+        # normalized dhw demand flow rates
+        dhw = np.asarray(dhw_schedules, dtype=float)[day_type, hour_day] * month_year * dhw_max
+        pro = np.asarray(pro_schedules, dtype=float)[day_type, hour_day] * month_year
 
         return occ, el, dhw, pro
 
     # get internal loads and indoor comfort from archetypes
-    archetypes_internal_loads = pd.read_excel(locator.get_archetypes_properties(), 'INTERNAL_LOADS').set_index('Code')
-    archetypes_indoor_comfort = pd.read_excel(locator.get_archetypes_properties(), 'INDOOR_COMFORT').set_index('Code')
+    archetypes_properties = xlsreader.read_workbook(locator.get_archetypes_properties())
+    archetypes_internal_loads = archetypes_properties['INTERNAL_LOADS'].set_index('Code')
+    archetypes_indoor_comfort = archetypes_properties['INDOOR_COMFORT'].set_index('Code')
 
     # create empty list of archetypal schedules and occupant densities
     schedules = []
@@ -229,7 +247,7 @@ def schedule_maker(dates, locator, list_uses):
 
     for use in list_uses:
         # read from archetypes_schedules and properties
-        archetypes_schedules = pd.read_excel(locator.get_archetypes_schedules(), use).T
+        archetypes_schedules = xlsreader.read_excel(locator.get_archetypes_schedules(), use).T
 
         # read lists of every daily profile
         occ_schedules, el_schedules, dhw_schedules, pro_schedules, month_schedule, area_per_occupant = read_schedules(
@@ -11,6 +11,7 @@ from __future__ import absolute_import
 import numpy as np
 import pandas as pd
 from cea.utilities.dbfreader import dbf_to_dataframe, dataframe_to_dbf
+from cea.utilities import xlsreader
 import cea.inputlocator
 
 __author__ = "Jimeno A. Fonseca"
@@ -58,7 +59,7 @@ def properties(locator, prop_architecture_flag, prop_hvac_flag, prop_comfort_fla
     # get occupant densities from archetypes schedules
     occupant_densities = {}
     for use in list_uses:
-        archetypes_schedules = pd.read_excel(locator.get_archetypes_schedules(), use).T
+        archetypes_schedules = xlsreader.read_excel(locator.get_archetypes_schedules(), use).T
         area_per_occupant = archetypes_schedules['density'].values[:1][0]
         if area_per_occupant > 0:
             occupant_densities[use] = 1 / area_per_occupant
@@ -166,7 +167,7 @@ def calc_mainuse(uses_df, uses):
 
 
 def get_database(path_database, sheet):
-    database = pd.read_excel(path_database, sheet)
+    database = xlsreader.read_excel(path_database, sheet)
     return database
 
 
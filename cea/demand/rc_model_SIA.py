@@ -5,6 +5,8 @@ from __future__ import division
 
 import numpy as np
 
+from cea.utilities import kernels
+
 __author__ = "Gabriel Happle"
 __copyright__ = "Copyright 2016, Architecture and Building Systems - ETH Zurich"
 __credits__ = ["Gabriel Happle"]
@@ -830,12 +832,8 @@ def lookup_f_hc_cv_cooling(bpr):
     return f_hc_cv
 
 
-# use the optimized (numba_cc) versions of the functions in this module if available
-try:
-    # import Numba AOT versions of the functions above, overwriting them
-    from rc_model_sia_cc import (calc_phi_m, calc_phi_c, calc_theta_c, calc_phi_m_tot, calc_phi_a, calc_theta_m,
-                                 calc_h_ea, calc_theta_m_t, calc_theta_ea, calc_h_em, calc_h_3)
-except ImportError:
-    # fall back to using the python version
-    print('failed to import from rc_model_sia_cc.pyd, falling back to pure python functions')
-    pass
+# use the compiled versions of the functions in this module if available (see `cea.utilities.kernels`)
+calc_phi_m, calc_phi_c, calc_theta_c, calc_phi_m_tot, calc_phi_a, calc_theta_m, calc_h_ea, calc_theta_m_t, \
+calc_theta_ea, calc_h_em, calc_h_3 = kernels.compile_kernels(
+    __name__, [calc_phi_m, calc_phi_c, calc_theta_c, calc_phi_m_tot, calc_phi_a, calc_theta_m, calc_h_ea,
+               calc_theta_m_t, calc_theta_ea, calc_h_em, calc_h_3], 'rc_model_sia_cc')
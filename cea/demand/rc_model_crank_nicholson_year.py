@@ -0,0 +1,871 @@
+# -*- coding: utf-8 -*-
+"""
+Whole-year engine for the SIA 2044 R-C-model (Crank-Nicholson procedure)
+
+This module computes the same hourly results as the loop in :py:func:`cea.demand.thermal_loads.calc_thermal_loads`
+calling :py:func:`cea.demand.rc_model_crank_nicholson_procedure.calc_rc_model_demand_heating_cooling`, but:
+
+- all time-invariant coupling coefficients of the R-C-model (``h_ec``, ``h_ac``, ``f_sc``, ``f_ic``, ``f_im``,
+  ``f_sm``, ``h_mc``, ``h_em``, ``c_m``) are calculated once per building (see :py:func:`calc_rc_model_constants`)
+- all time series that do not depend on the state of the building (internal gains, incident solar gains,
+  season / night time flags) are calculated once per building as arrays
+- the recursion of the thermal mass temperature ``theta_m`` runs in a single kernel (``_calc_year``) with the
+  heating / cooling / ventilation control logic resolved per time step inside the kernel. The kernel is compiled with
+  numba if it is installed (see :py:mod:`cea.utilities.kernels`), otherwise it runs as pure python on lists.
+
+:py:func:`calc_rc_model_demand_heating_cooling_buildings` runs the same procedure for a batch of buildings, stacking
+their parameters and time series into arrays and advancing all buildings through the year together (each time step
+is a set of numpy operations over the buildings).
+
+The floating point operations are done in the same order as in the hourly procedure, so the results are identical
+to the ones of the hourly procedure (``TestCalcThermalLoads.test_calc_thermal_loads_fast_rc_model`` compares both
+engines with a relative tolerance of 1e-9 to be safe against compiler optimizations).
+"""
+from __future__ import division
+
+import numpy as np
+
+from cea.demand import airconditioning_model, control_heating_cooling_systems, control_ventilation_systems, \
+    space_emission_systems, ventilation_air_flows_detailed
+from cea.demand import rc_model_SIA
+from cea.demand.rc_model_SIA import f_sa, f_r_l, f_r_p, f_r_a
+from cea.utilities import helpers, kernels
+from cea.utilities.physics import BOLTZMANN
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas", "Gabriel Happle"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "thomas@arch.ethz.ch"
+__status__ = "Production"
+
+
+# system status codes written by the kernel (see ``SYSTEM_STATUS``)
+STATUS_OFF = 0
+STATUS_RADIATIVE_HEATING = 1
+STATUS_AC_HEATING = 2
+STATUS_AC_OVER_HEATING = 3
+STATUS_RADIATIVE_COOLING = 4
+STATUS_AC_COOLING = 5
+STATUS_AC_OVER_COOLING = 6
+
+SYSTEM_STATUS = ['systems off', 'Radiative heating', 'AC heating', 'AC over heating', 'Radiative cooling',
+                 'AC cooling', 'AC over cooling']
+
+# temperature tolerance of the heating / cooling demand check, see `rc_model_SIA.has_heating_demand`
+TEMP_TOLERANCE = 0.001
+
+# night flushing control parameters, see `control_ventilation_systems.is_night_flushing_active`
+NIGHT_FLUSHING_TEMPERATURE_ZONE_CONTROL = 26  # (°C)
+NIGHT_FLUSHING_DELTA_T = 2  # (°C)
+
+# time series written by the kernel (in the order of the arguments of ``_calc_year``)
+RESULT_FIELDS = ['I_sol', 'I_rad', 'm_ve_mech', 'm_ve_window', 'm_ve_inf', 'theta_ve_mech', 'theta_a', 'theta_m',
+                 'theta_c', 'theta_o', 'Qhs_sen', 'Qhs_sen_sys', 'Qhs_lat_sys', 'Qhs_em_ls', 'Ehs_lat_aux',
+                 'ma_sup_hs', 'Ta_sup_hs', 'Ta_re_hs', 'Qcs_sen', 'Qcs_sen_sys', 'Qcs_lat_sys', 'Qcs_em_ls',
+                 'ma_sup_cs', 'Ta_sup_cs', 'Ta_re_cs', 'm_ve_recirculation']
+
+
+def calc_rc_model_constants(bpr):
+    """
+    Calculate the time-invariant coupling coefficients of the SIA 2044 R-C-model for a building. These are the
+    values re-calculated at every call of :py:func:`cea.demand.rc_model_SIA._calc_rc_model_temperatures`.
+
+    :param bpr: building properties row object
+    :type bpr: cea.demand.thermal_loads.BuildingPropertiesRow
+    :return: coupling coefficients, keyed by the names used in `rc_model_SIA`
+    :rtype: dict
+    """
+    a_t = bpr.rc_model['Atot']
+    a_m = bpr.rc_model['Am']
+    a_w = bpr.rc_model['Aw']
+
+    h_ec = rc_model_SIA.calc_h_ec(Htr_w=bpr.rc_model['Htr_w'])
+    h_mc = rc_model_SIA.calc_h_mc(a_m=a_m)
+    h_em = rc_model_SIA.calc_h_em(rc_model_SIA.calc_h_op_m(Htr_op=bpr.rc_model['Htr_op']), h_mc)
+
+    return {'h_ec': h_ec,
+            'h_ac': rc_model_SIA.calc_h_ac(a_t),
+            'h_mc': h_mc,
+            'h_em': h_em,
+            'f_sc': rc_model_SIA.calc_f_sc(a_t, a_m, a_w, h_ec),
+            'f_ic': rc_model_SIA.calc_f_ic(a_t, a_m, h_ec),
+            'f_im': rc_model_SIA.calc_f_im(a_t=a_t, a_m=a_m),
+            'f_sm': rc_model_SIA.calc_f_sm(a_t=a_t, a_m=a_m, a_w=a_w),
+            'c_m': bpr.rc_model['Cm'] / 3600}  # (Wh/K) SIA 2044 unit is Wh/K, ISO unit is J/K
+
+
+def calc_I_sol_gross(bpr, gv):
+    """
+    Incident solar gains of the building (before re-irradiation to the sky) for each hour of the year, see
+    :py:func:`cea.demand.sensible_loads.calc_I_sol`.
+
+    :param bpr: building properties row object
+    :param gv: global variables
+    :return: solar gains [W] for each hour of the year
+    :rtype: numpy.ndarray
+    """
+    I_win = np.asarray(bpr.solar.I_win, dtype=float)
+    Fsh_win = np.where(I_win > 300, bpr.architecture.G_win * bpr.architecture.rf_sh, bpr.architecture.G_win)
+
+    Asol_wall = bpr.rc_model['Awall_all'] * bpr.architecture.a_wall * gv.Rse * bpr.rc_model['U_wall']
+    Asol_roof = bpr.rc_model['Aroof'] * bpr.architecture.a_roof * gv.Rse * bpr.rc_model['U_roof']
+    Asol_win = Fsh_win * bpr.rc_model['Aw'] * (1 - gv.F_f)
+
+    return (np.asarray(bpr.solar.I_roof, dtype=float) * Asol_roof + I_win * Asol_win +
+            np.asarray(bpr.solar.I_wall, dtype=float) * Asol_wall)
+
+
+def calc_season_hours(gv):
+    """
+    The hours of the year in the order they are simulated (including the 720 hours of the heating up phase)
+    """
+    return [helpers.seasonhour_2_hoy(t, gv) for t in range(-720, 8760)]
+
+
+def calc_rc_model_demand_heating_cooling_year(bpr, tsd, gv, use_dynamic_infiltration_calculation=False):
+    """
+    Calculate the heating and cooling demand of a building for the whole year. This is a drop-in replacement for
+    the hourly loop in :py:func:`cea.demand.thermal_loads.calc_thermal_loads` calling
+
+    - :py:func:`cea.demand.sensible_loads.calc_Qgain_sen`
+    - :py:func:`cea.demand.ventilation_air_flows_simple.calc_air_mass_flow_mechanical_ventilation`
+    - :py:func:`cea.demand.ventilation_air_flows_simple.calc_air_mass_flow_window_ventilation`
+    - :py:func:`cea.demand.ventilation_air_flows_simple.calc_theta_ve_mech`
+    - :py:func:`cea.demand.rc_model_crank_nicholson_procedure.calc_rc_model_demand_heating_cooling`
+
+    for each hour of the year.
+
+    :param bpr: building properties row object
+    :type bpr: cea.demand.thermal_loads.BuildingPropertiesRow
+    :param tsd: time series data dict, the ``RESULT_FIELDS`` and ``system_status`` are updated
+    :type tsd: dict
+    :param gv: global variables
+    :type gv: cea.globalvar.GlobalVariables
+    :param use_dynamic_infiltration_calculation: calculate the infiltration with the detailed natural ventilation
+        model instead of using the static ``tsd['m_ve_inf']``
+    :type use_dynamic_infiltration_calculation: bool
+    :return: updates tsd
+    """
+    constants, flags, systems, radiation, time_series = _calc_kernel_inputs(bpr, tsd, gv)
+
+    results = [np.zeros(8760) * np.nan for _ in RESULT_FIELDS]
+    results[RESULT_FIELDS.index('m_ve_inf')][:] = tsd['m_ve_inf']
+    status = np.zeros(8760, dtype=np.int64)
+
+    if use_dynamic_infiltration_calculation:
+        # the detailed natural ventilation model is python only
+        calc_m_ve_inf = _get_calc_m_ve_inf_dynamic(bpr, tsd, gv)
+    else:
+        calc_m_ve_inf = None
+
+    if JIT_ACTIVE and calc_m_ve_inf is None:
+        _calc_year(constants, flags, systems, radiation, calc_m_ve_inf, status, *(time_series + results))
+    else:
+        # python lists are much faster to index than numpy arrays in pure python
+        py_results = [r.tolist() for r in results]
+        py_status = status.tolist()
+        getattr(_calc_year, 'py_func', _calc_year)(constants, flags, systems, radiation, calc_m_ve_inf, py_status,
+                                                   *([ts.tolist() for ts in time_series] + py_results))
+        results = [np.array(r) for r in py_results]
+        status = np.array(py_status)
+
+    _update_tsd(tsd, results, status)
+    return
+
+
+def calc_rc_model_demand_heating_cooling_buildings(bprs, tsds, gv, use_dynamic_infiltration_calculation=False):
+    """
+    Calculate the heating and cooling demand of several buildings for the whole year. The buildings are advanced
+    through the hours of the year together, each time step is a set of numpy operations over the buildings (the
+    AC model and the dynamic infiltration are still calculated building by building, but only for the buildings
+    that need them in that time step).
+
+    The results are the same as calling :py:func:`calc_rc_model_demand_heating_cooling_year` for each building.
+
+    :param bprs: building properties row objects (only buildings with conditioned area, ``Af > 0``)
+    :type bprs: list[cea.demand.thermal_loads.BuildingPropertiesRow]
+    :param tsds: time series data dicts of the buildings, the ``RESULT_FIELDS`` and ``system_status`` are updated
+    :type tsds: list[dict]
+    :param gv: global variables
+    :type gv: cea.globalvar.GlobalVariables
+    :param use_dynamic_infiltration_calculation: calculate the infiltration with the detailed natural ventilation
+        model instead of using the static ``tsd['m_ve_inf']``
+    :type use_dynamic_infiltration_calculation: bool
+    :return: updates the tsds
+    """
+    if not len(bprs):
+        return
+    inputs = [_calc_kernel_inputs(bpr, tsd, gv) for bpr, tsd in zip(bprs, tsds)]
+
+    # stack the inputs: one row per parameter / hour of the year, one column per building
+    constants, flags, systems, radiation = [np.array([building_inputs[i] for building_inputs in inputs]).T
+                                            for i in range(4)]
+    time_series = inputs[0][4][:3]  # season hours, heating season and night time flags are the same for all
+    time_series.extend(np.column_stack([building_inputs[4][i] for building_inputs in inputs])
+                       for i in range(3, len(inputs[0][4])))
+
+    results = [np.zeros((8760, len(tsds))) * np.nan for _ in RESULT_FIELDS]
+    results[RESULT_FIELDS.index('m_ve_inf')][:] = np.column_stack([tsd['m_ve_inf'] for tsd in tsds])
+    status = np.zeros((8760, len(tsds)), dtype=np.int64)
+
+    if use_dynamic_infiltration_calculation:
+        # the air flows of all the buildings are solved at once
+        calc_m_ve_inf = _get_calc_m_ve_inf_dynamic(bprs, tsds, gv)
+    else:
+        calc_m_ve_inf = None
+
+    # the results of both branches of `np.where` are calculated, but only the valid ones are used
+    with np.errstate(divide='ignore', invalid='ignore'):
+        _calc_year_buildings(constants, flags, systems, radiation, calc_m_ve_inf, status, *(time_series + results))
+
+    for i, tsd in enumerate(tsds):
+        _update_tsd(tsd, [np.ascontiguousarray(r[:, i]) for r in results], np.ascontiguousarray(status[:, i]))
+    return
+
+
+def _calc_kernel_inputs(bpr, tsd, gv):
+    """
+    Collect the inputs of the kernel for a building.
+
+    :return: constants, flags, systems, radiation (tuples of scalars) and time_series (list of arrays), see the
+        arguments of ``_calc_year``
+    """
+    c = calc_rc_model_constants(bpr)
+    constants = (c['h_ec'], c['h_ac'], c['h_mc'], c['h_em'], c['c_m'], c['f_sc'], c['f_ic'], c['f_im'], c['f_sm'])
+
+    # building system configuration
+    has_heating_system = control_heating_cooling_systems.has_heating_system(bpr)
+    has_cooling_system = control_heating_cooling_systems.has_cooling_system(bpr)
+    flags = (has_heating_system,
+             has_cooling_system,
+             control_heating_cooling_systems.heating_system_is_ac(bpr),
+             control_heating_cooling_systems.cooling_system_is_ac(bpr),
+             control_ventilation_systems.has_mechanical_ventilation(bpr),
+             control_ventilation_systems.has_window_ventilation(bpr),
+             control_ventilation_systems.has_mechanical_ventilation_heat_recovery(bpr),
+             control_ventilation_systems.has_night_flushing(bpr),
+             control_ventilation_systems.has_mechanical_ventilation_economizer(bpr))
+
+    # heating / cooling system properties
+    phi_hc_10 = 10 * bpr.rc_model['Af']
+    systems = (rc_model_SIA.lookup_f_hc_cv_heating(bpr) if has_heating_system else 0.0,
+               rc_model_SIA.lookup_f_hc_cv_cooling(bpr) if has_cooling_system else 0.0,
+               phi_hc_10,
+               bpr.hvac['Qhsmax_Wm2'] * bpr.rc_model['Af'],
+               -bpr.hvac['Qcsmax_Wm2'] * bpr.rc_model['Af'],
+               space_emission_systems.calc_delta_theta_int_inc_heating(bpr) if has_heating_system else 0.0,
+               space_emission_systems.calc_delta_theta_int_inc_cooling(bpr) if has_cooling_system else 0.0,
+               space_emission_systems.get_delta_theta_e_sol(bpr) if has_cooling_system else 0.0,
+               gv.nrec_N,
+               float(np.max(tsd['m_ve_required'])),
+               gv.temp_sup_heat_hvac, gv.temp_comf_max, gv.rhum_comf_max, gv.temp_sup_cool_hvac)
+
+    # re-irradiation to the sky, see `sensible_loads.calc_I_rad`
+    radiation = (gv.Rse * bpr.rc_model['U_wall'], 4.0 * bpr.architecture.e_wall * BOLTZMANN, bpr.rc_model['Awall_all'],
+                 gv.Rse * bpr.rc_model['U_win'], 4.0 * bpr.architecture.e_win * BOLTZMANN, bpr.rc_model['Aw'],
+                 gv.Rse * bpr.rc_model['U_roof'], 4.0 * bpr.architecture.e_roof * BOLTZMANN, bpr.rc_model['Aroof'])
+
+    # time series independent of the state of the building
+    # (the order of the floating point operations is the same as in `rc_model_SIA` to get identical results)
+    phi_i_l = 0.9 * tsd['Elf']
+    phi_i_a = 0.9 * tsd['Eaf'] + tsd['Qcdataf'] - tsd['Qcref']
+    phi_i_p = tsd['Qs']
+    time_series = [np.array(calc_season_hours(gv), dtype=np.int64),
+                   np.array([helpers.is_heatingseason_hoy(hoy) for hoy in range(8760)], dtype=np.bool_),
+                   np.array([helpers.is_nighttime_hoy(hoy) for hoy in range(8760)], dtype=np.bool_)]
+    time_series.extend(np.array(ts, dtype=float) for ts in (
+        tsd['T_ext'], tsd['T_sky'], tsd['ta_hs_set'], tsd['ta_cs_set'], tsd['m_ve_required'], tsd['w_int'],
+        tsd['rh_ext'], calc_I_sol_gross(bpr, gv), (1 - f_r_l) * phi_i_l, (1 - f_r_p) * phi_i_p, (1 - f_r_a) * phi_i_a,
+        f_r_l * phi_i_l + f_r_p * phi_i_p + f_r_a * phi_i_a))
+
+    return constants, flags, systems, radiation, time_series
+
+
+def _get_calc_m_ve_inf_dynamic(bpr, tsd, gv):
+    """
+    :param bpr: building properties row object, or a list of them to calculate several buildings at once
+    :param tsd: time series data dict, or a list of them (one per building)
+    :return: a function ``calc_m_ve_inf(theta_a_t_1, t)`` calculating the infiltration of a building (or an array
+        with the infiltration of the buildings) with the detailed natural ventilation model
+    """
+    if isinstance(bpr, list):
+        dict_props_nat_vent = ventilation_air_flows_detailed.stack_properties_natural_ventilation(
+            [ventilation_air_flows_detailed.get_properties_natural_ventilation(b, gv) for b in bpr])
+        u_wind = np.column_stack([t['u_wind'] for t in tsd])
+        T_ext = np.column_stack([t['T_ext'] for t in tsd])
+        p_zone = np.ones(len(bpr))  # (Pa) zone pressures, initial estimate of the first hour
+    else:
+        dict_props_nat_vent = ventilation_air_flows_detailed.get_properties_natural_ventilation(bpr, gv)
+        u_wind = tsd['u_wind']
+        T_ext = tsd['T_ext']
+        p_zone = 1.0  # (Pa) zone pressure, initial estimate of the first hour
+    # the zone pressure of the previous hour is the initial estimate of the next hour
+    state = {'p_zone': p_zone}
+
+    def calc_m_ve_inf(theta_a_t_1, t):
+        # OVERWRITE STATIC INFILTRATION WITH DYNAMIC INFILTRATION RATE
+        qm_sum_in, qm_sum_out, state['p_zone'] = ventilation_air_flows_detailed.calc_air_flows(
+            theta_a_t_1, u_wind[t], T_ext[t], dict_props_nat_vent, state['p_zone'])
+        # INFILTRATION IS FORCED NOT TO REACH ZERO IN ORDER TO AVOID THE RC MODEL TO FAIL
+        return np.maximum(qm_sum_in / 3600, 1 / 3600)
+    return calc_m_ve_inf
+
+
+def _update_tsd(tsd, results, status):
+    """
+    Write the results of the kernel to the time series data of a building.
+    """
+    for field, values in zip(RESULT_FIELDS, results):
+        tsd[field] = values
+
+    # the hourly procedure resets these values in the heating / cooling cases
+    heating = (status >= STATUS_RADIATIVE_HEATING) & (status <= STATUS_AC_OVER_HEATING)
+    cooling = status >= STATUS_RADIATIVE_COOLING
+    for field in ['Qhsf', 'Qhsf_lat']:
+        tsd[field][heating] = 0
+    for field in ['Qcs', 'Qcsf', 'Qcsf_lat']:
+        tsd[field][cooling] = 0
+    tsd['system_status'][:] = [SYSTEM_STATUS[s] for s in status]
+
+
+def _calc_year(constants, flags, systems, radiation, calc_m_ve_inf, status, season_hours, is_heating_season, is_night,
+               T_ext, T_sky, ta_hs_set, ta_cs_set, m_ve_required, w_int, rh_ext, I_sol_gross, phi_i_l_cv, phi_i_p_cv,
+               phi_i_a_cv, phi_i_r,
+               I_sol, I_rad, m_ve_mech, m_ve_window, m_ve_inf, theta_ve_mech, theta_a, theta_m, theta_c, theta_o,
+               Qhs_sen, Qhs_sen_sys, Qhs_lat_sys, Qhs_em_ls, Ehs_lat_aux, ma_sup_hs, Ta_sup_hs, Ta_re_hs,
+               Qcs_sen, Qcs_sen_sys, Qcs_lat_sys, Qcs_em_ls, ma_sup_cs, Ta_sup_cs, Ta_re_cs, m_ve_recirculation):
+    """
+    Kernel of :py:func:`calc_rc_model_demand_heating_cooling_year`: Loops over the hours in ``season_hours`` and
+    writes the results to the output sequences (``I_sol`` ... ``m_ve_recirculation``) and the ``status`` codes.
+
+    The inputs / outputs are either numpy arrays (compiled with numba) or python lists (pure python).
+    """
+    h_ec, h_ac, h_mc, h_em, c_m, f_sc, f_ic, f_im, f_sm = constants
+    has_heating_system, has_cooling_system, heating_is_ac, cooling_is_ac, has_mech_vent, has_win_vent, \
+        has_heat_rec, has_night_flushing, has_economizer = flags
+    f_hc_cv_h, f_hc_cv_c, phi_hc_10, phi_h_max, phi_c_max, delta_theta_int_inc_heating, \
+        delta_theta_int_inc_cooling, delta_theta_e_sol, eta_rec, m_ve_required_max, temp_sup_heat_hvac, \
+        temp_comf_max, rhum_comf_max, temp_sup_cool_hvac = systems
+    rse_u_wall, hr_wall, a_wall, rse_u_win, hr_win, a_win, rse_u_roof, hr_roof, a_roof = radiation
+    Fform_wall, Fform_win, Fform_roof = 0.5, 0.5, 1.0  # 50% reiradiated by vertical surfaces and 100% by horizontal.
+    f_s_c = (1 - f_sa) * f_sc
+    f_s_m = (1 - f_sa) * f_sm
+
+    for t in season_hours:
+        t_1 = t - 1
+        if t_1 < 0:
+            t_1 = 8759  # the same element as [-1] (negative indexes are not supported by all sequences)
+        T_ext_t = T_ext[t]
+        theta_a_t_1 = theta_a[t_1]  # NaN in the first hour
+        theta_a_t_1_valid = theta_a_t_1 if theta_a_t_1 == theta_a_t_1 else T_ext[t_1]
+        theta_m_t_1 = theta_m[t_1]
+        if theta_m_t_1 != theta_m_t_1:
+            theta_m_t_1 = T_ext[t_1]
+        theta_c_t_1 = theta_c[t_1]
+        if theta_c_t_1 != theta_c_t_1:
+            theta_c_t_1 = T_ext[t_1]
+        heating_season = is_heating_season[t]
+
+        # sensible heat gains
+        theta_ss = T_sky[t] - theta_c_t_1
+        theta_ss_3 = (theta_ss + 273.0) ** 3.0
+        I_rad_t = (Fform_wall * (rse_u_wall * (hr_wall * theta_ss_3) * a_wall * theta_ss) +
+                   Fform_win * (rse_u_win * (hr_win * theta_ss_3) * a_win * theta_ss) +
+                   Fform_roof * (rse_u_roof * (hr_roof * theta_ss_3) * a_roof * theta_ss))
+        I_sol_t = I_sol_gross[t] - I_rad_t
+        I_rad[t] = I_rad_t
+        I_sol[t] = I_sol_t
+
+        if calc_m_ve_inf is not None:
+            m_ve_inf[t] = calc_m_ve_inf(theta_a_t_1_valid, t)
+
+        # ventilation air flows [kg/s]
+        night_flushing = (has_night_flushing and not heating_season and is_night[t]
+                          and theta_a_t_1 > NIGHT_FLUSHING_TEMPERATURE_ZONE_CONTROL
+                          and theta_a_t_1 > T_ext_t + NIGHT_FLUSHING_DELTA_T)
+        economizer = (has_economizer and not heating_season and theta_a_t_1 > ta_cs_set[t]
+                      and ta_cs_set[t] >= T_ext_t)
+        mech_vent_active = has_mech_vent and (m_ve_required[t] > 0 or night_flushing)
+        win_vent_active = has_win_vent and not mech_vent_active
+
+        if mech_vent_active and not night_flushing and not economizer:
+            m_ve_mech_t = max(m_ve_required[t] - m_ve_inf[t], 0.0)
+        elif has_mech_vent and (night_flushing or economizer):
+            m_ve_mech_t = m_ve_required_max
+        else:
+            m_ve_mech_t = 0.0
+        if win_vent_active and not night_flushing:
+            m_ve_window_t = max(m_ve_required[t] - m_ve_inf[t], 0.0)
+        elif win_vent_active:
+            m_ve_window_t = m_ve_required_max
+        else:
+            m_ve_window_t = 0.0
+        m_ve_mech[t] = m_ve_mech_t
+        m_ve_window[t] = m_ve_window_t
+
+        # ventilation air temperature
+        if mech_vent_active and has_heat_rec and (heating_season or theta_a_t_1 < T_ext_t):
+            theta_ve_mech_t = T_ext_t + eta_rec * (theta_a_t_1_valid - T_ext_t)
+        else:
+            theta_ve_mech_t = T_ext_t
+        theta_ve_mech[t] = theta_ve_mech_t
+
+        # parts of the R-C-model that do not depend on the heating / cooling power
+        m_ve_inf_t = m_ve_inf[t]
+        h_ea = (m_ve_mech_t * 3600 + m_ve_window_t * 3600 + m_ve_inf_t * 3600) * (1.005 / 3.6)
+        theta_ea = ((m_ve_mech_t * theta_ve_mech_t + (m_ve_window_t + m_ve_inf_t) * T_ext_t) /
+                    (m_ve_mech_t + m_ve_window_t + m_ve_inf_t))
+        h_1 = 1 / (1 / h_ea + 1 / h_ac)
+        h_2 = h_1 + h_ec
+        h_3 = 1.0 / (1.0 / h_2 + 1.0 / h_mc)
+        phi_a_0 = f_sa * I_sol_t + phi_i_l_cv[t] + phi_i_p_cv[t] + phi_i_a_cv[t]
+        phi_i_r_t = phi_i_r[t]
+        phi_s_c = f_s_c * I_sol_t
+        phi_s_m = f_s_m * I_sol_t
+        k_m_1 = c_m - 0.5 * (h_3 + h_em)
+        k_m_2 = c_m + 0.5 * (h_3 + h_em)
+        k_c = h_mc + h_ec + h_1
+        k_a = h_ac + h_ea
+
+        # temperatures with zero heating / cooling power
+        theta_a_0, theta_m_0, theta_c_0 = _calc_temperatures(
+            0.0, 0.0, phi_a_0, phi_i_r_t, phi_s_c, phi_s_m, f_ic, f_im, theta_m_t_1, theta_ea, T_ext_t, h_1, h_2,
+            h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c, k_a)
+
+        heating_active = (heating_season and has_heating_system and ta_hs_set[t] == ta_hs_set[t]
+                          and theta_a_0 < ta_hs_set[t] - TEMP_TOLERANCE)
+        cooling_active = (not heating_season and has_cooling_system and T_ext_t >= ta_cs_set[t]
+                          and ta_cs_set[t] == ta_cs_set[t] and theta_a_0 > ta_cs_set[t] + TEMP_TOLERANCE)
+
+        # ++++++++++++++++++++++++++++++
+        # CASE 0 - NO HEATING OR COOLING
+        # ++++++++++++++++++++++++++++++
+        if not heating_active and not cooling_active:
+            theta_a[t] = theta_a_0
+            theta_m[t] = theta_m_0
+            theta_c[t] = theta_c_0
+            theta_o[t] = theta_a_0 * 0.31 + theta_c_0 * 0.69
+            Qhs_sen[t] = Qhs_sen_sys[t] = Qhs_lat_sys[t] = Qhs_em_ls[t] = ma_sup_hs[t] = Ehs_lat_aux[t] = 0.0
+            Ta_sup_hs[t] = Ta_re_hs[t] = 0.0
+            Qcs_sen[t] = Qcs_sen_sys[t] = Qcs_lat_sys[t] = Qcs_em_ls[t] = ma_sup_cs[t] = 0.0
+            Ta_sup_cs[t] = Ta_re_cs[t] = 0.0
+            m_ve_recirculation[t] = 0.0
+            status[t] = STATUS_OFF
+
+        # ++++++++++++++++
+        # CASE 1 - HEATING
+        # ++++++++++++++++
+        elif heating_active:
+            status[t] = STATUS_RADIATIVE_HEATING
+            theta_a_10 = _calc_temperatures(
+                f_hc_cv_h * phi_hc_10, (1 - f_hc_cv_h) * phi_hc_10, phi_a_0, phi_i_r_t, phi_s_c, phi_s_m, f_ic,
+                f_im, theta_m_t_1, theta_ea, T_ext_t, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c,
+                k_a)[0]
+
+            # interpolate heating power
+            # (64) in SIA 2044 / Korrigenda C1 zum Merkblatt SIA 2044:2011 / Korrigenda C2 zum Mekblatt SIA 2044:2011
+            phi_hc_ul = phi_hc_10 * (ta_hs_set[t] - theta_a_0) / (theta_a_10 - theta_a_0)
+            if 0 < phi_hc_ul <= phi_h_max:
+                phi_h_act = phi_hc_ul
+            elif 0 < phi_hc_ul > phi_h_max:
+                phi_h_act = phi_h_max
+            else:
+                raise ValueError('Unexpected heating power')
+
+            theta_a_t, theta_m_t, theta_c_t = _calc_temperatures(
+                f_hc_cv_h * phi_h_act, (1 - f_hc_cv_h) * phi_h_act, phi_a_0, phi_i_r_t, phi_s_c, phi_s_m, f_ic, f_im,
+                theta_m_t_1, theta_ea, T_ext_t, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c, k_a)
+            Qhs_sen_sys_t = phi_h_act
+            Ehs_lat_aux[t] = ma_sup_hs[t] = Ta_sup_hs[t] = Ta_re_hs[t] = 0.0
+
+            if heating_is_ac:
+                status[t] = STATUS_AC_HEATING
+                q_hs_sen_hvac, ma_sup_hs_t, ta_sup_hs_t, ta_re_hs_t, e_hs_lat_aux_t, m_ve_hvac_recirculation = \
+                    _calc_hvac_heating(theta_a_t, phi_h_act / 1000, m_ve_mech_t, w_int[t], rh_ext[t], T_ext_t,
+                                       theta_ve_mech_t, temp_sup_heat_hvac, temp_comf_max, rhum_comf_max)
+                if m_ve_mech_t + m_ve_hvac_recirculation < 0:
+                    raise ValueError('Negative air flow of AC system')
+
+                # update temperatures for over heating case
+                if q_hs_sen_hvac > phi_h_act:
+                    theta_a_t, theta_m_t, theta_c_t = _calc_temperatures(
+                        f_hc_cv_h * q_hs_sen_hvac, (1 - f_hc_cv_h) * q_hs_sen_hvac, phi_a_0, phi_i_r_t, phi_s_c,
+                        phi_s_m, f_ic, f_im, theta_m_t_1, theta_ea, T_ext_t, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc,
+                        h_ac, k_m_1, k_m_2, k_c, k_a)
+                    status[t] = STATUS_AC_OVER_HEATING
+
+                Qhs_sen_sys_t = q_hs_sen_hvac
+                ma_sup_hs[t] = ma_sup_hs_t
+                Ta_sup_hs[t] = ta_sup_hs_t
+                Ta_re_hs[t] = ta_re_hs_t
+                Ehs_lat_aux[t] = e_hs_lat_aux_t
+
+            # emission system losses
+            Qhs_em_ls[t] = _calc_q_em_ls(Qhs_sen_sys_t, delta_theta_int_inc_heating,
+                                         theta_a_t + delta_theta_int_inc_heating, T_ext_t, phi_h_max)
+
+            theta_a[t] = theta_a_t
+            theta_m[t] = theta_m_t
+            theta_c[t] = theta_c_t
+            theta_o[t] = theta_a_t * 0.31 + theta_c_t * 0.69
+            Qhs_sen[t] = phi_h_act
+            Qhs_sen_sys[t] = Qhs_sen_sys_t
+            Qhs_lat_sys[t] = 0.0
+            # see `rc_model_crank_nicholson_procedure.update_tsd_no_cooling`
+            Qcs_sen[t] = Qcs_sen_sys[t] = Qcs_lat_sys[t] = Qcs_em_ls[t] = ma_sup_cs[t] = 0.0
+            Ta_sup_cs[t] = Ta_re_cs[t] = m_ve_recirculation[t] = 0.0
+
+        # ++++++++++++++++
+        # CASE 2 - COOLING
+        # ++++++++++++++++
+        else:
+            status[t] = STATUS_RADIATIVE_COOLING
+            theta_a_10 = _calc_temperatures(
+                f_hc_cv_c * phi_hc_10, (1 - f_hc_cv_c) * phi_hc_10, phi_a_0, phi_i_r_t, phi_s_c, phi_s_m, f_ic,
+                f_im, theta_m_t_1, theta_ea, T_ext_t, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c,
+                k_a)[0]
+
+            # interpolate cooling power
+            # (64) in SIA 2044 / Korrigenda C1 zum Merkblatt SIA 2044:2011 / Korrigenda C2 zum Mekblatt SIA 2044:2011
+            phi_hc_ul = phi_hc_10 * (ta_cs_set[t] - theta_a_0) / (theta_a_10 - theta_a_0)
+            if 0 > phi_hc_ul >= phi_c_max:
+                phi_c_act = phi_hc_ul
+            elif 0 > phi_hc_ul < phi_c_max:
+                phi_c_act = phi_c_max
+            else:
+                raise ValueError('Unexpected cooling power')
+
+            theta_a_t, theta_m_t, theta_c_t = _calc_temperatures(
+                f_hc_cv_c * phi_c_act, (1 - f_hc_cv_c) * phi_c_act, phi_a_0, phi_i_r_t, phi_s_c, phi_s_m, f_ic, f_im,
+                theta_m_t_1, theta_ea, T_ext_t, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c, k_a)
+            Qcs_sen_sys_t = phi_c_act
+            Qcs_lat_sys_t = 0.0
+            ma_sup_cs[t] = 0.0
+
+            if cooling_is_ac:
+                status[t] = STATUS_AC_COOLING
+                q_cs_sen_hvac, Qcs_lat_sys_t, ma_sup_cs_t, ta_sup_cs_t, ta_re_cs_t, m_ve_hvac_recirculation = \
+                    _calc_hvac_cooling(theta_a_t, phi_c_act / 1000, m_ve_mech_t, w_int[t], rh_ext[t], T_ext_t,
+                                       theta_ve_mech_t, temp_sup_cool_hvac)
+                if m_ve_mech_t + m_ve_hvac_recirculation < 0:
+                    raise ValueError('Negative air flow of AC system')
+
+                # update temperatures for over cooling case
+                if q_cs_sen_hvac < phi_c_act:
+                    theta_a_t, theta_m_t, theta_c_t = _calc_temperatures(
+                        f_hc_cv_c * q_cs_sen_hvac, (1 - f_hc_cv_c) * q_cs_sen_hvac, phi_a_0, phi_i_r_t, phi_s_c,
+                        phi_s_m, f_ic, f_im, theta_m_t_1, theta_ea, T_ext_t, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc,
+                        h_ac, k_m_1, k_m_2, k_c, k_a)
+                    status[t] = STATUS_AC_OVER_COOLING
+
+                Qcs_sen_sys_t = q_cs_sen_hvac
+                ma_sup_cs[t] = ma_sup_cs_t
+                Ta_sup_cs[t] = ta_sup_cs_t
+                Ta_re_cs[t] = ta_re_cs_t
+
+            # emission system losses
+            Qcs_em_ls[t] = _calc_q_em_ls(Qcs_sen_sys_t, delta_theta_int_inc_cooling,
+                                         theta_a_t + delta_theta_int_inc_cooling, T_ext_t + delta_theta_e_sol,
+                                         phi_c_max)
+
+            theta_a[t] = theta_a_t
+            theta_m[t] = theta_m_t
+            theta_c[t] = theta_c_t
+            theta_o[t] = theta_a_t * 0.31 + theta_c_t * 0.69
+            Qcs_sen[t] = phi_c_act
+            Qcs_sen_sys[t] = Qcs_sen_sys_t
+            Qcs_lat_sys[t] = Qcs_lat_sys_t
+            # see `rc_model_crank_nicholson_procedure.update_tsd_no_heating`
+            Qhs_sen[t] = Qhs_sen_sys[t] = Qhs_lat_sys[t] = Qhs_em_ls[t] = ma_sup_hs[t] = Ehs_lat_aux[t] = 0.0
+            Ta_sup_hs[t] = Ta_re_hs[t] = m_ve_recirculation[t] = 0.0
+
+
+def _calc_year_buildings(constants, flags, systems, radiation, calc_m_ve_inf, status, season_hours, is_heating_season,
+                         is_night, T_ext, T_sky, ta_hs_set, ta_cs_set, m_ve_required, w_int, rh_ext, I_sol_gross,
+                         phi_i_l_cv, phi_i_p_cv, phi_i_a_cv, phi_i_r,
+                         I_sol, I_rad, m_ve_mech, m_ve_window, m_ve_inf, theta_ve_mech, theta_a, theta_m, theta_c,
+                         theta_o, Qhs_sen, Qhs_sen_sys, Qhs_lat_sys, Qhs_em_ls, Ehs_lat_aux, ma_sup_hs, Ta_sup_hs,
+                         Ta_re_hs, Qcs_sen, Qcs_sen_sys, Qcs_lat_sys, Qcs_em_ls, ma_sup_cs, Ta_sup_cs, Ta_re_cs,
+                         m_ve_recirculation):
+    """
+    Kernel of :py:func:`calc_rc_model_demand_heating_cooling_buildings`: the same procedure as ``_calc_year``, with
+    each parameter an array over the buildings and each time series / output a (hour of the year, building) array.
+
+    The heating / cooling / ventilation control decisions of a time step are boolean arrays over the buildings,
+    the heating and cooling cases only differ by season so only one of them is calculated per time step.
+    """
+    h_ec, h_ac, h_mc, h_em, c_m, f_sc, f_ic, f_im, f_sm = constants
+    has_heating_system, has_cooling_system, heating_is_ac, cooling_is_ac, has_mech_vent, has_win_vent, \
+        has_heat_rec, has_night_flushing, has_economizer = flags
+    f_hc_cv_h, f_hc_cv_c, phi_hc_10, phi_h_max, phi_c_max, delta_theta_int_inc_heating, \
+        delta_theta_int_inc_cooling, delta_theta_e_sol, eta_rec, m_ve_required_max, temp_sup_heat_hvac, \
+        temp_comf_max, rhum_comf_max, temp_sup_cool_hvac = systems
+    rse_u_wall, hr_wall, a_wall, rse_u_win, hr_win, a_win, rse_u_roof, hr_roof, a_roof = radiation
+    Fform_wall, Fform_win, Fform_roof = 0.5, 0.5, 1.0  # 50% reiradiated by vertical surfaces and 100% by horizontal.
+    f_s_c = (1 - f_sa) * f_sc
+    f_s_m = (1 - f_sa) * f_sm
+    calc_temperatures = getattr(_calc_temperatures, 'py_func', _calc_temperatures)
+    no_buildings = np.zeros(len(h_ec), dtype=np.bool_)
+
+    for t in season_hours:
+        t_1 = t - 1  # -1 is the last hour of the year
+        T_ext_t = T_ext[t]
+        theta_a_t_1 = theta_a[t_1]  # NaN in the first hour
+        theta_a_t_1_valid = np.where(np.isnan(theta_a_t_1), T_ext[t_1], theta_a_t_1)
+        theta_m_t_1 = np.where(np.isnan(theta_m[t_1]), T_ext[t_1], theta_m[t_1])
+        theta_c_t_1 = np.where(np.isnan(theta_c[t_1]), T_ext[t_1], theta_c[t_1])
+        heating_season = is_heating_season[t]
+
+        # sensible heat gains
+        theta_ss = T_sky[t] - theta_c_t_1
+        theta_ss_3 = (theta_ss + 273.0) ** 3.0
+        I_rad_t = (Fform_wall * (rse_u_wall * (hr_wall * theta_ss_3) * a_wall * theta_ss) +
+                   Fform_win * (rse_u_win * (hr_win * theta_ss_3) * a_win * theta_ss) +
+                   Fform_roof * (rse_u_roof * (hr_roof * theta_ss_3) * a_roof * theta_ss))
+        I_sol_t = I_sol_gross[t] - I_rad_t
+        I_rad[t] = I_rad_t
+        I_sol[t] = I_sol_t
+
+        if calc_m_ve_inf is not None:
+            m_ve_inf[t] = calc_m_ve_inf(theta_a_t_1_valid, t)
+
+        # ventilation air flows [kg/s]
+        if heating_season:
+            night_flushing = economizer = no_buildings
+        else:
+            night_flushing = (has_night_flushing & is_night[t]
+                              & (theta_a_t_1 > NIGHT_FLUSHING_TEMPERATURE_ZONE_CONTROL)
+                              & (theta_a_t_1 > T_ext_t + NIGHT_FLUSHING_DELTA_T))
+            economizer = has_economizer & (theta_a_t_1 > ta_cs_set[t]) & (ta_cs_set[t] >= T_ext_t)
+        mech_vent_active = has_mech_vent & ((m_ve_required[t] > 0) | night_flushing)
+        win_vent_active = has_win_vent & ~mech_vent_active
+        m_ve_required_net = np.maximum(m_ve_required[t] - m_ve_inf[t], 0.0)
+
+        m_ve_mech_t = np.where(mech_vent_active & ~night_flushing & ~economizer, m_ve_required_net,
+                               np.where(has_mech_vent & (night_flushing | economizer), m_ve_required_max, 0.0))
+        m_ve_window_t = np.where(win_vent_active, np.where(night_flushing, m_ve_required_max, m_ve_required_net),
+                                 0.0)
+        m_ve_mech[t] = m_ve_mech_t
+        m_ve_window[t] = m_ve_window_t
+
+        # ventilation air temperature
+        heat_recovery_active = mech_vent_active & has_heat_rec & (heating_season | (theta_a_t_1 < T_ext_t))
+        theta_ve_mech_t = np.where(heat_recovery_active, T_ext_t + eta_rec * (theta_a_t_1_valid - T_ext_t), T_ext_t)
+        theta_ve_mech[t] = theta_ve_mech_t
+
+        # parts of the R-C-model that do not depend on the heating / cooling power
+        m_ve_inf_t = m_ve_inf[t]
+        h_ea = (m_ve_mech_t * 3600 + m_ve_window_t * 3600 + m_ve_inf_t * 3600) * (1.005 / 3.6)
+        theta_ea = ((m_ve_mech_t * theta_ve_mech_t + (m_ve_window_t + m_ve_inf_t) * T_ext_t) /
+                    (m_ve_mech_t + m_ve_window_t + m_ve_inf_t))
+        h_1 = 1 / (1 / h_ea + 1 / h_ac)
+        h_2 = h_1 + h_ec
+        h_3 = 1.0 / (1.0 / h_2 + 1.0 / h_mc)
+        phi_a_0 = f_sa * I_sol_t + phi_i_l_cv[t] + phi_i_p_cv[t] + phi_i_a_cv[t]
+        phi_i_r_t = phi_i_r[t]
+        phi_s_c = f_s_c * I_sol_t
+        phi_s_m = f_s_m * I_sol_t
+        k_m_1 = c_m - 0.5 * (h_3 + h_em)
+        k_m_2 = c_m + 0.5 * (h_3 + h_em)
+        k_c = h_mc + h_ec + h_1
+        k_a = h_ac + h_ea
+        rc_model_parameters = (phi_a_0, phi_i_r_t, phi_s_c, phi_s_m, f_ic, f_im, theta_m_t_1, theta_ea, T_ext_t, h_1,
+                               h_2, h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c, k_a)
+
+        # temperatures with zero heating / cooling power (CASE 0 - NO HEATING OR COOLING)
+        theta_a_t, theta_m_t, theta_c_t = calc_temperatures(0.0, 0.0, *rc_model_parameters)
+        theta_a_0 = theta_a_t
+
+        if heating_season:
+            ta_set = ta_hs_set[t]
+            active = has_heating_system & ~np.isnan(ta_set) & (theta_a_0 < ta_set - TEMP_TOLERANCE)
+            f_hc_cv, phi_max, is_ac = f_hc_cv_h, phi_h_max, heating_is_ac
+            delta_theta_int_inc, theta_e_comb = delta_theta_int_inc_heating, T_ext_t
+        else:
+            ta_set = ta_cs_set[t]
+            active = (has_cooling_system & (T_ext_t >= ta_set) & ~np.isnan(ta_set)
+                      & (theta_a_0 > ta_set + TEMP_TOLERANCE))
+            f_hc_cv, phi_max, is_ac = f_hc_cv_c, phi_c_max, cooling_is_ac
+            delta_theta_int_inc, theta_e_comb = delta_theta_int_inc_cooling, T_ext_t + delta_theta_e_sol
+
+        status_t = np.zeros(len(h_ec), dtype=np.int64)  # STATUS_OFF
+        phi_act = np.zeros(len(h_ec))
+        phi_sys = phi_act
+        q_em_ls = phi_act
+        q_lat, ma_sup, ta_sup, ta_re, e_lat_aux = [np.zeros(len(h_ec)) for _ in range(5)]
+
+        # ++++++++++++++++++++++++++++
+        # CASE 1 / 2 - HEATING/COOLING
+        # ++++++++++++++++++++++++++++
+        if active.any():
+            theta_a_10 = calc_temperatures(f_hc_cv * phi_hc_10, (1 - f_hc_cv) * phi_hc_10, *rc_model_parameters)[0]
+
+            # interpolate heating / cooling power
+            # (64) in SIA 2044 / Korrigenda C1 zum Merkblatt SIA 2044:2011 / Korrigenda C2 zum Mekblatt SIA 2044:2011
+            phi_hc_ul = phi_hc_10 * (ta_set - theta_a_0) / (theta_a_10 - theta_a_0)
+            if heating_season:
+                if (active & ~(phi_hc_ul > 0)).any():
+                    raise ValueError('Unexpected heating power')
+                phi_act = np.where(active, np.where(phi_hc_ul <= phi_max, phi_hc_ul, phi_max), 0.0)
+                status_t[active] = STATUS_RADIATIVE_HEATING
+            else:
+                if (active & ~(phi_hc_ul < 0)).any():
+                    raise ValueError('Unexpected cooling power')
+                phi_act = np.where(active, np.where(phi_hc_ul >= phi_max, phi_hc_ul, phi_max), 0.0)
+                status_t[active] = STATUS_RADIATIVE_COOLING
+                # not set by the hourly procedure for radiative cooling, the time series keep their value
+                ta_sup[active] = Ta_sup_cs[t][active]
+                ta_re[active] = Ta_re_cs[t][active]
+
+            theta_act = calc_temperatures(f_hc_cv * phi_act, (1 - f_hc_cv) * phi_act, *rc_model_parameters)
+            theta_a_t, theta_m_t, theta_c_t = [np.where(active, theta_hc, theta_0) for theta_hc, theta_0 in
+                                               zip(theta_act, (theta_a_t, theta_m_t, theta_c_t))]
+
+            # AC systems, building by building
+            phi_sys = phi_act.copy()
+            ac_active = active & is_ac
+            for i in np.flatnonzero(ac_active):
+                if heating_season:
+                    phi_sys[i], q_hs_lat_hvac, ma_sup[i], ta_sup[i], ta_re[i], e_lat_aux[i], \
+                        m_ve_hvac_recirculation = airconditioning_model._calc_hvac_heating(
+                            float(theta_a_t[i]), float(phi_act[i]) / 1000, float(m_ve_mech_t[i]), float(w_int[t, i]),
+                            float(rh_ext[t, i]), float(T_ext_t[i]), float(theta_ve_mech_t[i]),
+                            float(temp_sup_heat_hvac[i]), float(temp_comf_max[i]), float(rhum_comf_max[i]))
+                else:
+                    phi_sys[i], q_lat[i], ma_sup[i], ta_sup[i], ta_re[i], m_ve_hvac_recirculation = \
+                        airconditioning_model._calc_hvac_cooling(
+                            float(theta_a_t[i]), float(phi_act[i]) / 1000, float(m_ve_mech_t[i]), float(w_int[t, i]),
+                            float(rh_ext[t, i]), float(T_ext_t[i]), float(theta_ve_mech_t[i]),
+                            float(temp_sup_cool_hvac[i]))
+                if m_ve_mech_t[i] + m_ve_hvac_recirculation < 0:
+                    raise ValueError('Negative air flow of AC system')
+
+            if ac_active.any():
+                # update temperatures for over heating / over cooling case
+                if heating_season:
+                    status_t[ac_active] = STATUS_AC_HEATING
+                    over = ac_active & (phi_sys > phi_act)
+                    status_t[over] = STATUS_AC_OVER_HEATING
+                else:
+                    status_t[ac_active] = STATUS_AC_COOLING
+                    over = ac_active & (phi_sys < phi_act)
+                    status_t[over] = STATUS_AC_OVER_COOLING
+                if over.any():
+                    theta_over = calc_temperatures(f_hc_cv * phi_sys, (1 - f_hc_cv) * phi_sys, *rc_model_parameters)
+                    theta_a_t, theta_m_t, theta_c_t = [np.where(over, theta_o_ac, theta_hc) for theta_o_ac, theta_hc
+                                                       in zip(theta_over, (theta_a_t, theta_m_t, theta_c_t))]
+
+            # emission system losses
+            q_em_ls = np.where(active, _calc_q_em_ls_buildings(phi_sys, delta_theta_int_inc,
+                                                               theta_a_t + delta_theta_int_inc, theta_e_comb,
+                                                               phi_max), 0.0)
+
+        theta_a[t] = theta_a_t
+        theta_m[t] = theta_m_t
+        theta_c[t] = theta_c_t
+        theta_o[t] = theta_a_t * 0.31 + theta_c_t * 0.69
+        status[t] = status_t
+        m_ve_recirculation[t] = 0.0
+        # see `rc_model_crank_nicholson_procedure.update_tsd_no_heating` / `update_tsd_no_cooling`
+        if heating_season:
+            Qhs_sen[t] = phi_act
+            Qhs_sen_sys[t] = phi_sys
+            Qhs_lat_sys[t] = 0.0
+            Qhs_em_ls[t] = q_em_ls
+            Ehs_lat_aux[t] = e_lat_aux
+            ma_sup_hs[t] = ma_sup
+            Ta_sup_hs[t] = ta_sup
+            Ta_re_hs[t] = ta_re
+            Qcs_sen[t] = Qcs_sen_sys[t] = Qcs_lat_sys[t] = Qcs_em_ls[t] = ma_sup_cs[t] = 0.0
+            Ta_sup_cs[t] = Ta_re_cs[t] = 0.0
+        else:
+            Qcs_sen[t] = phi_act
+            Qcs_sen_sys[t] = phi_sys
+            Qcs_lat_sys[t] = q_lat
+            Qcs_em_ls[t] = q_em_ls
+            ma_sup_cs[t] = ma_sup
+            Ta_sup_cs[t] = ta_sup
+            Ta_re_cs[t] = ta_re
+            Qhs_sen[t] = Qhs_sen_sys[t] = Qhs_lat_sys[t] = Qhs_em_ls[t] = ma_sup_hs[t] = Ehs_lat_aux[t] = 0.0
+            Ta_sup_hs[t] = Ta_re_hs[t] = 0.0
+
+
+def _calc_q_em_ls_buildings(q_em_out, delta_theta_int_inc, theta_int_inc, theta_e_comb, q_em_max):
+    """
+    :py:func:`cea.demand.space_emission_systems.calc_q_em_ls` for arrays over buildings
+    """
+    q_em_ls = q_em_out * (delta_theta_int_inc / (theta_int_inc - theta_e_comb))
+
+    # cap emission losses at absolute capacity
+    q_em_ls = np.where(np.abs(q_em_ls + q_em_out) > np.abs(q_em_max), q_em_max - q_em_out, q_em_ls)
+
+    # prevent form negative emission losses
+    q_em_ls = np.where(np.sign(q_em_ls) == np.sign(q_em_out), q_em_ls, 0.0)
+
+    # prevent division by zero
+    return np.where(np.abs(theta_int_inc - theta_e_comb) < 1e-6, 0.0, q_em_ls)
+
+
+def _calc_temperatures(phi_hc_cv, phi_hc_r, phi_a_0, phi_i_r, phi_s_c, phi_s_m, f_ic, f_im, theta_m_t_1, theta_ea,
+                       theta_e, h_1, h_2, h_3, h_ea, h_ec, h_em, h_mc, h_ac, k_m_1, k_m_2, k_c, k_a):
+    """
+    R-C-model node temperatures for a time step, see :py:func:`cea.demand.rc_model_SIA._calc_rc_model_temperatures`.
+    The parts that do not depend on the heating / cooling power are passed in pre-calculated.
+
+    :return: theta_a, theta_m, theta_c
+    """
+    phi_a = phi_a_0 + phi_hc_cv
+    phi_c = f_ic * (phi_i_r + phi_hc_r) + phi_s_c
+    phi_m = f_im * (phi_i_r + phi_hc_r) + phi_s_m
+    phi_ea = h_1 * (phi_a / h_ea + theta_ea)
+    phi_m_tot = phi_m + h_em * theta_e + (h_3 * (phi_c + h_ec * theta_e + phi_ea)) / h_2
+    theta_m_t = (theta_m_t_1 * k_m_1 + phi_m_tot) / k_m_2
+    theta_m = (theta_m_t + theta_m_t_1) / 2
+    theta_c = (h_mc * theta_m + phi_c + h_ec * theta_e + phi_ea) / k_c
+    theta_a = (h_ac * theta_c + h_ea * theta_ea + phi_a) / k_a
+    return theta_a, theta_m, theta_c
+
+
+def _calc_hvac_heating(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext, temp_ext, temp_mech_vent,
+                       temp_sup_heat_hvac, temp_comf_max, rhum_comf_max):
+    """
+    Call :py:func:`cea.demand.airconditioning_model._calc_hvac_heating` (python only) from the kernel.
+
+    :return: q_hs_sen_hvac, ma_sup_hs, ta_sup_hs, ta_re_hs, e_hs_lat_aux, m_ve_hvac_recirculation
+    """
+    with objmode(q_hs_sen_hvac='float64', ma_sup_hs='float64', ta_sup_hs='float64', ta_re_hs='float64',
+                 e_hs_lat_aux='float64', m_ve_hvac_recirculation='float64'):
+        q_hs_sen_hvac, q_hs_lat_hvac, ma_sup_hs, ta_sup_hs, ta_re_hs, e_hs_lat_aux, m_ve_hvac_recirculation = \
+            airconditioning_model._calc_hvac_heating(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext,
+                                                     temp_ext, temp_mech_vent, temp_sup_heat_hvac, temp_comf_max,
+                                                     rhum_comf_max)
+    return q_hs_sen_hvac, ma_sup_hs, ta_sup_hs, ta_re_hs, e_hs_lat_aux, m_ve_hvac_recirculation
+
+
+def _calc_hvac_cooling(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext, temp_ext, temp_mech_vent,
+                       temp_sup_cool_hvac):
+    """
+    Call :py:func:`cea.demand.airconditioning_model._calc_hvac_cooling` (python only) from the kernel.
+
+    :return: q_cs_sen_hvac, q_cs_lat_hvac, ma_sup_cs, ta_sup_cs, ta_re_cs, m_ve_hvac_recirculation
+    """
+    with objmode(q_cs_sen_hvac='float64', q_cs_lat_hvac='float64', ma_sup_cs='float64', ta_sup_cs='float64',
+                 ta_re_cs='float64', m_ve_hvac_recirculation='float64'):
+        q_cs_sen_hvac, q_cs_lat_hvac, ma_sup_cs, ta_sup_cs, ta_re_cs, m_ve_hvac_recirculation = \
+            airconditioning_model._calc_hvac_cooling(temp_zone_set, qe_sen, m_ve_mech, wint, rel_humidity_ext,
+                                                     temp_ext, temp_mech_vent, temp_sup_cool_hvac)
+    return q_cs_sen_hvac, q_cs_lat_hvac, ma_sup_cs, ta_sup_cs, ta_re_cs, m_ve_hvac_recirculation
+
+
+_calc_q_em_ls = space_emission_systems.calc_q_em_ls
+
+
+# compile the kernel with numba if available (see `cea.utilities.kernels`). Numba can not cache the objmode blocks of
+# the air conditioning kernels (and so `_calc_year`), the kernels are compiled once per process (a few seconds)
+objmode = kernels.objmode
+_calc_temperatures, _calc_q_em_ls, _calc_hvac_heating, _calc_hvac_cooling, _calc_year = kernels.compile_kernels(
+    __name__, [_calc_temperatures, _calc_q_em_ls, _calc_hvac_heating, _calc_hvac_cooling, _calc_year], cache=False)
+JIT_ACTIVE = kernels.is_compiled(__name__)
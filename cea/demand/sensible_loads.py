@@ -176,18 +176,18 @@ def calc_temperatures_emission_systems(tsd, bpr, Qcsf_0, Qhsf_0, gv):
 
     if bpr.hvac['type_hs'] == 'T1' or bpr.hvac['type_hs'] == 'T2':  # radiators
 
-        Ths_sup, Ths_re, mcphs = np.vectorize(radiators.calc_radiator)(tsd['Qhsf'], tsd['theta_a'], Qhsf_0, Ta_0,
-                                                                        bpr.building_systems['Ths_sup_0'],
-                                                                        bpr.building_systems['Ths_re_0'])
+        Ths_sup, Ths_re, mcphs = radiators.calc_radiator(tsd['Qhsf'], tsd['theta_a'], Qhsf_0, Ta_0,
+                                                         bpr.building_systems['Ths_sup_0'],
+                                                         bpr.building_systems['Ths_re_0'])
 
     if bpr.hvac['type_hs'] == 'T3':  # air conditioning
         index = np.where(tsd['Qhsf'] == Qhsf_0)
         ma_sup_0 = tsd['ma_sup_hs'][index[0][0]]
         Ta_sup_0 = tsd['Ta_sup_hs'][index[0][0]] + 273
         Ta_re_0 = tsd['Ta_re_hs'][index[0][0]] + 273
-        Ths_sup, Ths_re, mcphs = np.vectorize(heating_coils.calc_heating_coil)(tsd['Qhsf'], Qhsf_0, tsd['Ta_sup_hs'], tsd['Ta_re_hs'],
-                                                                               bpr.building_systems['Ths_sup_0'], bpr.building_systems['Ths_re_0'], tsd['ma_sup_hs'],ma_sup_0,
-                                                                               Ta_sup_0, Ta_re_0, gv.Cpa, gv)
+        Ths_sup, Ths_re, mcphs = heating_coils.calc_heating_coil(tsd['Qhsf'], Qhsf_0, tsd['Ta_sup_hs'], tsd['Ta_re_hs'],
+                                                                 bpr.building_systems['Ths_sup_0'], bpr.building_systems['Ths_re_0'], tsd['ma_sup_hs'],ma_sup_0,
+                                                                 Ta_sup_0, Ta_re_0, gv.Cpa, gv)
 
     if bpr.hvac['type_cs'] == 'T3':  # air conditioning
 
@@ -195,16 +195,16 @@ def calc_temperatures_emission_systems(tsd, bpr, Qcsf_0, Qhsf_0, gv):
         ma_sup_0 = tsd['ma_sup_cs'][index[0][0]]
         Ta_sup_0 = tsd['Ta_sup_cs'][index[0][0]] + 273
         Ta_re_0 = tsd['Ta_re_cs'][index[0][0]] + 273
-        Tcs_sup, Tcs_re, mcpcs = np.vectorize(heating_coils.calc_cooling_coil)(tsd['Qcsf'], Qcsf_0, tsd['Ta_sup_cs'], tsd['Ta_re_cs'],
-                                                                               bpr.building_systems['Tcs_sup_0'], bpr.building_systems['Tcs_re_0'], tsd['ma_sup_cs'], ma_sup_0,
-                                                                               Ta_sup_0, Ta_re_0, gv.Cpa, gv)
+        Tcs_sup, Tcs_re, mcpcs = heating_coils.calc_cooling_coil(tsd['Qcsf'], Qcsf_0, tsd['Ta_sup_cs'], tsd['Ta_re_cs'],
+                                                                 bpr.building_systems['Tcs_sup_0'], bpr.building_systems['Tcs_re_0'], tsd['ma_sup_cs'], ma_sup_0,
+                                                                 Ta_sup_0, Ta_re_0, gv.Cpa, gv)
 
     if bpr.hvac['type_hs'] == 'T4':  # floor heating
 
-        Ths_sup, Ths_re, mcphs = np.vectorize(tabs.calc_floorheating)(tsd['Qhsf'], tsd['theta_m'], Qhsf_0,
-                                                                      bpr.building_systems['Ths_sup_0'],
-                                                                      bpr.building_systems['Ths_re_0'],
-                                                                      bpr.rc_model['Af'])
+        Ths_sup, Ths_re, mcphs = tabs.calc_floorheating(tsd['Qhsf'], tsd['theta_m'], Qhsf_0,
+                                                        bpr.building_systems['Ths_sup_0'],
+                                                        bpr.building_systems['Ths_re_0'],
+                                                        bpr.rc_model['Af'])
 
     return Tcs_re, Tcs_sup, Ths_re, Ths_sup, mcpcs, mcphs  # C,C, C,C, W/C, W/C
 
@@ -12,16 +12,18 @@ from geopandas import GeoDataFrame as Gdf
 from cea.utilities.dbfreader import dbf_to_dataframe
 
 from cea.demand import occupancy_model, rc_model_crank_nicholson_procedure, ventilation_air_flows_simple
+from cea.demand import rc_model_crank_nicholson_year
 from cea.demand import ventilation_air_flows_detailed
 from cea.demand import sensible_loads, electrical_loads, hotwater_loads, refrigeration_loads, datacenter_loads
 from cea.technologies import controllers
 from cea.utilities import helpers
+from cea.utilities import xlsreader
 
 
 # demand model of thermal and electrical loads
 
 def calc_thermal_loads(building_name, bpr, weather_data, usage_schedules, date, gv, locator,
-                       use_dynamic_infiltration_calculation=False):
+                       use_dynamic_infiltration_calculation=False, use_fast_rc_model=False):
     """
     Calculate thermal loads of a single building with mechanical or natural ventilation.
     Calculation procedure follows the methodology of ISO 13790
@@ -42,17 +44,13 @@ def calc_thermal_loads(building_name, bpr, weather_data, usage_schedules, date,
       probability of use), with each element of the 4-tuple being a list of hourly values (8760 values).
 
 
-    Side effect include a number of files in two folders:
+    Side effects:
 
     * ``scenario/outputs/data/demand``
 
       * ``${Name}.csv`` for each building
 
-    * temporary folder (as returned by ``tempfile.gettempdir()``)
-
-      * ``${Name}T.csv`` for each building
-
-    daren-thomas: as far as I can tell, these are the only side-effects.
+    * the yearly totals of the building are added to ``gv.demand_writer.totals`` (if ``gv.print_totals``)
 
     :param building_name: name of building
     :type building_name: str
@@ -73,16 +71,109 @@ def calc_thermal_loads(building_name, bpr, weather_data, usage_schedules, date,
     :param gv: global variables / context
     :type gv: GlobalVariables
 
+    :param use_dynamic_infiltration_calculation: calculate infiltration with the detailed natural ventilation model
+    :type use_dynamic_infiltration_calculation: bool
+
+    :param use_fast_rc_model: calculate the whole year with
+        :py:func:`cea.demand.rc_model_crank_nicholson_year.calc_rc_model_demand_heating_cooling_year` instead of
+        looping over the hours of the year in python. The results are the same up to floating point rounding.
+    :type use_fast_rc_model: bool
+
     :returns: This function does not return anything
     :rtype: NoneType
 """
+    tsd, schedules = initialize_thermal_loads(bpr, weather_data, usage_schedules, date, gv)
+
+    if bpr.rc_model['Af'] > 0:  # building has conditioned area
+
+        # end-use demand calculation
+        if use_fast_rc_model:
+            rc_model_crank_nicholson_year.calc_rc_model_demand_heating_cooling_year(
+                bpr, tsd, gv, use_dynamic_infiltration_calculation)
+        else:
+            if use_dynamic_infiltration_calculation:
+                # the natural ventilation properties do not change during the year
+                dict_props_nat_vent = ventilation_air_flows_detailed.get_properties_natural_ventilation(bpr, gv)
+                p_zone = 1.0  # (Pa) zone pressure, initial estimate of the first hour
+            for t in range(-720, 8760):
+                hoy = helpers.seasonhour_2_hoy(t, gv)
+
+                # heat flows in [W]
+                # sensible heat gains
+                tsd = sensible_loads.calc_Qgain_sen(hoy, tsd, bpr, gv)
+
+                if use_dynamic_infiltration_calculation:
+                    # OVERWRITE STATIC INFILTRATION WITH DYNAMIC INFILTRATION RATE
+                    # (warm-started from the zone pressure of the previous hour)
+                    qm_sum_in, qm_sum_out, p_zone = ventilation_air_flows_detailed.calc_air_flows(
+                        tsd['theta_a'][hoy - 1] if not np.isnan(tsd['theta_a'][hoy - 1]) else tsd['T_ext'][hoy - 1],
+                        tsd['u_wind'][hoy], tsd['T_ext'][hoy], dict_props_nat_vent, p_zone)
+                    # INFILTRATION IS FORCED NOT TO REACH ZERO IN ORDER TO AVOID THE RC MODEL TO FAIL
+                    tsd['m_ve_inf'][hoy] = max(qm_sum_in / 3600, 1 / 3600)
+
+                # ventilation air flows [kg/s]
+                ventilation_air_flows_simple.calc_air_mass_flow_mechanical_ventilation(bpr, tsd, hoy)
+                ventilation_air_flows_simple.calc_air_mass_flow_window_ventilation(bpr, tsd, hoy)
+
+                # ventilation air temperature
+                ventilation_air_flows_simple.calc_theta_ve_mech(bpr, tsd, hoy, gv)
+
+                # heating / cooling demand of building
+                rc_model_crank_nicholson_procedure.calc_rc_model_demand_heating_cooling(bpr, tsd, hoy, gv)
+
+                # END OF FOR LOOP
+
+    finalize_thermal_loads(building_name, bpr, tsd, schedules, date, gv, locator)
+    return
+
+
+def calc_thermal_loads_batch(building_names, bprs, weather_data, usage_schedules, date, gv, locator,
+                             use_dynamic_infiltration_calculation=False):
+    """
+    Calculate thermal loads of a batch of buildings. This produces the same results as calling
+    :py:func:`calc_thermal_loads` for each building, but the R-C-model of all buildings with conditioned area is
+    calculated together (vectorized over the buildings, see
+    :py:func:`cea.demand.rc_model_crank_nicholson_year.calc_rc_model_demand_heating_cooling_buildings`), so the
+    number of python steps is independent of the number of buildings.
+
+    The time series data of all buildings in the batch is kept in memory at the same time - use batches of a few
+    hundred buildings for large scenarios.
+
+    :param building_names: names of the buildings in the batch
+    :type building_names: list[str]
+    :param bprs: building properties rows of the buildings in the batch
+    :type bprs: list[BuildingPropertiesRow]
+    :param use_dynamic_infiltration_calculation: calculate infiltration with the detailed natural ventilation model
+    :type use_dynamic_infiltration_calculation: bool
+
+    See :py:func:`calc_thermal_loads` for the other parameters.
+
+    :returns: This function does not return anything
+    :rtype: NoneType
+    """
+    tsds, schedules = zip(*[initialize_thermal_loads(bpr, weather_data, usage_schedules, date, gv) for bpr in bprs])
+
+    conditioned = [i for i, bpr in enumerate(bprs) if bpr.rc_model['Af'] > 0]
+    rc_model_crank_nicholson_year.calc_rc_model_demand_heating_cooling_buildings(
+        [bprs[i] for i in conditioned], [tsds[i] for i in conditioned], gv, use_dynamic_infiltration_calculation)
+
+    for building_name, bpr, tsd, building_schedules in zip(building_names, bprs, tsds, schedules):
+        finalize_thermal_loads(building_name, bpr, tsd, building_schedules, date, gv, locator)
+    return
+
+
+def initialize_thermal_loads(bpr, weather_data, usage_schedules, date, gv):
+    """
+    First part of :py:func:`calc_thermal_loads`: Initialize the time step data with the schedules, internal loads,
+    ventilation requirements and set points of a building (everything the R-C-model needs).
+
+    :returns: tsd, schedules
+    :rtype: (dict, dict)
+    """
     tsd = initialize_timestep_data(bpr, weather_data)
 
-    # get schedules
-    list_uses = usage_schedules['list_uses']
-    archetype_schedules = usage_schedules['archetype_schedules']
-    archetype_values = usage_schedules['archetype_values']
-    schedules = occupancy_model.calc_schedules(list_uses, archetype_schedules, bpr.occupancy, archetype_values)
+    # get schedules (calculated once for each occupancy mix)
+    schedules = occupancy_model.get_building_schedules(usage_schedules, bpr.occupancy)
 
     # calculate occupancy schedule and occupant-related parameters
     tsd['people'] = schedules['people'] * bpr.rc_model['Af']
@@ -107,7 +198,6 @@ def calc_thermal_loads(building_name, bpr, weather_data, usage_schedules, date,
     tsd['Twwf_re'][gv.seasonhours[0] + 1:gv.seasonhours[1] - 1] = 14
 
     if bpr.rc_model['Af'] > 0:  # building has conditioned area
-
         ventilation_air_flows_simple.calc_m_ve_required(bpr, tsd)
         ventilation_air_flows_simple.calc_m_ve_leakage_simple(bpr, tsd, gv)
 
@@ -119,34 +209,18 @@ def calc_thermal_loads(building_name, bpr, weather_data, usage_schedules, date,
         tsd['w_int'] = sensible_loads.calc_Qgain_lat(schedules, bpr.internal_loads['X_ghp'], bpr.rc_model['Af'],
                                                      bpr.hvac['type_cs'], bpr.hvac['type_hs'])
 
-        # end-use demand calculation
-        for t in range(-720, 8760):
-            hoy = helpers.seasonhour_2_hoy(t, gv)
-
-            # heat flows in [W]
-            # sensible heat gains
-            tsd = sensible_loads.calc_Qgain_sen(hoy, tsd, bpr, gv)
-
-            if use_dynamic_infiltration_calculation:
-                # OVERWRITE STATIC INFILTRATION WITH DYNAMIC INFILTRATION RATE
-                dict_props_nat_vent = ventilation_air_flows_detailed.get_properties_natural_ventilation(bpr, gv)
-                qm_sum_in, qm_sum_out = ventilation_air_flows_detailed.calc_air_flows(
-                    tsd['theta_a'][hoy - 1] if not np.isnan(tsd['theta_a'][hoy - 1]) else tsd['T_ext'][hoy - 1],
-                    tsd['u_wind'][hoy], tsd['T_ext'][hoy], dict_props_nat_vent)
-                # INFILTRATION IS FORCED NOT TO REACH ZERO IN ORDER TO AVOID THE RC MODEL TO FAIL
-                tsd['m_ve_inf'][hoy] = max(qm_sum_in / 3600, 1 / 3600)
-
-            # ventilation air flows [kg/s]
-            ventilation_air_flows_simple.calc_air_mass_flow_mechanical_ventilation(bpr, tsd, hoy)
-            ventilation_air_flows_simple.calc_air_mass_flow_window_ventilation(bpr, tsd, hoy)
+    return tsd, schedules
 
-            # ventilation air temperature
-            ventilation_air_flows_simple.calc_theta_ve_mech(bpr, tsd, hoy, gv)
 
-            # heating / cooling demand of building
-            rc_model_crank_nicholson_procedure.calc_rc_model_demand_heating_cooling(bpr, tsd, hoy, gv)
+def finalize_thermal_loads(building_name, bpr, tsd, schedules, date, gv, locator):
+    """
+    Last part of :py:func:`calc_thermal_loads`: Calculate the loads of the heating / cooling and hot water systems
+    based on the results of the R-C-model and write the results of a building.
 
-            # END OF FOR LOOP
+    :returns: This function does not return anything
+    :rtype: NoneType
+    """
+    if bpr.rc_model['Af'] > 0:  # building has conditioned area
 
         # add emission losses to heating / cooling demand
         tsd['Qhs_sen_incl_em_ls'] = tsd['Qhs_sen_sys'] + tsd['Qhs_em_ls']
@@ -820,11 +894,12 @@ def get_properties_technical_systems(locator, prop_HVAC):
     Data is read from :py:meth:`cea.inputlocator.InputLocator.get_technical_emission_systems` (e.g.
     ``db/Systems/emission_systems.csv``)
     """
-    prop_emission_heating = pd.read_excel(locator.get_technical_emission_systems(), 'heating')
-    prop_emission_cooling = pd.read_excel(locator.get_technical_emission_systems(), 'cooling')
-    prop_emission_dhw = pd.read_excel(locator.get_technical_emission_systems(), 'dhw')
-    prop_emission_control_heating_and_cooling = pd.read_excel(locator.get_technical_emission_systems(), 'controller')
-    prop_ventilation_system_and_control = pd.read_excel(locator.get_technical_emission_systems(), 'ventilation')
+    prop_emission_heating = xlsreader.read_excel(locator.get_technical_emission_systems(), 'heating')
+    prop_emission_cooling = xlsreader.read_excel(locator.get_technical_emission_systems(), 'cooling')
+    prop_emission_dhw = xlsreader.read_excel(locator.get_technical_emission_systems(), 'dhw')
+    prop_emission_control_heating_and_cooling = xlsreader.read_excel(locator.get_technical_emission_systems(),
+                                                                     'controller')
+    prop_ventilation_system_and_control = xlsreader.read_excel(locator.get_technical_emission_systems(), 'ventilation')
 
     df_emission_heating = prop_HVAC.merge(prop_emission_heating, left_on='type_hs', right_on='code')
     df_emission_cooling = prop_HVAC.merge(prop_emission_cooling, left_on='type_cs', right_on='code')
@@ -850,12 +925,12 @@ def get_properties_technical_systems(locator, prop_HVAC):
 
 
 def get_envelope_properties(locator, prop_architecture):
-    prop_roof = pd.read_excel(locator.get_envelope_systems(), 'ROOF')
-    prop_wall = pd.read_excel(locator.get_envelope_systems(), 'WALL')
-    prop_win = pd.read_excel(locator.get_envelope_systems(), 'WINDOW')
-    prop_shading = pd.read_excel(locator.get_envelope_systems(), 'SHADING')
-    prop_construction = pd.read_excel(locator.get_envelope_systems(), 'CONSTRUCTION')
-    prop_leakage = pd.read_excel(locator.get_envelope_systems(), 'LEAKAGE')
+    prop_roof = xlsreader.read_excel(locator.get_envelope_systems(), 'ROOF')
+    prop_wall = xlsreader.read_excel(locator.get_envelope_systems(), 'WALL')
+    prop_win = xlsreader.read_excel(locator.get_envelope_systems(), 'WINDOW')
+    prop_shading = xlsreader.read_excel(locator.get_envelope_systems(), 'SHADING')
+    prop_construction = xlsreader.read_excel(locator.get_envelope_systems(), 'CONSTRUCTION')
+    prop_leakage = xlsreader.read_excel(locator.get_envelope_systems(), 'LEAKAGE')
 
     df_construction = prop_architecture.merge(prop_construction, left_on='type_cons', right_on='code')
     df_leakage = prop_architecture.merge(prop_leakage, left_on='type_leak', right_on='code')
@@ -19,9 +19,9 @@ from __future__ import division
 
 import numpy as np
 import pandas as pd
-from scipy.optimize import minimize
 
 from cea.geometry.geometry_reader import get_building_geometry_ventilation
+from cea.utilities import solvers
 from cea.utilities.physics import calc_rho_air
 
 __author__ = "Gabriel Happle"
@@ -37,46 +37,78 @@ __status__ = "Production"
 # ventilation calculation
 
 
-def calc_air_flows(temp_zone, u_wind, temp_ext, dict_props_nat_vent):
+def calc_air_flows(temp_zone, u_wind, temp_ext, dict_props_nat_vent, p_zone_ref=1.0):
     """
-    Minimization of variable air flows as a function of zone gauge
+    Solution of variable air flows as a function of zone gauge
+
+    The zone pressure balancing the air mass flows is found with a bracketed root search starting from `p_zone_ref`
+    (the air mass flow balance decreases monotonically with the zone pressure). Passing the zone pressure of the
+    previous hour as `p_zone_ref` makes the search converge in a few iterations.
+
+    All the inputs can be arrays of several zones (e.g. one element per building, with the natural ventilation
+    properties stacked by :py:func:`stack_properties_natural_ventilation`), the zones are solved at once.
 
     :param temp_zone: zone indoor air temperature (°C)
     :param u_wind: wind velocity (m/s)
     :param temp_ext: exterior air temperature (°C)
     :param dict_props_nat_vent: dictionary containing natural ventilation properties of zone
+    :param p_zone_ref: initial estimate of the zone pressure (Pa), e.g. the zone pressure of the previous hour
 
     qm_sum_in : total air mass flow rates into zone (kg/h)
     qm_sum_out : total air mass flow rates out of zone (kg/h)
-    """
-
-    # Different solver options to try:
-    # --------------------------------
-    # solver_options_nelder_mead ={'disp': False, 'maxiter': 100, 'maxfev': None, 'xtol': 0.1, 'ftol': 0.1}
-    # solver_options_cg ={'disp': False, 'gtol': 1e-05, 'eps': 1.4901161193847656e-08, 'return_all': False,
-    #                     'maxiter': None, 'norm': -np.inf}
-    # solver_options_powell = {'disp': True, 'maxiter': None, 'direc': None, 'maxfev': None,
-    #            'xtol': 0.0001, 'ftol': 0.0001}
-    # solver_options_tnc = {'disp': True, 'minfev': 0, 'scale': None, 'rescale': -1, 'offset': None, 'gtol': -1,
-    #                       'eps': 1e-08, 'eta': -1, 'maxiter': None, 'maxCGit': -1, 'mesg_num': None,
-    #                       'ftol': -1, 'xtol': -1, 'stepmx': 0, 'accuracy': 0}
-    solver_options_cobyla = {'iprint': 1, 'disp': False, 'maxiter': 100, 'rhobeg': 1.0, 'tol': 0.001}
+    p_zone : zone pressure of the air flow mass balance (Pa)
+    """
+
+    # one element per zone, the properties of the air paths along the last axis
+    shape = np.broadcast(temp_zone, u_wind, temp_ext, p_zone_ref,
+                         np.asarray(dict_props_nat_vent['coeff_lea_path'])[..., 0]).shape
+    temp_zone, u_wind, temp_ext = [np.broadcast_to(x, shape).ravel() for x in (temp_zone, u_wind, temp_ext)]
+    height_lea_path, coeff_wind_pressure_path_lea, coeff_lea_path, \
+    height_vent_path, coeff_wind_pressure_path_vent, coeff_vent_path = [
+        np.broadcast_to(value, shape + np.shape(value)[-1:]).reshape(-1, np.shape(value)[-1])
+        for value in [dict_props_nat_vent[key] for key in ['height_lea_path', 'coeff_wind_pressure_path_lea',
+                                                           'coeff_lea_path', 'height_vent_path',
+                                                           'coeff_wind_pressure_path_vent', 'coeff_vent_path']]]
+
+    # the pressure differences across the air paths only depend on the zone pressure through Eq. (5) in [1], so they
+    # are calculated once for a zone pressure of zero and shifted by the zone pressure in the iteration
+    u_wind_site = calc_u_wind_site(u_wind)
+    delta_p_lea_path_0 = calc_delta_p_path(0.0, height_lea_path, temp_zone[:, None], coeff_wind_pressure_path_lea,
+                                           u_wind_site[:, None], temp_ext[:, None])
+    delta_p_vent_path_0 = calc_delta_p_path(0.0, height_vent_path, temp_zone[:, None], coeff_wind_pressure_path_vent,
+                                            u_wind_site[:, None], temp_ext[:, None])
+    rho_air_ext = calc_rho_air(temp_ext)
+    rho_air_zone = calc_rho_air(temp_zone)
+
+    def calc_qm_sum(p_zone, zones):
+        # air flows through the paths, Eq. (60) and (64) in [1]
+        qv_lea_path = calc_qv_lea_path(coeff_lea_path[zones], delta_p_lea_path_0[zones] - p_zone[:, None])
+        qv_vent_path = calc_qv_vent_path(coeff_vent_path[zones], delta_p_vent_path_0[zones] - p_zone[:, None])
+        # total air mass flows in and out of the zone, Eq. (62), (63) and (65) to (68) in [1]
+        qm_sum_in = (np.maximum(qv_vent_path, 0.0).sum(axis=1) + np.maximum(qv_lea_path, 0.0).sum(axis=1)) * \
+                    rho_air_ext[zones]
+        qm_sum_out = (np.minimum(qv_vent_path, 0.0).sum(axis=1) + np.minimum(qv_lea_path, 0.0).sum(axis=1)) * \
+                     rho_air_zone[zones]
+        return qm_sum_in, qm_sum_out
+
+    def calc_qm_balance(p_zone, zones):
+        # mass balance, Eq. (69) in [1]
+        qm_sum_in, qm_sum_out = calc_qm_sum(p_zone, zones)
+        return qm_sum_in + qm_sum_out
 
     # solve air flow mass balance via iteration
-    p_zone_ref = 1  # (Pa) zone pressure, THE UNKNOWN VALUE
-    res = minimize(calc_air_flow_mass_balance, p_zone_ref,
-                   args=(temp_zone, u_wind, temp_ext, dict_props_nat_vent, 'minimize',),
-                   method='COBYLA',
-                   options=solver_options_cobyla)
-    # print(res)
-    # get zone pressure of air flow mass balance
-    p_zone = res.x
+    zones = np.arange(temp_zone.size)
+    p_zone, converged = solvers.regula_falsi(calc_qm_balance, np.broadcast_to(p_zone_ref, shape).ravel(),
+                                             args=(zones,), step=1.0, xtol=1e-6)
+    if not converged.all():
+        print('Warning: air flow mass balance did not converge in %i of %i zones, largest imbalance %.3g kg/h' % (
+            (~converged).sum(), converged.size, abs(calc_qm_balance(p_zone[~converged], zones[~converged])).max()))
 
     # calculate air flows at zone pressure
-    qm_sum_in, qm_sum_out = calc_air_flow_mass_balance(p_zone, temp_zone, u_wind,
-                                                       temp_ext, dict_props_nat_vent, 'calculate')
-
-    return qm_sum_in, qm_sum_out
+    qm_sum_in, qm_sum_out = calc_qm_sum(p_zone, zones)
+    if not shape:
+        return float(qm_sum_in), float(qm_sum_out), float(p_zone)
+    return qm_sum_in.reshape(shape), qm_sum_out.reshape(shape), p_zone.reshape(shape)
 
 
 def get_properties_natural_ventilation(bpr, gv):
@@ -130,6 +162,19 @@ def get_properties_natural_ventilation(bpr, gv):
     return dict_props_nat_vent
 
 
+def stack_properties_natural_ventilation(list_dict_props_nat_vent):
+    """
+    Stack the natural ventilation properties of several zones to solve their air flows at once with
+    :py:func:`calc_air_flows`
+
+    :param list_dict_props_nat_vent: dictionaries containing natural ventilation properties of zones
+
+    :returns: dictionary containing the natural ventilation properties of the zones, one row per zone
+    """
+    return {key: np.array([dict_props_nat_vent[key] for dict_props_nat_vent in list_dict_props_nat_vent])
+            for key in list_dict_props_nat_vent[0]}
+
+
 # Wind pressure calculation
 
 def calc_u_wind_site(u_wind_10):
@@ -268,8 +313,8 @@ def calc_delta_p_path(p_zone_ref, height_path, temp_zone, coeff_wind_pressure_pa
     rho_air_ref = 1.23  # (kg/m3)
     temp_ext_ref = 283  # (K)
 
-    temp_zone += 273  # conversion to (K)
-    temp_ext += 273  # conversion to (K)
+    temp_zone = temp_zone + 273  # conversion to (K)
+    temp_ext = temp_ext + 273  # conversion to (K)
 
     # Equation (5) in [1]
     p_zone_path = p_zone_ref - rho_air_ref * height_path * g * temp_ext_ref / temp_zone
@@ -389,51 +434,6 @@ def allocate_default_leakage_paths(coeff_lea_zone, area_facade_zone, area_roof_z
     return coeff_lea_path, height_lea_path, orientation_lea_path
 
 
-def calc_qm_lea(p_zone_ref, temp_zone, temp_ext, u_wind_site, dict_props_nat_vent):
-    """
-    Calculation of leakage infiltration and exfiltration air mass flow as a function of zone indoor reference pressure
-
-    :param p_zone_ref: zone reference pressure (Pa)
-    :param temp_zone: air temperature in ventilation zone (°C)
-    :param temp_ext: exterior air temperature (°C)
-    :param u_wind_site: wind velocity (m/s)
-    :param dict_props_nat_vent: dictionary containing natural ventilation properties of zone
-
-    :returns: - qm_lea_in : air mass flow rate into zone through leakages (kg/h)
-              - qm_lea_out : air mass flow rate out of zone through leakages (kg/h)
-    """
-
-    # get default leakage paths from locals
-    coeff_lea_path = dict_props_nat_vent['coeff_lea_path']
-    height_lea_path = dict_props_nat_vent['height_lea_path']
-
-    # lookup wind pressure coefficients for leakage paths from locals
-    coeff_wind_pressure_path = dict_props_nat_vent['coeff_wind_pressure_path_lea']
-
-    # calculation of pressure difference at leakage path
-    delta_p_path = calc_delta_p_path(p_zone_ref, height_lea_path, temp_zone, coeff_wind_pressure_path, u_wind_site,
-                                     temp_ext)
-
-    # calculation of leakage air volume flow at path
-    qv_lea_path = calc_qv_lea_path(coeff_lea_path, delta_p_path)
-
-    # Eq. (65) in [1], infiltration is sum of air flows greater zero
-    qv_lea_in = qv_lea_path[np.where(qv_lea_path > 0)].sum()
-
-    # Eq. (66) in [1], exfiltration is sum of air flows smaller zero
-    qv_lea_out = qv_lea_path[np.where(qv_lea_path < 0)].sum()
-
-    # conversion to air mass flows according to 6.4.3.8 in [1]
-    # Eq. (67) in [1]
-    qm_lea_in = qv_lea_in * calc_rho_air(temp_ext)
-    # Eq. (68) in [1]
-    qm_lea_out = qv_lea_out * calc_rho_air(temp_zone)
-
-    # print (qm_lea_in, qm_lea_out)
-
-    return qm_lea_in, qm_lea_out
-
-
 # operation of window openings
 
 def calc_qv_vent_path(coeff_vent_path, delta_p_vent_path):
@@ -519,49 +519,6 @@ def allocate_default_ventilation_openings(coeff_vent_zone, height_zone):
     return coeff_vent_path, height_vent_path, orientation_vent_path
 
 
-def calc_qm_vent(p_zone_ref, temp_zone, temp_ext, u_wind_site, dict_props_nat_vent):
-    """
-    Calculation of air flows through ventilation openings in the facade
-
-    :param p_zone_ref : zone reference pressure (Pa)
-    :param temp_zone : zone air temperature (°C)
-    :param temp_ext : exterior air temperature (°C)
-    :param u_wind_site : wind velocity (m/s)
-    :param dict_props_nat_vent : dictionary containing natural ventilation properties of zone
-
-    :returns: - qm_vent_in : air mass flow rate into zone through ventilation openings (kg/h)
-              - qm_vent_out : air mass flow rate out of zone through ventilation openings (kg/h)
-    """
-
-    # get properties from locals()
-    coeff_vent_path = dict_props_nat_vent['coeff_vent_path']
-    height_vent_path = dict_props_nat_vent['height_vent_path']
-    coeff_wind_pressure_path = dict_props_nat_vent['coeff_wind_pressure_path_vent']
-
-    # calculation of pressure difference at leakage path
-    delta_p_path = calc_delta_p_path(p_zone_ref, height_vent_path, temp_zone, coeff_wind_pressure_path, u_wind_site,
-                                     temp_ext)
-
-    # calculation of leakage air volume flow at path
-    qv_vent_path = calc_qv_vent_path(coeff_vent_path, delta_p_path)
-
-    # Eq. (62) in [1], air flow entering through ventilation openings is sum of air flows greater zero
-    qv_vent_in = qv_vent_path[np.where(qv_vent_path > 0)].sum()
-
-    # Eq. (63) in [1], air flow entering through ventilation openings is sum of air flows smaller zero
-    qv_vent_out = qv_vent_path[np.where(qv_vent_path < 0)].sum()
-
-    # conversion to air mass flows according to 6.4.3.8 in [1]
-    # Eq. (67) in [1]
-    qm_vent_in = qv_vent_in * calc_rho_air(temp_ext)
-    # Eq. (68) in [1]
-    qm_vent_out = qv_vent_out * calc_rho_air(temp_zone)
-
-    # print (qm_lea_in, qm_lea_out)
-
-    return qm_vent_in, qm_vent_out
-
-
 # windows ventilation
 
 def calc_area_window_free(area_window_max, r_window_arg):
@@ -752,59 +709,6 @@ def calc_qm_arg(factor_cros, temp_ext, dict_windows_building, u_wind_10, temp_zo
     return qm_arg_in, qm_arg_out
 
 
-# mass balance
-
-def calc_air_flow_mass_balance(p_zone_ref, temp_zone, u_wind_10, temp_ext, dict_props_nat_vent, option):
-    """
-    Air flow mass balance for iterative calculation according to 6.4.3.9 in [1]
-
-    :param p_zone_ref : zone reference pressure (Pa)
-    :param temp_zone : air temperature in ventilation zone (°C)
-    :param u_wind_10 : meteorological wind velocity (m/s)
-    :param temp_ext : exterior air temperature (°C)
-    :param dict_props_nat_vent : dictionary containing natural ventilation properties of zone
-    :param option : 'minimize' = returns sum of air mass flows, 'calculate' = returns air mass flows
-
-    :returns: sum of air mass flows in and out of zone in (kg/h)
-    """
-
-    # adjust wind velocity
-    u_wind_site = calc_u_wind_site(u_wind_10)
-
-    qm_sup_dis = 0
-    qm_eta_dis = 0
-    qm_lea_sup_dis = 0
-    qm_lea_eta_dis = 0
-    qm_comb_in = 0
-    qm_comb_out = 0
-    qm_pdu_in = 0
-    qm_pdu_out = 0
-
-    qm_arg_in = 0  # removed to speed up code, as window ventilation is always balanced
-    #  with the currently implemented method
-    qm_arg_out = 0  #
-
-    qm_vent_in, qm_vent_out = calc_qm_vent(p_zone_ref, temp_zone, temp_ext, u_wind_site, dict_props_nat_vent)
-    qm_lea_in, qm_lea_out = calc_qm_lea(p_zone_ref, temp_zone, temp_ext, u_wind_site, dict_props_nat_vent)
-
-    # print('iterate air flows')
-    # print(qm_arg_in, qm_arg_out)
-    # print(qm_vent_in, qm_vent_out)
-    # print(qm_lea_in, qm_lea_out)
-
-    # mass balance, Eq. (69) in [1]
-    qm_balance = qm_sup_dis + qm_eta_dis + qm_lea_sup_dis + qm_lea_eta_dis + qm_comb_in + qm_comb_out + \
-                 qm_pdu_in + qm_pdu_out + qm_arg_in + qm_arg_out + qm_vent_in + qm_vent_out + qm_lea_in + qm_lea_out
-    qm_sum_in = qm_sup_dis + qm_lea_sup_dis + qm_comb_in + qm_pdu_in + qm_arg_in + qm_vent_in + qm_lea_in
-    qm_sum_out = qm_eta_dis + qm_lea_eta_dis + qm_comb_out + qm_pdu_out + qm_arg_out + qm_vent_out + qm_lea_out
-
-    # switch output according to selected option
-    if option == 'minimize':
-        return abs(qm_balance)  # for minimization the mass balance is the output
-    elif option == 'calculate':
-        return qm_sum_in, qm_sum_out  # for the calculation the total air mass flows are output
-
-
 def testing():
     import geopandas
     import cea.globalvar
@@ -3,7 +3,6 @@
 Global variables - this object contains context information and is expected to be refactored away in future.
 """
 from __future__ import absolute_import
-import cea.demand.demand_writers
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -26,6 +25,7 @@ class GlobalVariables(object):
         self.date_start = '2015-01-01'  # format: yyyy-mm-dd
         self.seasonhours = [3216, 6192]
         self.multiprocessing = False  # use multiprocessing / parallel execution if possible
+        self.number_of_processes = None  # number of worker processes for multiprocessing (None: one per CPU)
         self.Z = 3  # height of basement for every building in m
         self.Bf = 0.7  # it calculates the coefficient of reduction in transmittance for surfaces in contact with the ground according to values of SIA 380/1
         self.his = 3.45  # heat transfer coefficient between air and the surfacein W/(m2K)
@@ -81,6 +81,7 @@ class GlobalVariables(object):
         self.NGEN = 5  # number of total generations
         self.fCheckPoint = 1  # frequency for the saving of checkpoints
         self.maxTime = 7 * 24 * 3600  # maximum computational time [seconds]
+        self.optimization_evaluator = 'processes'  # evaluate individuals in parallel ('processes') or 'serial'
 
         # Set Flags for different system setup preferences
 
@@ -273,6 +274,7 @@ class GlobalVariables(object):
         self.PipeInterestRate = 0.05  # 5% interest rate
         self.PipeCostPerMeterAnnual = self.PipeCostPerMeterInv / self.PipeLifeTime
         self.NetworkDepth = 1 # m
+        self.thermal_network_chunk_size = 168  # time steps per job of the thermal network simulation (progress is logged per job)
 
         # Solar area to Wpeak
         self.eta_area_to_peak = 0.16  # Peak Capacity - Efficiency, how much kW per area there are, valid for PV and PVT (after Jimeno's J+)
@@ -541,6 +543,8 @@ class GlobalVariables(object):
         # here is where we decide whether full excel reports of the calculations are generated
         self.testing = False  # if true: reports are generated, if false: not
 
+        # imported here, so importing this module does not import numpy and pandas
+        import cea.demand.demand_writers
         self.demand_writer = cea.demand.demand_writers.HourlyDemandWriter(self)
 
     def report(self, tsd, output_folder, basename):
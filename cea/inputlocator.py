@@ -254,6 +254,10 @@ class InputLocator(object):
         return os.path.join(self.get_optimization_master_results_folder(),
                             'Checkpoint_Final')
 
+    def get_optimization_fitness_cache(self):
+        """scenario/outputs/data/optimization/master/FitnessCache.json - fitness of the individuals evaluated"""
+        return os.path.join(self.get_optimization_master_results_folder(), 'FitnessCache.json')
+
     def get_uncertainty_checkpoint(self, generation):
         """scenario/outputs/data/calibration/clustering/checkpoints/..."""
         return os.path.join(self.get_uncertainty_results_folder(),
@@ -554,6 +558,18 @@ class InputLocator(object):
         """scenario/outputs/data/demand/{building_name}.csv"""
         return os.path.join(self.get_demand_results_folder(), '%(building_name)s.csv' % locals())
 
+    def get_demand_results_fingerprint(self, building_name):
+        """scenario/outputs/data/demand/{building_name}.sha1 - fingerprint of the inputs of the results of a building"""
+        return os.path.join(self.get_demand_results_folder(), '%(building_name)s.sha1' % locals())
+
+    def get_demand_building_store(self, building_name):
+        """scenario/outputs/data/demand/{building_name}.npz - hourly results of a building (ColumnarDemandWriter)"""
+        return os.path.join(self.get_demand_results_folder(), '%(building_name)s.npz' % locals())
+
+    def get_demand_results_store(self):
+        """scenario/outputs/data/demand/Demand_hourly.npz - hourly results of all buildings (ColumnarDemandWriter)"""
+        return os.path.join(self.get_demand_results_folder(), 'Demand_hourly.npz')
+
     # CALIBRATION
     def get_calibration_folder(self):
         """scenario/outputs/data/calibration"""
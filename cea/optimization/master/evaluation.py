@@ -334,16 +334,19 @@ def calc_master_to_slave_variables(individual, Qmax, locator, gv):
     return master_to_slave_vars
 
 
-def checkNtw(individual, ntwList, locator, gv):
+def checkNtw(individual, ntwList, locator, gv, building_loads=None):
     """
     This function calls the distribution routine if necessary
     
     :param individual: network configuration considered
     :param ntwList: list of DHN configurations previously encounterd in the master
     :param locator: path to the folder
+    :param building_loads: the hourly values of the buildings summarized by the distribution routine, updated with the
+        results of the substation routine (read from the results files if None)
     :type individual: list
     :type ntwList: list
     :type locator: string
+    :type building_loads: cea.optimization.master.summarize_network.BuildingLoads
     :return: None
     :rtype: Nonetype
     """
@@ -358,7 +361,7 @@ def checkNtw(individual, ntwList, locator, gv):
                 os.path.join(locator.get_optimization_network_results_folder(), "Total_%(indCombi)s.csv" % locals()))
             building_names = total_demand.Name.values
             print "Direct launch of distribution summary routine for", indCombi
-            nM.network_main(locator, total_demand, building_names, gv, indCombi)
+            nM.network_main(locator, total_demand, building_names, gv, indCombi, building_loads)
 
         else:
             total_demand = sFn.createTotalNtwCsv(indCombi, locator)
@@ -366,10 +369,12 @@ def checkNtw(individual, ntwList, locator, gv):
 
             # Run the substation and distribution routines
             print "Re-run the substation routine for new distribution configuration", indCombi
-            sMain.substation_main(locator, total_demand, building_names, gv, indCombi)
+            substation_results = sMain.substation_main(locator, total_demand, building_names, gv, indCombi)
+            if building_loads is not None:
+                building_loads.update_substations(substation_results)
             
             print "Launch distribution summary routine"
-            nM.network_main(locator, total_demand, building_names, gv, indCombi)
+            nM.network_main(locator, total_demand, building_names, gv, indCombi, building_loads)
 
 
 def epsIndicator(frontOld, frontNew):
@@ -0,0 +1,199 @@
+"""
+=======================================
+Evaluation of the individuals in bulk
+=======================================
+
+The evaluators evaluate the individuals of a generation with an objective function and are registered as
+``toolbox.map`` of the evolutionary algorithm (see :py:func:`cea.optimization.master.master_main.evolutionary_algo_main`).
+
+- ``serial``: one individual after the other in the current process
+- ``processes``: the individuals are distributed to a pool of worker processes
+
+Both backends return the fitnesses in the order of the individuals and give the same results: the objective function
+may modify the individual (e.g. ``evaluation.check_invalid``) and use the random generators, so every individual is
+evaluated with its own random seed (drawn in the main process) and the modified genes are copied back to the
+individual. An individual whose evaluation fails is given the fitness ``FAILED_FITNESS`` instead of stopping the
+optimization.
+
+The objective function changes the working directory (``os.chdir``) and reads/writes files relative to it, so each
+worker process works in a scratch folder of its own and the working directory is restored after each evaluation.
+"""
+from __future__ import division
+
+import multiprocessing as mp
+import os
+import random
+import shutil
+import tempfile
+import traceback
+
+import numpy as np
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+# the fitness (costs, CO2, prim) of an individual that could not be evaluated: dominated by every other individual. A
+# finite value is used, as `inf` results in NaN in the crowding distance of the NSGA-II selection.
+FAILED_FITNESS = (1e20, 1e20, 1e20)
+
+
+class SerialEvaluator(object):
+    """Evaluate the individuals one after the other in the current process"""
+
+    def __init__(self, gv, fitness_cache=None):
+        self.gv = gv
+        self.fitness_cache = fitness_cache
+
+    def map(self, function, individuals):
+        """
+        Evaluate ``individuals`` with ``function`` - same as ``map(function, individuals)``, but the individuals are
+        evaluated in isolation (see module documentation). With a fitness cache, the individuals already evaluated are
+        not evaluated again and identical individuals are evaluated once.
+
+        :param function: the objective function, called with the individual (a list) and returning its fitness
+        :param individuals: the individuals to evaluate (updated with the genes modified by the objective function)
+        :type individuals: list
+        :return: the fitness of each individual
+        :rtype: list
+        """
+        individuals = list(individuals)
+        if self.fitness_cache is None:
+            keys = range(len(individuals))
+        else:
+            keys = [self.fitness_cache.get_key(individual) for individual in individuals]
+
+        results = {}
+        jobs = []
+        for key, individual in zip(keys, individuals):
+            if key in results:
+                # identical individuals are evaluated once
+                if self.fitness_cache is not None:
+                    self.fitness_cache.hits += 1
+                continue
+            cached = self.fitness_cache.get(key) if self.fitness_cache is not None else None
+            if cached is not None:
+                results[key] = cached + (None,)
+            else:
+                results[key] = None
+                jobs.append((key, (function, list(individual), random.randint(0, 2 ** 31 - 1))))
+
+        if jobs:
+            for (key, _), result in zip(jobs, self._evaluate_jobs([job for _, job in jobs])):
+                results[key] = result
+                genes, fitness, error = result
+                if self.fitness_cache is not None and error is None:
+                    self.fitness_cache.add(key, genes, fitness)
+            if self.fitness_cache is not None:
+                self.fitness_cache.save()
+
+        return [_update_individual(individual, results[key]) for key, individual in zip(keys, individuals)]
+
+    def _evaluate_jobs(self, jobs):
+        # the random generators of the main process are not affected by the seeds of the jobs
+        random_state, np_random_state = random.getstate(), np.random.get_state()
+        working_directory = os.getcwd()
+        try:
+            return [_evaluate(job) for job in jobs]
+        finally:
+            os.chdir(working_directory)
+            random.setstate(random_state)
+            np.random.set_state(np_random_state)
+
+    def close(self):
+        pass
+
+    def terminate(self):
+        """Stop the evaluation without waiting for the remaining jobs (when the optimization failed)"""
+        pass
+
+
+class ProcessPoolEvaluator(SerialEvaluator):
+    """Evaluate the individuals in a pool of worker processes (``gv.number_of_processes``, or one per CPU)"""
+
+    def __init__(self, gv, fitness_cache=None):
+        super(ProcessPoolEvaluator, self).__init__(gv, fitness_cache)
+        self.number_of_processes = gv.number_of_processes or mp.cpu_count()
+        self.scratch_folder = tempfile.mkdtemp(prefix='cea-optimization-')
+        self.pool = mp.Pool(self.number_of_processes, initializer=_initialize_worker,
+                            initargs=(self.scratch_folder,))
+
+    def _evaluate_jobs(self, jobs):
+        # `imap` keeps the order of the jobs, `chunksize=1` as each evaluation takes minutes
+        return list(self.pool.imap(_evaluate, jobs, chunksize=1))
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+        shutil.rmtree(self.scratch_folder, ignore_errors=True)
+
+    def terminate(self):
+        self.pool.terminate()
+        self.pool.join()
+        shutil.rmtree(self.scratch_folder, ignore_errors=True)
+
+
+EVALUATORS = {
+    'serial': SerialEvaluator,
+    'processes': ProcessPoolEvaluator,
+}
+
+
+def create_evaluator(gv, fitness_cache=None):
+    """
+    Create the evaluator chosen with ``gv.optimization_evaluator`` (one of ``EVALUATORS``). The ``processes`` evaluator
+    falls back to ``serial`` if only one process is to be used.
+
+    :param gv: global variables class
+    :type gv: class
+    :param fitness_cache: the fitnesses of the individuals already evaluated (updated with the new ones)
+    :type fitness_cache: cea.optimization.master.fitness_cache.FitnessCache
+    :return: the evaluator - call ``close()`` when done, or ``terminate()`` if the optimization failed
+    :rtype: SerialEvaluator
+    """
+    if gv.optimization_evaluator not in EVALUATORS:
+        raise ValueError('Unknown evaluator %r, expected one of: %s' % (gv.optimization_evaluator,
+                                                                        ', '.join(sorted(EVALUATORS.keys()))))
+    if gv.optimization_evaluator == 'processes' and (gv.number_of_processes or mp.cpu_count()) < 2:
+        return SerialEvaluator(gv, fitness_cache)
+    return EVALUATORS[gv.optimization_evaluator](gv, fitness_cache)
+
+
+def _initialize_worker(scratch_folder):
+    """Each worker process starts in a scratch folder of its own"""
+    worker_folder = os.path.join(scratch_folder, 'worker-%i' % os.getpid())
+    os.mkdir(worker_folder)
+    os.chdir(worker_folder)
+
+
+def _evaluate(job):
+    """
+    Evaluate an individual with its own random seed. Returns the (possibly modified) genes and the fitness of the
+    individual, or ``None`` and the traceback if the evaluation failed.
+    """
+    function, individual, seed = job
+    working_directory = os.getcwd()
+    random.seed(seed)
+    np.random.seed(seed)
+    try:
+        fitness = function(individual)
+        return individual, tuple(fitness), None
+    except Exception:
+        return individual, None, traceback.format_exc()
+    finally:
+        os.chdir(working_directory)
+
+
+def _update_individual(individual, result):
+    """Copy the genes modified by the objective function back to the individual and return its fitness"""
+    genes, fitness, error = result
+    if error is not None:
+        print "Evaluation of individual failed, using fitness %s:\n%s" % (FAILED_FITNESS, error)
+        return FAILED_FITNESS
+    individual[:] = genes
+    return fitness
@@ -0,0 +1,90 @@
+"""
+===========================
+Fitness cache
+===========================
+
+Crossover and mutation often recreate individuals that were already evaluated in an earlier generation (or several
+times in the same generation). The fitness cache stores the fitness of every individual evaluated during an
+optimization, so each configuration goes through the slave routine only once.
+
+The cache is stored next to the checkpoints (see `InputLocator.get_optimization_fitness_cache`) and reused when the
+optimization is resumed from a checkpoint - a new optimization starts with an empty cache.
+"""
+from __future__ import division
+
+import json
+import os
+
+import numpy as np
+
+import cea.optimization.supportFn as sFn
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+
+class FitnessCache(object):
+    """
+    The fitness of the individuals evaluated, by key (see `get_key`). The genes of the individual after the evaluation
+    are stored as well, as the objective function may modify the individual (e.g. ``evaluation.check_invalid``).
+    """
+
+    def __init__(self, cache_file, gv, resume=False):
+        """
+        :param cache_file: the file the cache is stored in
+        :type cache_file: str
+        :param gv: global variables class
+        :type gv: class
+        :param resume: read the fitnesses stored in ``cache_file`` (else, the cache starts empty)
+        :type resume: bool
+        """
+        self.cache_file = cache_file
+        self.gv = gv
+        self.entries = {}
+        self.hits = 0
+        self.misses = 0
+        if resume and os.path.exists(cache_file):
+            with open(cache_file, 'r') as f:
+                self.entries = json.load(f)
+
+    def get_key(self, individual):
+        """
+        The canonical representation of an individual: the plant, share and solar genes followed by the barcode of
+        the buildings connected to the network (``supportFn.individual_to_barcode``).
+
+        :rtype: str
+        """
+        barcode = sFn.individual_to_barcode(individual, self.gv)
+        genes = individual[:len(individual) - len(barcode)]
+        return '%s|%s' % (','.join(repr(float(gene)) for gene in genes), barcode)
+
+    def get(self, key):
+        """
+        :return: the genes (after the evaluation) and the fitness of the individual, or None if it was not evaluated
+        :rtype: (list, tuple)
+        """
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        self.hits += 1
+        entry = self.entries[key]
+        return entry['individual'], tuple(entry['fitness'])
+
+    def add(self, key, individual, fitness):
+        self.entries[key] = {'individual': [_to_python(gene) for gene in individual],
+                             'fitness': [_to_python(value) for value in fitness]}
+
+    def save(self):
+        with open(self.cache_file, 'w') as f:
+            json.dump(self.entries, f)
+
+
+def _to_python(value):
+    """numpy scalars (e.g. ``numpy.int64``) can't be written to json, convert them to the python types"""
+    return value.item() if isinstance(value, np.generic) else value
@@ -14,6 +14,9 @@ import json
 
 import cea.optimization.master.crossover as cx
 import cea.optimization.master.evaluation as evaluation
+import cea.optimization.master.evaluator as evaluator
+import cea.optimization.master.fitness_cache as fitness_cache
+import cea.optimization.master.summarize_network as nM
 from deap import base
 from deap import creator
 from deap import tools
@@ -68,17 +71,12 @@ def evolutionary_algo_main(locator, building_names, extra_costs, extra_CO2, extr
      subfolders locator.get_optimization_master_results_folder() as a python pickle file.
     :rtype: pickled file
     """
-    t0 = time.clock()
+    # wall-clock time, the individuals may be evaluated in other processes
+    t0 = time.time()
 
     # get number of buildings
     nBuildings = len(building_names)
 
-    # DEFINE OBJECTIVE FUNCTION
-    def objective_function(ind):
-        (costs, CO2, prim) = evaluation.evaluation_main(ind, building_names, locator, extra_costs, extra_CO2, extra_primary_energy, solar_features,
-                                                        network_features, gv)
-        return (costs, CO2, prim)
-
     # SET-UP EVOLUTIONARY ALGORITHM
     # Contains 3 minimization objectives : Costs, CO2 emissions, Primary Energy Needs
     creator.create("Fitness", base.Fitness, weights=(-1.0, -1.0, -1.0))
@@ -87,148 +85,169 @@ def evolutionary_algo_main(locator, building_names, extra_costs, extra_CO2, extr
     toolbox.register("generate", generation.generate_main, nBuildings, gv)
     toolbox.register("individual", tools.initIterate, creator.Individual, toolbox.generate)
     toolbox.register("population", tools.initRepeat, list, toolbox.individual)
-    toolbox.register("evaluate", objective_function)
-
-    ntwList = ["1"*nBuildings]
-    epsInd = []
-    invalid_ind = []
-
-    # Evolutionary strategy
-    if genCP is 0:
-        # create population
-        pop = toolbox.population(n=gv.initialInd)
-
-        # Check distribution
-        for ind in pop:
-            evaluation.checkNtw(ind, ntwList, locator, gv)
-
-        # Evaluate the initial population
-        print "Evaluate initial population"
-        fitnesses = map(toolbox.evaluate, pop)
-
-        for ind, fit in zip(pop, fitnesses):
-            ind.fitness.values = fit
-            print ind.fitness.values, "fit"
-
-        # Save initial population
-        print "Save Initial population \n"
-
-        with open(locator.get_optimization_checkpoint_initial(),"wb") as fp:
-            cp = dict(population=pop, generation=0, networkList=ntwList, epsIndicator=[], testedPop=[], population_fitness=fitnesses)
-            json.dump(cp, fp)
-
-    else:
-        print "Recover from CP " + str(genCP) + "\n"
-
-        with open(locator.get_optimization_checkpoint(genCP), "rb") as CPread:
-            CPunpick = Unpickler(CPread)
-            cp = CPunpick.load()
-            pop = cp["population"]
-            ntwList = cp["networkList"]
-            epsInd = cp["epsIndicator"]
-
-    PROBA, SIGMAP = gv.PROBA, gv.SIGMAP
-
-    # Evolution starts !
-    g = genCP
-    stopCrit = False # Threshold for the Epsilon indicator, Not used
-
-    while g < gv.NGEN and not stopCrit and ( time.clock() - t0 ) < gv.maxTime :
-
-        g += 1
-        print "Generation", g
-
-        offspring = list(pop)
-
-        # Apply crossover and mutation on the pop
-        print "CrossOver"
-        for ind1, ind2 in zip(pop[::2], pop[1::2]):
-            child1, child2 = cx.cxUniform(ind1, ind2, PROBA, gv)
-            offspring += [child1, child2]
-
-        # First half of the master: create new un-correlated configurations
-        if g < gv.NGEN/2:
-            for mutant in pop:
-                print "Mutation Flip"
-                offspring.append(mut.mutFlip(mutant, PROBA, gv))
-                print "Mutation Shuffle"
-                offspring.append(mut.mutShuffle(mutant, PROBA, gv))
-                print "Mutation GU \n"
-                offspring.append(mut.mutGU(mutant, PROBA, gv))
-
-        # Third quarter of the master: keep the good individuals but modify the shares uniformly
-        elif g < gv.NGEN * 3/4:
-            for mutant in pop:
-                print "Mutation Uniform"
-                offspring.append(mut.mutUniformCap(mutant, gv))
-
-        # Last quarter: keep the very good individuals and modify the shares with Gauss distribution
-        else:
-            for mutant in pop:
-                print "Mutation Gauss"
-                offspring.append(mut.mutGaussCap(mutant, SIGMAP, gv))
-
-
-        # Evaluate the individuals with an invalid fitness
-        # NB: every generation leads to the reevaluation of (n/2) / (n/4) / (n/4) individuals
-        # (n being the number of individuals in the previous generation)
-        invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
-
-        print "Update Network list \n"
-        for ind in invalid_ind:
-            evaluation.checkNtw(ind, ntwList, locator, gv)
-
-        print "Re-evaluate the population"
-        fitnesses = map(toolbox.evaluate, invalid_ind)
-
-        print "......................................."
-        for ind, fit in zip(invalid_ind, fitnesses):
-            ind.fitness.values = fit
-            print ind.fitness.values, "new fit"
-        print "....................................... \n"
-
-        # Select the Pareto Optimal individuals
-        selection = sel.selectPareto(offspring,gv)
-
-        # Compute the epsilon criteria [and check the stopping criteria]
-        epsInd.append(evaluation.epsIndicator(pop, selection))
-        #if len(epsInd) >1:
-        #    eta = (epsInd[-1] - epsInd[-2]) / epsInd[-2]
-        #    if eta < gv.epsMargin:
-        #        stopCrit = True
-
-        # The population is entirely replaced by the best individuals
-        print "Replace the population \n"
-        pop[:] = selection
-
-        print "....................................... \n GENERATION ", g
-        for ind in pop:
-            print ind.fitness.values, "selected fit"
-        print "....................................... \n"
-
-        # Create Checkpoint if necessary
-        if g % gv.fCheckPoint == 0:
-            print "Create CheckPoint", g, "\n"
-            fitnesses = map(toolbox.evaluate, pop)
-            with open(locator.get_optimization_checkpoint(g), "wb") as fp:
-                cp = dict(population=pop, generation=g, networkList=ntwList, epsIndicator=epsInd, testedPop=invalid_ind,
-                          population_fitness=fitnesses)
+    # DEFINE OBJECTIVE FUNCTION (a module level function, so it can be sent to the worker processes)
+    toolbox.register("evaluate", evaluation.evaluation_main, building_names=building_names, locator=locator,
+                     extraCosts=extra_costs, extraCO2=extra_CO2, extraPrim=extra_primary_energy,
+                     solar_features=solar_features, network_features=network_features, gv=gv)
+    # the individuals evaluated in the previous generations (of the checkpoint resumed) are not evaluated again
+    fitnesses_evaluated = fitness_cache.FitnessCache(locator.get_optimization_fitness_cache(), gv,
+                                                     resume=genCP != 0)
+    population_evaluator = evaluator.create_evaluator(gv, fitnesses_evaluated)
+    try:
+        toolbox.register("map", population_evaluator.map)
+
+        # the hourly values of the buildings, summarized for each new network configuration
+        building_loads = nM.BuildingLoads.read(locator, building_names)
+
+        ntwList = ["1"*nBuildings]
+        epsInd = []
+        invalid_ind = []
+
+        # Evolutionary strategy
+        if genCP == 0:
+            # create population
+            pop = toolbox.population(n=gv.initialInd)
+
+            # Check distribution
+            for ind in pop:
+                evaluation.checkNtw(ind, ntwList, locator, gv, building_loads)
+
+            # Evaluate the initial population
+            print "Evaluate initial population"
+            fitnesses = toolbox.map(toolbox.evaluate, pop)
+
+            for ind, fit in zip(pop, fitnesses):
+                ind.fitness.values = fit
+                print ind.fitness.values, "fit"
+
+            # Save initial population
+            print "Save Initial population \n"
+
+            with open(locator.get_optimization_checkpoint_initial(),"wb") as fp:
+                cp = dict(population=pop, generation=0, networkList=ntwList, epsIndicator=[], testedPop=[], population_fitness=fitnesses)
                 json.dump(cp, fp)
 
-    if g == gv.NGEN:
-        print "Final Generation reached"
-    else:
-        print "Stopping criteria reached"
-
-    # Saving the final results
-    print "Save final results. " + str(len(pop)) + " individuals in final population"
-    print "Epsilon indicator", epsInd, "\n"
-    fitnesses = map(toolbox.evaluate, pop)
+        else:
+            print "Recover from CP " + str(genCP) + "\n"
+
+            # the checkpoints are written with json: recreate the individuals and their fitness
+            with open(locator.get_optimization_checkpoint(genCP), "rb") as CPread:
+                cp = json.load(CPread)
+                pop = [creator.Individual(ind) for ind in cp["population"]]
+                for ind, fit in zip(pop, cp["population_fitness"]):
+                    ind.fitness.values = fit
+                ntwList = cp["networkList"]
+                epsInd = cp["epsIndicator"]
+
+        PROBA, SIGMAP = gv.PROBA, gv.SIGMAP
+
+        # Evolution starts !
+        g = genCP
+        stopCrit = False # Threshold for the Epsilon indicator, Not used
+
+        while g < gv.NGEN and not stopCrit and ( time.time() - t0 ) < gv.maxTime :
+
+            g += 1
+            print "Generation", g
+
+            offspring = list(pop)
+
+            # Apply crossover and mutation on the pop
+            print "CrossOver"
+            for ind1, ind2 in zip(pop[::2], pop[1::2]):
+                child1, child2 = cx.cxUniform(ind1, ind2, PROBA, gv)
+                offspring += [child1, child2]
+
+            # First half of the master: create new un-correlated configurations
+            if g < gv.NGEN/2:
+                for mutant in pop:
+                    print "Mutation Flip"
+                    offspring.append(mut.mutFlip(mutant, PROBA, gv))
+                    print "Mutation Shuffle"
+                    offspring.append(mut.mutShuffle(mutant, PROBA, gv))
+                    print "Mutation GU \n"
+                    offspring.append(mut.mutGU(mutant, PROBA, gv))
+
+            # Third quarter of the master: keep the good individuals but modify the shares uniformly
+            elif g < gv.NGEN * 3/4:
+                for mutant in pop:
+                    print "Mutation Uniform"
+                    offspring.append(mut.mutUniformCap(mutant, gv))
+
+            # Last quarter: keep the very good individuals and modify the shares with Gauss distribution
+            else:
+                for mutant in pop:
+                    print "Mutation Gauss"
+                    offspring.append(mut.mutGaussCap(mutant, SIGMAP, gv))
+
+
+            # Evaluate the individuals with an invalid fitness
+            # NB: every generation leads to the reevaluation of (n/2) / (n/4) / (n/4) individuals
+            # (n being the number of individuals in the previous generation)
+            invalid_ind = [ind for ind in offspring if not ind.fitness.valid]
+
+            print "Update Network list \n"
+            for ind in invalid_ind:
+                evaluation.checkNtw(ind, ntwList, locator, gv, building_loads)
+
+            print "Re-evaluate the population"
+            fitnesses = toolbox.map(toolbox.evaluate, invalid_ind)
+
+            print "......................................."
+            for ind, fit in zip(invalid_ind, fitnesses):
+                ind.fitness.values = fit
+                print ind.fitness.values, "new fit"
+            print "....................................... \n"
+
+            # Select the Pareto Optimal individuals
+            selection = sel.selectPareto(offspring,gv)
+
+            # Compute the epsilon criteria [and check the stopping criteria]
+            epsInd.append(evaluation.epsIndicator(pop, selection))
+            #if len(epsInd) >1:
+            #    eta = (epsInd[-1] - epsInd[-2]) / epsInd[-2]
+            #    if eta < gv.epsMargin:
+            #        stopCrit = True
+
+            # The population is entirely replaced by the best individuals
+            print "Replace the population \n"
+            pop[:] = selection
+
+            print "....................................... \n GENERATION ", g
+            for ind in pop:
+                print ind.fitness.values, "selected fit"
+            print "....................................... \n"
+
+            # Create Checkpoint if necessary
+            if g % gv.fCheckPoint == 0:
+                print "Create CheckPoint", g, "\n"
+                fitnesses = toolbox.map(toolbox.evaluate, pop)
+                with open(locator.get_optimization_checkpoint(g), "wb") as fp:
+                    cp = dict(population=pop, generation=g, networkList=ntwList, epsIndicator=epsInd, testedPop=invalid_ind,
+                              population_fitness=fitnesses)
+                    json.dump(cp, fp)
+
+        if g == gv.NGEN:
+            print "Final Generation reached"
+        else:
+            print "Stopping criteria reached"
+
+        # Saving the final results
+        print "Save final results. " + str(len(pop)) + " individuals in final population"
+        print "Epsilon indicator", epsInd, "\n"
+        fitnesses = toolbox.map(toolbox.evaluate, pop)
+    except:
+        # stop the worker processes (and remove their scratch folders) instead of leaving them behind
+        population_evaluator.terminate()
+        raise
+    population_evaluator.close()
     with open(locator.get_optimization_checkpoint_final(), "wb") as fp:
         cp = dict(population=pop, generation=g, networkList=ntwList, epsIndicator=epsInd, testedPop=invalid_ind,
                   population_fitness=fitnesses)
         json.dump(cp, fp)
 
+    print "Fitness cache: %i individuals evaluated, %i evaluations saved" % (fitnesses_evaluated.misses,
+                                                                             fitnesses_evaluated.hits)
     print "Master Work Complete \n"
     
     return pop, epsInd
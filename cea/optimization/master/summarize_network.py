@@ -11,6 +11,8 @@ import numpy as np
 import pandas as pd
 import math
 
+from cea.demand.demand_writers import read_demand_results
+
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
 __credits__ = ["Sreepathi Bhargava Krishna","Jimeno A. Fonseca", "Thuy-An Nguyen", "Tim Vollrath", ]
@@ -20,8 +22,56 @@ __maintainer__ = "Daren Thomas"
 __email__ = "thomas@arch.ethz.ch"
 __status__ = "Production"
 
+# the hourly values of the buildings summarized by `network_main`
+DEMAND_COLUMNS = ['Qcdataf_kWh', 'mcpdataf_kWperC', 'Ecaf_kWh']
+SUBSTATION_COLUMNS = ['Electr_array_all_flat_W', 'mdot_DH_result_kgpers', 'mdot_DC_result_kgpers', 'Q_heating_W',
+                      'Q_dhw_W', 'Q_cool_W', 'T_return_DH_result_K', 'T_return_DC_result_K', 'T_supply_DH_result_K']
+
+
+class BuildingLoads(object):
+    """
+    The hourly demand and substation results of the buildings summarized by `network_main`, as an array
+    (buildings x 8760) per variable. The optimization creates it once and keeps the substation results up to date
+    (`update_substations`), so the summary of a network doesn't read any files.
+    """
 
-def network_main(locator, total_demand, building_names, gv, key):
+    def __init__(self, building_names):
+        self.building_names = list(building_names)
+        self.index = dict((building_name, i) for i, building_name in enumerate(self.building_names))
+        self.values = dict((column, np.zeros((len(self.building_names), 8760)))
+                           for column in DEMAND_COLUMNS + SUBSTATION_COLUMNS)
+
+    @classmethod
+    def read(cls, locator, building_names):
+        """Read the demand results and the substation results (as stored by the last substation routine)"""
+        building_loads = cls(building_names)
+        for i, demand in enumerate(read_demand_results(locator, building_names, columns=DEMAND_COLUMNS)):
+            for column in DEMAND_COLUMNS:
+                building_loads.values[column][i] = demand[column].values
+        building_loads.update_substations(dict(
+            (building_name, pd.read_csv(locator.get_optimization_substations_results_file(building_name),
+                                        usecols=SUBSTATION_COLUMNS)) for building_name in building_names))
+        return building_loads
+
+    def update_substations(self, substation_results):
+        """
+        Update the substation results of the buildings (the result of `substation.substation_main`). The values are
+        rounded as in the substation results files.
+
+        :param substation_results: the substation results of each building
+        :type substation_results: dict[str, pd.DataFrame]
+        """
+        for building_name, results in substation_results.items():
+            for column in SUBSTATION_COLUMNS:
+                self.values[column][self.index[building_name]] = np.round(results[column].values, 3)
+
+    def get(self, building_names):
+        """The values of the buildings ``building_names``: column -> array (buildings x 8760)"""
+        rows = [self.index[building_name] for building_name in building_names]
+        return dict((column, values[rows]) for column, values in self.values.items())
+
+
+def network_main(locator, total_demand, building_names, gv, key, building_loads=None):
     """
     This function summarizes the distribution demands and will give them as:
     - absolute values (design values = extreme values)
@@ -33,11 +83,13 @@ def network_main(locator, total_demand, building_names, gv, key):
     :param gv: global variables class
     :param key: when called by the optimization, a key will provide an id for the individual
      and the generation.
+    :param building_loads: the hourly values of the buildings, read from the results files if None
     :type locator: class
     :type total_demand: list
     :type building_names: vector
     :type gv: class
     :type key: int
+    :type building_loads: BuildingLoads
     :return: csv file stored in locator.get_optimization_network_results_folder() as fName_result
         where fName_result: FIXME: what?
     :rtype: Nonetype
@@ -50,50 +102,24 @@ def network_main(locator, total_demand, building_names, gv, key):
     pipes_tot_length = pd.read_csv(locator.get_optimization_network_layout_pipes_file(), usecols=['LENGTH'])
     ntwk_length = pipes_tot_length.sum() * num_buildings_network / len(building_names) #gv.num_tot_buildings
 
-    # empty vectors
-    buildings = []
-    substations = []
-    Qcdata_netw_total_kWh = np.zeros(8760)
-    mcpdata_netw_total_kWperC = np.zeros(8760)
-    Ecaf_netw_total_kWh = np.zeros(8760)
-    Electr_netw_total_W = np.zeros(8760)
-    mdot_heat_netw_all_kgpers = np.zeros(8760)
-    mdot_cool_netw_all_kgpers = np.zeros(8760)
-    Q_DH_building_netw_total_W = np.zeros(8760)
-    Q_DC_building_netw_total_W = np.zeros(8760)
-    sum_tret_mdot_heat = np.zeros(8760)
-    sum_tret_mdot_cool = np.zeros(8760)
-    mdot_heat_netw_min_kgpers = np.zeros(8760) + 1E6
-    mdot_cool_netw_min_kgpers = np.zeros(8760) + 1E6
-    iteration = 0
-    for building_name in building_names:
-        buildings.append(pd.read_csv(locator.get_demand_results_file(building_name),
-                                     usecols=['mcpdataf_kWperC', 'Qcdataf_kWh', 'Ecaf_kWh']))
-        substations.append(pd.read_csv(locator.get_optimization_substations_results_file(building_name),
-                                       usecols=['Electr_array_all_flat_W', 'mdot_DH_result_kgpers',
-                                                'mdot_DC_result_kgpers', 'Q_heating_W', 'Q_dhw_W', 'Q_cool_W',
-                                                'T_return_DH_result_K', 'T_return_DC_result_K',
-                                                'T_supply_DH_result_K']))
-
-        Qcdata_netw_total_kWh += buildings[iteration].Qcdataf_kWh.values
-        mcpdata_netw_total_kWperC += buildings[iteration].mcpdataf_kWperC.values
-        Ecaf_netw_total_kWh += buildings[iteration].Ecaf_kWh.values
-        Electr_netw_total_W += substations[iteration].Electr_array_all_flat_W.values
-        mdot_heat_netw_all_kgpers += substations[iteration].mdot_DH_result_kgpers.values
-        mdot_cool_netw_all_kgpers += substations[iteration].mdot_DC_result_kgpers.values
-        Q_DH_building_netw_total_W += (substations[iteration].Q_heating_W.values + substations[iteration].Q_dhw_W.values)
-        Q_DC_building_netw_total_W += (substations[iteration].Q_cool_W.values)
-        sum_tret_mdot_heat += substations[iteration].T_return_DH_result_K.values * substations[
-            iteration].mdot_DH_result_kgpers.values
-        sum_tret_mdot_cool += substations[iteration].T_return_DC_result_K.values * substations[
-            iteration].mdot_DC_result_kgpers.values
-
-        # evaluate minimum flows
-        mdot_heat_netw_min_kgpers = np.vectorize(calc_min_flow)(mdot_heat_netw_min_kgpers,
-                                                         substations[iteration].mdot_DH_result_kgpers.values)
-        mdot_cool_netw_min_kgpers = np.vectorize(calc_min_flow)(mdot_cool_netw_min_kgpers,
-                                                         substations[iteration].mdot_DC_result_kgpers.values)
-        iteration += 1
+    # sum the values of the buildings of the network
+    if building_loads is None:
+        building_loads = BuildingLoads.read(locator, building_names)
+    loads = building_loads.get(building_names)
+    Qcdata_netw_total_kWh = loads['Qcdataf_kWh'].sum(axis=0)
+    mcpdata_netw_total_kWperC = loads['mcpdataf_kWperC'].sum(axis=0)
+    Ecaf_netw_total_kWh = loads['Ecaf_kWh'].sum(axis=0)
+    Electr_netw_total_W = loads['Electr_array_all_flat_W'].sum(axis=0)
+    mdot_heat_netw_all_kgpers = loads['mdot_DH_result_kgpers'].sum(axis=0)
+    mdot_cool_netw_all_kgpers = loads['mdot_DC_result_kgpers'].sum(axis=0)
+    Q_DH_building_netw_total_W = (loads['Q_heating_W'] + loads['Q_dhw_W']).sum(axis=0)
+    Q_DC_building_netw_total_W = loads['Q_cool_W'].sum(axis=0)
+    sum_tret_mdot_heat = (loads['T_return_DH_result_K'] * loads['mdot_DH_result_kgpers']).sum(axis=0)
+    sum_tret_mdot_cool = (loads['T_return_DC_result_K'] * loads['mdot_DC_result_kgpers']).sum(axis=0)
+
+    # evaluate minimum flows
+    mdot_heat_netw_min_kgpers = calc_min_flows(loads['mdot_DH_result_kgpers'])
+    mdot_cool_netw_min_kgpers = calc_min_flows(loads['mdot_DC_result_kgpers'])
 
     # calculate thermal losses of distribution
     T_DHN_withoutlosses_re_K = np.vectorize(calc_return_temp)(sum_tret_mdot_heat, mdot_heat_netw_all_kgpers)
@@ -301,6 +327,21 @@ def calc_min_flow(m0, m1):
         mmin = m0
     return mmin
 
+def calc_min_flows(mdot_kgpers):
+    """
+    Same as `calc_min_flow` applied to the flows of all the buildings of a distribution: the minimum positive flow of
+    each hour, 1E6 if no building has a flow.
+
+    :param mdot_kgpers: mass flow rates (buildings x hours)
+    :type mdot_kgpers: ndarray
+    :return: minimum mass flow rate of each hour
+    :rtype: ndarray
+    """
+    mmin = np.zeros(mdot_kgpers.shape[1]) + 1E6
+    if len(mdot_kgpers):
+        mmin = np.minimum(mmin, np.where(mdot_kgpers > 0, mdot_kgpers, 1E6).min(axis=0))
+    return mmin
+
 def find_index_of_max(array):
     """
     Returns the index of an array on which the maximum value is at.
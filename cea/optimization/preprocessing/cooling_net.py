@@ -17,6 +17,7 @@ import pandas as pd
 import cea.technologies.cooling_tower as CTModel
 import cea.technologies.chillers as VCCModel
 import cea.technologies.pumps as PumpModel
+from cea.demand.demand_writers import read_demand_results
 
 __author__ = "Thuy-An Nguyen"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -178,8 +179,8 @@ def coolingMain(locator, configKey, ntwFeat, HRdata, gv):
             if arrayData[i][1] > 0:
                 buildName = arrayData[i][0]
                 print buildName
-                df = pd.read_csv(locator.get_demand_results_file(buildName),
-                                 usecols=["Tcdataf_sup_C", "Tcdataf_re_C", "mcpdataf_kWperC"])
+                df = read_demand_results(locator, [buildName],
+                                         columns=["Tcdataf_sup_C", "Tcdataf_re_C", "mcpdataf_kWperC"])[0]
                 arrayBuild = np.array(df)
 
                 mdot_max_Data_kWperC = abs(np.amax(arrayBuild[:, -1]) / gv.cp * 1E3)
@@ -11,6 +11,7 @@ from __future__ import division
 
 import pandas as pd
 
+from cea.demand.demand_writers import read_demand_results
 from cea.technologies import boilers
 
 
@@ -38,7 +39,7 @@ def calc_pareto_Qhp(locator, total_demand, gv):
 
         for name in df.Name :
             # Extract process heat needs
-            Qhprof = pd.read_csv(locator.get_demand_results_file(name), usecols=["Qhprof_kWh"]).Qhprof_kWh.values
+            Qhprof = read_demand_results(locator, [name], columns=["Qhprof_kWh"])[0].Qhprof_kWh.values
 
             Qnom = 0
             Qannual = 0
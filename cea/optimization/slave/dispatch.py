@@ -0,0 +1,256 @@
+"""
+===========================
+Merit-order dispatch of the centralized plant
+===========================
+
+Allocates the thermal demand of the district heating network (after storage) to the plants of the centralized plant,
+in the preset merit order ``gv.act_first`` ... ``gv.act_fourth``: heat pumps ('HP'), cogeneration ('CHP'), base
+boiler ('BoilerBase') and peak boiler ('BoilerPeak').
+
+The demand of an hour does not depend on the other hours, so the allocation is done for all hours at once: each
+source is activated for the hours where demand is left, with array operations on the capacities and cost curves of its
+plants. The furnace cost model is scalar and is called for the hours it operates only.
+
+An hour is dispatched like this:
+
+- the sources are activated one after the other, as long as at least 1 Wh is left after a source
+- what is left after the last source is uncovered (and covered by an additional boiler in ``least_cost``)
+- a deficit below 1 Wh is neglected, a surplus (e.g. of the sewage heat pump, which follows the network mass flow) is
+  recorded as excess
+"""
+from __future__ import division
+
+import numpy as np
+
+from cea.technologies.boilers import cond_boiler_op_cost
+from cea.technologies.cogeneration import calc_Cop_CCT
+from cea.technologies.furnace import furnace_op_cost
+from cea.technologies.heatpumps import GHP_op_cost, GHP_Op_max, HPLake_op_cost, HPSew_op_cost
+
+__author__ = "Tim Vollrath"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Tim Vollrath", "Thuy-An Nguyen", "Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+# the columns of the results, in this order (the demand uncovered is stored in the column UNCOVERED of Q_source_W)
+PLANTS = ['HPSew', 'HPLake', 'GHP', 'CC', 'Furnace', 'BoilerBase', 'BoilerPeak']
+HPSEW, HPLAKE, GHP, CC, FURNACE, BOILER_BASE, BOILER_PEAK = range(len(PLANTS))
+UNCOVERED = len(PLANTS)
+
+
+def calc_dispatch(Q_therm_req_W, mdot_DH_kgpers, T_DH_return_K, T_DH_supply_K, T_sewage_K, master_to_slave_vars, gv):
+    """
+    Dispatch the thermal demand of each hour to the plants of the centralized plant in merit order.
+
+    :param Q_therm_req_W: thermal demand of the network after storage, for each hour
+    :type Q_therm_req_W: ndarray
+    :param mdot_DH_kgpers: mass flow rate of the network, for each hour
+    :type mdot_DH_kgpers: ndarray
+    :param T_DH_return_K: return temperature of the network, for each hour
+    :type T_DH_return_K: ndarray
+    :param T_DH_supply_K: supply temperature of the network
+    :type T_DH_supply_K: float
+    :param T_sewage_K: sewage temperature for each hour (only used if ``gv.HPSew_allowed``)
+    :type T_sewage_K: ndarray
+    :param master_to_slave_vars: class MastertoSlaveVars containing the plants of the individual
+    :param gv: global variables class
+    :return: for each hour and plant (columns ``PLANTS``): operation cost, status (1 = activated), thermal energy
+        generated (plus the uncovered demand), cold source energy, electricity (required by heat pumps and boilers,
+        generated by CC and furnace), gas and wood required - and the excess of each hour
+    :rtype: ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray, ndarray
+    """
+    hours = len(Q_therm_req_W)
+    network = {'mdot_DH_kgpers': np.asarray(mdot_DH_kgpers, dtype=float),
+               'T_DH_return_K': np.asarray(T_DH_return_K, dtype=float),
+               'T_DH_supply_K': T_DH_supply_K,
+               'T_sewage_K': T_sewage_K}
+    results = {'cost': np.zeros((hours, len(PLANTS))),
+               'source_info': np.zeros((hours, len(PLANTS))),
+               'Q_source_W': np.zeros((hours, len(PLANTS) + 1)),
+               'E_coldsource_W': np.zeros((hours, len(PLANTS))),
+               'E_PP_el_W': np.zeros((hours, len(PLANTS))),
+               'E_gas_W': np.zeros((hours, len(PLANTS))),
+               'E_wood_W': np.zeros((hours, len(PLANTS)))}
+    Q_excess_W = np.zeros(hours)
+
+    Q_left_W = np.array(Q_therm_req_W, dtype=float)
+    active = Q_left_W > 1E-1  # the hours where demand is left to be covered
+    for source in [gv.act_first, gv.act_second, gv.act_third, gv.act_fourth]:
+        for activate_plant in SOURCES.get(source, []):
+            activate_plant(Q_left_W, active & (Q_left_W > 0), network, master_to_slave_vars, gv, results)
+
+        # as long as 1 Wh is left, go on with the next source
+        missing = Q_left_W >= 1.0
+        covered = active & ~missing
+        excess = covered & (np.abs(Q_left_W) >= 0.5)
+        Q_excess_W[excess] = -Q_left_W[excess]
+        active &= missing
+
+    results['Q_source_W'][active, UNCOVERED] = Q_left_W[active]
+    if active.any():
+        print "insufficient capacity installed in %i hours: %.0f Wh missing (covered by an additional boiler)" % (
+            np.count_nonzero(active), np.sum(Q_left_W[active]))
+    if np.count_nonzero(Q_excess_W):
+        print "too much power in %i hours: %.0f kWh in excess" % (np.count_nonzero(Q_excess_W),
+                                                                   np.sum(Q_excess_W) / 1000.0)
+
+    return results['cost'], results['source_info'], results['Q_source_W'], results['E_coldsource_W'], \
+           results['E_PP_el_W'], results['E_gas_W'], results['E_wood_W'], Q_excess_W
+
+
+def activate_HPSew(Q_left_W, hours, network, MS_Var, gv, results):
+    """Sewage heat pump: follows the mass flow of the network, scaled down to the size of the heat pump"""
+    if MS_Var.HP_Sew_on != 1 or gv.HPSew_allowed != 1 or not hours.any():
+        return
+    Q_req_W = Q_left_W[hours]
+    mdot_req_kgpers = network['mdot_DH_kgpers'][hours]
+    mdot_kgpers = np.where(Q_req_W > MS_Var.HPSew_maxSize, mdot_req_kgpers * MS_Var.HPSew_maxSize / Q_req_W,
+                           mdot_req_kgpers)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        C_HPSew_el, _, Q_cold_W, Q_therm_W, E_HPSew_req_W = HPSew_op_cost(mdot_kgpers, network['T_DH_supply_K'],
+                                                                         network['T_DH_return_K'][hours],
+                                                                         network['T_sewage_K'][hours], gv)
+    Q_left_W[hours] = Q_req_W - Q_therm_W
+    store(results, HPSEW, hours, status=Q_therm_W > 0, cost=C_HPSew_el, Q_W=Q_therm_W, E_el_W=E_HPSew_req_W,
+          E_coldsource_W=Q_cold_W)
+
+
+def activate_GHP(Q_left_W, hours, network, MS_Var, gv, results):
+    """Ground source heat pump: up to its maximum capacity, during its season"""
+    hour_of_year = np.arange(len(Q_left_W))
+    hours = hours & (hour_of_year >= MS_Var.GHP_SEASON_ON) & (hour_of_year <= MS_Var.GHP_SEASON_OFF)
+    if MS_Var.GHP_on != 1 or not hours.any():
+        return
+    Q_max_W, GHP_COP = GHP_Op_max(network['T_DH_supply_K'], gv.TGround, MS_Var.GHP_number, gv)
+    Q_req_W = Q_left_W[hours]
+    at_max = Q_req_W > Q_max_W
+    Q_GHP_W = np.where(at_max, Q_max_W, Q_req_W)
+    T_DH_return_K = network['T_DH_return_K'][hours]
+    mdot_kgpers = Q_GHP_W / (gv.cp * (network['T_DH_supply_K'] - T_DH_return_K))
+    Q_left_W[hours] = np.where(at_max, Q_req_W - Q_max_W, 0)
+
+    C_GHP_el, E_GHP_req_W, Q_cold_W, Q_therm_W = GHP_op_cost(mdot_kgpers, network['T_DH_supply_K'], T_DH_return_K,
+                                                              gv, GHP_COP)
+    store(results, GHP, hours, status=1, cost=C_GHP_el, Q_W=Q_therm_W, E_el_W=E_GHP_req_W, E_coldsource_W=Q_cold_W)
+
+
+def activate_HPLake(Q_left_W, hours, network, MS_Var, gv, results):
+    """Lake heat pump: up to its maximum size"""
+    if MS_Var.HP_Lake_on != 1 or gv.HPLake_allowed != 1 or not hours.any():
+        return
+    Q_req_W = Q_left_W[hours]
+    at_max = Q_req_W > MS_Var.HPLake_maxSize
+    Q_HPLake_W = np.where(at_max, MS_Var.HPLake_maxSize, Q_req_W)
+    T_DH_return_K = network['T_DH_return_K'][hours]
+    mdot_kgpers = Q_HPLake_W / (gv.cp * (network['T_DH_supply_K'] - T_DH_return_K))
+    Q_left_W[hours] = np.where(at_max, Q_req_W - MS_Var.HPLake_maxSize, 0)
+
+    C_HPL_el, E_HPLake_req_W, Q_cold_W, _ = HPLake_op_cost(mdot_kgpers, network['T_DH_supply_K'], T_DH_return_K,
+                                                            gv.TLake, gv)
+    store(results, HPLAKE, hours, status=1, cost=C_HPL_el, Q_W=Q_HPLake_W, E_el_W=E_HPLake_req_W,
+          E_coldsource_W=Q_cold_W)
+
+
+def activate_CC(Q_left_W, hours, network, MS_Var, gv, results):
+    """Combined cycle: between its minimum and maximum load, with the part load curves of ``calc_Cop_CCT``"""
+    if MS_Var.CC_on != 1 or gv.CC_allowed != 1 or not hours.any():
+        return
+    _, Q_used_prim_fn_W, cost_per_Wh_fn, Q_CC_min_W, Q_CC_max_W, eta_elec_fn = calc_Cop_CCT(
+        MS_Var.CC_GT_SIZE, network['T_DH_supply_K'], MS_Var.gt_fuel, gv)
+
+    below_min = hours & (Q_left_W <= Q_CC_min_W)
+    if below_min.any():
+        print "CC below part load in %i hours" % np.count_nonzero(below_min)
+    hours = hours & ~below_min
+    if not hours.any():
+        return
+    Q_req_W = Q_left_W[hours]
+    at_max = Q_req_W >= Q_CC_max_W
+    Q_CC_W = np.where(at_max, Q_CC_max_W, Q_req_W)
+    Q_used_prim_W = Q_used_prim_fn_W(Q_CC_W)
+    # at full load, the electric efficiency curve is evaluated at the thermal output (as in the hourly model so far)
+    E_CC_gen_W = eta_elec_fn(np.where(at_max, Q_CC_max_W, Q_used_prim_W)) * Q_used_prim_W
+    Q_left_W[hours] = np.where(at_max, Q_req_W - Q_CC_max_W, 0)
+
+    store(results, CC, hours, status=1, cost=cost_per_Wh_fn(Q_CC_W) * Q_CC_W, Q_W=Q_CC_W, E_el_W=E_CC_gen_W,
+          E_gas_W=Q_used_prim_W)
+
+
+def activate_furnace(Q_left_W, hours, network, MS_Var, gv, results):
+    """Furnace: between its minimum and maximum load (the cost model is scalar and called hour by hour)"""
+    if MS_Var.Furnace_on != 1 or not hours.any():
+        return
+    below_min = hours & (Q_left_W <= gv.Furn_min_Load * MS_Var.Furnace_Q_max)
+    if below_min.any():
+        print "Furnace below minimum load in %i hours" % np.count_nonzero(below_min)
+
+    for hour in np.flatnonzero(hours & ~below_min):
+        if Q_left_W[hour] > MS_Var.Furnace_Q_max:
+            Q_furnace_W = MS_Var.Furnace_Q_max
+        else:
+            Q_furnace_W = Q_left_W[hour]
+        C_furn, _, Q_prim_W, _, E_furn_el_gen_W = furnace_op_cost(Q_furnace_W, MS_Var.Furnace_Q_max,
+                                                                  network['T_DH_return_K'][hour],
+                                                                  MS_Var.Furn_Moist_type, gv)
+        Q_left_W[hour] -= Q_furnace_W
+        store(results, FURNACE, hour, status=1, cost=C_furn, Q_W=Q_furnace_W, E_el_W=E_furn_el_gen_W,
+              E_wood_W=Q_prim_W)
+
+
+def activate_boiler_base(Q_left_W, hours, network, MS_Var, gv, results):
+    """Base boiler: between its minimum and maximum load"""
+    if MS_Var.Boiler_on != 1 or not hours.any():
+        return
+    below_min = hours & (Q_left_W < gv.Boiler_min * MS_Var.Boiler_Q_max)
+    if below_min.any():
+        print "Base Boiler not activated (below part load) in %i hours" % np.count_nonzero(below_min)
+    hours = hours & ~below_min
+    if not hours.any():
+        return
+    Q_req_W = Q_left_W[hours]
+    Q_boiler_W = np.where(Q_req_W >= MS_Var.Boiler_Q_max, MS_Var.Boiler_Q_max, Q_req_W)
+    C_boil_therm, _, Q_primary_W, E_aux_boiler_req_W = cond_boiler_op_cost(Q_boiler_W, MS_Var.Boiler_Q_max,
+                                                                           network['T_DH_return_K'][hours],
+                                                                           MS_Var.BoilerType, MS_Var.EL_TYPE, gv)
+    Q_left_W[hours] = Q_req_W - Q_boiler_W
+    store(results, BOILER_BASE, hours, status=1, cost=C_boil_therm, Q_W=Q_boiler_W, E_el_W=E_aux_boiler_req_W,
+          E_gas_W=Q_primary_W)
+
+
+def activate_boiler_peak(Q_left_W, hours, network, MS_Var, gv, results):
+    """Peak boiler: up to its maximum load"""
+    if MS_Var.BoilerPeak_on != 1 or not hours.any():
+        return
+    Q_req_W = Q_left_W[hours]
+    at_max = Q_req_W > MS_Var.BoilerPeak_Q_max
+    Q_boiler_W = np.where(at_max, MS_Var.BoilerPeak_Q_max, Q_req_W)
+    C_boil_therm, _, Q_primary_W, E_aux_boiler_req_W = cond_boiler_op_cost(Q_boiler_W, MS_Var.BoilerPeak_Q_max,
+                                                                           network['T_DH_return_K'][hours],
+                                                                           MS_Var.BoilerPeakType, MS_Var.EL_TYPE, gv)
+    Q_left_W[hours] = np.where(at_max, Q_req_W - MS_Var.BoilerPeak_Q_max, 0)
+    store(results, BOILER_PEAK, hours, status=1, cost=C_boil_therm, Q_W=Q_boiler_W, E_el_W=E_aux_boiler_req_W,
+          E_gas_W=Q_primary_W)
+
+
+# the plants of each source, in the order they are activated
+SOURCES = {
+    'HP': [activate_HPSew, activate_GHP, activate_HPLake],
+    'CHP': [activate_CC, activate_furnace],
+    'BoilerBase': [activate_boiler_base],
+    'BoilerPeak': [activate_boiler_peak],
+}
+
+
+def store(results, plant, hours, status, cost, Q_W, E_el_W, E_coldsource_W=0.0, E_gas_W=0.0, E_wood_W=0.0):
+    """Store the operation of ``plant`` at ``hours`` (a mask or an hour) in the results of the dispatch"""
+    results['source_info'][hours, plant] = status
+    results['cost'][hours, plant] = cost
+    results['Q_source_W'][hours, plant] = Q_W
+    results['E_PP_el_W'][hours, plant] = E_el_W
+    results['E_coldsource_W'][hours, plant] = E_coldsource_W
+    results['E_gas_W'][hours, plant] = E_gas_W
+    results['E_wood_W'][hours, plant] = E_wood_W
@@ -14,7 +14,7 @@ import pandas as pd
 
 from cea.technologies.photovoltaic import calc_Crem_pv
 from cea.technologies.boilers import cond_boiler_op_cost
-import copy
+from cea.optimization.slave import dispatch
 
 __author__ = "Tim Vollrath"
 __copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
@@ -95,434 +95,18 @@ def least_cost_main(locator, master_to_slave_vars, solar_features, gv):
 
     mdot_DH_kgpers = network_data['mdot_DH_netw_total_kgpers']
     tdhsup_K = network_data['T_DHNf_sup_K'][0]
-        # import Marginal Cost of PP Data :
-    # os.chdir(Cost_Maps_Path)
-
- #   """ LOAD MODULES """
-
-    if (MS_Var.Furnace_on) == 1:
-        # os.chdir(Cost_Maps_Path)
-        import cea.technologies.furnace as CMFurn
-        # os.chdir(Cost_Maps_Path)
-        reload(CMFurn)
-        Furnace_op_cost = CMFurn.furnace_op_cost
-
-    # Heat Pumps
-    if (MS_Var.GHP_on) == 1 or (MS_Var.HP_Lake_on) == 1 or (MS_Var.HP_Sew_on) == 1:
-        import cea.technologies.heatpumps as CMHP
-        import cea.technologies.heatpumps as ESMHP
-        HPLake_op_cost = CMHP.HPLake_op_cost
-        HPSew_op_cost = CMHP.HPSew_op_cost
-        GHP_op_cost = CMHP.GHP_op_cost
-        GHP_Op_max = ESMHP.GHP_Op_max
-
-    # CHP
-    if (MS_Var.CC_on) == 1:
-        import cea.technologies.cogeneration as chp
-        CC_op_cost = chp.calc_Cop_CCT
-        # How to use: for e.g. cost_per_Wh(Q_therm):
-        # type cost_per_Wh_fn = CC_op_cost(10E6, 273+70.0, "NG")[2]
-        # similar: Q_used_prim_fn = CC_op_cost(10E6, 273+70.0, "NG")[1]
-        # then: ask for Q_therm_req:
-        # Q_used_prim = Q_used_prim_fn(Q_therm_req) OR cost_per_Wh = cost_per_Wh_fn(Q_therm_req)
-
- #   """ Fixed order COST ALGORITHM STARTS """  # Run the Centralized Plant Operation Scheme
 
     # Import Data - Sewage
     if gv.HPSew_allowed == 1:
         HPSew_Data = pd.read_csv(locator.get_sewage_heat_potential())
-        QcoldsewArray = np.array(HPSew_Data['Qsw_kW']) * 1E3
         TretsewArray_K = np.array(HPSew_Data['ts_C']) + 273
+    else:
+        TretsewArray_K = None
 
-    def source_activator(Q_therm_req_W, hour, context):
-        """
-        :param Q_therm_req_W:
-        :param hour:
-        :param context:
-        :type Q_therm_req_W: float
-        :type hour: int
-        :type context: list
-        :return: cost_data_centralPlant_op, source_info, Q_source_data, E_coldsource_data, E_PP_el_data, E_gas_data, E_wood_data, Q_excess
-        :rtype:
-        """
-        Q_therm_req_COPY_W = copy.copy(Q_therm_req_W)
-        MS_Var = context
-        current_source = gv.act_first  # Start with first source, no cost yet
-        mdot_DH_req_kgpers = mdot_DH_kgpers[hour]
-        tdhret_req_K = tdhret_K[hour]
-        Q_uncovered_W = 0
-        # Initializing resulting values (necessairy as not all of them are over-written):
-
-        costHPSew, costHPLake, costGHP, costCC, costFurnace, costBoiler, costBackup = 0, 0, 0, 0, 0, 0, 0
-
-        # initialize all sources to be off = 0 (turn to "on" with setting to 1)
-        sHPSew = 0
-        sHPLake = 0
-        srcGHP = 0
-        sorcCC = 0
-        sorcFurnace = 0
-        sBoiler = 0
-        sBackup = 0
-        Q_excess_W = 0
-        Q_HPSew_gen_W, Q_HPLake_gen_W, Q_GHP_gen_W, Q_CC_gen_W, Q_Furnace_gen_W, Q_Boiler_gen_W, Q_Backup_gen_W = 0, 0, 0, 0, 0, 0, 0
-        E_HPSew_req_W, E_HPLake_req_W, E_GHP_req_W, E_CC_gen_W, E_Furnace_gen_W, E_BaseBoiler_req_W, E_BackupBoiler_req_W = 0, 0, 0, 0, 0, 0, 0
-        E_gas_HPSew_W, E_gas_HPLake_W, E_gas_GHP, E_gas_CC_W, E_gas_Furnace_W, E_gas_Boiler_W, E_gas_Backup_W = 0, 0, 0, 0, 0, 0, 0
-        E_wood_HPSew_W, E_wood_HPLake_W, E_wood_GHP_W, E_wood_CC_W, E_wood_Furnace_W, E_wood_Boiler_W, E_wood_Backup_W = 0, 0, 0, 0, 0, 0, 0
-        E_coldsource_HPSew_W, E_coldsource_HPLake_W, E_coldsource_GHP_W, E_coldsource_CC_W, \
-        E_coldsource_Furnace_W, E_coldsource_Boiler_W, E_coldsource_Backup_W = 0, 0, 0, 0, 0, 0, 0
-
-        # print "Slave has uncovered demand?", Q_therm_req, " (if zero then no)"
-        # print "else, the slave routine's while loop (PP Activation) will be started"
-        while Q_therm_req_W > 1E-1:  # cover demand as long as the supply is lower than demand!
-            # print Q_therm_req, "Wh will now be covered, hour:", hour
-
-            if current_source == 'HP':  # use heat pumps available!
-
-                # print "current_source", current_source
-
-                if (MS_Var.HP_Sew_on) == 1 and Q_therm_req_W > 0 and gv.HPSew_allowed == 1:  # activate if its available
-
-                    sHPSew = 0
-                    costHPSew = 0.0
-                    Q_HPSew_gen_W = 0.0
-                    E_HPSew_req_W = 0.0
-                    E_coldsource_HPSew_W = 0.0
-
-                    if Q_therm_req_W > MS_Var.HPSew_maxSize:
-                        Q_therm_Sew_W = MS_Var.HPSew_maxSize
-                        mdot_DH_to_Sew_kgpers = mdot_DH_req_kgpers * Q_therm_Sew_W / Q_therm_req_W.copy()  # scale down the mass flow if the thermal demand is lowered
-                        # Q_therm_req -= MS_Var.HPSew_maxSize
-
-                    else:
-                        Q_therm_Sew_W = float(Q_therm_req_W.copy())
-                        mdot_DH_to_Sew_kgpers = float(mdot_DH_req_kgpers.copy())
-                        # Q_therm_req = 0
-
-                    HP_Sew_Cost_Data = HPSew_op_cost(mdot_DH_to_Sew_kgpers, tdhsup_K, tdhret_req_K, TretsewArray_K[hour], gv)
-                    C_HPSew_el_pure, C_HPSew_per_kWh_th_pure, Q_HPSew_cold_primary_W, Q_HPSew_therm_W, E_HPSew_req_W = HP_Sew_Cost_Data
-                    Q_therm_req_W -= Q_HPSew_therm_W
-                    # print "C_HPSew_el_pure, C_HPSew_per_kWh_th_pure, Q_HPSew_cold_primary, Q_HPSew_therm", \
-                    #                        C_HPSew_el_pure, C_HPSew_per_kWh_th_pure, Q_HPSew_cold_primary, Q_HPSew_therm
-
-                    # Storing data for further processing
-                    if Q_HPSew_therm_W > 0:
-                        sHPSew = 1
-                    costHPSew = float(C_HPSew_el_pure)
-                    Q_HPSew_gen_W = float(Q_HPSew_therm_W)
-                    # print "\n Q_HPSew", Q_HPSew
-                    E_HPSew_req_W = float(E_HPSew_req_W)
-                    E_coldsource_HPSew_W = float(Q_HPSew_cold_primary_W)
-
-                if (
-                MS_Var.GHP_on) == 1 and hour >= MS_Var.GHP_SEASON_ON and hour <= MS_Var.GHP_SEASON_OFF and Q_therm_req_W > 0:
-                    # activating GHP plant if possible
-
-                    # print "is GHP on?", MS_Var.GHP_on
-                    srcGHP = 0
-                    costGHP = 0.0
-                    Q_GHP_gen_W = 0.0
-                    E_GHP_req_W = 0.0
-                    E_coldsource_GHP_W = 0.0
-
-                    Q_max_W, GHP_COP = GHP_Op_max(tdhsup_K, gv.TGround, MS_Var.GHP_number, gv)
-
-                    if Q_therm_req_W > Q_max_W:
-                        mdot_DH_to_GHP_kgpers = Q_max_W / (gv.cp * (tdhsup_K - tdhret_req_K))
-                        Q_therm_req_W -= Q_max_W
-
-                    else:  # regular operation possible, demand is covered
-                        mdot_DH_to_GHP_kgpers = Q_therm_req_W.copy() / (gv.cp * (tdhsup_K - tdhret_req_K))
-                        Q_therm_req_W = 0
-
-                    GHP_Cost_Data = GHP_op_cost(mdot_DH_to_GHP_kgpers, tdhsup_K, tdhret_req_K, gv, GHP_COP)
-                    C_GHP_el, E_GHP_req_W, Q_GHP_cold_primary_W, Q_GHP_therm_W = GHP_Cost_Data
-
-                    # Storing data for further processing
-                    srcGHP = 1
-                    costGHP = C_GHP_el
-                    Q_GHP_gen_W = Q_GHP_therm_W
-                    E_GHP_req_W = E_GHP_req_W
-                    E_coldsource_GHP_W = Q_GHP_cold_primary_W
-
-                if (MS_Var.HP_Lake_on) == 1 and Q_therm_req_W > 0 and gv.HPLake_allowed == 1:  # run Heat Pump Lake
-                    sHPLake = 0
-                    costHPLake = 0
-                    Q_HPLake_gen_W = 0
-                    E_HPLake_req_W = 0
-                    E_coldsource_HPLake_W = 0
-
-                    if Q_therm_req_W > MS_Var.HPLake_maxSize:  # Scale down Load, 100% load achieved
-                        Q_therm_HPL_W = MS_Var.HPLake_maxSize
-                        mdot_DH_to_Lake_kgpers = Q_therm_HPL_W / (
-                        gv.cp * (tdhsup_K - tdhret_req_K))  # scale down the mass flow if the thermal demand is lowered
-                        Q_therm_req_W -= MS_Var.HPLake_maxSize
-
-                    else:  # regular operation possible
-                        Q_therm_HPL_W = Q_therm_req_W.copy()
-                        mdot_DH_to_Lake_kgpers = Q_therm_HPL_W / (gv.cp * (tdhsup_K - tdhret_req_K))
-                        Q_therm_req_W = 0
-                    print tdhsup_K
-                    HP_Lake_Cost_Data = HPLake_op_cost(mdot_DH_to_Lake_kgpers, tdhsup_K, tdhret_req_K, gv.TLake, gv)
-                    C_HPL_el, E_HPLake_req_W, Q_HPL_cold_primary_W, Q_HPL_therm_W = HP_Lake_Cost_Data
-
-                    # Storing Data
-                    sHPLake = 1
-                    costHPLake = C_HPL_el
-                    Q_HPLake_gen_W = Q_therm_HPL_W
-                    E_HPLake_req_W = E_HPLake_req_W
-                    E_coldsource_HPLake_W = Q_HPL_cold_primary_W
-
-                    # print Q_therm_req, "Q left"
-
-            if current_source == 'CHP' and Q_therm_req_W > 0:  # start activating the combined cycles
-
-                # print "current_source", current_source
-
-                # By definition, one can either activate the CHP (NG-CC) or ORC (Furnace) BUT NOT BOTH at the same time (not activated by Master)
-                Cost_CC = 0.0
-                sorcCC = 0
-                costCC = 0.0
-                Q_CC_gen_W = 0.0
-                E_gas_CC_W = 0.0
-                E_CC_gen_W = 0
-
-                if (
-                MS_Var.CC_on) == 1 and Q_therm_req_W > 0 and gv.CC_allowed == 1:  # only operate if the plant is available
-                    CC_op_cost_data = CC_op_cost(MS_Var.CC_GT_SIZE, tdhsup_K, MS_Var.gt_fuel,
-                                                 gv)  # create cost information
-                    Q_used_prim_CC_fn_W = CC_op_cost_data[1]
-                    cost_per_Wh_CC_fn = CC_op_cost_data[2]  # gets interpolated cost function
-                    Q_CC_min_W = CC_op_cost_data[3]
-                    Q_CC_max_W = CC_op_cost_data[4]
-                    eta_elec_interpol = CC_op_cost_data[5]
-
-                    if Q_therm_req_W > Q_CC_min_W:  # operation Possible if above minimal load
-                        print MS_Var.CC_GT_SIZE, MS_Var.gt_fuel, tdhsup_K, Q_therm_req_W, Q_CC_min_W, Q_CC_max_W
-                        if Q_therm_req_W < Q_CC_max_W:  # Normal operation Possible within partload regime
-                            cost_per_Wh_CC = cost_per_Wh_CC_fn(Q_therm_req_W)
-                            Q_used_prim_CC_W = Q_used_prim_CC_fn_W(Q_therm_req_W)
-                            Q_CC_delivered_W = Q_therm_req_W.copy()
-                            Q_therm_req_W = 0
-                            E_CC_gen_W = np.float(eta_elec_interpol(Q_used_prim_CC_W)) * Q_used_prim_CC_W
-
-
-                        else:  # Only part of the demand can be delivered as 100% load achieved
-                            cost_per_Wh_CC = cost_per_Wh_CC_fn(Q_CC_max_W)
-                            Q_used_prim_CC_W = Q_used_prim_CC_fn_W(Q_CC_max_W)
-                            Q_CC_delivered_W = Q_CC_max_W
-                            Q_therm_req_W -= Q_CC_max_W
-                            # print "CC electric efficiency:", np.float(eta_elec_interpol(Q_CC_max))
-                            # print "Q_CC_delivered", Q_CC_delivered
-                            E_CC_gen_W = np.float(eta_elec_interpol(Q_CC_max_W)) * Q_used_prim_CC_W
-                            # print "E_el_CC", np.shape(E_el_CC), E_el_CC
-
-                        Cost_CC = cost_per_Wh_CC * Q_CC_delivered_W
-                        sorcCC = 1
-                        costCC = Cost_CC
-                        Q_CC_gen_W = Q_CC_delivered_W
-                        E_gas_CC_W = Q_used_prim_CC_W
-                    else:
-                        print "CC below part load"
-
-                if (
-                MS_Var.Furnace_on) == 1 and Q_therm_req_W > 0:  # Activate Furnace if its there. By definition, either ORC or NG-CC!
-                    Q_Furn_therm_W = 0
-                    sorcFurnace = 0
-                    costFurnace = 0.0
-                    Q_Furnace_gen_W = 0.0
-                    E_wood_Furnace_W = 0.0
-                    Q_Furn_prim_W = 0.0
-
-                    if Q_therm_req_W > (
-                        gv.Furn_min_Load * MS_Var.Furnace_Q_max):  # Operate only if its above minimal load
-
-                        if Q_therm_req_W > MS_Var.Furnace_Q_max:  # scale down if above maximum load, Furnace operates at max. capacity
-                            Furnace_Cost_Data = Furnace_op_cost(MS_Var.Furnace_Q_max, MS_Var.Furnace_Q_max, tdhret_req_K,
-                                                                MS_Var.Furn_Moist_type, gv)
-
-                            C_Furn_therm = Furnace_Cost_Data[0]
-                            Q_Furn_prim_W = Furnace_Cost_Data[2]
-                            Q_Furn_therm_W = MS_Var.Furnace_Q_max
-                            Q_therm_req_W -= Q_Furn_therm_W
-                            E_Furnace_gen_W = Furnace_Cost_Data[4]
-                            # print "\n E_el_Furnace",np.shape(E_el_Furnace), E_el_Furnace
-
-
-                        else:  # Normal Operation Possible
-                            Furnace_Cost_Data = Furnace_op_cost(Q_therm_req_W, MS_Var.Furnace_Q_max, tdhret_req_K,
-                                                                MS_Var.Furn_Moist_type, gv)
-
-                            Q_Furn_prim_W = Furnace_Cost_Data[2]
-                            C_Furn_therm = Furnace_Cost_Data[0]
-                            Q_Furn_therm_W = Q_therm_req_W.copy()
-                            E_Furnace_gen_W = Furnace_Cost_Data[4]
-
-                            Q_therm_req_W = 0
-
-                        sorcFurnace = 1
-                        costFurnace = C_Furn_therm.copy()
-                        Q_Furnace_gen_W = Q_Furn_therm_W
-                        E_wood_Furnace_W = Q_Furn_prim_W
-                        # print "Q_Furn_therm", Q_Furn_therm
-                        # print "E_el_Furnace_produced", E_el_Furnace_produced
-
-                    else:
-                        print "Furnace below minimum load!"
-
-                        # print Q_therm_req, "Q left"
-
-            if current_source == 'BoilerBase' and Q_therm_req_W > 0:
-
-                # print "current_source", current_source
-
-                Q_therm_boiler_W = 0
-                if (MS_Var.Boiler_on) == 1:
-                    sBoiler = 0
-                    costBoiler = 0.0
-                    Q_Boiler_gen_W = 0.0
-                    E_gas_Boiler_W = 0.0
-                    E_BaseBoiler_req_W = 0.0
-
-                    if Q_therm_req_W >= gv.Boiler_min * MS_Var.Boiler_Q_max:  # Boiler can be activated?
-                        # Q_therm_boiler = Q_therm_req
-
-                        if Q_therm_req_W >= MS_Var.Boiler_Q_max:  # Boiler above maximum Load?
-                            Q_therm_boiler_W = MS_Var.Boiler_Q_max
-                        else:
-                            Q_therm_boiler_W = Q_therm_req_W.copy()
-
-                        Boiler_Cost_Data = cond_boiler_op_cost(Q_therm_boiler_W, MS_Var.Boiler_Q_max, tdhret_req_K, \
-                                                               context.BoilerType, context.EL_TYPE, gv)
-                        C_boil_therm, C_boil_per_Wh, Q_primary_W, E_aux_Boiler_req_W = Boiler_Cost_Data
-
-                        sBoiler = 1
-                        costBoiler = C_boil_therm
-                        Q_Boiler_gen_W = Q_therm_boiler_W
-                        E_gas_Boiler_W = Q_primary_W
-                        E_BaseBoiler_req_W = E_aux_Boiler_req_W
-                        Q_therm_req_W -= Q_therm_boiler_W
-                        # print "Base Boiler activated with ", Q_therm_boiler
-                        # print "E_el_BoilerBase ",E_el_BoilerBase
-                    else:
-                        print "Base Boiler not activated (below part load)"
-
-                        # print Q_therm_req, "Q left"
-
-            if current_source == 'BoilerPeak' and Q_therm_req_W > 0:
-                # print "current_source", current_source
-
-                if (MS_Var.BoilerPeak_on) == 1:
-                    sBackup = 0
-                    costBackup = 0.0
-                    Q_Backup_gen_W = 0.0
-                    E_gas_Backup_W = 0
-                    E_BackupBoiler_req_W = 0
-
-                    if Q_therm_req_W > 0:  # gv.Boiler_min*MS_Var.BoilerPeak_Q_max: # Boiler can be activated?
-
-                        if Q_therm_req_W > MS_Var.BoilerPeak_Q_max:  # Boiler above maximum Load?
-                            Q_therm_boilerP_W = MS_Var.BoilerPeak_Q_max
-                            Q_therm_req_W -= Q_therm_boilerP_W
-                        else:
-                            Q_therm_boilerP_W = Q_therm_req_W.copy()
-                            Q_therm_req_W = 0
-
-                        Boiler_Cost_DataP = cond_boiler_op_cost(Q_therm_boilerP_W, MS_Var.BoilerPeak_Q_max, tdhret_req_K, \
-                                                                context.BoilerPeakType, context.EL_TYPE, gv)
-                        C_boil_thermP, C_boil_per_WhP, Q_primaryP_W, E_aux_BoilerP_W = Boiler_Cost_DataP
-
-                        sBackup = 1
-                        costBackup = C_boil_thermP
-                        Q_Backup_gen_W = Q_therm_boilerP_W
-                        E_gas_Backup_W = Q_primaryP_W
-                        E_BackupBoiler_req_W = E_aux_BoilerP_W
-                        # print "Peak Boiler activated with ", Q_Backup
-                        # print "E_el_Backup ",E_el_Backup
-
-
-                        # print Q_therm_req, "Q left"
-
-
-            print "\n currently activated source: ", current_source
-            print "available sources :", "\n Boiler", MS_Var.Boiler_on,\
-                                         "\n BoilerPeak_on", MS_Var.BoilerPeak_on, \
-                                         "\n Furnace_on", MS_Var.Furnace_on,\
-                                         "\n GHP_on", MS_Var.GHP_on,\
-                                         "\n HP_Lake_on", MS_Var.HP_Lake_on,\
-                                         "\n HP_Sew_on", MS_Var.HP_Sew_on,\
-                                         "\n CC_on",MS_Var.CC_on,\
-                                         "\n WasteServersHeatRecovery", MS_Var.WasteServersHeatRecovery,\
-                                         "\n WasteCompressorHeatRecovery", MS_Var.WasteCompressorHeatRecovery
-
-
-            Q_excess_W = 0
-            if np.floor(Q_therm_req_W) > 0:
-                if current_source == gv.act_first:
-                    current_source = gv.act_second
-                    # print "switch to", gv.act_second, "\n"
-                elif current_source == gv.act_second:
-                    current_source = gv.act_third
-                    # print "switch to", gv.act_third, "\n"
-                elif current_source == gv.act_third:
-                    current_source = gv.act_fourth
-                    # print "switch to", gv.act_fourth, "\n"
-                else:
-                    Q_uncovered_W = Q_therm_req_W
-
-                    print "last source tested: ", current_source
-                    print "occured in hour: ", hour
-                    print "insufficient capacity installed! Cannot cover the distribution demand (check Slave code, find_least_cost_source_main"
-                    #break
-
-                    print "not sufficient capacity installed in hour : ", hour
-                    print Q_therm_req_W, "Wh missing"
-                    print "check least cost optimization (here the error comes from) but also the inputs: "
-                    print "It is not sufficient capacity available to the slave in order to fulfill the thermal "
-                    print "demand of the distribution (think about the bands or gaps that occur when a system has a minimum load)"
-                    print "This is now covered by a boiler"
-
-                    print Q_therm_req_COPY_W, "Wh was required \n"
-
-                    break
-
-            elif round(Q_therm_req_W, 0) != 0:
-                print "ERROR - TOO MUCH POWER! -     ", -Q_therm_req_W / 1000.0, "kWh in excess"
-                Q_uncovered_W = 0  # Q_therm_req
-                Q_excess_W = -Q_therm_req_W
-                Q_therm_req_W = 0
-                # break
-            else:
-                # print "\n all demand covered in Slave, Q_therm_req = ", Q_therm_req, "Wh, hour:", hour, "\n"
-                Q_therm_req_W = 0
-
-        cost_data_centralPlant_op = costHPSew, costHPLake, costGHP, costCC, costFurnace, costBoiler, costBackup
-        source_info = sHPSew, sHPLake, srcGHP, sorcCC, sorcFurnace, sBoiler, sBackup
-        Q_source_data_W = Q_HPSew_gen_W, Q_HPLake_gen_W, Q_GHP_gen_W, Q_CC_gen_W, Q_Furnace_gen_W, Q_Boiler_gen_W, Q_Backup_gen_W, Q_uncovered_W
-        E_PP_el_data_W = E_HPSew_req_W, E_HPLake_req_W, E_GHP_req_W, E_CC_gen_W, E_Furnace_gen_W, E_BaseBoiler_req_W, E_BackupBoiler_req_W
-        E_gas_data_W = E_gas_HPSew_W, E_gas_HPLake_W, E_gas_GHP, E_gas_CC_W, E_gas_Furnace_W, E_gas_Boiler_W, E_gas_Backup_W
-        E_wood_data_W = E_wood_HPSew_W, E_wood_HPLake_W, E_wood_GHP_W, E_wood_CC_W, E_wood_Furnace_W, E_wood_Boiler_W, E_wood_Backup_W
-        E_coldsource_data_W = E_coldsource_HPSew_W, E_coldsource_HPLake_W, E_coldsource_GHP_W, E_coldsource_CC_W, \
-                            E_coldsource_Furnace_W, E_coldsource_Boiler_W, E_coldsource_Backup_W
-
-        return cost_data_centralPlant_op, source_info, Q_source_data_W, E_coldsource_data_W, E_PP_el_data_W, E_gas_data_W, E_wood_data_W, Q_excess_W
-
-    cost_data_centralPlant_op = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 7))
-    source_info = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 7))
-    #    source_info = np.chararray((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR,7), itemsize = 3)
-    Q_source_data_W = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 8))
-    E_coldsource_data_W = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 7))
-    E_PP_el_data_W = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 7))
-    E_gas_data_W = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 7))
-    E_wood_data_W = np.zeros((gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR, 7))
-    Q_excess_W = np.zeros(gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR)
-
-    # Iterate over all hours in the year
-    for hour in range(gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR):
-        Q_therm_req_W = Q_missing_W[hour]
-        PP_activation_data = source_activator(Q_therm_req_W, hour, master_to_slave_vars)
-        # print PP_activation_data
-        cost_data_centralPlant_op[hour, :], source_info[hour, :], Q_source_data_W[hour, :], E_coldsource_data_W[hour, :], \
-        E_PP_el_data_W[hour, :], E_gas_data_W[hour, :], E_wood_data_W[hour, :], Q_excess_W[hour] = PP_activation_data
+    # Run the Centralized Plant Operation Scheme (fixed order), for all hours at once
+    cost_data_centralPlant_op, source_info, Q_source_data_W, E_coldsource_data_W, E_PP_el_data_W, E_gas_data_W, \
+    E_wood_data_W, Q_excess_W = dispatch.calc_dispatch(Q_missing_W, mdot_DH_kgpers, tdhret_K, tdhsup_K,
+                                                       TretsewArray_K, master_to_slave_vars, gv)
 
     # save data
 
@@ -550,12 +134,9 @@ def least_cost_main(locator, master_to_slave_vars, solar_features, gv):
             costBoiler), np.sum(costBackup)
 
     if Q_uncovered_design_W != 0:
-        for hour in range(gv.HOURS_IN_DAY * gv.DAYS_IN_YEAR):
-            tdhret_req = tdhret_K[hour]
-            BoilerBackup_Cost_Data = cond_boiler_op_cost(Q_uncovered_W[hour], Q_uncovered_design_W, tdhret_req, \
-                                                         master_to_slave_vars.BoilerBackupType, master_to_slave_vars.EL_TYPE, gv)
-            C_boil_thermAddBackup[hour], C_boil_per_WhBackup, Q_primary_AddBackup_W[hour], E_aux_AddBoiler_req_W[
-                hour] = BoilerBackup_Cost_Data
+        BoilerBackup_Cost_Data = cond_boiler_op_cost(Q_uncovered_W, Q_uncovered_design_W, tdhret_K.values, \
+                                                     master_to_slave_vars.BoilerBackupType, master_to_slave_vars.EL_TYPE, gv)
+        C_boil_thermAddBackup, C_boil_per_WhBackup, Q_primary_AddBackup_W, E_aux_AddBoiler_req_W = BoilerBackup_Cost_Data
         Q_primary_AddBackup_sum_W = np.sum(Q_primary_AddBackup_W)
         costAddBackup_total = np.sum(C_boil_thermAddBackup)
 
@@ -9,6 +9,8 @@ They are called by either the operation or optimization of storage.
 
 
 import numpy as np
+
+from cea.utilities import kernels
  
 
 def StorageGateway(Q_thermal_available_Wh, Q_network_demand_W, P_HP_max_W, gv):
@@ -321,3 +323,215 @@ def Storage_Operator(Q_solar_available_Wh, Q_network_demand_W, T_storage_old_K,
                  
     return Q_in_storage_new_W, T_storage_new_K, Q_from_storage_req_W, Q_to_storage_W, E_aux_ch_W, E_aux_dech_W, \
                         Q_missing_W, Q_from_storage_used_W, Q_loss_W, mdot_DH_missing_kgpers
+
+
+# rows of the hourly results of storage_operation_kernel, for each storage
+Q_STORAGE_CONTENT, T_STORAGE, Q_TO_STORAGE, Q_FROM_STORAGE, Q_FROM_STORAGE_USED, E_AUX_CH, E_AUX_DECH, Q_MISSING, \
+MDOT_DH, Q_REJECTED, Q_UNCONTROLLABLE, E_AUX_HP_UNCONTROLLABLE = range(12)
+# columns of the summary of storage_operation_kernel, for each storage
+Q_LOSS_TOTAL, Q_DISC_SEASONSTART, HOURS_FULL, ERROR_HOUR = range(4)
+
+
+def storage_operation_kernel(Q_uncontrollable_Wh, Q_network_demand_W, T_DH_sup_K, T_DH_return_K, mdot_DH_kgpers,
+                             E_aux_HP_uncontrollable_Wh, V_storage_m3, T_storage_initial_K, Q_in_storage_initial_W,
+                             P_HP_max_W, parameters, results, summary):
+    """
+    Operates the storage hour by hour over the year - same as calling ``Storage_Operator`` for each hour and checking
+    the storage is not full (see ``design_operation.Storage_Design``), for several storages at once.
+
+    Only floats and arrays are used, so this function can be compiled with Numba (see
+    ``cea/utilities/compile_pyd_files.py``).
+
+    :param Q_uncontrollable_Wh: solar energy and waste heat available, for each hour
+    :param Q_network_demand_W: network load, for each hour
+    :param T_DH_sup_K: supply temperature of the network, for each hour
+    :param T_DH_return_K: return temperature of the network, for each hour
+    :param mdot_DH_kgpers: mass flow rate of the network, for each hour
+    :param E_aux_HP_uncontrollable_Wh: electricity of the heat pumps of the uncontrollable sources, for each hour
+    :param V_storage_m3: volume of each storage
+    :param T_storage_initial_K: initial temperature of each storage
+    :param Q_in_storage_initial_W: initial storage content of each storage
+    :param P_HP_max_W: maximum charging / decharging power of each storage
+    :param parameters: StorageMaxUptakeLimitFlag, T_amb_K, TGround, T_storage_zero, T_ST_MAX, Storage_conv_loss,
+        alpha_loss, HP_etaex, cp, rho_60, Wh_to_J
+    :param results: filled with the hourly results (storage, row, hour), see the rows above
+    :param summary: filled with the summary of each storage (storage, column), see the columns above
+    :type Q_uncontrollable_Wh: ndarray
+    :type Q_network_demand_W: ndarray
+    :type T_DH_sup_K: ndarray
+    :type T_DH_return_K: ndarray
+    :type mdot_DH_kgpers: ndarray
+    :type E_aux_HP_uncontrollable_Wh: ndarray
+    :type V_storage_m3: ndarray
+    :type T_storage_initial_K: ndarray
+    :type Q_in_storage_initial_W: ndarray
+    :type P_HP_max_W: ndarray
+    :type parameters: ndarray
+    :type results: ndarray
+    :type summary: ndarray
+    """
+    uptake_limit = parameters[0]
+    T_amb_K = parameters[1]
+    T_ground_K = parameters[2]
+    T_storage_zero_K = parameters[3]
+    T_ST_MAX_K = parameters[4]
+    conv_loss = parameters[5]
+    alpha_loss = parameters[6]
+    HP_etaex = parameters[7]
+    cp = parameters[8]
+    rho_60 = parameters[9]
+    Wh_to_J = parameters[10]
+
+    for storage in range(len(V_storage_m3)):
+        V_m3 = V_storage_m3[storage]
+        P_max_W = P_HP_max_W[storage]
+        H_storage_m = (2.0 * V_m3 / (9.0 * np.pi)) ** (1.0 / 3.0)  # assume 3 : 1 (D : H)
+        A_storage_ground_m2 = V_m3 / H_storage_m
+        A_storage_rest_m2 = 2.0 * (H_storage_m * np.pi * V_m3) ** (1.0 / 2.0)
+
+        T_storage_old_K = T_storage_initial_K[storage]
+        Q_in_storage_old_W = Q_in_storage_initial_W[storage]
+        T_storage_min_K = T_ST_MAX_K
+        Q_loss_tot_W = 0.0
+        Q_disc_seasonstart_W = 0.0
+        hours_full = 0.0
+        summary[storage, ERROR_HOUR] = -1.0
+
+        for hour in range(len(Q_network_demand_W)):
+            Q_available_Wh = Q_uncontrollable_Wh[hour]
+            Q_demand_W = Q_network_demand_W[hour]
+
+            # StorageGateway
+            if Q_available_Wh > Q_demand_W:
+                Q_to_storage_W = Q_available_Wh - Q_demand_W
+                Q_from_storage_req_W = 0.0
+                to_storage = True
+            else:
+                Q_to_storage_W = 0.0
+                Q_from_storage_req_W = Q_demand_W - Q_available_Wh
+                to_storage = False
+            if uptake_limit == 1:
+                if Q_to_storage_W >= P_max_W:
+                    Q_to_storage_W = P_max_W
+                if Q_from_storage_req_W >= P_max_W:
+                    Q_from_storage_req_W = P_max_W
+
+            # Storage_Loss (with the temperature before the time step)
+            Q_loss_W = alpha_loss * A_storage_ground_m2 * (T_storage_old_K - T_amb_K) + \
+                       alpha_loss * A_storage_rest_m2 * (T_storage_old_K - T_ground_K)
+            T_loss_K = Q_loss_W / (V_m3 * cp * rho_60 * Wh_to_J)
+
+            # Storage_Operator
+            Q_missing_W = 0.0
+            Q_from_storage_used_W = 0.0
+            E_aux_dech_W = 0.0
+            E_aux_ch_W = 0.0
+            mdot_DH_missing_kgpers = 0.0
+            if to_storage:
+                # Storage_Charger
+                if T_storage_old_K > T_DH_return_K[hour]:
+                    COP_th = T_storage_old_K / (T_storage_old_K - T_DH_return_K[hour])
+                    COP = HP_etaex * COP_th
+                    E_aux_ch_W = Q_to_storage_W * (1 + conv_loss) * (1 / COP)
+                    Q_to_storage_new_W = (E_aux_ch_W + Q_to_storage_W) * (1 - conv_loss)
+                else:
+                    Q_to_storage_new_W = Q_to_storage_W * (1 - conv_loss)
+                Q_in_storage_new_W = Q_in_storage_old_W + Q_to_storage_new_W
+                T_storage_new_K = T_storage_zero_K + Q_in_storage_new_W * Wh_to_J / (V_m3 * cp * rho_60)
+
+                T_storage_new_K -= T_loss_K
+                Q_in_storage_new_W -= Q_loss_W
+
+            else:
+                if Q_in_storage_old_W > 0:
+                    # de-charge what is required - or, if the storage is almost empty, what is left
+                    Q_from_storage_W = Q_from_storage_req_W
+                    for attempt in range(2):
+                        # Storage_DeCharger
+                        if T_DH_sup_K[hour] > T_storage_old_K:
+                            COP_th = T_DH_sup_K[hour] / (T_DH_sup_K[hour] - T_storage_old_K)
+                            COP = HP_etaex * COP_th
+                            E_aux_dech_W = Q_from_storage_W / COP * (1 + conv_loss)
+                            Q_from_storage_used_W = Q_from_storage_W * (1 - 1 / COP) * (1 + conv_loss)
+                        else:
+                            Q_from_storage_used_W = Q_from_storage_W * (1 + conv_loss)
+                            E_aux_dech_W = 0.0
+                        T_storage_new_K = T_storage_zero_K + (Q_in_storage_old_W - Q_from_storage_used_W) * \
+                                                             Wh_to_J / (V_m3 * cp * rho_60)
+
+                        T_storage_new_K -= T_loss_K
+                        Q_in_storage_new_W = Q_in_storage_old_W - Q_loss_W - Q_from_storage_used_W
+                        if attempt == 1:
+                            mdot_DH_missing_kgpers = mdot_DH_kgpers[hour] * Q_missing_W
+                        else:
+                            mdot_DH_missing_kgpers = mdot_DH_kgpers[hour] * (Q_demand_W - Q_from_storage_used_W)
+                            if not Q_in_storage_new_W < 0:
+                                break
+                            Q_from_storage_W = Q_in_storage_old_W
+                            Q_missing_W = Q_demand_W - Q_available_Wh - Q_from_storage_W
+                            if Q_missing_W < 0:  # catch numerical errors (leading to very low negative numbers)
+                                Q_missing_W = 0.0
+
+                else:  # neither storage charging nor decharging
+                    T_storage_new_K = T_storage_old_K - T_loss_K
+                    Q_in_storage_new_W = Q_in_storage_old_W - Q_loss_W
+                    Q_missing_W = Q_demand_W - Q_available_Wh
+                    if Q_missing_W < 0:  # catch numerical errors (leading to very low negative numbers)
+                        Q_missing_W = 0.0
+                    mdot_DH_missing_kgpers = mdot_DH_kgpers[hour] * Q_missing_W
+
+                # the mass flow rate is scaled down with the demand (x / 0 as with numpy floats: NaN or inf)
+                if Q_demand_W != 0:
+                    mdot_DH_missing_kgpers = mdot_DH_missing_kgpers / Q_demand_W
+                elif mdot_DH_missing_kgpers == 0:
+                    mdot_DH_missing_kgpers = np.nan
+                else:
+                    mdot_DH_missing_kgpers = np.inf * mdot_DH_missing_kgpers
+
+            # check the storage is not full
+            Q_to_storage_final_W = Q_to_storage_W
+            Q_storage_content_W = Q_in_storage_new_W
+            if Q_storage_content_W < 0.0001:
+                Q_storage_content_W = 0.0
+            if T_storage_new_K >= T_ST_MAX_K - 0.001:  # no more charging possible - reject energy
+                Q_storage_content_W = Q_in_storage_new_W if Q_in_storage_new_W < Q_in_storage_old_W \
+                    else Q_in_storage_old_W
+                Q_to_storage_final_W = Q_storage_content_W - Q_in_storage_old_W
+                if 0 > Q_to_storage_final_W:
+                    Q_to_storage_final_W = 0.0
+                results[storage, Q_REJECTED, hour] = Q_available_Wh - Q_to_storage_W
+                if not T_storage_new_K < T_storage_old_K:
+                    T_storage_new_K = T_storage_old_K
+                E_aux_ch_W = 0.0
+                hours_full += 1
+
+            results[storage, Q_STORAGE_CONTENT, hour] = Q_storage_content_W
+            results[storage, T_STORAGE, hour] = T_storage_new_K
+            results[storage, Q_FROM_STORAGE_USED, hour] = Q_from_storage_used_W
+            Q_loss_tot_W += Q_loss_W
+            Q_in_storage_old_W = Q_storage_content_W
+            T_storage_old_K = T_storage_new_K
+            if T_storage_old_K < T_amb_K - 1:  # catch an error if the storage temperature is too low
+                summary[storage, ERROR_HOUR] = hour
+                break
+
+            results[storage, Q_TO_STORAGE, hour] = Q_to_storage_final_W
+            results[storage, Q_FROM_STORAGE, hour] = Q_demand_W - Q_missing_W
+            results[storage, E_AUX_CH, hour] = E_aux_ch_W
+            results[storage, E_AUX_DECH, hour] = E_aux_dech_W
+            results[storage, Q_MISSING, hour] = Q_missing_W
+            results[storage, MDOT_DH, hour] = mdot_DH_missing_kgpers
+            results[storage, Q_UNCONTROLLABLE, hour] = Q_available_Wh
+            results[storage, E_AUX_HP_UNCONTROLLABLE, hour] = E_aux_HP_uncontrollable_Wh[hour]
+
+            if T_storage_new_K <= T_storage_min_K:
+                T_storage_min_K = T_storage_new_K
+                Q_disc_seasonstart_W += Q_from_storage_req_W
+
+        summary[storage, Q_LOSS_TOTAL] = Q_loss_tot_W
+        summary[storage, Q_DISC_SEASONSTART] = Q_disc_seasonstart_W
+        summary[storage, HOURS_FULL] = hours_full
+
+
+# use the compiled version of the storage operation in this module if available (see `cea.utilities.kernels`)
+storage_operation_kernel, = kernels.compile_kernels(__name__, [storage_operation_kernel], 'storage_operation_cc')
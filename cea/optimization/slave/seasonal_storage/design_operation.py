@@ -16,32 +16,22 @@ import Import_Network_Data_functions as fn
 import SolarPowerHandler_incl_Losses as SPH_fn
 
 
-def Storage_Design(CSV_NAME, SOLCOL_TYPE, T_storage_old_K, Q_in_storage_old_W, locator,
-                   STORAGE_SIZE_m3, STORE_DATA, context, P_HP_max_W, gV):
+def read_storage_inputs(CSV_NAME, locator, context, gV):
     """
+    Reads the network data and the solar data and calculates the heat available from the uncontrollable sources (solar
+    collectors and waste heat), including the heat pumps lifting them to the supply temperature of the network. These
+    inputs do not depend on the storage, so they are read once for all the storages operated (see `Storage_Design`).
 
-    :param CSV_NAME:
-    :param SOLCOL_TYPE:
-    :param T_storage_old_K:
-    :param Q_in_storage_old_W:
-    :param locator:
-    :param STORAGE_SIZE_m3:
-    :param STORE_DATA:
-    :param context:
-    :param P_HP_max_W:
-    :param gV:
-    :type CSV_NAME:
-    :type SOLCOL_TYPE:
-    :type T_storage_old_K:
-    :type Q_in_storage_old_W:
-    :type locator:
-    :type STORAGE_SIZE_m3:
-    :type STORE_DATA:
-    :type context:
-    :type P_HP_max_W:
-    :type gV:
-    :return:
-    :rtype:
+    :param CSV_NAME: name of the network data file in `locator.get_optimization_network_results_folder()`
+    :param locator: locator class
+    :param context: class MastertoSlaveVars containing the value of variables to be passed to the slave optimization
+    :param gV: global variables class
+    :type CSV_NAME: str
+    :type locator: class
+    :type context: class
+    :type gV: class
+    :return: the hourly inputs of the storage operation, by name
+    :rtype: dict
     """
     os.chdir(locator.get_optimization_network_results_folder())
     MS_Var = context
@@ -56,276 +46,252 @@ def Storage_Design(CSV_NAME, SOLCOL_TYPE, T_storage_old_K, Q_in_storage_old_W, l
     Q_DH_networkload_W = Network_Data['Q_DHNf_W'].values
     T_DH_return_array_K = Network_Data['T_DHNf_re_K'].values
     T_DH_supply_array_K = Network_Data['T_DHNf_sup_K'].values
-    Q_wasteheatServer_kWh = Network_Data['Qcdata_netw_total_kWh'].values #np.array(fn.extract_csv(fName, "Q_DH_building_netw_total", DAYS_IN_YEAR))
+    Q_wasteheatServer_kWh = Network_Data['Qcdata_netw_total_kWh'].values
     Q_wasteheatCompAir_kWh = Network_Data['Ecaf_netw_total_kWh'].values
-    
-    Solar_Data_SC = np.zeros((HOURS_IN_DAY* DAYS_IN_YEAR, 7))
-    Solar_Data_PVT = np.zeros((HOURS_IN_DAY* DAYS_IN_YEAR, 7))
-    Solar_Data_PV = np.zeros((HOURS_IN_DAY* DAYS_IN_YEAR, 7))
-    
-    Solar_Tscr_th_SC_K = Solar_Data_SC[:,6]
-    Solar_E_aux_SC_req_kWh = Solar_Data_SC[:,1]
-    Solar_Q_th_SC_kWh = Solar_Data_SC[:,1]
-    
-    Solar_Tscr_th_PVT_K = Solar_Data_PVT[:,6]
-    Solar_E_aux_PVT_kWh = Solar_Data_PVT[:,1]
-    Solar_Q_th_SC_kWh = Solar_Data_PVT[:,2]
-    PVT_kWh = Solar_Data_PVT[:,5]
-    Solar_E_aux_PV_kWh = Solar_Data_PV[:,1]
-    PV_kWh = Solar_Data_PV[:,5]
-    
+
+    Solar_Data_SC = np.zeros((HOURS_IN_DAY * DAYS_IN_YEAR, 7))
+    Solar_Data_PVT = np.zeros((HOURS_IN_DAY * DAYS_IN_YEAR, 7))
+    Solar_Data_PV = np.zeros((HOURS_IN_DAY * DAYS_IN_YEAR, 7))
+
+    Solar_Tscr_th_SC_K = Solar_Data_SC[:, 6]
+    Solar_Q_th_SC_kWh = Solar_Data_SC[:, 1]
+
+    Solar_Tscr_th_PVT_K = Solar_Data_PVT[:, 6]
+    Solar_Q_th_SC_kWh = Solar_Data_PVT[:, 2]
+    PVT_kWh = Solar_Data_PVT[:, 5]
+    PV_kWh = Solar_Data_PV[:, 5]
+
     # Import Solar Data
     os.chdir(locator.get_potentials_solar_folder())
-    
+
     fNameArray = [MS_Var.SOLCOL_TYPE_PVT, MS_Var.SOLCOL_TYPE_SC, MS_Var.SOLCOL_TYPE_PV]
-    
-        #LOOP AROUND ALL SC TYPES
+
+    # LOOP AROUND ALL SC TYPES
     for solartype in range(3):
         fName = fNameArray[solartype]
-    
+
         if MS_Var.SOLCOL_TYPE_SC != "NONE" and fName == MS_Var.SOLCOL_TYPE_SC:
-            Solar_Area_SC_m2, Solar_E_aux_SC_req_kWh, Solar_Q_th_SC_kWh, Solar_Tscs_th_SC, Solar_mcp_SC_kWperC, SC_kWh, Solar_Tscr_th_SC_K\
-                            = fn.import_solar_data(MS_Var.SOLCOL_TYPE_SC, DAYS_IN_YEAR, HOURS_IN_DAY)
-        
+            Solar_Area_SC_m2, Solar_E_aux_SC_req_kWh, Solar_Q_th_SC_kWh, Solar_Tscs_th_SC, Solar_mcp_SC_kWperC, SC_kWh, Solar_Tscr_th_SC_K \
+                = fn.import_solar_data(MS_Var.SOLCOL_TYPE_SC, DAYS_IN_YEAR, HOURS_IN_DAY)
+
         if MS_Var.SOLCOL_TYPE_PVT != "NONE" and fName == MS_Var.SOLCOL_TYPE_PVT:
             Solar_Area_PVT_m2, Solar_E_aux_PVT_kWh, Solar_Q_th_PVT_kWh, Solar_Tscs_th_PVT, Solar_mcp_PVT_kWperC, PVT_kWh, Solar_Tscr_th_PVT_K \
-                            = fn.import_solar_data(MS_Var.SOLCOL_TYPE_PVT, DAYS_IN_YEAR, HOURS_IN_DAY)
-            #Solar_Data_PVT= fn.import_solar_data(MS_Var.SOLCOL_TYPE_PVT, DAYS_IN_YEAR, HOURS_IN_DAY)
-    
+                = fn.import_solar_data(MS_Var.SOLCOL_TYPE_PVT, DAYS_IN_YEAR, HOURS_IN_DAY)
+
         if MS_Var.SOLCOL_TYPE_PV != "NONE" and fName == MS_Var.SOLCOL_TYPE_PV:
-            Solar_Area_PV_m2, Solar_E_aux_PV_kWh, Solar_Q_th_PV_kWh, Solar_Tscs_th_PV, Solar_mcp_PV_kWperC, PV_kWh, Solar_Tscr_th_PV_K\
-                            = fn.import_solar_data(MS_Var.SOLCOL_TYPE_PV, DAYS_IN_YEAR, HOURS_IN_DAY)
+            Solar_Area_PV_m2, Solar_E_aux_PV_kWh, Solar_Q_th_PV_kWh, Solar_Tscs_th_PV, Solar_mcp_PV_kWperC, PV_kWh, Solar_Tscr_th_PV_K \
+                = fn.import_solar_data(MS_Var.SOLCOL_TYPE_PV, DAYS_IN_YEAR, HOURS_IN_DAY)
 
-    #print "\n ........---------........."
-    #print "sum of PV_kWh_PVT in Storage desing op v2", np.sum(PV_kWh_PVT) 
-    # ADD SOLAR COLLECTOR AND SELL ELECTRICITY!
-    
-    # Recover Solar Data
-   # Solar_Area = Solar_Data_SC[0] * MS_Var.SOLAR_PART_SC + Solar_Data_PVT[0] * MS_Var.SOLAR_PART_PVT + Solar_Data_PV[0] * MS_Var.SOLAR_PART_PV
-    Solar_E_aux_W = np.ravel(Solar_E_aux_SC_req_kWh * 1000 * MS_Var.SOLAR_PART_SC) + np.ravel(Solar_E_aux_PVT_kWh * 1000 * MS_Var.SOLAR_PART_PVT) \
-                            + np.ravel(Solar_E_aux_PV_kWh * 1000 * MS_Var.SOLAR_PART_PV)
-    #print "Solar_E_aux_W", np.shape(Solar_E_aux_W), Solar_E_aux_W
-    #print "Solar_Data_SC", Solar_Data_SC
-    
     Q_SC_gen_Wh = Solar_Q_th_SC_kWh * 1000 * MS_Var.SOLAR_PART_SC
-    #print Q_SC, "Q_SC"
     Q_PVT_gen_Wh = Solar_Q_th_PVT_kWh * 1000 * MS_Var.SOLAR_PART_PVT
-    Q_SCandPVT_gen_Wh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    
-    #Q_SCandPVT = float(np.sum(Q_SC) + np.sum(Q_PVT))
-    #Q_SCandPVT = Q_SC + Q_PVT
-    for hour in range(len(Q_SCandPVT_gen_Wh)):
-        Q_SCandPVT_gen_Wh[hour] = Q_SC_gen_Wh[hour] + Q_PVT_gen_Wh[hour]
-        
-    #print Q_SCandPVT
-    #print "shape", np.shape(Q_SCandPVT)
-    
+    Q_SCandPVT_gen_Wh = Q_SC_gen_Wh[:HOURS_IN_DAY * DAYS_IN_YEAR] + Q_PVT_gen_Wh[:HOURS_IN_DAY * DAYS_IN_YEAR]
+
     E_PV_Wh = PV_kWh * 1000 * MS_Var.SOLAR_PART_PV
-    E_PVT_Wh = PVT_kWh * 1000  * MS_Var.SOLAR_PART_PVT
-    #print "PV_kWh_PV", np.shape(PV_kWh_PV)
-    #print "PV_kWh_PVT", np.shape(PV_kWh_PVT)
-    
-    
-    #if MS_Var.SOLCOL_TYPE_SC == 'SC_60.csv': #or MS_Var.SOLCOL_TYPE_SC == 'SC_ET50.csv':
-    #    Solar_Tscr_th_SC = 60 + 273.0 #K
-    
-    #else: 
-    #    Solar_Tscr_th_SC = 75 + 273.0 # K
-    
-    #Solar_Tscr_th_PVT = 35 + 273.0 #K 
-    
-    
-    #Solar_Tscs_th = Solar_Data_SC[3] + 273.0
-    #Solar_mcp_W_C = Solar_Data_SC[4] * 1000
-    
-    #iterate over this loop: 
-    HOUR = 0
-    Q_to_storage_avail_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_from_storage_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    to_storage = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_storage_content_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    T_storage_fin_K = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_from_storage_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_to_storage_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    E_aux_ch_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    E_aux_dech_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    #E_PV_Wh_fin = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    E_aux_solar_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_missing_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_from_storage_used_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_rejected_fin_W = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    mdot_DH_fin_kgpers = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    Q_uncontrollable_fin_Wh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    E_aux_HP_uncontrollable_fin_Wh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    HPServerHeatDesignArray_kWh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    HPpvt_designArray_Wh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    HPCompAirDesignArray_kWh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    HPScDesignArray_Wh = np.zeros(HOURS_IN_DAY*DAYS_IN_YEAR)
-    
-    T_amb_K = 10 + 273.0 # K
-    T_storage_min_K = MS_Var.T_ST_MAX
-    Q_disc_seasonstart_W = [0]
-    Q_loss_tot_W = 0
-    
-    while HOUR < HOURS_IN_DAY*DAYS_IN_YEAR:
-        # Store later on this data
-        HPServerHeatDesign_kWh = 0
-        HPpvt_design_Wh = 0
-        HPCompAirDesign_kWh = 0
-        HPScDesign_Wh = 0
-        
-        T_DH_sup_K = T_DH_supply_array_K[HOUR]
-        T_DH_return_K = T_DH_return_array_K[HOUR]
-        mdot_DH_kgpers = mdot_heat_netw_total_kgpers[HOUR]
-        if MS_Var.WasteServersHeatRecovery == 1:
-            QServerHeat_kWh = Q_wasteheatServer_kWh[HOUR]
-        else:
-            QServerHeat_kWh = 0
-        #print QServerHeat, "QServerHeat"
-        if MS_Var.WasteCompressorHeatRecovery == 1:
-            QCompAirHeat_kWh= Q_wasteheatCompAir_kWh[HOUR]
-        else:
-            QCompAirHeat_kWh = 0
-        #print Q_SC,"Q_SC", len(Q_SC)
-        Qsc_Wh = Q_SC_gen_Wh[HOUR]
-        Qpvt_Wh = Q_PVT_gen_Wh[HOUR]
-        
-        # check if each source needs a heat-pump, calculate the final energy 
-        if T_DH_sup_K > gV.TElToHeatSup - gV.dT_heat: #and checkpoint_ElToHeat == 1:
-            #use a heat pump to bring it to distribution temp
-            COP_th = T_DH_sup_K / (T_DH_sup_K - (gV.TElToHeatSup - gV.dT_heat))
-            COP = gV.HP_etaex * COP_th
-            E_aux_Server_kWh = QServerHeat_kWh * (1/COP) # assuming the losses occur after the heat pump
-            if E_aux_Server_kWh > 0:
-                HPServerHeatDesign_kWh = QServerHeat_kWh
-                QServerHeat_kWh += E_aux_Server_kWh
-            
-        else:
-            E_aux_Server_kWh = 0.0
-            
-        if T_DH_sup_K > gV.TfromServer - gV.dT_heat:# and checkpoint_QfromServer == 1:
-            #use a heat pump to bring it to distribution temp
-            COP_th = T_DH_sup_K / (T_DH_sup_K - (gV.TfromServer - gV.dT_heat))
-            COP = gV.HP_etaex * COP_th
-            E_aux_CAH_kWh = QCompAirHeat_kWh * (1/COP) # assuming the losses occur after the heat pump
-            if E_aux_Server_kWh > 0:
-                HPCompAirDesign_kWh = QCompAirHeat_kWh
-                QCompAirHeat_kWh += E_aux_CAH_kWh
-        else:
-            E_aux_CAH_kWh = 0.0
-
-        if T_DH_sup_K > Solar_Tscr_th_PVT_K[HOUR] - gV.dT_heat:# and checkpoint_PVT == 1:
-            #use a heat pump to bring it to distribution temp
-            COP_th = T_DH_sup_K / (T_DH_sup_K - (Solar_Tscr_th_PVT_K[HOUR] - gV.dT_heat))
-            COP = gV.HP_etaex * COP_th
-            E_aux_PVT_Wh = Qpvt_Wh * (1/COP) # assuming the losses occur after the heat pump
-            if E_aux_PVT_Wh > 0:
-                HPpvt_design_Wh = Qpvt_Wh
-                Qpvt_Wh += E_aux_PVT_Wh
-                
-        else:
-            E_aux_PVT_Wh = 0.0
-            
-        if T_DH_sup_K > Solar_Tscr_th_SC_K[HOUR] - gV.dT_heat:# and checkpoint_SC == 1:
-            #use a heat pump to bring it to distribution temp
-            COP_th = T_DH_sup_K / (T_DH_sup_K - (Solar_Tscr_th_SC_K[HOUR] - gV.dT_heat))
-            #print Solar_Tscr_th_SC[HOUR], "Solar_Tscr_th_SC[HOUR]"
-            COP = gV.HP_etaex * COP_th
-            E_aux_SC_Wh = Qsc_Wh * (1/COP) # assuming the losses occur after the heat pump
-            if E_aux_SC_Wh > 0:
-                HPScDesign_Wh = Qsc_Wh
-                Qsc_Wh += E_aux_SC_Wh
-        else:  
-            E_aux_SC_Wh = 0.0
-        
-        
-        HPServerHeatDesignArray_kWh[HOUR] = HPServerHeatDesign_kWh
-        HPpvt_designArray_Wh[HOUR] = HPpvt_design_Wh
-        HPCompAirDesignArray_kWh[HOUR] = HPCompAirDesign_kWh
-        HPScDesignArray_Wh[HOUR] = HPScDesign_Wh
-        
-        
-        E_aux_HP_uncontrollable_Wh = float(E_aux_SC_Wh + E_aux_PVT_Wh + E_aux_CAH_kWh * 1000 + E_aux_Server_kWh * 1000)
-        
-        #print E_aux_HP_uncontrollable, len(E_aux_HP_uncontrollable), type(E_aux_HP_uncontrollable)
-        
-        # Heat Recovery has some losses, these are taken into account as "overall Losses", i.e.: from Source to DH Pipe
-        # hhhhhhhhhhhhhh GET VALUES
-        Q_uncontrollable_Wh = (Qpvt_Wh + Qsc_Wh + QServerHeat_kWh * 1000 * gV.etaServerToHeat + QCompAirHeat_kWh * 1000 * gV.etaElToHeat )
+    E_PVT_Wh = PVT_kWh * 1000 * MS_Var.SOLAR_PART_PVT
 
-        #print "Q_uncontrollable = ", Q_uncontrollable
-        #print "E_aux_HP_uncontrollable = ", E_aux_HP_uncontrollable
-        
-        Q_network_demand_W = Q_DH_networkload_W[HOUR]
-        Q_to_storage_avail_W[HOUR], Q_from_storage_W[HOUR], to_storage[HOUR] = SPH_fn.StorageGateway(Q_uncontrollable_Wh, Q_network_demand_W, P_HP_max_W, gV)
-        
-       
-        #print HOUR, Q_to_storage_avail[HOUR], Q_from_storage[HOUR], to_storage[HOUR] 
-        Storage_Data = SPH_fn.Storage_Operator(Q_uncontrollable_Wh, Q_network_demand_W, T_storage_old_K, T_DH_sup_K, T_amb_K, \
-                                               Q_in_storage_old_W, T_DH_return_K, mdot_DH_kgpers, STORAGE_SIZE_m3, context, P_HP_max_W, gV)
-    
-        Q_in_storage_new_W = Storage_Data[0]
-        #print "Q_in_storage_new in Storage desing and operation: ", Q_in_storage_new
-        T_storage_new_K = Storage_Data[1]
-        Q_to_storage_final_W = Storage_Data[3]
-        Q_from_storage_req_final_W = Storage_Data[2]
-        #print "Q_from_storage_req_final", Q_from_storage_req_final
-        #print "Q_to_storage_final", Q_to_storage_final
-        E_aux_ch_W = Storage_Data[4]
-        E_aux_dech_W = Storage_Data[5]
-        Q_missing_W = Storage_Data[6]
-        Q_from_storage_used_fin_W[HOUR] = Storage_Data[7]
-        Q_loss_tot_W += Storage_Data[8]
-        mdot_DH_afterSto_kgpers = Storage_Data[9]
-        
-        if Q_in_storage_new_W < 0.0001:
-            Q_in_storage_new_W = 0
-    
-        
-        if T_storage_new_K >= MS_Var.T_ST_MAX-0.001: # no more charging possible - reject energy
-            Q_in_storage_new_W = min(Q_in_storage_old_W, Storage_Data[0])
-            Q_to_storage_final_W = max(Q_in_storage_new_W - Q_in_storage_old_W, 0)
-            Q_rejected_fin_W[HOUR] = Q_uncontrollable_Wh - Storage_Data[3]
-            T_storage_new_K = min(T_storage_old_K, T_storage_new_K)
-            E_aux_ch_W = 0
-            print "Storage Full!"
-            
+    if MS_Var.WasteServersHeatRecovery == 1:
+        QServerHeat_kWh = Q_wasteheatServer_kWh.astype(float)
+    else:
+        QServerHeat_kWh = np.zeros(len(Q_DH_networkload_W))
+    if MS_Var.WasteCompressorHeatRecovery == 1:
+        QCompAirHeat_kWh = Q_wasteheatCompAir_kWh.astype(float)
+    else:
+        QCompAirHeat_kWh = np.zeros(len(Q_DH_networkload_W))
+    hours = len(Q_DH_networkload_W)
+    Qsc_Wh = Q_SC_gen_Wh[:hours]
+    Qpvt_Wh = Q_PVT_gen_Wh[:hours]
 
-            
-        Q_storage_content_fin_W[HOUR] = Q_in_storage_new_W
-        Q_in_storage_old_W = Q_in_storage_new_W
-        
-        T_storage_fin_K[HOUR] = T_storage_new_K
-        T_storage_old_K = T_storage_new_K
-        
-        if T_storage_old_K < T_amb_K-1: # chatch an error if the storage temperature is too low
-            print "ERROR!"
-            break
-        
-        Q_from_storage_fin_W[HOUR] = Q_from_storage_req_final_W
-        Q_to_storage_fin_W[HOUR] = Q_to_storage_final_W
-        E_aux_ch_fin_W[HOUR] = E_aux_ch_W
-        E_aux_dech_fin_W[HOUR] = E_aux_dech_W
-        E_aux_solar_W[HOUR] = Solar_E_aux_W[HOUR]
-        Q_missing_fin_W[HOUR] = Q_missing_W
-        Q_uncontrollable_fin_Wh[HOUR] = Q_uncontrollable_Wh
-        
-        
-        E_aux_HP_uncontrollable_fin_Wh[HOUR] = float(E_aux_HP_uncontrollable_Wh)
-        #print type(E_aux_HP_uncontrollable_fin[HOUR]),
-        mdot_DH_fin_kgpers[HOUR] = mdot_DH_afterSto_kgpers
-        
-        Q_from_storage_fin_W[HOUR] = Q_DH_networkload_W[HOUR] - Q_missing_W
-        
-        if T_storage_new_K <= T_storage_min_K:
-            T_storage_min_K = T_storage_new_K
-            Q_disc_seasonstart_W[0] += Q_from_storage_req_final_W
-            
-        
-        HOUR += 1
-        
-        
-        """ STORE DATA """
+    # check if each source needs a heat-pump, calculate the final energy (assuming the losses occur after the heat pump)
+    T_DH_sup_K = T_DH_supply_array_K
+    E_aux_Server_kWh = QServerHeat_kWh * (1 / _calc_COP_HP(T_DH_sup_K, gV.TElToHeatSup - gV.dT_heat, gV))
+    HPServerHeatDesignArray_kWh = np.where(E_aux_Server_kWh > 0, QServerHeat_kWh, 0.0)
+    QServerHeat_kWh = np.where(E_aux_Server_kWh > 0, QServerHeat_kWh + E_aux_Server_kWh, QServerHeat_kWh)
+
+    COP_CompAir = _calc_COP_HP(T_DH_sup_K, gV.TfromServer - gV.dT_heat, gV)
+    E_aux_CAH_kWh = QCompAirHeat_kWh * (1 / COP_CompAir)
+    # the heat pump of the compressed air is only designed when the one of the servers is
+    HP_CompAir = np.isfinite(COP_CompAir) & (E_aux_Server_kWh > 0)
+    HPCompAirDesignArray_kWh = np.where(HP_CompAir, QCompAirHeat_kWh, 0.0)
+    QCompAirHeat_kWh = np.where(HP_CompAir, QCompAirHeat_kWh + E_aux_CAH_kWh, QCompAirHeat_kWh)
+
+    E_aux_PVT_Wh = Qpvt_Wh * (1 / _calc_COP_HP(T_DH_sup_K, Solar_Tscr_th_PVT_K[:hours] - gV.dT_heat, gV))
+    HPpvt_designArray_Wh = np.where(E_aux_PVT_Wh > 0, Qpvt_Wh, 0.0)
+    Qpvt_Wh = np.where(E_aux_PVT_Wh > 0, Qpvt_Wh + E_aux_PVT_Wh, Qpvt_Wh)
+
+    E_aux_SC_Wh = Qsc_Wh * (1 / _calc_COP_HP(T_DH_sup_K, Solar_Tscr_th_SC_K[:hours] - gV.dT_heat, gV))
+    HPScDesignArray_Wh = np.where(E_aux_SC_Wh > 0, Qsc_Wh, 0.0)
+    Qsc_Wh = np.where(E_aux_SC_Wh > 0, Qsc_Wh + E_aux_SC_Wh, Qsc_Wh)
+
+    E_aux_HP_uncontrollable_Wh = E_aux_SC_Wh + E_aux_PVT_Wh + E_aux_CAH_kWh * 1000 + E_aux_Server_kWh * 1000
+
+    # Heat Recovery has some losses, these are taken into account as "overall Losses", i.e.: from Source to DH Pipe
+    Q_uncontrollable_Wh = (Qpvt_Wh + Qsc_Wh + QServerHeat_kWh * 1000 * gV.etaServerToHeat +
+                           QCompAirHeat_kWh * 1000 * gV.etaElToHeat)
+
+    return {'Q_uncontrollable_Wh': Q_uncontrollable_Wh.astype(float),
+            'E_aux_HP_uncontrollable_Wh': E_aux_HP_uncontrollable_Wh.astype(float),
+            'Q_DH_networkload_W': Q_DH_networkload_W,
+            'T_DH_sup_K': T_DH_supply_array_K.astype(float),
+            'T_DH_return_K': T_DH_return_array_K.astype(float),
+            'mdot_DH_kgpers': mdot_heat_netw_total_kgpers.astype(float),
+            'E_PV_Wh': E_PV_Wh,
+            'E_PVT_Wh': E_PVT_Wh,
+            'Q_SCandPVT_gen_Wh': Q_SCandPVT_gen_Wh,
+            'HPServerHeatDesignArray_kWh': HPServerHeatDesignArray_kWh,
+            'HPpvt_designArray_Wh': HPpvt_designArray_Wh,
+            'HPCompAirDesignArray_kWh': HPCompAirDesignArray_kWh,
+            'HPScDesignArray_Wh': HPScDesignArray_Wh}
+
+
+def _calc_COP_HP(T_DH_sup_K, T_source_K, gV):
+    """
+    COP of the heat pump lifting a source to the supply temperature of the network, for each hour - inf where no heat
+    pump is needed (the supply temperature is below the source temperature), so no electricity is used.
+    """
+    T_source_K = np.ones(len(T_DH_sup_K)) * T_source_K
+    COP = np.ones(len(T_DH_sup_K)) * np.inf
+    HP_needed = T_DH_sup_K > T_source_K
+    COP_th = T_DH_sup_K[HP_needed] / (T_DH_sup_K[HP_needed] - T_source_K[HP_needed])
+    COP[HP_needed] = gV.HP_etaex * COP_th
+    return COP
+
+
+def calc_storage_operation(inputs, V_storage_m3, T_storage_initial_K, Q_in_storage_initial_W, P_HP_max_W, context,
+                           gV):
+    """
+    Operates one or several storages over the year (see `SolarPowerHandler_incl_Losses.storage_operation_kernel`).
+    Several candidate storages (e.g. volumes) are operated in one call by passing arrays - the other arguments are
+    broadcast to the volumes.
+
+    :param inputs: the inputs of the storage operation, as returned by `read_storage_inputs`
+    :param V_storage_m3: volume of the storage(s)
+    :param T_storage_initial_K: initial temperature of the storage(s)
+    :param Q_in_storage_initial_W: initial storage content of the storage(s)
+    :param P_HP_max_W: maximum charging / decharging power of the storage(s)
+    :param context: class MastertoSlaveVars containing the value of variables to be passed to the slave optimization
+    :param gV: global variables class
+    :type inputs: dict
+    :type V_storage_m3: float or ndarray
+    :type T_storage_initial_K: float or ndarray
+    :type Q_in_storage_initial_W: float or ndarray
+    :type P_HP_max_W: float or ndarray
+    :type context: class
+    :type gV: class
+    :return: the hourly operation (storage, hour) and the summary (storage) of each storage, by name
+    :rtype: dict
+    """
+    MS_Var = context
+    T_amb_K = 10 + 273.0  # K
+    V_storage_m3, T_storage_initial_K, Q_in_storage_initial_W, P_HP_max_W = [
+        np.array(value, dtype=float).ravel() for value in
+        np.broadcast_arrays(np.ravel(V_storage_m3), np.ravel(T_storage_initial_K), np.ravel(Q_in_storage_initial_W),
+                            np.ravel(P_HP_max_W))]
+    parameters = np.array([gV.StorageMaxUptakeLimitFlag, T_amb_K, gV.TGround, MS_Var.T_storage_zero, MS_Var.T_ST_MAX,
+                           MS_Var.Storage_conv_loss, MS_Var.alpha_loss, gV.HP_etaex, gV.cp, gV.rho_60, gV.Wh_to_J],
+                          dtype=float)
+    Q_network_demand_W = inputs['Q_DH_networkload_W'].astype(float)
+    results = np.zeros((len(V_storage_m3), SPH_fn.E_AUX_HP_UNCONTROLLABLE + 1, len(Q_network_demand_W)))
+    summary = np.zeros((len(V_storage_m3), SPH_fn.ERROR_HOUR + 1))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        SPH_fn.storage_operation_kernel(inputs['Q_uncontrollable_Wh'], Q_network_demand_W, inputs['T_DH_sup_K'],
+                                        inputs['T_DH_return_K'], inputs['mdot_DH_kgpers'],
+                                        inputs['E_aux_HP_uncontrollable_Wh'], V_storage_m3, T_storage_initial_K,
+                                        Q_in_storage_initial_W, P_HP_max_W, parameters, results, summary)
+
+    for storage in range(len(V_storage_m3)):
+        if summary[storage, SPH_fn.HOURS_FULL] > 0:
+            print "Storage Full! (%i hours)" % summary[storage, SPH_fn.HOURS_FULL]
+        if summary[storage, SPH_fn.ERROR_HOUR] >= 0:
+            print "ERROR! (storage temperature too low at hour %i)" % summary[storage, SPH_fn.ERROR_HOUR]
+
+    return {'Q_storage_content_W': results[:, SPH_fn.Q_STORAGE_CONTENT, :],
+            'T_storage_K': results[:, SPH_fn.T_STORAGE, :],
+            'Q_to_storage_W': results[:, SPH_fn.Q_TO_STORAGE, :],
+            'Q_from_storage_W': results[:, SPH_fn.Q_FROM_STORAGE, :],
+            'Q_from_storage_used_W': results[:, SPH_fn.Q_FROM_STORAGE_USED, :],
+            'E_aux_ch_W': results[:, SPH_fn.E_AUX_CH, :],
+            'E_aux_dech_W': results[:, SPH_fn.E_AUX_DECH, :],
+            'Q_missing_W': results[:, SPH_fn.Q_MISSING, :],
+            'mdot_DH_fin_kgpers': results[:, SPH_fn.MDOT_DH, :],
+            'Q_rejected_fin_W': results[:, SPH_fn.Q_REJECTED, :],
+            'Q_uncontrollable_Wh': results[:, SPH_fn.Q_UNCONTROLLABLE, :],
+            'E_aux_HP_uncontrollable_Wh': results[:, SPH_fn.E_AUX_HP_UNCONTROLLABLE, :],
+            'Q_loss_tot_W': summary[:, SPH_fn.Q_LOSS_TOTAL],
+            'Q_disc_seasonstart_W': summary[:, SPH_fn.Q_DISC_SEASONSTART],
+            'hours_full': summary[:, SPH_fn.HOURS_FULL].astype(int),
+            'error_hour': summary[:, SPH_fn.ERROR_HOUR].astype(int)}
+
+
+def Storage_Design(CSV_NAME, SOLCOL_TYPE, T_storage_old_K, Q_in_storage_old_W, locator,
+                   STORAGE_SIZE_m3, STORE_DATA, context, P_HP_max_W, gV, inputs=None):
+    """
+    Operates the storage over the year (see `calc_storage_operation`) and summarizes the operation - with
+    STORE_DATA == "yes", the hourly operation is saved to `locator.get_optimization_slave_storage_operation_data`.
+
+    :param CSV_NAME:
+    :param SOLCOL_TYPE:
+    :param T_storage_old_K:
+    :param Q_in_storage_old_W:
+    :param locator:
+    :param STORAGE_SIZE_m3:
+    :param STORE_DATA:
+    :param context:
+    :param P_HP_max_W:
+    :param gV:
+    :param inputs: the inputs of the storage operation, as returned by `read_storage_inputs` (read if None)
+    :type CSV_NAME:
+    :type SOLCOL_TYPE:
+    :type T_storage_old_K:
+    :type Q_in_storage_old_W:
+    :type locator:
+    :type STORAGE_SIZE_m3:
+    :type STORE_DATA:
+    :type context:
+    :type P_HP_max_W:
+    :type gV:
+    :type inputs: dict
+    :return:
+    :rtype:
+    """
+    MS_Var = context
+    if inputs is None:
+        inputs = read_storage_inputs(CSV_NAME, locator, MS_Var, gV)
+
+    operation = calc_storage_operation(inputs, STORAGE_SIZE_m3, T_storage_old_K, Q_in_storage_old_W, P_HP_max_W,
+                                       MS_Var, gV)
+    Q_storage_content_fin_W = operation['Q_storage_content_W'][0]
+    T_storage_fin_K = operation['T_storage_K'][0]
+    Q_to_storage_fin_W = operation['Q_to_storage_W'][0]
+    Q_from_storage_used_fin_W = operation['Q_from_storage_used_W'][0]
+    E_aux_ch_fin_W = operation['E_aux_ch_W'][0]
+    E_aux_dech_fin_W = operation['E_aux_dech_W'][0]
+    Q_missing_fin_W = operation['Q_missing_W'][0]
+    mdot_DH_fin_kgpers = operation['mdot_DH_fin_kgpers'][0]
+    Q_rejected_fin_W = operation['Q_rejected_fin_W'][0]
+    Q_uncontrollable_fin_Wh = operation['Q_uncontrollable_Wh'][0]
+    E_aux_HP_uncontrollable_fin_Wh = operation['E_aux_HP_uncontrollable_Wh'][0]
+    Q_loss_tot_W = operation['Q_loss_tot_W'][0]
+    Q_disc_seasonstart_W = [operation['Q_disc_seasonstart_W'][0]]
+
+    # the operation stops at the hour the storage temperature is too low
+    HPServerHeatDesignArray_kWh = inputs['HPServerHeatDesignArray_kWh'].copy()
+    HPpvt_designArray_Wh = inputs['HPpvt_designArray_Wh'].copy()
+    HPCompAirDesignArray_kWh = inputs['HPCompAirDesignArray_kWh'].copy()
+    HPScDesignArray_Wh = inputs['HPScDesignArray_Wh'].copy()
+    if operation['error_hour'][0] >= 0:
+        for design_array in [HPServerHeatDesignArray_kWh, HPpvt_designArray_Wh, HPCompAirDesignArray_kWh,
+                             HPScDesignArray_Wh]:
+            design_array[operation['error_hour'][0] + 1:] = 0
+
+    Q_DH_networkload_W = inputs['Q_DH_networkload_W']
+    E_PV_Wh = inputs['E_PV_Wh']
+    E_PVT_Wh = inputs['E_PVT_Wh']
+    Q_SCandPVT_gen_Wh = inputs['Q_SCandPVT_gen_Wh']
+    HOURS_IN_DAY = 24
+    DAYS_IN_YEAR = 365
+
+    """ STORE DATA """
     E_aux_HP_uncontrollable_fin_flat_Wh = E_aux_HP_uncontrollable_fin_Wh.flatten()
     #print len(E_aux_HP_uncontrollable_fin_flat), np.shape(E_aux_HP_uncontrollable_fin_flat)
     #print "Q_storage_content_fin", np.shape(Q_storage_content_fin)
@@ -349,7 +315,8 @@ def Storage_Design(CSV_NAME, SOLCOL_TYPE, T_storage_old_K, Q_in_storage_old_W, l
     
     for hour in range(DAYS_IN_YEAR, HOURS_IN_DAY):
         E_produced_total_W[hour] = E_PV_Wh[hour] + E_PVT_Wh[hour]
-        E_consumed_total_without_buildingdemand_W[hour] = E_aux_ch_W[hour] + E_aux_dech_W[hour] + E_aux_HP_uncontrollable_Wh[hour]
+        E_consumed_total_without_buildingdemand_W[hour] = E_aux_ch_fin_W[hour] + E_aux_dech_fin_W[hour] + \
+                                                          E_aux_HP_uncontrollable_fin_Wh[hour]
 
 
     if STORE_DATA == "yes":
@@ -53,6 +53,8 @@ def storage_optimization(locator, master_to_slave_vars, gv):
     MS_Var = master_to_slave_vars
 
     CSV_NAME = MS_Var.NETWORK_DATA_FILE
+    # the network and solar data are the same for all the rounds of the optimization
+    storage_inputs = StDesOp.read_storage_inputs(CSV_NAME, locator, MS_Var, gv)
 
     # SOLCOL_TYPE = MS_Var.SOLCOL_TYPE
     SOLCOL_TYPE = "NONE"
@@ -71,7 +73,8 @@ def storage_optimization(locator, master_to_slave_vars, gv):
     STORE_DATA = "no"
     Q_stored_max0, Q_rejected_fin, Q_disc_seasonstart, T_st_max, T_st_min, Q_storage_content_fin, T_storage_fin, Q_loss0, mdot_DH_fin0, \
     Q_uncontrollable_fin = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_storage_old, Q_in_storage_old, locator,
-                                                  V_storage_initial, STORE_DATA, master_to_slave_vars, 1e12, gv)
+                                                  V_storage_initial, STORE_DATA, master_to_slave_vars, 1e12, gv,
+                                                  inputs=storage_inputs)
 
     # Design HP for storage uptake - limit the maximum thermal power, Criterial: 2000h operation average of a year 
     # --> Oral Recommandation of Antonio (former Leibundgut Group)
@@ -89,7 +92,7 @@ def storage_optimization(locator, master_to_slave_vars, gv):
         # assume unlimited uptake to storage during first round optimisation (P_HP_max = 1e12)
         Optimized_Data = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_initial, Q_initial, locator,
                                                 V_storage_possible_needed, STORE_DATA, master_to_slave_vars, P_HP_max,
-                                                gv)
+                                                gv, inputs=storage_inputs)
         Q_stored_max_opt, Q_rejected_fin_opt, Q_disc_seasonstart_opt, T_st_max_op, T_st_min_op, Q_storage_content_fin_op, \
         T_storage_fin_op, Q_loss1, mdot_DH_fin1, Q_uncontrollable_fin = Optimized_Data
 
@@ -106,7 +109,7 @@ def storage_optimization(locator, master_to_slave_vars, gv):
         T_initial = T_ST_MIN + Q_initial * gv.Wh_to_J / (gv.rho_60 * gv.cp * V_storage_possible_needed)
         Optimized_Data2 = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_initial, Q_initial, locator,
                                                  V_storage_possible_needed, STORE_DATA, master_to_slave_vars, P_HP_max,
-                                                 gv)
+                                                 gv, inputs=storage_inputs)
         Q_stored_max_opt2, Q_rejected_fin_opt2, Q_disc_seasonstart_opt2, T_st_max_op2, T_st_min_op2, \
         Q_storage_content_fin_op2, T_storage_fin_op2, Q_loss2, mdot_DH_fin2, \
         Q_uncontrollable_fin = Optimized_Data2
@@ -122,7 +125,7 @@ def storage_optimization(locator, master_to_slave_vars, gv):
 
         Optimized_Data3 = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_initial, Q_initial, locator,
                                                  V_storage_possible_needed, STORE_DATA, master_to_slave_vars, P_HP_max,
-                                                 gv)
+                                                 gv, inputs=storage_inputs)
         Q_stored_max_opt3, Q_rejected_fin_opt3, Q_disc_seasonstart_opt3, T_st_max_op3, T_st_min_op3, \
         Q_storage_content_fin_op3, T_storage_fin_op3, Q_loss3, mdot_DH_fin3, Q_uncontrollable_fin = Optimized_Data3
 
@@ -135,7 +138,7 @@ def storage_optimization(locator, master_to_slave_vars, gv):
 
         Optimized_Data4 = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_initial, Q_initial, locator,
                                                  V_storage_possible_needed, STORE_DATA, master_to_slave_vars, P_HP_max,
-                                                 gv)
+                                                 gv, inputs=storage_inputs)
         Q_stored_max_opt4, Q_rejected_fin_opt4, Q_disc_seasonstart_opt4, T_st_max_op4, T_st_min_op4, \
         Q_storage_content_fin_op4, T_storage_fin_op4, Q_loss4, mdot_DH_fin4, Q_uncontrollable_fin = Optimized_Data4
 
@@ -158,7 +161,7 @@ def storage_optimization(locator, master_to_slave_vars, gv):
         STORE_DATA = "yes"
         Optimized_Data5 = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_initial, Q_initial, locator,
                                                  V_storage_possible_needed, STORE_DATA, master_to_slave_vars, P_HP_max,
-                                                 gv)
+                                                 gv, inputs=storage_inputs)
         Q_stored_max_opt5, Q_rejected_fin_opt5, Q_disc_seasonstart_opt5, T_st_max_op5, T_st_min_op5, \
         Q_storage_content_fin_op5, T_storage_fin_op5, Q_loss5, mdot_DH_fin5, Q_uncontrollable_fin = Optimized_Data5
 
@@ -196,7 +199,7 @@ def storage_optimization(locator, master_to_slave_vars, gv):
 
             Optimized_Data6 = StDesOp.Storage_Design(CSV_NAME, SOLCOL_TYPE, T_initial, Q_initial, locator,
                                                      V_storage_possible_needed, STORE_DATA, master_to_slave_vars,
-                                                     P_HP_max, gv)
+                                                     P_HP_max, gv, inputs=storage_inputs)
             Q_stored_max_opt5, Q_rejected_fin_opt5, Q_disc_seasonstart_opt5, T_st_max_op5, T_st_min_op5, Q_storage_content_fin_op5, \
             T_storage_fin_op5, Q_loss5, mdot_DH_fin5, Q_uncontrollable_fin = Optimized_Data6
 
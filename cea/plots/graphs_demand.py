@@ -9,6 +9,7 @@ import pandas as pd
 
 import cea
 import cea.inputlocator
+from cea.demand.demand_writers import read_demand_results
 import multiprocessing as mp
 
 MAX_ANALYSIS_FIELDS = 4
@@ -73,7 +74,7 @@ def create_demand_graph_for_building(analysis_fields, area_df, color_palette, fi
     from matplotlib.backends.backend_pdf import PdfPages
     pdf = PdfPages(locator.get_demand_plots_file(name))
     # CREATE FIRST PAGE WITH TIMESERIES
-    df = pd.read_csv(locator.get_demand_results_file(name), usecols=fields_date)
+    df = read_demand_results(locator, [name], columns=fields_date)[0]
     df.index = pd.to_datetime(df.DATE)
     fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, figsize=(12, 16))
     fig.text(0.07, 0.5, 'Demand [kW]', va='center', rotation='vertical')
@@ -129,7 +130,7 @@ def demand_graph_fields(scenario_path):
     df_total_demand = pd.read_csv(locator.get_total_demand())
     total_fields = set(df_total_demand.columns.tolist())
     first_building = df_total_demand['Name'][0]
-    df_building = pd.read_csv(locator.get_demand_results_file(first_building))
+    df_building = read_demand_results(locator, [first_building])[0]
     fields = set(df_building.columns.tolist())
     fields.remove('DATE')
     fields.remove('Name')
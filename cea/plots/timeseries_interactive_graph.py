@@ -10,6 +10,8 @@ import multiprocessing as mp
 from plotly.offline import plot
 import plotly.graph_objs as go
 
+from cea.demand.demand_writers import read_demand_results
+
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2016, Architecture and Building Systems - ETH Zurich"
@@ -67,7 +69,7 @@ def timeseries_graph(locator, analysis_fields, gv):
 def create_demand_graph_for_building(analysis_fields, fields_date, locator, name, layout):
 
     # CREATE FIRST PAGE WITH TIMESERIES
-    df = pd.read_csv(locator.get_demand_results_file(name), usecols=fields_date).set_index("DATE")
+    df = read_demand_results(locator, [name], columns=fields_date)[0].set_index("DATE")
     counter = 0
     for field in analysis_fields:
         trace = go.Scatter(x= df.index.values, y= df[field].values, name = field)
@@ -15,6 +15,7 @@ from geopandas import GeoDataFrame as gpdf
 
 import cea.globalvar
 import cea.inputlocator
+from cea.utilities import xlsreader
 
 __author__ = "Paul Neitzel, Kian Wee Chen"
 __copyright__ = "Copyright 2016, Architecture and Building Systems - ETH Zurich"
@@ -124,9 +125,9 @@ def reader_surface_properties(locator, input_shp):
 
     # local variables
     architectural_properties = gpdf.from_file(input_shp).drop('geometry', axis=1)
-    surface_database_windows = pd.read_excel(locator.get_envelope_systems(), "WINDOW")
-    surface_database_roof = pd.read_excel(locator.get_envelope_systems(), "ROOF")
-    surface_database_walls = pd.read_excel(locator.get_envelope_systems(), "WALL")
+    surface_database_windows = xlsreader.read_excel(locator.get_envelope_systems(), "WINDOW")
+    surface_database_roof = xlsreader.read_excel(locator.get_envelope_systems(), "ROOF")
+    surface_database_walls = xlsreader.read_excel(locator.get_envelope_systems(), "WALL")
 
     # querry data
     df = architectural_properties.merge(surface_database_windows, left_on='type_win', right_on='code')
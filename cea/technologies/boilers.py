@@ -5,6 +5,7 @@ condensing boilers
 
 
 from __future__ import division
+import numpy as np
 from scipy.interpolate import interp1d
 
 
@@ -28,50 +29,38 @@ def cond_boiler_operation(Q_load_W, Q_design_W, T_return_to_boiler_K):
     operational efficiency after:
         http://www.greenshootscontrols.net/?p=153
 
-    :param Q_load_W: Load of time step
-    :type Q_load_W: float
+    :param Q_load_W: Load of time step (or of each time step)
+    :type Q_load_W: float or ndarray
 
     :type Q_design_W: float
     :param Q_design_W: Design Load of Boiler
 
-    :type T_return_to_boiler_K : float
+    :type T_return_to_boiler_K : float or ndarray
     :param T_return_to_boiler_K: Return Temperature of the network to the boiler [K]
 
-    :retype boiler_eff: float
+    :retype boiler_eff: ndarray
     :returns boiler_eff: efficiency of Boiler (Lower Heating Value), in abs. numbers
 
     """
     #TODO[SH]: Operation efficiency Reference link doesn't work
 
-    #Implement Curves provided by http://www.greenshootscontrols.net/?p=153
-    x = [0, 15.5, 21, 26.7, 32.2, 37.7, 43.3, 49, 54.4, 60, 65.6, 71.1, 100] # Return Temperature Dependency
-    y = [96.8, 96.8, 96.2, 95.5, 94.7, 93.2, 91.2, 88.9, 87.3, 86.3, 86.0, 85.9, 85.8] # Return Temperature Dependency
-    x1 = [0, 0.05, 0.25, 0.5, 0.75, 1] # Load Point dependency
-    y1 = [99.5, 99.3, 98.3, 97.6, 97.1, 96.8] # Load Point Dependency
-
-    # do the interpolation
-    eff_of_T_return = interp1d(x, y, kind='linear')
-    eff_of_phi = interp1d(x1, y1, kind='cubic')
-
     # get input variables
     if Q_design_W > 0:
-        phi = float(Q_load_W) / float(Q_design_W)
+        phi = np.asarray(Q_load_W, dtype=float) / float(Q_design_W)
     else:
-        phi = 0
+        phi = np.zeros_like(Q_load_W, dtype=float)
 
     #if phi < gV.Boiler_min:
     #    print "Boiler at too low part load, see Model_Boiler_condensing, line 100"
 
         #raise model error!!
 
-    if T_return_to_boiler_K == 0: # accounting with times with no flow
-        T_return = 0
-    else:
-        T_return = T_return_to_boiler_K - 273
+    # accounting with times with no flow
+    T_return_C = np.where(T_return_to_boiler_K == 0, 0, T_return_to_boiler_K - 273)
 
-    eff_score = eff_of_phi(phi) / eff_of_phi(1)
+    eff_score = _cond_eff_of_phi(phi) / _cond_eff_of_phi(1)
 
-    boiler_eff = (eff_score * eff_of_T_return(T_return) )/ 100.0
+    boiler_eff = (eff_score * _eff_of_T_return(T_return_C) )/ 100.0
 
 
     return boiler_eff
@@ -148,36 +137,26 @@ def calc_Cop_boiler(Q_load_W, Q_design_W, T_return_to_boiler_K):
         http://www.greenshootscontrols.net/?p=153
 
 
-    :param Q_load_W: Load of time step
-    :type Q_load_W: float
+    :param Q_load_W: Load of time step (or of each time step)
+    :type Q_load_W: float or ndarray
 
     :type Q_design_W: float
     :param Q_design_W: Design Load of Boiler
 
-    :type T_return_to_boiler_K : float
+    :type T_return_to_boiler_K : float or ndarray
     :param T_return_to_boiler_K: Return Temperature of the network to the boiler [K]
 
 
-    :retype boiler_eff: float
+    :retype boiler_eff: ndarray
     :returns boiler_eff: efficiency of Boiler (Lower Heating Value), in abs. numbers
     """
 
-    #Implement Curves provided by http://www.greenshootscontrols.net/?p=153
-    x = [0, 15.5, 21, 26.7, 32.2, 37.7, 43.3, 49, 54.4, 60, 65.6, 71.1, 100] # Return Temperature Dependency
-    y = [96.8, 96.8, 96.2, 95.5, 94.7, 93.2, 91.2, 88.9, 87.3, 86.3, 86.0, 85.9, 85.8] # Return Temperature Dependency
-    x1 = [0.0, 0.05, 0.25, 0.5, 0.75, 1.0] # Load Point dependency
-    y1 = [100.0, 99.3, 98.3, 97.6, 97.1, 96.8] # Load Point Dependency
-
-     # do the interpolation
-    eff_of_T_return = interp1d(x, y, kind='linear')
-    eff_of_phi = interp1d(x1, y1, kind='cubic')
-
     # get input variables
     if Q_design_W > 0:
-        phi = float(Q_load_W) / float(Q_design_W)
+        phi = np.asarray(Q_load_W, dtype=float) / float(Q_design_W)
 
     else:
-        phi = 0
+        phi = np.zeros_like(Q_load_W, dtype=float)
     #if phi < gV.Boiler_min:
     #    print "Boiler at too low part load, see Model_Boiler_condensing, line 100"
 
@@ -185,12 +164,21 @@ def calc_Cop_boiler(Q_load_W, Q_design_W, T_return_to_boiler_K):
 
 
     T_return_C = T_return_to_boiler_K - 273
-    eff_score = eff_of_phi(phi) / eff_of_phi(1)
-    boiler_eff = (eff_score * eff_of_T_return(T_return_C) )/ 100.0
+    eff_score = _eff_of_phi(phi) / _eff_of_phi(1)
+    boiler_eff = (eff_score * _eff_of_T_return(T_return_C) )/ 100.0
 
     return boiler_eff
 
 
+#Implement Curves provided by http://www.greenshootscontrols.net/?p=153
+_eff_of_T_return = interp1d([0, 15.5, 21, 26.7, 32.2, 37.7, 43.3, 49, 54.4, 60, 65.6, 71.1, 100],  # Return Temperature
+                            [96.8, 96.8, 96.2, 95.5, 94.7, 93.2, 91.2, 88.9, 87.3, 86.3, 86.0, 85.9, 85.8],
+                            kind='linear')
+_eff_of_phi = interp1d([0.0, 0.05, 0.25, 0.5, 0.75, 1.0],  # Load Point dependency
+                       [100.0, 99.3, 98.3, 97.6, 97.1, 96.8], kind='cubic')
+_cond_eff_of_phi = interp1d([0, 0.05, 0.25, 0.5, 0.75, 1],  # Load Point dependency (cond_boiler_operation)
+                            [99.5, 99.3, 98.3, 97.6, 97.1, 96.8], kind='cubic')
+
 
 # investment and maintenance costs
 
@@ -358,8 +358,8 @@ def calc_eta_FC(Q_load_W, Q_design_W, phi_threshold, approach_call):
         Approach B (Empiric Approach): [Iain Staffell]_
 
 
-    :type Q_load_W : float
-    :param Q_load_W: Load at each time step
+    :type Q_load_W : float or ndarray
+    :param Q_load_W: Load at each time step (an array of loads for approach B)
 
     :type Q_design_W : float
     :param Q_design_W: Design Load of FC
@@ -414,26 +414,23 @@ def calc_eta_FC(Q_load_W, Q_design_W, phi_threshold, approach_call):
         else:
             eta_therm = 0.5 * eta_therm_max * (1 + eta_therm_max * ((phi - phi_threshold) / (1 - phi_threshold)))
 
-    ## Approach B - Empiric Approach
+    ## Approach B - Empiric Approach (also for an array of loads)
     if approach_call == "B":
 
         if Q_design_W > 0:
-            phi = float(Q_load_W) / float(Q_design_W)
+            phi = np.asarray(Q_load_W, dtype=float) / float(Q_design_W)
 
         else:
-            phi = 0
+            phi = np.zeros_like(Q_load_W, dtype=float)
 
         eta_el_max = 0.39
         eta_therm_max = 0.58   #* 1.11 as this source gives eff. of HHV
         eta_el_score = -0.220 + 5.277 * phi - 9.127 * phi**2 + 7.172* phi ** 3 - 2.103* phi**4
         eta_therm_score = 0.9 - 0.07 * phi + 0.17 * phi**2
 
-        eta_el = eta_el_max * eta_el_score
+        eta_el = np.where(phi < 0.2, 0, eta_el_max * eta_el_score)
         eta_therm = eta_therm_max * eta_therm_score
 
-        if phi < 0.2:
-            eta_el = 0
-
     return eta_el, eta_therm
 
 
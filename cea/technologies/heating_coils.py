@@ -6,6 +6,7 @@ from __future__ import division
 import scipy.optimize as sopt
 import scipy
 import numpy as np
+from cea.utilities import solvers
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -19,9 +20,19 @@ __status__ = "Production"
 
 def calc_heating_coil(Qhsf, Qhsf_0, Ta_sup_hs, Ta_re_hs, Ths_sup_0, Ths_re_0, ma_sup_hs, ma_sup_0,Ta_sup_0, Ta_re_0,
                       Cpa, gv):
+    """
+    Calculates the supply and return temperatures and the flow rate of the heating coil for each hour (``Qhsf``,
+    ``Ta_sup_hs``, ``Ta_re_hs`` and ``ma_sup_hs`` are arrays), the return temperature of all the hours with a heating
+    load is solved at once.
+
+    :return: supply and return temperature in [C] and capacity flow rate in [W/C] of each hour (0 without load)
+    """
+    Qhsf, Ta_sup_hs, Ta_re_hs, ma_sup_hs = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in
+                                                                 (Qhsf, Ta_sup_hs, Ta_re_hs, ma_sup_hs)])
+    tsh = np.zeros(Qhsf.shape)
+    trh = np.zeros(Qhsf.shape)
+    mcphs = np.zeros(Qhsf.shape)
 
-    tasup = Ta_sup_hs + 273
-    tare = Ta_re_hs + 273
     tsh0 = Ths_sup_0 + 273
     trh0 = Ths_re_0 + 273
     mCw0 = Qhsf_0 / (tsh0 - trh0)
@@ -32,7 +43,12 @@ def calc_heating_coil(Qhsf, Qhsf_0, Ta_sup_hs, Ta_re_hs, Ths_sup_0, Ths_re_0, ma
     LMRT0 = (TD10 - TD20) / scipy.log(TD20 / TD10)
     UA0 = Qhsf_0 / LMRT0
 
-    if Qhsf > 0 and ma_sup_hs > 0:
+    heating = (Qhsf > 0) & (ma_sup_hs > 0)
+    if heating.any():
+        Qhsf = Qhsf[heating]
+        ma_sup_hs = ma_sup_hs[heating]
+        tasup = Ta_sup_hs[heating] + 273
+        tare = Ta_re_hs[heating] + 273
         AUa = UA0 * (ma_sup_hs / ma_sup_0) ** 0.77
         NTUc = AUa / (ma_sup_hs * Cpa * 1000)
         ec = 1 - scipy.exp(-NTUc)
@@ -42,30 +58,39 @@ def calc_heating_coil(Qhsf, Qhsf_0, Ta_sup_hs, Ta_re_hs, Ths_sup_0, Ths_re_0, ma
         LMRT = abs((tsh0 - trh0) / scipy.log((tsh0 - tc) / (trh0 - tc)))
         k1 = 1 / mCw0
 
-        def fh(x):
+        def fh(x, k2, tc, LMRT):
             Eq = mCw0 * k2 - Qhsf_0 * (k2 / (scipy.log((x + k2 - tc) / (x - tc)) * LMRT))
             return Eq
 
         k2 = Qhsf * k1
-        try:
-            result = sopt.newton(fh, trh0, maxiter=1000, tol=0.01).real - 273
-        except RuntimeError:
-            print (Qhsf, Qhsf_0, Ta_sup_hs, Ta_re_hs, Ths_sup_0, Ths_re_0, ma_sup_hs, ma_sup_0,Ta_sup_0, Ta_re_0)
-            result = sopt.bisect(fh, 0, 350, xtol=0.01, maxiter=500).real - 273
+        result, converged = solvers.newton(fh, trh0, args=(k2, tc, LMRT), maxiter=1000, tol=0.01)
+        for i in np.flatnonzero(~converged):
+            print (Qhsf[i], Qhsf_0, Ta_sup_hs[heating][i], Ta_re_hs[heating][i], Ths_sup_0, Ths_re_0, ma_sup_hs[i],
+                   ma_sup_0, Ta_sup_0, Ta_re_0)
+            result[i] = sopt.bisect(fh, 0, 350, args=(k2[i], tc[i], LMRT[i]), xtol=0.01, maxiter=500)
+        result = result - 273
 
-        trh = result
-        tsh = trh + k2
-        mcphs = Qhsf / (tsh - trh)
-    else:
-        tsh = trh = mcphs = 0
-    # return floats with numpy function. Needed when np.vectorize is use to call this function
-    return np.float(tsh), np.float(trh), np.float(mcphs) # C,C, W/C
+        trh[heating] = result
+        tsh[heating] = result + k2
+        mcphs[heating] = Qhsf / (tsh[heating] - trh[heating])
+    return tsh, trh, mcphs # C,C, W/C
 
 
 def calc_cooling_coil(Qcsf, Qcsf_0, Ta_sup_cs, Ta_re_cs, Tcs_sup_0, Tcs_re_0, ma_sup_cs, ma_sup_0, Ta_sup_0, Ta_re_0,Cpa, gv):
+    """
+    Calculates the supply and return temperatures and the flow rate of the cooling coil for each hour (``Qcsf``,
+    ``Ta_sup_cs``, ``Ta_re_cs`` and ``ma_sup_cs`` are arrays), the supply temperature of all the hours with a cooling
+    load is solved at once.
+
+    :return: supply and return temperature in [C] and capacity flow rate in [W/C] of each hour (0 without load)
+    """
+    Qcsf, Ta_sup_cs, Ta_re_cs, ma_sup_cs = np.broadcast_arrays(*[np.asarray(x, dtype=float) for x in
+                                                                 (Qcsf, Ta_sup_cs, Ta_re_cs, ma_sup_cs)])
+    tsc = np.zeros(Qcsf.shape)
+    trc = np.zeros(Qcsf.shape)
+    mcpcs = np.zeros(Qcsf.shape)
+
     # Initialize temperatures
-    tasup = Ta_sup_cs + 273
-    tare = Ta_re_cs + 273
     tsc0 = Tcs_sup_0 + 273
     trc0 = Tcs_re_0 + 273
     mCw0 = Qcsf_0 / (tsc0 - trc0)
@@ -76,13 +101,18 @@ def calc_cooling_coil(Qcsf, Qcsf_0, Ta_sup_cs, Ta_re_cs, Tcs_sup_0, Tcs_re_0, ma
     LMRT0 = (TD20 - TD10) / scipy.log(TD20 / TD10)
     UA0 = Qcsf_0 / LMRT0
 
-    if Qcsf < -0 and ma_sup_cs > 0:
+    cooling = (Qcsf < -0) & (ma_sup_cs > 0)
+    if cooling.any():
+        Qcsf = Qcsf[cooling]
+        ma_sup_cs = ma_sup_cs[cooling]
+        tasup = Ta_sup_cs[cooling] + 273
+        tare = Ta_re_cs[cooling] + 273
         AUa = UA0 * (ma_sup_cs / ma_sup_0) ** 0.77
         NTUc = AUa / (ma_sup_cs * Cpa * 1000)
         ec = 1 - scipy.exp(-NTUc)
         tc = (tare - tasup + tasup * ec) / ec  # contact temperature of coil
 
-        def fh(x):
+        def fh(x, k2, tc):
             TD1 = tc - (k2 + x)
             TD2 = tc - x
             LMRT = (TD2 - TD1) / scipy.log(TD2 / TD1)
@@ -90,42 +120,41 @@ def calc_cooling_coil(Qcsf, Qcsf_0, Ta_sup_cs, Ta_re_cs, Tcs_sup_0, Tcs_re_0, ma
             return Eq
 
         k2 = -Qcsf / mCw0
-        try:
-            result = sopt.newton(fh, trc0, maxiter=1000, tol=0.01) - 273
-        except RuntimeError:
+        result, converged = solvers.newton(fh, trc0, args=(k2, tc), maxiter=1000, tol=0.01)
+        for i in np.flatnonzero(~converged):
             print('Newton optimization failed in cooling coil, using slower bisect algorithm...')
             try:
-                result = sopt.bisect(fh, 0, 350, xtol=0.01, maxiter=500) - 273
+                result[i] = sopt.bisect(fh, 0, 350, args=(k2[i], tc[i]), xtol=0.01, maxiter=500)
             except RuntimeError:
                 print ('Bisect optimization also failed in cooing coil, using sample:')
-
+                raise
+        result = result - 273
 
         #if Ta_sup_cs == Ta_re_cs:
         #    print 'Ta_sup_cs == Ta_re_cs:', Ta_sup_cs
-        tsc = result.real
-        trc = tsc + k2
+        tsc_cooling = result
+        trc_cooling = tsc_cooling + k2
 
         #Control system check - close to optimal flow
         min_AT = 5  # Its equal to 10% of the mass flowrate
         tsc_min = Tcs_sup_0  # to consider coolest source possible
         trc_max = Tcs_re_0
         tsc_max = 12
-        AT = tsc - trc
-        if AT < min_AT:
-            if tsc < tsc_min:
-                tsc = tsc_min
-                trc = tsc_min + min_AT
-            if tsc > tsc_max:
-                tsc = tsc_max
-                trc = tsc_max + min_AT
-            else:
-                trc = tsc + min_AT
-        elif tsc > tsc_max or trc > trc_max or tsc < tsc_min:
-            trc = trc_max
-            tsc = tsc_max
-
-        mcpcs = Qcsf / (tsc - trc)
-    else:
-        tsc = trc = mcpcs = 0
-    # return floats with numpy function. Needed when np.vectorize is use to call this function
-    return np.float(tsc), np.float(trc), np.float(mcpcs)  # C,C, W/C
+        AT = tsc_cooling - trc_cooling
+        low_AT = AT < min_AT
+        # raise the supply temperature to the coolest source possible
+        too_cold = low_AT & (tsc_cooling < tsc_min)
+        tsc_low_AT = np.where(too_cold, tsc_min, tsc_cooling)
+        # and then limit it to the maximum supply temperature, with the minimum temperature difference
+        too_warm = low_AT & (tsc_low_AT > tsc_max)
+        trc_cooling = np.where(too_warm, tsc_max + min_AT, np.where(low_AT, tsc_low_AT + min_AT, trc_cooling))
+        tsc_cooling = np.where(too_warm, tsc_max, tsc_low_AT)
+        # otherwise, use the design temperatures if out of range
+        out_of_range = ~low_AT & ((tsc_cooling > tsc_max) | (trc_cooling > trc_max) | (tsc_cooling < tsc_min))
+        trc_cooling = np.where(out_of_range, trc_max, trc_cooling)
+        tsc_cooling = np.where(out_of_range, tsc_max, tsc_cooling)
+
+        tsc[cooling] = tsc_cooling
+        trc[cooling] = trc_cooling
+        mcpcs[cooling] = Qcsf / (tsc_cooling - trc_cooling)
+    return tsc, trc, mcpcs  # C,C, W/C
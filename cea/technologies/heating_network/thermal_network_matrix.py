@@ -7,12 +7,16 @@ Hydraulic - thermal network
 """
 
 from __future__ import division
+import multiprocessing as mp
 import time
 import numpy as np
 import pandas as pd
+import scipy.sparse
+import scipy.sparse.linalg
 import cea.technologies.substation_matrix as substation
 import math
 from cea.utilities import epwreader
+from cea.utilities import xlsreader
 from cea.resources import geothermal
 import geopandas as gpd
 import networkx as nx
@@ -27,6 +31,8 @@ __maintainer__ = "Daren Thomas"
 __email__ = "thomas@arch.ethz.ch"
 __status__ = "Production"
 
+HOURS_IN_YEAR = 8760
+
 
 def thermal_network_main(locator, gv, network_type, source, set_diameter):
     """
@@ -115,6 +121,8 @@ def thermal_network_main(locator, gv, network_type, source, set_diameter):
 
     # substation HEX design
     substations_HEX_specs, buildings_demands = substation.substation_HEX_design_main(locator, building_names, gv)
+    # the substation demands of all buildings, evaluated at every time step and iteration
+    substation_table = substation.calc_substation_table(buildings_demands, substations_HEX_specs)
 
     # get edge-node matrix from defined network, the input formats are either .csv or .shp
     if source == 'csv':
@@ -143,84 +151,172 @@ def thermal_network_main(locator, gv, network_type, source, set_diameter):
     K_pipe_kWK = calc_aggregated_heat_conduction_coefficient(locator, gv, edge_df, pipe_properties_df)  # (exe)[kW/K]
 
     ## Start solving hydraulic and thermal equations at each time-step
-    t0 = time.clock()
-    # create empty lists to write results
-    T_return_nodes_list = []
-    T_supply_nodes_list = []
-    q_loss_supply_edges_list = []
-    plant_heat_requirements = []
-    pressure_nodes_supply = []
-    pressure_nodes_return = []
-    pressure_loss_system = []
-
-
-    for t in range(8760):
-
-        print('calculating network thermal hydraulic properties... time step', t)
-        timer = time.clock()
-
-        ## solve network temperatures
-        T_supply_nodes_K, \
-        T_return_nodes_K, \
-        plant_heat_requirement_kW, \
-        edge_mass_flow_df_kgs.ix[t],\
-        q_loss_supply_edges_kW = solve_network_temperatures(locator, gv, T_ground_K, edge_node_df, all_nodes_df,
-                                                         edge_mass_flow_df_kgs.ix[t], K_pipe_kWK, t_target_supply_df,
-                                                         building_names, buildings_demands, substations_HEX_specs,
-                                                         t, network_type)
-
-        # calculate pressure at each node and pressure drop throughout the entire network
-        P_supply_nodes_Pa, P_return_nodes_Pa, delta_P_network_Pa = calc_pressure_nodes(edge_node_df,
-                                                                              pipe_properties_df[:]['D_int_m':'D_int_m'].
-                                                                              values, edge_df['pipe length'].values,
-                                                                              edge_mass_flow_df_kgs.ix[t].values,
-                                                                              T_supply_nodes_K, T_return_nodes_K, gv)
-
-        # store node temperatures and pressures, as well as plant heat requirement and overall pressure drop at each
-        # time step
-        T_supply_nodes_list.append(T_supply_nodes_K)
-        T_return_nodes_list.append(T_return_nodes_K)
-        q_loss_supply_edges_list.append(q_loss_supply_edges_kW)
-        plant_heat_requirements.append(plant_heat_requirement_kW)
-        pressure_nodes_supply.append(P_supply_nodes_Pa[0])
-        pressure_nodes_return.append(P_return_nodes_Pa[0])
-        pressure_loss_system.append(delta_P_network_Pa)
-
-        print (time.clock() - timer, 'seconds process time for time step', t)
+    t0 = time.time()
+    # the time steps are independent from each other, they are solved in chunks (in parallel, if possible) and the
+    # results are written to the arrays of the whole year
+    network_inputs = (locator, gv, T_ground_K, edge_node_df, all_nodes_df, edge_mass_flow_df_kgs, K_pipe_kWK,
+                      t_target_supply_df, building_names, buildings_demands, substations_HEX_specs, substation_table,
+                      pipe_properties_df[:]['D_int_m':'D_int_m'].values, edge_df['pipe length'].values, network_type)
+    number_of_plants = sum(all_nodes_df['Type'] == 'PLANT')
+    results = {'T_supply_nodes_K': np.full((HOURS_IN_YEAR, len(edge_node_df.index)), np.nan),
+               'T_return_nodes_K': np.full((HOURS_IN_YEAR, len(edge_node_df.index)), np.nan),
+               'plant_heat_requirement_kW': np.full((HOURS_IN_YEAR, number_of_plants), np.nan),
+               'edge_mass_flow_kgs': np.array(edge_mass_flow_df_kgs.values, dtype=float),
+               'q_loss_supply_edges_kW': np.full((HOURS_IN_YEAR, len(edge_node_df.columns)), np.nan),
+               'P_supply_nodes_Pa': np.full((HOURS_IN_YEAR, len(edge_node_df.index)), np.nan),
+               'P_return_nodes_Pa': np.full((HOURS_IN_YEAR, len(edge_node_df.index)), np.nan),
+               'delta_P_network_Pa': np.full((HOURS_IN_YEAR, 3), np.nan),
+               'supply_temperature_iterations': np.zeros((HOURS_IN_YEAR, 1)),
+               'max_node_dT': np.zeros((HOURS_IN_YEAR, 1))}
+
+    chunks = [range(start, min(start + gv.thermal_network_chunk_size, HOURS_IN_YEAR))
+              for start in range(0, HOURS_IN_YEAR, gv.thermal_network_chunk_size)]
+    number_of_processes = gv.number_of_processes or mp.cpu_count()
+    if gv.multiprocessing and number_of_processes > 1 and len(chunks) > 1:
+        gv.log("Using %i CPU's" % number_of_processes)
+        pool = mp.Pool(number_of_processes, initializer=_initialize_worker, initargs=network_inputs)
+        solved_chunks = pool.imap_unordered(_solve_time_steps_worker, chunks)
+    else:
+        pool = None
+        solved_chunks = (solve_thermal_network_time_steps(time_steps, *network_inputs) for time_steps in chunks)
+
+    try:
+        number_of_time_steps_solved = 0
+        for time_steps, chunk_results in solved_chunks:
+            for name, values in chunk_results.items():
+                results[name][time_steps] = values
+            number_of_time_steps_solved += len(time_steps)
+            # the supply temperatures are iterated with the substation flows until they change by less than 1 K
+            not_converged = chunk_results['max_node_dT'] >= 1
+            gv.log('Time steps %(first)i to %(last)i completed (%(solved)i out of %(total)i) - time elapsed: '
+                   '%(time_elapsed).2f seconds - supply temperatures: %(iterations)i iterations, not converged in '
+                   '%(not_converged)i time steps (max. dT %(max_node_dT).2f K)', first=time_steps[0],
+                   last=time_steps[-1], solved=number_of_time_steps_solved, total=HOURS_IN_YEAR,
+                   time_elapsed=time.time() - t0, iterations=chunk_results['supply_temperature_iterations'].sum(),
+                   not_converged=not_converged.sum(), max_node_dT=chunk_results['max_node_dT'].max())
+    except:
+        # don't leave the workers running
+        if pool is not None:
+            pool.terminate()
+            pool.join()
+        raise
+    if pool is not None:
+        pool.close()
+        pool.join()
 
     # save results
     # edge flow rates (flow direction corresponding to edge_node_df)
-    pd.DataFrame(edge_mass_flow_df_kgs, columns=edge_node_df.columns).to_csv(
+    pd.DataFrame(results['edge_mass_flow_kgs'], columns=edge_node_df.columns).to_csv(
         locator.get_optimization_network_layout_massflow_file(network_type),
         na_rep='NaN', index=False, float_format='%.3f')
     # node temperatures
-    pd.DataFrame(T_supply_nodes_list, columns=edge_node_df.index).to_csv(
+    pd.DataFrame(results['T_supply_nodes_K'], columns=edge_node_df.index).to_csv(
         locator.get_optimization_network_layout_supply_temperature_file(network_type),
         na_rep='NaN', index=False, float_format='%.3f')
-    pd.DataFrame(T_return_nodes_list, columns=edge_node_df.index).to_csv(
+    pd.DataFrame(results['T_return_nodes_K'], columns=edge_node_df.index).to_csv(
         locator.get_optimization_network_layout_return_temperature_file(network_type),
         na_rep='NaN', index=False, float_format='%.3f')
 
     # save edge heat losses in the supply line
-    pd.DataFrame(q_loss_supply_edges_list, columns=edge_node_df.columns).to_csv(
+    pd.DataFrame(results['q_loss_supply_edges_kW'], columns=edge_node_df.columns).to_csv(
         locator.get_optimization_network_layout_qloss_file(network_type),
         na_rep='NaN', index=False, float_format='%.3f')
 
     # plant heat requirements
-    pd.DataFrame(plant_heat_requirements, columns=filter(None,all_nodes_df[all_nodes_df.Type=='PLANT'].Building.values)).to_csv(
+    pd.DataFrame(results['plant_heat_requirement_kW'],
+                 columns=filter(None, all_nodes_df[all_nodes_df.Type == 'PLANT'].Building.values)).to_csv(
         locator.get_optimization_network_layout_plant_heat_requirement_file(network_type), index=False,
         float_format='%.3f')
     # node pressures
-    pd.DataFrame(pressure_nodes_supply, columns=edge_node_df.index).to_csv(
+    pd.DataFrame(results['P_supply_nodes_Pa'], columns=edge_node_df.index).to_csv(
         locator.get_optimization_network_layout_supply_pressure_file(network_type), index=False, float_format='%.3f')
-    pd.DataFrame(pressure_nodes_return, columns=edge_node_df.index).to_csv(
+    pd.DataFrame(results['P_return_nodes_Pa'], columns=edge_node_df.index).to_csv(
         locator.get_optimization_network_layout_return_pressure_file(network_type), index=False, float_format='%.3f')
     # pressure losses over entire network
-    pd.DataFrame(pressure_loss_system, columns=['pressure_loss_supply_Pa','pressure_loss_return_Pa',
-                                                'pressure_loss_total_Pa']).to_csv(
+    pd.DataFrame(results['delta_P_network_Pa'], columns=['pressure_loss_supply_Pa', 'pressure_loss_return_Pa',
+                                                         'pressure_loss_total_Pa']).to_csv(
         locator.get_optimization_network_layout_pressure_drop_file(network_type), index=False, float_format='%.3f')
 
-    print (time.clock() - t0, "seconds process time for network thermal-hydraulic calculation \n")
+    print (time.time() - t0, "seconds process time for network thermal-hydraulic calculation \n")
+
+
+def solve_thermal_network_time_steps(time_steps, locator, gv, T_ground_K, edge_node_df, all_nodes_df,
+                                     edge_mass_flow_df_kgs, K_pipe_kWK, t_target_supply_df, building_names,
+                                     buildings_demands, substations_HEX_specs, substation_table, pipe_diameter_m,
+                                     pipe_length_m, network_type):
+    """
+    Solves the network temperatures (see `solve_network_temperatures`) and pressures (see `calc_pressure_nodes`) at
+    the given time steps. Each time step only depends on the inputs, so the year can be split in chunks of time steps
+    that are solved independently (see `thermal_network_main`).
+
+    :param time_steps: the time steps to solve
+    :type time_steps: list
+
+    The other parameters are the same as in `solve_network_temperatures` and `calc_pressure_nodes`.
+
+    :return: the time steps solved and the results at these time steps: the node temperatures, the plant heat
+             requirements, the edge mass flows, the heat losses in the supply line, the node pressures, the pressure
+             losses of the network and the convergence of the supply temperatures (see `solve_network_temperatures`),
+             with one row per time step
+    :rtype: (list, dict)
+    """
+    results = {}
+    for i, t in enumerate(time_steps):
+        # the flow directions of the edge-node matrix are aligned with the flows of each time step
+        edge_node_df_t = edge_node_df.copy()
+        convergence = {'iterations': 0, 'max_node_dT': 0.0}
+
+        ## solve network temperatures
+        T_supply_nodes_K, \
+        T_return_nodes_K, \
+        plant_heat_requirement_kW, \
+        edge_mass_flow_kgs, \
+        q_loss_supply_edges_kW = solve_network_temperatures(locator, gv, T_ground_K, edge_node_df_t, all_nodes_df,
+                                                            edge_mass_flow_df_kgs.ix[t].copy(), K_pipe_kWK,
+                                                            t_target_supply_df, building_names, buildings_demands,
+                                                            substations_HEX_specs, t, network_type,
+                                                            substation_table=substation_table,
+                                                            convergence=convergence)
+        edge_mass_flow_kgs = np.asarray(edge_mass_flow_kgs, dtype=float).ravel()
+
+        # calculate pressure at each node and pressure drop throughout the entire network
+        P_supply_nodes_Pa, P_return_nodes_Pa, delta_P_network_Pa = calc_pressure_nodes(edge_node_df_t, pipe_diameter_m,
+                                                                                       pipe_length_m,
+                                                                                       edge_mass_flow_kgs,
+                                                                                       T_supply_nodes_K,
+                                                                                       T_return_nodes_K, gv)
+
+        # store node temperatures and pressures, as well as plant heat requirement and overall pressure drop at each
+        # time step
+        results_t = {'T_supply_nodes_K': T_supply_nodes_K,
+                     'T_return_nodes_K': T_return_nodes_K,
+                     'plant_heat_requirement_kW': plant_heat_requirement_kW,
+                     'edge_mass_flow_kgs': edge_mass_flow_kgs,
+                     'q_loss_supply_edges_kW': q_loss_supply_edges_kW,
+                     'P_supply_nodes_Pa': P_supply_nodes_Pa[0],
+                     'P_return_nodes_Pa': P_return_nodes_Pa[0],
+                     'delta_P_network_Pa': delta_P_network_Pa,
+                     'supply_temperature_iterations': convergence['iterations'],
+                     'max_node_dT': convergence['max_node_dT']}
+        for name, values in results_t.items():
+            if name not in results:
+                results[name] = np.full((len(time_steps), np.size(values)), np.nan)
+            results[name][i] = values
+
+    return time_steps, results
+
+
+# the inputs shared by all the time steps of a worker process, set by `_initialize_worker`
+_worker_inputs = {}
+
+
+def _initialize_worker(*network_inputs):
+    _worker_inputs['network_inputs'] = network_inputs
+
+
+def _solve_time_steps_worker(time_steps):
+    """Solve a chunk of time steps in a worker process (see `solve_thermal_network_time_steps`)"""
+    return solve_thermal_network_time_steps(time_steps, *_worker_inputs['network_inputs'])
 
 
 # ===========================
@@ -233,6 +329,10 @@ def calc_mass_flow_edges(edge_node_df, mass_flow_substation_df, all_nodes_df):
     flow rates at each substation based on the method from Todini et al. (1987), Ikonen et al. (2016), Oppelt et al.
     (2016), etc.
 
+    The mass flows of all the time steps in `mass_flow_substation_df` are solved at once. For tree-shaped networks, the
+    flows are accumulated from the branch ends to the plant (see `calc_network_tree`), other networks are solved with
+    a sparse LU factorization of the edge-node matrix.
+
     :param edge_node_df: DataFrame consisting of n rows (number of nodes) and e columns (number of edges)
                          and indicating the direction of flow of each edge e at node n: if e points to n,
                          value is 1; if e leaves node n, -1; else, 0.                                       (n x e)
@@ -241,7 +341,7 @@ def calc_mass_flow_edges(edge_node_df, mass_flow_substation_df, all_nodes_df):
     :type edge_node_df: DataFrame
     :type mass_flow_substation_df: DataFrame
 
-    :return mass_flow_edge: matrix specifying the mass flow rate at each edge e at the given time step t
+    :return mass_flow_edge: matrix specifying the mass flow rate at each edge e at the given time step t    (t x e)
     :rtype mass_flow_edge: numpy.ndarray
 
     ..[Todini & Pilati, 1987] Todini & Pilati. "A gradient method for the analysis of pipe networks," in Computer
@@ -253,15 +353,116 @@ def calc_mass_flow_edges(edge_node_df, mass_flow_substation_df, all_nodes_df):
 
     """
 
-    ## remove one equation (at plant node) to build a well-determined matrix, A.
     plant_index = np.where(all_nodes_df['Type']=='PLANT')[0][0] # find index of the first plant node
-    A = edge_node_df.drop(edge_node_df.index[plant_index])
-    b = mass_flow_substation_df.T
-    b.drop(b.index[plant_index], inplace=True)
-    ## compute the exact solution of Ax = b
-    mass_flow_edge = np.round(np.transpose(np.linalg.solve(A.values, b.values)), decimals=5)
+    edge_node = np.asarray(edge_node_df, dtype=float)
+    mass_flow_substation = np.asarray(mass_flow_substation_df, dtype=float).T  # (n x t)
+
+    network_tree = calc_network_tree(edge_node, plant_index)
+    if network_tree is not None:
+        # the equation at the plant node is not needed: the flows are accumulated towards the plant
+        mass_flow_edge = calc_tree_edge_values(edge_node, network_tree, mass_flow_substation)
+        # as with solving the whole system of equations, a missing substation flow leaves the time step unsolved
+        mass_flow_edge[:, np.isnan(mass_flow_substation).any(axis=0)] = np.nan
+    else:
+        ## remove one equation (at plant node) to build a well-determined matrix, A.
+        A = scipy.sparse.csc_matrix(np.delete(edge_node, plant_index, axis=0))
+        b = np.delete(mass_flow_substation, plant_index, axis=0)
+        ## compute the exact solution of Ax = b
+        mass_flow_edge = scipy.sparse.linalg.splu(A).solve(b)
+
+    return np.round(np.transpose(mass_flow_edge), decimals=5)
+
+
+def calc_network_tree(edge_node, root_index):
+    """
+    Orders the nodes of a tree-shaped network breadth-first, starting from the root node (e.g. the plant). Each node
+    (except the root) is connected to its parent node (the node closer to the root) by exactly one edge, so the
+    equations of the edge-node matrix can be solved node by node in this order (or the reverse order) instead of solving
+    the whole system of equations.
+
+    :param edge_node: edge-node matrix, if e points to n, value is 1; if e leaves node n, -1; else, 0.          (n x e)
+    :param root_index: index of the root node
+    :type edge_node: ndarray
+    :type root_index: int
+
+    :return: the node indices in breadth-first order, and the parent edge and parent node of each node (-1 for the
+             root) - or None if the network is not a tree (it has loops or it is not connected)
+    :rtype: (list, list, list)
+    """
+    number_of_nodes, number_of_edges = edge_node.shape
+    if number_of_edges != number_of_nodes - 1:
+        return None
+    edges_of_node = scipy.sparse.csr_matrix(edge_node)
+    nodes_of_edge = edges_of_node.tocsc()
+    # plain lists, as the network is traversed one node at a time
+    node_indptr, node_edges = edges_of_node.indptr.tolist(), edges_of_node.indices.tolist()
+    edge_indptr, edge_nodes = nodes_of_edge.indptr.tolist(), nodes_of_edge.indices.tolist()
+
+    parent_edge = [-1] * number_of_nodes
+    parent_node = [-1] * number_of_nodes
+    visited = [False] * number_of_nodes
+    visited[root_index] = True
+    node_order = [root_index]
+    for node in node_order:
+        for edge in node_edges[node_indptr[node]:node_indptr[node + 1]]:
+            if edge == parent_edge[node]:
+                continue
+            for other_node in edge_nodes[edge_indptr[edge]:edge_indptr[edge + 1]]:
+                if other_node == node:
+                    continue
+                if visited[other_node]:
+                    return None  # loop
+                visited[other_node] = True
+                parent_edge[other_node] = edge
+                parent_node[other_node] = node
+                node_order.append(other_node)
+    if len(node_order) != number_of_nodes:
+        return None
+    return node_order, parent_edge, parent_node
+
+
+def calc_tree_edge_values(edge_node, network_tree, node_values):
+    """
+    Solves ``edge_node * edge_values = node_values`` for a tree-shaped network (e.g. the edge mass flows from the
+    substation mass flows), going from the branch ends to the root node: the value of the edge to the parent node is
+    what is left at each node after its other edges. The equation at the root node is not used.
+
+    :param edge_node: edge-node matrix                                                                          (n x e)
+    :param network_tree: as returned by `calc_network_tree`
+    :param node_values: value at each node, for one or several time steps                                  (n x t)
+    :return: value at each edge                                                                            (e x t)
+    :rtype: ndarray
+    """
+    node_order, parent_edge, parent_node = network_tree
+    remaining = np.array(node_values, dtype=float)
+    edge_values = np.zeros((edge_node.shape[1],) + remaining.shape[1:])
+    for node in node_order[:0:-1]:
+        edge = parent_edge[node]
+        edge_values[edge] = remaining[node] / edge_node[node, edge]
+        remaining[parent_node[node]] -= edge_node[parent_node[node], edge] * edge_values[edge]
+    return edge_values
+
 
-    return mass_flow_edge
+def calc_tree_node_values(edge_node, network_tree, edge_values):
+    """
+    Solves ``edge_node.T * node_values = edge_values`` for a tree-shaped network (e.g. the node pressures from the
+    pressure losses of the edges), going from the root node to the branch ends. The node values are only defined up to
+    a constant, the solution with the minimum norm is returned (as with a least squares solution).
+
+    :param edge_node: edge-node matrix                                                                          (n x e)
+    :param network_tree: as returned by `calc_network_tree`
+    :param edge_values: value at each edge, for one or several time steps                                  (e x t)
+    :return: value at each node                                                                            (n x t)
+    :rtype: ndarray
+    """
+    node_order, parent_edge, parent_node = network_tree
+    edge_values = np.asarray(edge_values, dtype=float)
+    node_values = np.zeros((edge_node.shape[0],) + edge_values.shape[1:])
+    for node in node_order[1:]:
+        edge = parent_edge[node]
+        node_values[node] = (edge_values[edge] - edge_node[parent_node[node], edge] * node_values[parent_node[node]]) \
+                            / edge_node[node, edge]
+    return node_values - node_values.mean(axis=0)
 
 
 def assign_pipes_to_edges(mass_flow_df, locator, gv, set_diameter, edge_df, network_type):
@@ -283,7 +484,7 @@ def assign_pipes_to_edges(mass_flow_df, locator, gv, set_diameter, edge_df, netw
     """
 
     # import pipe catalog from Excel file
-    pipe_catalog = pd.read_excel(locator.get_thermal_networks(),sheetname=['PIPING CATALOG'])['PIPING CATALOG']
+    pipe_catalog = xlsreader.read_excel(locator.get_thermal_networks(), 'PIPING CATALOG')
     pipe_catalog['mdot_min_kgs'] = pipe_catalog['Vdot_min_m3s'] * gv.Pwater
     pipe_catalog['mdot_max_kgs'] = pipe_catalog['Vdot_max_m3s'] * gv.Pwater
     pipe_properties_df = pd.DataFrame(data=None, index=pipe_catalog.columns.values, columns=mass_flow_df.columns.values)
@@ -372,11 +573,19 @@ def calc_pressure_nodes(edge_node_df, pipe_diameter, pipe_length, edge_mass_flow
     # solve for the pressure at each node based on Eq. 1 in Todini & Pilati for no = 0 (no nodes with fixed head):
     # A12 * H + F(Q) = -A10 * H0 = 0
     # edge_node_transpose * pressure_nodes = - (pressure_loss_pipe) (Ax = b)
-    edge_node_transpose = np.transpose(edge_node_df.values)
-    pressure_nodes_supply_Pa = np.round(
-        np.transpose(np.linalg.lstsq(edge_node_transpose, np.transpose(pressure_loss_pipe_supply_Pa)*(-1))[0]), decimals=9)
-    pressure_nodes_return_Pa = np.round(
-        np.transpose(np.linalg.lstsq(-edge_node_transpose, np.transpose(pressure_loss_pipe_return_Pa)*(-1))[0]), decimals=9)
+    edge_node = np.asarray(edge_node_df, dtype=float)
+    network_tree = calc_network_tree(edge_node, 0)
+    if network_tree is not None:
+        pressure_nodes_supply_Pa = np.round(np.transpose(
+            calc_tree_node_values(edge_node, network_tree, np.transpose(pressure_loss_pipe_supply_Pa)*(-1))), decimals=9)
+        pressure_nodes_return_Pa = np.round(np.transpose(
+            calc_tree_node_values(-edge_node, network_tree, np.transpose(pressure_loss_pipe_return_Pa)*(-1))), decimals=9)
+    else:
+        edge_node_transpose = np.transpose(edge_node)
+        pressure_nodes_supply_Pa = np.round(
+            np.transpose(np.linalg.lstsq(edge_node_transpose, np.transpose(pressure_loss_pipe_supply_Pa)*(-1))[0]), decimals=9)
+        pressure_nodes_return_Pa = np.round(
+            np.transpose(np.linalg.lstsq(-edge_node_transpose, np.transpose(pressure_loss_pipe_return_Pa)*(-1))[0]), decimals=9)
     return pressure_nodes_supply_Pa, pressure_nodes_return_Pa, pressure_loss_system_Pa
 
 
@@ -388,11 +597,10 @@ def change_to_edge_node_matrix_t(edge_mass_flow, edge_node_df):
     :param edge_node_df: edge node matrix
     :return:
     """
-    while edge_mass_flow.min() < 0:
-        for i in range(len(edge_mass_flow)):
-            if edge_mass_flow[i] < 0:
-                edge_mass_flow[i] = abs(edge_mass_flow[i])
-                edge_node_df[edge_node_df.columns[i]] = -edge_node_df[edge_node_df.columns[i]]
+    negative_flow = np.asarray(edge_mass_flow) < 0
+    if negative_flow.any():
+        edge_mass_flow[negative_flow] = abs(edge_mass_flow[negative_flow])
+        edge_node_df.iloc[:, negative_flow] = -edge_node_df.iloc[:, negative_flow]
 
 
 def calc_pressure_loss_pipe(pipe_diameter_m, pipe_length_m, mass_flow_rate_kgs, temperature_K, gv):
@@ -606,7 +814,7 @@ def calc_edge_temperatures(temperature_node, edge_node):
 
 def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df, edge_mass_flow_df, K,
                                t_target_supply_df, building_names, buildings_demands, substations_HEX_specs, t,
-                               network_type):
+                               network_type, substation_table=None, convergence=None):
     """
     This function calculates the node temperatures at time-step t accounting for heat losses throughout the network.
     There is one iteration to determine weather the substation supply temperature and the substation mass flow are
@@ -636,6 +844,10 @@ def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df
     :param t: current time step
     :param network_type: a string that defines whether the network is a district heating ('DH') or cooling
                         ('DC') network
+    :param substation_table: the demands of the substations (see `substation_matrix.calc_substation_table`), created
+                             from `buildings_demands` if not given
+    :param convergence: a dictionary updated with the number of iterations (``iterations``) and the remaining maximum
+                        difference of the substation supply temperatures (``max_node_dT``) of the time step
 
     :type locator: InputLocator
     :type gv: GlobalVariables
@@ -646,6 +858,7 @@ def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df
     :type substations_HEX_specs: DataFrame
     :type network_type: str
     :type t_target_supply_df: DataFrame
+    :type convergence: dict
 
     :returns T_supply_nodes: list of supply line node temperatures (nx1)
     :rtype T_supply_nodes: list of arrays
@@ -656,6 +869,9 @@ def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df
 
     """
 
+    if substation_table is None:
+        substation_table = substation.calc_substation_table(buildings_demands, substations_HEX_specs)
+
     if edge_mass_flow_df.values.sum() != 0 :
         ## change pipe flow directions in the edge_node_df_t according to the flow conditions
         change_to_edge_node_matrix_t(edge_mass_flow_df, edge_node_df)
@@ -677,7 +893,8 @@ def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df
             T_return_all_K, \
                 mdot_all_kgs = substation.substation_return_model_main(locator, gv, consumer_building_names, buildings_demands,
                                                                    substations_HEX_specs, T_substation_supply_K, t,
-                                                                   network_type, t_flag=False)
+                                                                   network_type, t_flag=False,
+                                                                   substation_table=substation_table)
             if mdot_all_kgs.values.max() is np.nan:
                 print ('Error in edge mass flow! Check edge_mass_flow_df')
 
@@ -689,10 +906,7 @@ def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df
             edge_mass_flow_df_2_kgs = calc_mass_flow_edges(edge_node_df, mass_flow_substations_nodes_df, all_nodes_df)
             edge_node_df_2 = edge_node_df.copy()
             while edge_mass_flow_df_2_kgs.min() < 0:
-                for i in range(len(edge_mass_flow_df_2_kgs[0])):
-                    if edge_mass_flow_df_2_kgs[0][i] < 0:
-                        edge_mass_flow_df_2_kgs[0][i] = abs(edge_mass_flow_df_2_kgs[0][i])
-                        edge_node_df_2[edge_node_df_2.columns[i]] = -edge_node_df_2[edge_node_df_2.columns[i]]
+                change_to_edge_node_matrix_t(edge_mass_flow_df_2_kgs[0], edge_node_df_2)
                 edge_mass_flow_df_2_kgs = calc_mass_flow_edges(edge_node_df_2, mass_flow_substations_nodes_df, all_nodes_df)
 
             # calculate updated node temperatures on the supply network with updated edge mass flow
@@ -714,32 +928,28 @@ def solve_network_temperatures(locator, gv, T_ground, edge_node_df, all_nodes_df
             if max_node_dT > 1 and iteration < 10:
                 # update the substation supply temperature and re-enter the iteration
                 T_substation_supply_K = T_substation_supply_2
-                print (iteration, 'iteration. Maximum node temperature difference:', max_node_dT)
                 iteration += 1
             elif max_node_dT > 10 and 20 > iteration >= 10:
                 # FIXME: This is to avoid endless iteration, other design strategies should be implemented.
                 # update the substation supply temperature and re-enter the iteration
                 T_substation_supply_K = T_substation_supply_2
-                print (iteration, 'iteration. Maximum node temperature difference:', max_node_dT)
                 iteration += 1
             else:
                 # calculate substation return temperatures according to supply temperatures
                 T_return_all_2, \
                     mdot_all_2 = substation.substation_return_model_main(locator, gv, building_names, buildings_demands,
                                                                        substations_HEX_specs, T_substation_supply_2, t,
-                                                                       network_type, t_flag=False)
+                                                                       network_type, t_flag=False,
+                                                                       substation_table=substation_table)
                 # write consumer substation return T and required flow rate to nodes
                 T_substation_return_df_2 = write_substation_temperatures_to_nodes_df(all_nodes_df, T_return_all_2)  # (1xn)
                 mass_flow_substations_nodes_df_2 = write_substation_massflows_to_nodes_df(all_nodes_df, mdot_all_2)
                 # solve for the required mass flow rate on each pipe, using the nominal edge node matrix
                 edge_mass_flow_df_2_kgs = calc_mass_flow_edges(edge_node_df, mass_flow_substations_nodes_df_2, all_nodes_df)
-                # exit iteration
+                # exit iteration (the supply temperatures did not converge if max_node_dT >= 1)
                 flag = 1
-                if max_node_dT < 1:
-                    print('supply temperature converged after', iteration, 'iterations', 'dT:', max_node_dT)
-                else:
-                    print('Warning: supply temperature did not converge after', iteration, 'iterations at timestep', t,
-                          'dT:', max_node_dT)
+                if convergence is not None:
+                    convergence.update(iterations=iteration, max_node_dT=max_node_dT)
 
         # calculate node temperatures on the return network
         edge_mass_flow_df_t = calc_mass_flow_edges(edge_node_df_2, mass_flow_substations_nodes_df_2, all_nodes_df)  # edge-node matrix with no negative flow at the current time-step
@@ -835,10 +1045,10 @@ def write_nodes_to_substations_1(T_supply_nodes, all_nodes_df, plant_node):
 def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_target_supply_C, network_type):
     """
     This function calculate the node temperatures considering heat losses in the supply network.
-    Starting from the plant supply node, the function go through the edge-node index to search for the outlet node, and
-    calculate the outlet node temperature after heat loss. And starting from the outlet node, the function calculates
-    the node temperature at the corresponding pipe outlet, and the calculation goes on until all the node temperatures
-    are solved. At nodes connecting to multiple pipes, the mixing temperature is calculated.
+    Starting from the plant supply node, the node temperatures are calculated along the direction of flow (see
+    `calc_flow_order` and `calc_supply_node_temperatures`): the outlet temperature of each pipe is calculated from the
+    temperature of its inlet node after heat loss, and at nodes connecting to multiple pipes, the mixing temperature is
+    calculated.
 
     :param gv: an instance of globalvar.GlobalVariables with the constants  to use (like `list_uses` etc.)
     :param T_ground_K: vector with ground temperatures in K
@@ -862,18 +1072,12 @@ def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_ta
     :rtype plant_node: numpy array
 
     """
-    Z = np.asarray(edge_node_df)   # (nxe) edge-node matrix
-    Z_pipe_out = Z.clip(min=0)     # pipe outlet matrix
-    Z_pipe_in = Z.clip(max=0)      # pipe inlet matrix
-
-    M_d = np.zeros((Z.shape[1], Z.shape[1]))   # (exe) pipe mass flow rate matrix
-    np.fill_diagonal(M_d, mass_flow_df)
+    flow_order = calc_flow_order(edge_node_df)
+    mass_flow_edge_kgs = np.asarray(mass_flow_df, dtype=float).reshape(-1, 1)  # (e x 1)
+    K_edge = np.diag(K)
 
-    # matrices to store results
-    T_e_out = Z_pipe_out.copy()
-    T_e_in = Z_pipe_in.copy().dot(-1)
-    T_node = np.zeros(Z.shape[0])
-    Z_note = Z.copy()   # matrix to store information of solved nodes
+    # the node indices of the plant nodes in the edge-node index (the nodes without inflow, reached first)
+    plant_node = flow_order[0][0]
 
     # start node temperature calculation
     flag = 0
@@ -882,41 +1086,10 @@ def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_ta
     T_plant_sup = T_plant_sup_0
     iteration = 0
     while flag == 0:
-        # # calculate the pipe outlet temperature from the plant node
-        for i in range(Z.shape[0]):
-            if np.argwhere(Z[i]==1).size == 0:  # find plant node
-                    # write plant inlet temperature
-                    T_node[i] = T_plant_sup   # assume plant inlet temperature
-                    edge = np.where(T_e_in[i]!=0)[0]   # find edge index
-                    T_e_in[i] = T_e_in[i]*T_node[i]
-                    # calculate pipe outlet temperature
-                    calc_t_out(i, edge, K, M_d, Z, T_e_in, T_e_out, T_ground_K, Z_note, gv)
-        plant_node = T_node.nonzero()[0]   # the node indices of the plant nodes in the edge-node index
-
-        # # calculate pipe outlet temperature and node temperature for the rest
-        while np.count_nonzero(T_node == 0) > 0:
-            for j in range(Z.shape[0]):
-                # check if all inlet flow info towards node j are known (only -1 left in row Z_note[j])
-                if np.count_nonzero(Z_note[j] == 1) == 0 and np.count_nonzero(Z_note[j] == 0) != Z.shape[1]:
-                    # calculate node temperature with merging flows from pipes
-                    part1 = np.dot(M_d, T_e_out[j]).sum()
-                    part2 = np.dot(M_d, Z_pipe_out[j]).sum()
-                    T_node[j] = part1 / part2
-                    # write the node temperature to the corresponding pipe inlet
-                    T_e_in[j] = T_e_in[j] * T_node[j]
-
-                    # calculate pipe outlet temperatures entering from node j
-                    for edge in range(Z_note.shape[1]):
-                        # find the pipes with water flow leaving from node j
-                        if T_e_in[j, edge] != 0:
-                            # calculate the pipe outlet temperature entering from node j
-                            calc_t_out(j, edge, K, M_d, Z, T_e_in, T_e_out, T_ground_K, Z_note, gv)
-
-                # fill in temperatures for nodes at network branch ends
-                elif T_node[j] == 0 and T_e_out[j].max() != 1:
-                    T_node[j] = np.nan if np.isnan(T_e_out[j]).any() else T_e_out[j].max()
-                elif T_e_out[j].min() < 0:
-                    print('negative node temperature!')
+        # calculate the pipe outlet temperatures and the node temperatures, starting from the plant node
+        T_node, T_edge_in, T_edge_out = calc_supply_node_temperatures(flow_order, T_plant_sup, T_ground_K,
+                                                                      mass_flow_edge_kgs, K_edge, gv)
+        T_node = T_node[:, 0]
 
         # # iterate the plant supply temperature until all the node temperature reaches the target temperatures
         if network_type is 'DH':
@@ -929,12 +1102,6 @@ def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_ta
                     # increase plant supply temperature and re-iterate the node supply temperature calculation
                     # increase by the maximum amount of temperature deficit at nodes
                     T_plant_sup = T_plant_sup + abs(dT.min())
-
-                    # reset the matrices for supply network temperature calculation
-                    Z_note = Z.copy()
-                    T_e_out = Z_pipe_out.copy()
-                    T_e_in = Z_pipe_in.copy().dot(-1)
-                    T_node = np.zeros(Z.shape[0])
                     iteration += 1
 
             elif all(dT > -0.1) is False and (T_plant_sup - T_plant_sup_0) >= 60:
@@ -961,10 +1128,6 @@ def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_ta
                 # increase plant supply temperature and re-iterate the node supply temperature calculation
                 # increase by the maximum amount of temperature deficit at nodes
                 T_plant_sup = T_plant_sup - abs(dT.max())
-                Z_note = Z.copy()
-                T_e_out = Z_pipe_out.copy()
-                T_e_in = Z_pipe_in.copy().dot(-1)
-                T_node = np.zeros(Z.shape[0])
                 iteration += 1
             elif all(dT < 0.1) is False and (T_plant_sup_0 - T_plant_sup) >= 10:
                 # end iteration if total network temperature rise is higher than 10 K
@@ -981,12 +1144,10 @@ def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_ta
                 flag = 1
 
     # calculate pipe heat losses
-    q_loss_edges_kW = np.zeros(Z_note.shape[1])
-    for edge in range(Z_note.shape[1]):
-        if M_d[edge,edge] > 0:
-            dT_edge = T_e_in[:, edge].max() - T_e_out[:,edge].max()
-            q_loss_edges_kW[edge] = M_d[edge,edge] * gv.Cpw * dT_edge  # kW
-
+    q_loss_edges_kW = np.zeros(len(K_edge))
+    edges_with_flow = mass_flow_edge_kgs[:, 0] > 0
+    dT_edge = T_edge_in[edges_with_flow, 0] - T_edge_out[edges_with_flow, 0]
+    q_loss_edges_kW[edges_with_flow] = mass_flow_edge_kgs[edges_with_flow, 0] * gv.Cpw * dT_edge  # kW
 
     return T_node.T, plant_node, q_loss_edges_kW
 
@@ -994,10 +1155,10 @@ def calc_supply_temperatures(gv, T_ground_K, edge_node_df, mass_flow_df, K, t_ta
 def calc_return_temperatures(gv, T_ground, edge_node_df, mass_flow_df, mass_flow_substation_df, K, t_return):
     """
     This function calculates the node temperatures considering heat losses in the return line.
-    Starting from the substations at the end branches, the function goes through the edge-node index to search for the
-    outlet node, and calculates the outlet node temperature after heat loss. Starting from that outlet node, the function
-    calculates the node temperature at the corresponding pipe outlet, and the calculation goes on until all the node
-    temperatures are solved. At nodes connecting to multiple pipes, the mixing temperature is calculated.
+    Starting from the substations at the end branches, the node temperatures are calculated along the direction of flow
+    in the return line (see `calc_flow_order` and `calc_return_node_temperatures`): the outlet temperature of each pipe
+    is calculated from the temperature of its inlet node after heat loss, and at nodes connecting to multiple pipes
+    and substations, the mixing temperature is calculated.
 
     :param gv: an instance of globalvar.GlobalVariables with the constants  to use (like `list_uses` etc.)
     :param T_ground: vector with ground temperatures in K
@@ -1013,146 +1174,192 @@ def calc_return_temperatures(gv, T_ground, edge_node_df, mass_flow_df, mass_flow
     :rtype T_node.T: list
 
     """
-
-    Z = np.asarray(edge_node_df) * (-1)  # (n x e) edge-node matrix
-    Z_pipe_out = Z.clip(min=0)     # pipe outlet matrix
-    Z_pipe_in = Z.clip(max=0)      # pipe inlet matrix
-
-    M_sub = np.zeros((Z.shape[0], Z.shape[0]))    # (nxn) substation flow rate matrix
-    np.fill_diagonal(M_sub, mass_flow_substation_df)
-
-    M_d = np.zeros((Z.shape[1], Z.shape[1]))   # (exe) pipe mass flow rate matrix
-    np.fill_diagonal(M_d, mass_flow_df)
-
-    # matrices to store results
-    T_e_out = Z_pipe_out.copy()
-    T_e_in = Z_pipe_in.copy().dot(-1)
-    T_node = np.zeros(Z.shape[0])
-    Z_note = Z.copy()   # matrix to store information of solved nodes
-
-    # calculate the return pipe node temperature of substations locating at the end of the branch
-    for i in range(Z.shape[0]):
-            # choose the consumer nodes locating at the end of the branches
-            if np.count_nonzero(Z[i] == 1) == 0 and np.count_nonzero(Z[i] == 0) != Z.shape[1]:
-                T_node[i] = t_return.values[0,i]
-                # T_node[i] = map(list, t_return.values)[0][i]
-                for edge in range(Z_note.shape[1]):
-                    if T_e_in[i, edge] != 0:
-                        T_e_in[i, edge] = map(list, t_return.values)[0][i]
-                        # calculate pipe outlet
-                        calc_t_out(i, edge, K, M_d, Z, T_e_in, T_e_out, T_ground, Z_note, gv)
-
-    while Z_note.max() >= 1:
-            for j in range(Z.shape[0]):
-                if (np.count_nonzero(Z_note[j] == 1) == 0 and np.count_nonzero(Z_note[j] == 0) != Z.shape[1]):
-                    # calculate node temperature with merging flows from pipes
-                    T_node[j] = calc_return_node_temperature(j, M_d, T_e_out, t_return, Z_pipe_out, M_sub)
-                    for edge in range(Z_note.shape[1]):
-                        if T_e_in[j, edge]!=0:
-                            T_e_in[j, edge]=T_node[j]
-                            # calculate pipe outlet
-                            calc_t_out(j, edge, K, M_d, Z, T_e_in, T_e_out, T_ground, Z_note, gv)
-                if np.argwhere(Z_note[j]==0).size == Z.shape[1] and T_node[j]==0:
-                    T_node[j] = calc_return_node_temperature(j, M_d, T_e_out, t_return, Z_pipe_out, M_sub)
-
-    # calculate temperature with merging flows from pipes at the plant node
-    if len(np.where(T_node==0)[0]) != 0:
-        node_index = np.where(T_node == 0)[0][0]
-        M_sub[node_index] = 0
-        T_node[node_index] = calc_return_node_temperature(node_index, M_d, T_e_out, t_return, Z_pipe_out, M_sub)
-
-    return T_node
+    # the water flows in the opposite direction in the return line
+    flow_order = calc_flow_order(np.asarray(edge_node_df) * (-1))
+    T_node = calc_return_node_temperatures(flow_order, np.asarray(t_return, dtype=float).T, T_ground,
+                                           np.asarray(mass_flow_df, dtype=float).reshape(-1, 1),
+                                           np.asarray(mass_flow_substation_df, dtype=float).T, np.diag(K), gv)
+    return T_node[:, 0]
 
 
-def calc_return_node_temperature(index, M_d, T_e_out, t_return, Z_pipe_out, M_sub):
+def calc_flow_order(edge_node):
     """
-    The function calculates the node temperature with merging flows from pipes in the return line.
-
-    :param index: node index
-    :param M_d: pipe mass flow matrix (exe)
-    :param T_e_out: pipe outlet temperatures in edge node matrix (nxe)
-    :param t_return: list of substation return temperatures
-    :param Z_pipe_out: pipe outlet matrix (nxe)
-    :param M_sub: DataFrame substation flow rate
-
-    :type index: float
-    :type M_d: DataFrame
-    :type T_e_out: DataFrame
-    :type t_return: list
-    :type Z_pipe_out: DataFrame
-    :type M_sub: DataFrame
-
-    :returns T_node: node temperature with merging flows in the return line
-    :rtype T_node: float
-
+    Orders the nodes of the network along the direction of flow, starting from the nodes without inflow (e.g. the plant
+    nodes in the supply line). The nodes are grouped in steps: the nodes of a step are reached once the temperatures of
+    all the pipes flowing into them are known, i.e. after the previous steps, so the node temperatures are calculated
+    one step at a time in a single pass through the network.
+
+    :param edge_node: edge-node matrix, if e points to n, value is 1; if e leaves node n, -1; else, 0.          (n x e)
+    :type edge_node: ndarray or DataFrame
+
+    :return: for each step, the nodes reached, the edges flowing into these nodes (grouped by node), the index of the
+             first edge of each node in these edges, the edges flowing out of these nodes and the node each of these
+             edges flows out of
+    :rtype: list of tuple
     """
-    total_mass_flow_to_node = np.dot(M_d, Z_pipe_out[index]).sum() + M_sub[index].max()
-    if total_mass_flow_to_node == 0:
-        # set node temperature to nan if no flow to node
-        T_node = np.nan
-    else:
-        total_mcp_from_edges = np.dot(M_d, np.nan_to_num(T_e_out[index])).sum()
-        total_mcp_from_substations = 0 if M_sub[index].max()==0 else np.dot(M_sub[index].max(), t_return.values[0,
-                                                                                                                index])
-        T_node = (total_mcp_from_edges + total_mcp_from_substations) / total_mass_flow_to_node
+    edges_of_node = scipy.sparse.csr_matrix(np.asarray(edge_node, dtype=float))
+    number_of_nodes, number_of_edges = edges_of_node.shape
+    # plain lists, as the network is traversed one node at a time
+    indptr, indices, data = edges_of_node.indptr.tolist(), edges_of_node.indices.tolist(), edges_of_node.data.tolist()
+
+    inlet_edges = [[] for _ in range(number_of_nodes)]
+    outlet_edges = [[] for _ in range(number_of_nodes)]
+    outlet_node = [-1] * number_of_edges
+    for node in range(number_of_nodes):
+        for edge, direction in zip(indices[indptr[node]:indptr[node + 1]], data[indptr[node]:indptr[node + 1]]):
+            if direction > 0:
+                inlet_edges[node].append(edge)
+                outlet_node[edge] = node
+            else:
+                outlet_edges[node].append(edge)
+
+    unknown_inlets = [len(edges) for edges in inlet_edges]
+    nodes = [node for node in range(number_of_nodes) if unknown_inlets[node] == 0]
+    flow_order = []
+    number_of_nodes_reached = 0
+    while nodes:
+        number_of_nodes_reached += len(nodes)
+        inlets = [edge for node in nodes for edge in inlet_edges[node]]
+        first_inlet = np.cumsum([0] + [len(inlet_edges[node]) for node in nodes[:-1]])
+        outlets = [edge for node in nodes for edge in outlet_edges[node]]
+        outlet_from = [node for node in nodes for _ in outlet_edges[node]]
+        flow_order.append((np.array(nodes), np.array(inlets, dtype=int), first_inlet, np.array(outlets, dtype=int),
+                           np.array(outlet_from, dtype=int)))
+        # a node is reached once the temperatures of all the pipes flowing into it are known
+        next_nodes = []
+        for edge in outlets:
+            unknown_inlets[outlet_node[edge]] -= 1
+            if unknown_inlets[outlet_node[edge]] == 0:
+                next_nodes.append(outlet_node[edge])
+        nodes = next_nodes
+    if number_of_nodes_reached != number_of_nodes:
+        raise ValueError('The flow directions in the network form a loop, the node temperatures can not be calculated.')
+    return flow_order
+
+
+def calc_supply_node_temperatures(flow_order, T_plant_supply_K, T_ground_K, mass_flow_edge_kgs, K_edge, gv):
+    """
+    Calculates the node temperatures of the supply line for a given plant supply temperature, going through the nodes
+    in the order of flow (see `calc_flow_order`). The plant nodes are at the plant supply temperature, the other nodes
+    at the mixing temperature of the pipes flowing into them (the highest pipe outlet temperature at the branch ends).
+    Nodes (and pipes) downstream of a pipe without flow have no temperature (nan).
+
+    Several time steps with the same flow directions can be calculated at once.
+
+    :param flow_order: as returned by `calc_flow_order` for the supply line
+    :param T_plant_supply_K: plant supply temperature at each time step                                        (t)
+    :param T_ground_K: ground temperature at each time step                                                    (t)
+    :param mass_flow_edge_kgs: mass flow rate of each edge at each time step                               (e x t)
+    :param K_edge: aggregated heat conduction coefficient of each edge                                          (e)
+    :param gv: an instance of globalvar.GlobalVariables with the constants to use
+
+    :return: the temperature of each node (n x t), and the inlet and outlet temperatures of each edge (e x t)
+    :rtype: (ndarray, ndarray, ndarray)
+    """
+    K_edge = np.asarray(K_edge, dtype=float).reshape(-1, 1)
+    number_of_nodes = sum(len(nodes) for nodes, _, _, _, _ in flow_order)
+    T_node = np.zeros((number_of_nodes, mass_flow_edge_kgs.shape[1]))
+    T_edge_in = np.full(mass_flow_edge_kgs.shape, np.nan)
+    T_edge_out = np.full(mass_flow_edge_kgs.shape, np.nan)
+
+    for nodes, inlets, first_inlet, outlets, outlet_from in flow_order:
+        if inlets.size == 0:
+            # plant nodes
+            T_node[nodes] = T_plant_supply_K
+        else:
+            # calculate node temperature with merging flows from pipes
+            mass_flow = mass_flow_edge_kgs[inlets]
+            with np.errstate(divide='ignore', invalid='ignore'):
+                T_mixing = np.add.reduceat(mass_flow * T_edge_out[inlets], first_inlet) / np.add.reduceat(mass_flow,
+                                                                                                        first_inlet)
+            # fill in temperatures for nodes at network branch ends
+            T_branch_end = np.maximum.reduceat(T_edge_out[inlets], first_inlet)
+            T_node[nodes] = np.where(np.in1d(nodes, outlet_from)[:, None], T_mixing, T_branch_end)
+
+        # calculate pipe outlet temperatures entering from the nodes
+        if outlets.size > 0:
+            T_edge_in[outlets] = T_node[outlet_from]
+            T_edge_out[outlets] = calc_pipe_outlet_temperature(T_edge_in[outlets], mass_flow_edge_kgs[outlets],
+                                                               K_edge[outlets], T_ground_K, gv)
+
+    return T_node, T_edge_in, T_edge_out
+
+
+def calc_return_node_temperatures(flow_order, T_substation_return_K, T_ground_K, mass_flow_edge_kgs,
+                                  mass_flow_substation_kgs, K_edge, gv):
+    """
+    Calculates the node temperatures of the return line, going through the nodes in the order of flow (see
+    `calc_flow_order`). The substations at the branch ends are at their return temperature, the other nodes at the
+    mixing temperature of the pipes and the substation flowing into them. Nodes without flow have no temperature (nan).
+
+    Several time steps with the same flow directions can be calculated at once.
+
+    :param flow_order: as returned by `calc_flow_order` for the return line
+    :param T_substation_return_K: return temperature of the substation at each node at each time step       (n x t)
+    :param T_ground_K: ground temperature at each time step                                                    (t)
+    :param mass_flow_edge_kgs: mass flow rate of each edge at each time step                               (e x t)
+    :param mass_flow_substation_kgs: mass flow rate of the substation at each node at each time step       (n x t)
+    :param K_edge: aggregated heat conduction coefficient of each edge                                          (e)
+    :param gv: an instance of globalvar.GlobalVariables with the constants to use
+
+    :return: the temperature of each node                                                                  (n x t)
+    :rtype: ndarray
+    """
+    K_edge = np.asarray(K_edge, dtype=float).reshape(-1, 1)
+    T_node = np.zeros(T_substation_return_K.shape)
+    T_edge_out = np.full(mass_flow_edge_kgs.shape, np.nan)
+    # only the substations return water to the network (the flow at the plant nodes is negative)
+    mass_flow_substation_kgs = np.maximum(mass_flow_substation_kgs, 0)
+
+    for nodes, inlets, first_inlet, outlets, outlet_from in flow_order:
+        if inlets.size == 0:
+            # substations at the end of the branches
+            T_node[nodes] = T_substation_return_K[nodes]
+        else:
+            # calculate node temperature with merging flows from pipes and substations
+            mass_flow = mass_flow_edge_kgs[inlets]
+            mass_flow_substation = mass_flow_substation_kgs[nodes]
+            total_mass_flow_to_node = np.add.reduceat(mass_flow, first_inlet) + mass_flow_substation
+            total_mcp_from_edges = np.add.reduceat(mass_flow * np.nan_to_num(T_edge_out[inlets]), first_inlet)
+            total_mcp_from_substations = np.where(mass_flow_substation == 0, 0,
+                                                  mass_flow_substation * T_substation_return_K[nodes])
+            with np.errstate(divide='ignore', invalid='ignore'):
+                T_node[nodes] = np.where(total_mass_flow_to_node == 0, np.nan,
+                                         (total_mcp_from_edges + total_mcp_from_substations) / total_mass_flow_to_node)
+
+        # calculate pipe outlet temperatures entering from the nodes
+        if outlets.size > 0:
+            T_edge_out[outlets] = calc_pipe_outlet_temperature(T_node[outlet_from], mass_flow_edge_kgs[outlets],
+                                                               K_edge[outlets], T_ground_K, gv)
+
     return T_node
 
 
-def calc_t_out(node, edge, K, M_d, Z, T_e_in, T_e_out, T_ground, Z_note, gv):
+def calc_pipe_outlet_temperature(T_in_K, mass_flow_kgs, K, T_ground_K, gv):
     """
     Given the pipe inlet temperature, this function calculate the outlet temperature of the pipe.
-    Following the reference of [Wang et al., 2016]_.
-
-    :param node: node index
-    :param edge: edge indices
-    :param K: DataFrame of aggregated heat conduction coefficient for each pipe (exe)
-    :param M_d: DataFrame of pipe flow rate (exe)
-    :param Z: DataFrame of  edge_node_matrix (nxe)
-    :param T_e_in: DataFrame of pipe inlet temperatures [K] in edge_node_matrix (nxe)
-    :param T_e_out: DataFrame of  pipe outlet temperatures [K] in edge_node_matrix (nxe)
-    :param T_ground: vector with ground temperatures in [K]
-    :param Z_note: DataFrame of the matrix to store information of solved nodes
-    :param gv: an instance of globalvar.GlobalVariables with the constants  to use (like `list_uses` etc.)
+    Following the reference of [Wang et al., 2016]_. The outlet temperature of a pipe without flow is nan.
 
-    :type node: float
-    :type edge: np array
-    :type K: DataFrame
-    :type M_d: DataFrame
-    :type Z: DataFrame
-    :type T_e_in: DataFrame
-    :type T_e_out: DataFrame
-    :type T_ground: list
-    :type Z_note: DataFrame
-    :type gv: GlobalVariables
+    :param T_in_K: pipe inlet temperatures [K]                                                              (e x t)
+    :param mass_flow_kgs: pipe mass flow rates [kg/s]                                                       (e x t)
+    :param K: aggregated heat conduction coefficient of each pipe [kW/K]                                    (e x 1)
+    :param T_ground_K: ground temperature at each time step [K]                                                (t)
+    :param gv: an instance of globalvar.GlobalVariables with the constants  to use (like `list_uses` etc.)
 
-    :returns The calculated pipe outlet temperatures are directly written to T_e_out
+    :returns T_out_K: pipe outlet temperatures [K]                                                          (e x t)
+    :rtype T_out_K: ndarray
 
     ..[Wang et al, 2016] Wang J., Zhou, Z., Zhao, J. (2016). A method for the steady-state thermal simulation of
     district heating systems and model parameters calibration. Eenergy Conversion and Management, 120, 294-305.
     """
-    # calculate pipe outlet temperature
-    if isinstance(edge, np.ndarray) is False:
-        edge = np.array([edge])
-
-    for i in range(edge.size):
-        e = edge[i]
-        k = K[e, e]
-        m = M_d[e, e]
-        out_node_index = np.where(Z[:, e] == 1)[0].max()
-        if abs(m) == 0 and Z[node, e] == -1:
-            # set outlet temperature to nan if no flow is going out from node to connected edges
-            T_e_out[out_node_index, e] = np.nan
-            Z_note[:, e] = 0
-
-        elif Z[node, e] == -1:
-            # calculate outlet temperature if flow goes from node to out_node through edge
-            T_e_out[out_node_index, e] = (T_e_in[node, e] * (k / 2 - m * gv.Cpw) - k * T_ground) / (
-            -m * gv.Cpw - k / 2)  # [K]
-            dT = T_e_in[node, e] - T_e_out[out_node_index, e]
-            if abs(dT) > 30:
-                print('High temperature loss on edge', e, '. Loss:', abs(dT))
-            Z_note[:, e] = 0
-
+    with np.errstate(divide='ignore', invalid='ignore'):
+        T_out_K = (T_in_K * (K / 2 - mass_flow_kgs * gv.Cpw) - K * T_ground_K) / (-mass_flow_kgs * gv.Cpw - K / 2)  # [K]
+    T_out_K = np.where(mass_flow_kgs == 0, np.nan, T_out_K)
+    dT = abs(T_in_K - T_out_K)
+    with np.errstate(invalid='ignore'):
+        if (dT > 30).any():
+            print('High temperature loss in pipe. Loss:', np.nanmax(dT))
+    return T_out_K
 
 
 def calc_aggregated_heat_conduction_coefficient(locator, gv, edge_df, pipe_properties_df):
@@ -1185,7 +1392,7 @@ def calc_aggregated_heat_conduction_coefficient(locator, gv, edge_df, pipe_prope
     ..[isoplus] isoplus piping systems. http://en.isoplus.dk/download-centre
     """
     L_pipe = edge_df['pipe length']
-    material_properties = pd.read_excel(locator.get_thermal_networks(), sheetname=['MATERIAL PROPERTIES'])['MATERIAL PROPERTIES']
+    material_properties = xlsreader.read_excel(locator.get_thermal_networks(), 'MATERIAL PROPERTIES')
     material_properties = material_properties.set_index(material_properties['material'].values)
     conductivity_pipe = material_properties.ix['Steel','lamda_WmK']   # _[A. Kecebas et al., 2011]
     conductivity_insulation = material_properties.ix['PUR','lamda_WmK']  # _[A. Kecebas et al., 2011]
@@ -1263,14 +1470,7 @@ def get_thermal_network_from_csv(locator, network_type):
     edge_df.rename(columns = {'LENGTH':'pipe length'}, inplace= True)  #todo: could be removed when the input format of .csv is fixed
     list_edges = edge_df['DC_ID']
     list_nodes = sorted(set(edge_df['NODE1']).union(set(edge_df['NODE2'])), key=lambda x: int(x[1:]))  # sort the list by node numbers
-    edge_node_matrix = np.zeros((len(list_nodes),len(list_edges)))
-    for j in range(len(list_edges)):
-        for i in range(len(list_nodes)):
-            if edge_df['NODE2'][j] == list_nodes[i]:
-                edge_node_matrix[i][j] = 1
-            elif edge_df['NODE1'][j] == list_nodes[i]:
-                edge_node_matrix[i][j] = -1
-    edge_node_df = pd.DataFrame(data=edge_node_matrix, index=list_nodes, columns=list_edges)
+    edge_node_df = calc_edge_node_matrix(list_nodes, list_edges, edge_df['NODE1'].values, edge_df['NODE2'].values)
     edge_node_df.to_csv(locator.get_optimization_network_edge_node_matrix_file(network_type))
 
     all_nodes_df = pd.DataFrame(index=list_nodes, columns=['Building','Type'])
@@ -1340,14 +1540,8 @@ def get_thermal_network_from_shapefile(locator, network_type):
     # create first edge-node matrix
     list_pipes = edge_df.index.values
     list_nodes = sorted(set(edge_df['start node']).union(set(edge_df['end node'])),key=lambda x : int(x[4:])) # sort the list by node numbers
-    edge_node_matrix = np.zeros((len(list_nodes), len(list_pipes)))
-    for j in range(len(list_pipes)):
-        for i in range(len(list_nodes)):
-            if edge_df['end node'][j] == list_nodes[i]:
-                edge_node_matrix[i][j] = 1
-            elif edge_df['start node'][j] == list_nodes[i]:
-                edge_node_matrix[i][j] = -1
-    edge_node_df = pd.DataFrame(data=edge_node_matrix, index=list_nodes, columns=list_pipes)  # first edge-node matrix
+    # first edge-node matrix
+    edge_node_df = calc_edge_node_matrix(list_nodes, list_pipes, edge_df['start node'].values, edge_df['end node'].values)
 
     # An edge node matrix is generated as a first guess and then virtual substation mass flows are imposed to
     # calculate mass flows in each edge (mass_flow_guess).
@@ -1381,6 +1575,34 @@ def get_thermal_network_from_shapefile(locator, network_type):
 
     return edge_node_df, all_nodes_df, edge_df
 
+def calc_edge_node_matrix(list_nodes, list_edges, start_nodes, end_nodes):
+    """
+    Creates the edge-node incidence matrix of a network from the start and end node of each edge.
+
+    :param list_nodes: the names of the nodes, in the order of the rows of the matrix
+    :param list_edges: the names of the edges, in the order of the columns of the matrix
+    :param start_nodes: the name of the start node of each edge
+    :param end_nodes: the name of the end node of each edge
+    :type list_nodes: list
+    :type list_edges: list
+    :type start_nodes: ndarray
+    :type end_nodes: ndarray
+
+    :return edge_node_df: DataFrame consisting of n rows (number of nodes) and e columns (number of edges) and
+                        indicating direction of flow of each edge e at node n: if e points to n, value is 1; if
+                        e leaves node n, -1; else, 0.                                                           (n x e)
+    :rtype edge_node_df: DataFrame
+    """
+    node_index = dict((node, i) for i, node in enumerate(list_nodes))
+    edge_node_matrix = np.zeros((len(list_nodes), len(start_nodes)))
+    for j in range(len(start_nodes)):
+        if start_nodes[j] in node_index:
+            edge_node_matrix[node_index[start_nodes[j]], j] = -1
+        if end_nodes[j] in node_index:
+            edge_node_matrix[node_index[end_nodes[j]], j] = 1
+    return pd.DataFrame(data=edge_node_matrix, index=list_nodes, columns=list_edges)
+
+
 def extract_network_from_shapefile(edge_shapefile_df, node_shapefile_df):
     """
     Extracts network data into DataFrames for pipes and nodes in the network
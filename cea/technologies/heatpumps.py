@@ -6,6 +6,8 @@ heatpumps
 from __future__ import division
 from math import floor, log
 
+import numpy as np
+
 
 __author__ = "Thuy-An Nguyen"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -23,7 +25,8 @@ __status__ = "Production"
 
 def calc_Cop_GHP(mdot_kgpers, T_DH_sup_K, T_re_K, tground_K, gV):
     """
-    For the operation of a Geothermal heat pump (GSHP) supplying DHN.
+    For the operation of a Geothermal heat pump (GSHP) supplying DHN. The inputs can be arrays (one value per time step)
+    as well.
 
     :type mdot_kgpers : float
     :param mdot_kgpers: supply mass flow rate to the DHN
@@ -49,14 +52,13 @@ def calc_Cop_GHP(mdot_kgpers, T_DH_sup_K, T_re_K, tground_K, gV):
     ..[C. Montagud et al., 2014] C. Montagud, J.M. Corberan, A. Montero (2014). In situ optimization methodology for
     the water circulation pump frequency of ground source heat pump systems. Energy and Buildings
     """
-    tsup2_K = T_DH_sup_K      # tsup2 = tsup, if all load can be provided by the HP
-
     # calculate condenser temperature
     tcond_K = T_DH_sup_K + gV.HP_deltaT_cond
-    if tcond_K > gV.HP_maxT_cond:
-        #raise ModelError
-        tcond_K = gV.HP_maxT_cond
-        tsup2_K = tcond_K - gV.HP_deltaT_cond  # lower the supply temp if necessary, tsup2 < tsup if max load is not enough
+    above_maxT_cond = tcond_K > gV.HP_maxT_cond
+    tcond_K = np.where(above_maxT_cond, gV.HP_maxT_cond, tcond_K)
+    # tsup2 = tsup, if all load can be provided by the HP
+    # lower the supply temp if necessary, tsup2 < tsup if max load is not enough
+    tsup2_K = np.where(above_maxT_cond, gV.HP_maxT_cond - gV.HP_deltaT_cond, T_DH_sup_K)
 
     # calculate evaporator temperature
     tevap_K = tground_K - gV.HP_deltaT_evap
@@ -212,7 +214,7 @@ def HPLake_Op(mdot_kgpers, t_sup_K, t_ret_K, tlake_K, gV):
     COP = gV.HP_etaex / (1- tevap_K/tcond_K)   # [L. Girardin et al., 2010]_
     qhotdot_W = mdot_kgpers * gV.cp * (t_sup_K - t_ret_K)
 
-    if qhotdot_W > gV.HP_maxSize:
+    if np.any(qhotdot_W > gV.HP_maxSize):
         print "Qhot above max size on the market !"
 
     wdot_W = qhotdot_W / COP
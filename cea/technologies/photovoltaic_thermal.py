@@ -10,8 +10,7 @@ from math import *
 from cea.utilities import epwreader
 from cea.utilities import solar_equations
 from cea.technologies.solar_collector import optimal_angle_and_tilt, \
-    calc_groups, Calc_incidenteangleB, calc_properties_SC, calc_anglemodifierSC, calc_qrad, calc_qgain, calc_Eaux_SC,\
-    SelectminimumenergySc, Selectminimumenergy2, Calc_qloss_net
+    calc_groups, Calc_incidenteangleB, calc_properties_SC, calc_anglemodifierSC, calc_qrad, calc_collector_module
 from cea.technologies.photovoltaic import calc_properties_PV, calc_PV_power, calc_diffuseground_comp, calc_Sm_PV
 
 __author__ = "Jimeno A. Fonseca"
@@ -155,191 +154,26 @@ def Calc_PVT_module(tilt_angle, IAM_b_vector, I_direct_vector, I_diffuse_vector,
                         eff_nom, Bref, Sm_pv, Tcell_pv, misc_losses, areagroup):
 
 
-    # panel to store the results per flow
     # method with no condensaiton gains, no wind or long-wave dependency, sky factor set to zero.
-    # calculate radiation part
-    # local variables
-    Cpwg = 3680  # J/kgK  water grlycol  specific heat
-    maxmsc = mB_max_r * Area_a / 3600
-    # Do the calculation of every time step for every possible flow condition
-    # get states where highly performing values are obtained.
-    mopt = 0  # para iniciar
-    Tcell = []
-    temperature_out = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    temperature_in = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    supply_out = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    supply_losses = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    Auxiliary = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    temperature_m = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    specific_flows = [np.zeros(8760), (np.zeros(8760) + mB0_r) * Area_a / 3600, (np.zeros(8760) + mB_max_r) * Area_a / 3600,
-                      (np.zeros(8760) + mB_min_r) * Area_a / 3600, np.zeros(8760), np.zeros(8760)]  # in kg/s
-    specific_pressurelosses = [np.zeros(8760), (np.zeros(8760) + dP2) * Area_a, (np.zeros(8760) + dP3) * Area_a,
-                               (np.zeros(8760) + dP4) * Area_a, np.zeros(8760), np.zeros(8760)]  # in Pa
-    supply_out_pre = np.zeros(8760)
-    supply_out_total = np.zeros(8760)
-    mcp = np.zeros(8760)
-
     # calculate net radiant heat (absorbed)
     tilt = radians(tilt_angle)
     qrad_vector = np.vectorize(calc_qrad)(n0, IAM_b_vector, I_direct_vector, IAM_d, I_diffuse_vector,
                                           tilt)  # in W/m2 is a mean of the group
-    counter = 0
-    Flag = False
-    Flag2 = False
-    for flow in range(6):
-        Mo = 1
-        TIME0 = 0
-        DELT = 1  # timestep 1 hour
-        delts = DELT * 3600  # convert time step in seconds
-        Tfl = np.zeros([3, 1])  # create vector
-        DT = np.zeros([3, 1])
-        Tabs = np.zeros([3, 1])
-        STORED = np.zeros([600, 1])
-        TflA = np.zeros([600, 1])
-        TflB = np.zeros([600, 1])
-        TabsB = np.zeros([600, 1])
-        TabsA = np.zeros([600, 1])
-        qgainSeg = np.zeros([100, 1])
-        for time in range(8760):
-            c1_pvt = c1 - eff_nom * Bref * Sm_pv[time]
-            Mfl = specific_flows[flow][time]
-            if time < TIME0 + DELT / 2:
-                for Iseg in range(101, 501):  # 400 points with the data
-                    STORED[Iseg] = Tin
-            else:
-                for Iseg in range(1, Nseg):  # 400 points with the data
-                    STORED[100 + Iseg] = STORED[200 + Iseg]
-                    STORED[300 + Iseg] = STORED[400 + Iseg]
-
-            # calculate stability criteria
-            if Mfl > 0:
-                stabcrit = Mfl * Cpwg * Nseg * (DELT * 3600) / (C_eff * Area_a)
-                if stabcrit <= 0.5:
-                    print 'ERROR' + str(stabcrit) + ' ' + str(Area_a) + ' ' + str(Mfl)
-            Te = Te_vector[time]
-            qrad = qrad_vector[time]
-            Tfl[1] = 0  # mean absorber temp
-            Tabs[1] = 0  # mean absorber initial tempr
-            for Iseg in range(1, Nseg + 1):
-                Tfl[1] = Tfl[1] + STORED[100 + Iseg] / Nseg
-                Tabs[1] = Tabs[1] + STORED[300 + Iseg] / Nseg
-            # first guess for DeatT
-            if Mfl > 0:
-                Tout = Tin + (qrad - ((c1_pvt) + 0.5) * (Tin - Te)) / (Mfl * Cpwg / Area_a)
-                Tfl[2] = (Tin + Tout) / 2
-            else:
-                Tout = Te + qrad / (c1_pvt + 0.5)
-                Tfl[2] = Tout  # fluid temperature same as output
-            DT[1] = Tfl[2] - Te
-
-            # calculate qgain with the guess
-
-            qgain = calc_qgain(Tfl, Tabs, qrad, DT, Tin, Tout, Area_a, c1_pvt, c2, Mfl, delts, Cpwg, C_eff, Te)
-
-            Aseg = Area_a / Nseg
-            for Iseg in range(1, Nseg + 1):
-                TflA[Iseg] = STORED[100 + Iseg]
-                TabsA[Iseg] = STORED[300 + Iseg]
-                if Iseg > 1:
-                    TinSeg = ToutSeg
-                else:
-                    TinSeg = Tin
-                if Mfl > 0 and Mo == 1:
-                    ToutSeg = ((Mfl * Cpwg * (TinSeg + 273)) / Aseg - (C_eff * (TinSeg + 273)) / (2 * delts) + qgain +
-                               (C_eff * (TflA[Iseg] + 273) / delts)) / (Mfl * Cpwg / Aseg + C_eff / (2 * delts))
-                    ToutSeg = ToutSeg - 273
-                    TflB[Iseg] = (TinSeg + ToutSeg) / 2
-                else:
-                    Tfl[1] = TflA[Iseg]
-                    Tabs[1] = TabsA[Iseg]
-                    qgain = calc_qgain(Tfl, Tabs, qrad, DT, TinSeg, Tout, Aseg, c1_pvt, c2, Mfl, delts, Cpwg, C_eff, Te)
-                    ToutSeg = Tout
-                    if Mfl > 0:
-                        TflB[Iseg] = (TinSeg + ToutSeg) / 2
-                        ToutSeg = TflA[Iseg] + (qgain * delts) / C_eff
-                    else:
-                        TflB[Iseg] = ToutSeg
-                    TflB[Iseg] = ToutSeg
-                    qfluid = (ToutSeg - TinSeg) * Mfl * Cpwg / Aseg
-                    qmtherm = (TflB[Iseg] - TflA[Iseg]) * C_eff / delts
-                    qbal = qgain - qfluid - qmtherm
-                    if abs(qbal) > 1:
-                        time = time
-                qgainSeg[Iseg] = qgain  # in W/m2
-            # the resulting energy output
-            qout = Mfl * Cpwg * (ToutSeg - Tin)
-            Tabs[2] = 0
-            # storage of the mean temperature
-            for Iseg in range(1, Nseg + 1):
-                STORED[200 + Iseg] = TflB[Iseg]
-                STORED[400 + Iseg] = TabsB[Iseg]
-                Tabs[2] = Tabs[2] + TabsB[Iseg] / Nseg
-
-            # outputs
-            temperature_out[flow][time] = ToutSeg
-            temperature_in[flow][time] = Tin
-            supply_out[flow][time] = qout / 1000  # in kW
-            temperature_m[flow][time] = (Tin + ToutSeg) / 2  # Mean absorber temperature at present
-
-            qgain = 0
-            TavgB = 0
-            TavgA = 0
-            for Iseg in range(1, Nseg + 1):
-                qgain = qgain + qgainSeg * Aseg  # W
-                TavgA = TavgA + TflA[Iseg] / Nseg
-                TavgB = TavgB + TflB[Iseg] / Nseg
-
-            # OUT[9] = qgain/Area_a # in W/m2
-            qmtherm = (TavgB - TavgA) * C_eff * Area_a / delts
-            qbal = qgain - qmtherm - qout
-
-            # OUT[11] = qmtherm
-            # OUT[12] = qbal
-        if flow < 4:
-            Auxiliary[flow] = np.vectorize(calc_Eaux_SC)(specific_flows[flow], specific_pressurelosses[flow], Leq,
-                                                        Area_a)  # in kW
-        if flow == 3:
-            q1 = supply_out[0]
-            q2 = supply_out[1]
-            q3 = supply_out[2]
-            q4 = supply_out[3]
-            E1 = Auxiliary[0]
-            E2 = Auxiliary[1]
-            E3 = Auxiliary[2]
-            E4 = Auxiliary[3]
-            specific_flows[4], specific_pressurelosses[4] = SelectminimumenergySc(q1, q2, q3, q4, E1, E2, E3, E4, 0, mB0_r,
-                                                                                  mB_max_r, mB_min_r, 0, dP2, dP3, dP4,
-                                                                                  Area_a)
-        if flow == 4:
-            Auxiliary[flow] = np.vectorize(calc_Eaux_SC)(specific_flows[flow], specific_pressurelosses[flow], Leq,
-                                                        Area_a)  # in kW
-            dp5 = specific_pressurelosses[flow]
-            q5 = supply_out[flow]
-            m5 = specific_flows[flow]
-            ##poits where load is negative
-            specific_flows[5], specific_pressurelosses[5] = Selectminimumenergy2(m5, q5, dp5)
-        if flow == 5:
-            supply_losses[flow] = np.vectorize(Calc_qloss_net)(specific_flows[flow], Le, Area_a, temperature_m[flow],
-                                                               Te_vector, maxmsc)
-            supply_out_pre = supply_out[flow].copy() + supply_losses[flow].copy()
-            Auxiliary[flow] = np.vectorize(calc_Eaux_SC)(specific_flows[flow], specific_pressurelosses[flow], Leq,
-                                                        Area_a)  # in kW
-            supply_out_total = supply_out + 0.5 * Auxiliary[flow] - supply_losses[flow]
-            mcp = specific_flows[flow] * (Cpwg / 1000)  # mcp in kW/c
-
-    for x in range(8760):
-        if supply_out_total[5][x] <= 0:  # the demand is zero
-            supply_out_total[5][x] = 0
-            Auxiliary[5][x] = 0
-            temperature_out[5][x] = 0
-            temperature_in[5][x] = 0
-        Tcell.append((temperature_out[5][x] + temperature_in[5][x]) / 2)
-        if Tcell[x] == 0:
-            Tcell[x] = Tcell_pv[x]
+    Sm_pv = np.asarray(Sm_pv, dtype=float)
+    c1_pvt = c1 - eff_nom * Bref * Sm_pv
+    supply_losses, supply_out_total, Auxiliary, temperature_out, temperature_in, mcp = calc_collector_module(
+        qrad_vector, c1_pvt, Te_vector, c2, mB0_r, mB_max_r, mB_min_r, C_eff, Area_a, dP2, dP3, dP4, Tin, Leq, Le, Nseg)
+
+    no_demand = supply_out_total <= 0  # the demand is zero
+    supply_out_total[no_demand] = 0
+    Auxiliary[no_demand] = 0
+    temperature_out[no_demand] = 0
+    temperature_in[no_demand] = 0
+    Tcell = (temperature_out + temperature_in) / 2
+    Tcell = np.where(Tcell == 0, Tcell_pv, Tcell)
 
     PV_generation = np.vectorize(calc_PV_power)(Sm_pv, Tcell, eff_nom, areagroup, Bref, misc_losses)
-    result = [supply_losses[5], supply_out_total[5], Auxiliary[5], temperature_out[flow], temperature_in[flow], mcp,
-              PV_generation]
+    result = [supply_losses, supply_out_total, Auxiliary, temperature_out, temperature_in, mcp, PV_generation]
     return result
 
 # investment and maintenance costs
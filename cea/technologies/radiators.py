@@ -3,9 +3,8 @@
 heating radiators
 """
 from __future__ import division
-from scipy.optimize import newton
-import math
 import numpy as np
+from cea.utilities import solvers
 
 
 __author__ = "Jimeno A. Fonseca"
@@ -19,17 +18,29 @@ __status__ = "Production"
 
 
 def fh(x, mCw0, k2, Qh0, tair, LMRT, nh):
-    Eq = mCw0 * k2 - Qh0 * (k2 / (math.log((x + k2 - tair) / (x - tair)) * LMRT)) ** (nh + 1)
+    Eq = mCw0 * k2 - Qh0 * (k2 / (np.log((x + k2 - tair) / (x - tair)) * LMRT)) ** (nh + 1)
     return Eq
 
 def lmrt(tair0, trh0, tsh0):
-    LMRT = (tsh0 - trh0) / math.log((tsh0 - tair0) / (trh0 - tair0))
+    LMRT = (tsh0 - trh0) / np.log((tsh0 - tair0) / (trh0 - tair0))
     return LMRT
 
 def calc_radiator(Qh, tair, Qh0, tair0, tsh0, trh0):
+    """
+    Calculates the supply and return temperatures and the flow rate of the radiators for each hour (``Qh`` and
+    ``tair`` are arrays), the return temperature of all the hours with a heating load is solved at once.
+
+    :return: supply and return temperature in [C] and capacity flow rate in [W/C] of each hour (0 without load)
+    """
     nh = 0.3 #radiator constant
-    if Qh > 0:
-        tair = tair + 273
+    Qh, tair = np.broadcast_arrays(np.asarray(Qh, dtype=float), np.asarray(tair, dtype=float))
+    tsh = np.zeros(Qh.shape)
+    trh = np.zeros(Qh.shape)
+    mCw = np.zeros(Qh.shape)
+    heating = Qh > 0
+    if heating.any():
+        Qh = Qh[heating]
+        tair = tair[heating] + 273
         tair0 = tair0 + 273
         tsh0 = tsh0 + 273
         trh0 = trh0 + 273
@@ -38,21 +49,11 @@ def calc_radiator(Qh, tair, Qh0, tair0, tsh0, trh0):
         LMRT = lmrt(tair0, trh0, tsh0)
         k1 = 1 / mCw0
         k2 = Qh * k1
-        result = newton(fh, trh0, args=(mCw0, k2, Qh0, tair, LMRT, nh), maxiter=100, tol=0.01) - 273
-        trh = result.real
-        tsh = trh + k2
-        mCw = Qh / (tsh - trh)
-    else:
-        mCw = 0
-        tsh = 0
-        trh = 0
-    # return floats with numpy function. Needed when np.vectorize is use to call this function
-    return np.float(tsh), np.float(trh), np.float(mCw) # C, C, W/C
-
-try:
-    # import Numba AOT versions of the functions above, overwriting them
-    from calc_radiator import fh, lmrt
-except ImportError:
-    # fall back to using the python version
-    print('failed to import from calc_radiator.pyd, falling back to pure python functions')
-    pass
+        result, converged = solvers.newton(fh, trh0, args=(mCw0, k2, Qh0, tair, LMRT, nh), maxiter=100, tol=0.01)
+        if not converged.all():
+            raise RuntimeError('Failed to converge after 100 iterations, value is %s' % (result[~converged][0] - 273))
+        result = result - 273
+        trh[heating] = result
+        tsh[heating] = result + k2
+        mCw[heating] = Qh / (tsh[heating] - trh[heating])
+    return tsh, trh, mCw # C, C, W/C
@@ -7,6 +7,8 @@ import pandas as pd
 import numpy as np
 import scipy
 
+from cea.demand.demand_writers import read_demand_results
+
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
 __credits__ = ["Jimeno A. Fonseca"]
@@ -38,7 +40,7 @@ def calc_sewage_heat_exchanger(locator, Length_HEX_available, gv):
     names = pd.read_csv(locator.get_total_demand()).Name.count()
 
     for x in names:
-        building = pd.read_csv(locator.get_demand_results_file(x))
+        building = read_demand_results(locator, [x])[0]
         m, t = np.vectorize(calc_Sewagetemperature)( building.Qwwf_kWh, building.Qww_kWh, building.Tsww_C,
                                                      building.Trww_C, building.totwater, building.mcpww_kWC, gv.Cpw,
                                                      gv.Pwater, gv.SW_ratio)
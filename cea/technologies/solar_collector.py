@@ -8,6 +8,7 @@ import pandas as pd
 from math import *
 import re
 from cea.utilities import epwreader
+from cea.utilities import kernels
 from cea.utilities import solar_equations
 
 __author__ = "Jimeno A. Fonseca"
@@ -157,179 +158,158 @@ def calc_groups(Clean_hourly, observers_fin):
 def Calc_SC_module2(radiation, tilt_angle, IAM_b_vector, I_direct_vector, I_diffuse_vector, Te_vector, n0, c1, c2,
                     mB0_r,
                     mB_max_r, mB_min_r, C_eff, t_max, IAM_d, Area_a, dP1, dP2, dP3, dP4, Tin, Leq, Le, Nseg):
-    # panel to store the results per flow
     # method with no condensaiton gains, no wind or long-wave dependency, sky factor set to zero.
-    # calculate radiation part
-    # local variables
-    Cpwg = 3680  # J/kgK  water grlycol  specific heat
-    maxmsc = mB_max_r * Area_a / 3600
-    # Do the calculation of every time step for every possible flow condition
-    # get states where highly performing values are obtained.
-    mopt = 0  # para iniciar
-    temperature_out = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    temperature_in = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    supply_out = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    supply_losses = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    Auxiliary = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    temperature_m = [np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760), np.zeros(8760)]
-    specific_flows = [np.zeros(8760), (np.zeros(8760) + mB0_r) * Area_a / 3600,
-                      (np.zeros(8760) + mB_max_r) * Area_a / 3600,
-                      (np.zeros(8760) + mB_min_r) * Area_a / 3600, np.zeros(8760), np.zeros(8760)]  # in kg/s
-    specific_pressurelosses = [np.zeros(8760), (np.zeros(8760) + dP2) * Area_a, (np.zeros(8760) + dP3) * Area_a,
-                               (np.zeros(8760) + dP4) * Area_a, np.zeros(8760), np.zeros(8760)]  # in Pa
-    supply_out_pre = np.zeros(8760)
-    supply_out_total = np.zeros(8760)
-    mcp = np.zeros(8760)
-
     # calculate net radiant heat (absorbed)
     tilt = radians(tilt_angle)
     qrad_vector = np.vectorize(calc_qrad)(n0, IAM_b_vector, I_direct_vector, IAM_d, I_diffuse_vector,
                                           tilt)  # in W/m2 is a mean of the group
-    counter = 0
-    Flag = False
-    Flag2 = False
-    for flow in range(6):
-        Mo = 1
-        TIME0 = 0
-        DELT = 1  # timestep 1 hour
-        delts = DELT * 3600  # convert time step in seconds
-        Tfl = np.zeros([3, 1])  # create vector
-        DT = np.zeros([3, 1])
-        Tabs = np.zeros([3, 1])
-        STORED = np.zeros([600, 1])
-        TflA = np.zeros([600, 1])
-        TflB = np.zeros([600, 1])
-        TabsB = np.zeros([600, 1])
-        TabsA = np.zeros([600, 1])
-        qgainSeg = np.zeros([100, 1])
-        for time in range(8760):
-            Mfl = specific_flows[flow][time]
-            if time < TIME0 + DELT / 2:
-                for Iseg in range(101, 501):  # 400 points with the data
-                    STORED[Iseg] = Tin
-            else:
-                for Iseg in range(1, Nseg):  # 400 points with the data
-                    STORED[100 + Iseg] = STORED[200 + Iseg]
-                    STORED[300 + Iseg] = STORED[400 + Iseg]
+    c1_vector = np.zeros(len(qrad_vector)) + c1
+    return calc_collector_module(qrad_vector, c1_vector, Te_vector, c2, mB0_r, mB_max_r, mB_min_r, C_eff, Area_a, dP2,
+                                 dP3, dP4, Tin, Leq, Le, Nseg)
 
-            # calculate stability criteria
-            if Mfl > 0:
-                stabcrit = Mfl * Cpwg * Nseg * (DELT * 3600) / (C_eff * Area_a)
-                if stabcrit <= 0.5:
-                    print 'ERROR' + str(stabcrit) + ' ' + str(Area_a) + ' ' + str(Mfl)
-            Te = Te_vector[time]
-            qrad = qrad_vector[time]
-            Tfl[1] = 0  # mean absorber temp
-            Tabs[1] = 0  # mean absorber initial tempr
-            for Iseg in range(1, Nseg + 1):
-                Tfl[1] = Tfl[1] + STORED[100 + Iseg] / Nseg
-                Tabs[1] = Tabs[1] + STORED[300 + Iseg] / Nseg
-            # first guess for DeatT
-            if Mfl > 0:
-                Tout = Tin + (qrad - (c1 + 0.5) * (Tin - Te)) / (Mfl * Cpwg / Area_a)
-                Tfl[2] = (Tin + Tout) / 2
-            else:
-                Tout = Te + qrad / (c1 + 0.5)
-                Tfl[2] = Tout  # fluid temperature same as output
-            DT[1] = Tfl[2] - Te
 
-            # calculate qgain with the guess
+def calc_collector_module(qrad_vector, c1_vector, Te_vector, c2, mB0_r, mB_max_r, mB_min_r, C_eff, Area_a, dP2, dP3,
+                          dP4, Tin, Leq, Le, Nseg):
+    """
+    Thermal model of a collector divided in `Nseg` segments along the flow (used for the solar collectors and the
+    photovoltaic thermal panels). Six flow cases are evaluated for every hour: no flow, the nominal, maximum and minimum
+    flow (flows 0 to 3), the one of these with the highest net output (flow 4) and flow 4 without the hours with no
+    heat output (flow 5). The results are the ones of flow 5.
+
+    :param qrad_vector: absorbed radiation of each hour in W/m2
+    :param c1_vector: linear heat loss coefficient of each hour in W/m2K
+    :param Te_vector: ambient temperature of each hour in C
+    :param c2: quadratic heat loss coefficient in W/m2K2
+    :param mB0_r: nominal specific mass flow in kg/h/m2 of aperture area (mB_max_r, mB_min_r: maximum and minimum)
+    :param C_eff: thermal capacitance of the module in J/m2K
+    :param Area_a: aperture area of the module in m2
+    :param dP2: specific pressure loss at the nominal flow in Pa/m2 (dP3, dP4: maximum and minimum flow)
+    :param Tin: inlet temperature in C
+    :param Leq: equivalent length of the pipes in m/m2
+    :param Le: length of the pipes outside of the buildings in m/m2
+    :param Nseg: number of segments
+    :return: heat losses of the pipes [kW], heat output [kW], auxiliary electricity [kW], outlet temperature [C],
+        inlet temperature [C] and mcp [kW/C] of each hour
+    :rtype: list[np.ndarray]
+    """
+    Cpwg = 3680  # J/kgK  water grlycol  specific heat
+    qrad_vector = np.asarray(qrad_vector, dtype=float)
+    c1_vector = np.asarray(c1_vector, dtype=float)
+    Te_vector = np.asarray(Te_vector, dtype=float)
+    hours = len(qrad_vector)
+
+    # the flow cases with constant flow: no flow, nominal, maximum and minimum flow
+    m_cases = np.array([0, mB0_r, mB_max_r, mB_min_r]) * Area_a / 3600  # in kg/s
+    dP_cases = np.array([0, dP2, dP3, dP4]) * Area_a  # in Pa
+    Eaux_cases = calc_Eaux_SC(m_cases, dP_cases, Leq, Area_a)  # in kW
+
+    # calculate stability criteria (of the smallest flow, the cases without flow are not concerned)
+    if (m_cases > 0).any():
+        Mfl = m_cases[m_cases > 0].min()
+        stabcrit = Mfl * Cpwg * Nseg * 3600 / (C_eff * Area_a)
+        if stabcrit <= 0.5:
+            print 'ERROR' + str(stabcrit) + ' ' + str(Area_a) + ' ' + str(Mfl)
+
+    T_segments = np.zeros((6, Nseg)) + Tin
+    temperature_out = np.zeros((6, hours))
+    supply_out = np.zeros((6, hours))
+    selected_case = np.zeros(hours, dtype=np.int64)
+    arguments = [qrad_vector, c1_vector, Te_vector, float(c2), float(C_eff), float(Area_a), float(Tin), m_cases,
+                 Eaux_cases, T_segments, temperature_out, supply_out, selected_case]
+    if kernels.is_compiled(__name__):
+        calc_collector_flows(*arguments)
+    else:
+        # python lists are much faster to index than numpy arrays in pure python
+        py_arguments = [a.tolist() if isinstance(a, np.ndarray) else a for a in arguments]
+        getattr(calc_collector_flows, 'py_func', calc_collector_flows)(*py_arguments)
+        temperature_out, supply_out, selected_case = [np.array(a) for a in py_arguments[-3:]]
+
+    # flow 5
+    no_output = supply_out[4] <= 0
+    specific_flow = np.where(no_output, 0, m_cases[selected_case])  # in kg/s
+    specific_pressureloss = np.where(no_output, 0, dP_cases[selected_case])  # in Pa
+    Auxiliary = calc_Eaux_SC(specific_flow, specific_pressureloss, Leq, Area_a)  # in kW
+    temperature_m = (Tin + temperature_out[5]) / 2
+    maxmsc = mB_max_r * Area_a / 3600
+    supply_losses = Calc_qloss_net(specific_flow, Le, Area_a, temperature_m, Te_vector, maxmsc)
+    supply_out_total = supply_out[5] + 0.5 * Auxiliary - supply_losses
+    mcp = specific_flow * (Cpwg / 1000)  # mcp in kW/c
+
+    return [supply_losses, supply_out_total, Auxiliary, temperature_out[5], np.zeros(hours) + Tin, mcp]
+
+
+def calc_collector_flows(qrad, c1, Te, c2, C_eff, Area_a, Tin, m_cases, Eaux_cases, T_segments, T_out, q_out,
+                         selected_case):
+    """
+    Outlet temperature and heat output of the six flow cases of `calc_collector_module` for every hour. Flows 0 to 3
+    have the mass flows `m_cases`, flow 4 the one of these with the highest balance of heat output minus twice the
+    auxiliary electricity (`Eaux_cases`) in the hour and flow 5 the same flow as flow 4, but no flow in the hours with
+    no heat output of flow 4.
+
+    :param T_segments: mean fluid temperature of each segment of each flow (6, Nseg) in C, updated every hour
+    :param T_out: outlet temperature of each flow and hour (6, hours) in C, output
+    :param q_out: heat output of each flow and hour (6, hours) in kW, output
+    :param selected_case: the flow case (0 to 3) of flow 4 in each hour, output
+    """
+    Cpwg = 3680.0  # J/kgK  water grlycol  specific heat
+    delts = 3600.0  # time step of 1 hour in seconds
+    Nseg = len(T_segments[0])
+    Aseg = Area_a / Nseg
+    for time in range(len(qrad)):
+        for flow in range(6):
+            if flow < 4:
+                Mfl = m_cases[flow]
+            elif flow == 4:
+                best = 0
+                for case in range(1, 4):
+                    if q_out[case][time] - Eaux_cases[case] * 2 > q_out[best][time] - Eaux_cases[best] * 2:
+                        best = case
+                selected_case[time] = best
+                Mfl = m_cases[best]
+            elif q_out[4][time] > 0:
+                Mfl = m_cases[selected_case[time]]
+            else:
+                Mfl = 0.0
 
-            qgain = calc_qgain(Tfl, Tabs, qrad, DT, Tin, Tout, Area_a, c1, c2, Mfl, delts, Cpwg, C_eff, Te)
+            T_flow = T_segments[flow]
+            Tfl = 0.0  # mean fluid temperature at the beginning of the hour
+            for Iseg in range(Nseg):
+                Tfl = Tfl + T_flow[Iseg] / Nseg
+            if Mfl > 0:
+                # first guess for DeltaT, then iterate the heat gain
+                Tout = Tin + (qrad[time] - (c1[time] + 0.5) * (Tin - Te[time])) / (Mfl * Cpwg / Area_a)
+                DT = (Tin + Tout) / 2 - Te[time]
+                qgain = 0.0
+                for xgain in range(1, 101):
+                    qgain = qrad[time] - c1[time] * DT - c2 * abs(DT) * DT
+                    Tout = ((Mfl * Cpwg * Tin) / Area_a - (C_eff * Tin) / (2 * delts) + qgain + (C_eff * Tfl) / delts) / (
+                        Mfl * Cpwg / Area_a + C_eff / (2 * delts))
+                    DT2 = (Tin + Tout) / 2 - Te[time]
+                    qdiff = Mfl / Area_a * Cpwg * 2 * (DT2 - DT)
+                    if qdiff < 0.1:
+                        break
+                    if xgain > 40:
+                        DT = (DT + DT2) / 2
+                    else:
+                        DT = DT2
 
-            Aseg = Area_a / Nseg
-            for Iseg in range(1, Nseg + 1):
-                TflA[Iseg] = STORED[100 + Iseg]
-                TabsA[Iseg] = STORED[300 + Iseg]
-                if Iseg > 1:
+                ToutSeg = Tin
+                for Iseg in range(Nseg):
                     TinSeg = ToutSeg
-                else:
-                    TinSeg = Tin
-                if Mfl > 0 and Mo == 1:
                     ToutSeg = ((Mfl * Cpwg * (TinSeg + 273)) / Aseg - (C_eff * (TinSeg + 273)) / (2 * delts) + qgain +
-                               (C_eff * (TflA[Iseg] + 273) / delts)) / (Mfl * Cpwg / Aseg + C_eff / (2 * delts))
+                               (C_eff * (T_flow[Iseg] + 273) / delts)) / (Mfl * Cpwg / Aseg + C_eff / (2 * delts))
                     ToutSeg = ToutSeg - 273
-                    TflB[Iseg] = (TinSeg + ToutSeg) / 2
-                else:
-                    Tfl[1] = TflA[Iseg]
-                    Tabs[1] = TabsA[Iseg]
-                    qgain = calc_qgain(Tfl, Tabs, qrad, DT, TinSeg, Tout, Aseg, c1, c2, Mfl, delts, Cpwg, C_eff, Te)
-                    ToutSeg = Tout
-                    if Mfl > 0:
-                        TflB[Iseg] = (TinSeg + ToutSeg) / 2
-                        ToutSeg = TflA[Iseg] + (qgain * delts) / C_eff
-                    else:
-                        TflB[Iseg] = ToutSeg
-                    TflB[Iseg] = ToutSeg
-                    qfluid = (ToutSeg - TinSeg) * Mfl * Cpwg / Aseg
-                    qmtherm = (TflB[Iseg] - TflA[Iseg]) * C_eff / delts
-                    qbal = qgain - qfluid - qmtherm
-                    if abs(qbal) > 1:
-                        time = time
-                qgainSeg[Iseg] = qgain  # in W/m2
-            # the resulting energy output
-            qout = Mfl * Cpwg * (ToutSeg - Tin)
-            Tabs[2] = 0
-            # storage of the mean temperature
-            for Iseg in range(1, Nseg + 1):
-                STORED[200 + Iseg] = TflB[Iseg]
-                STORED[400 + Iseg] = TabsB[Iseg]
-                Tabs[2] = Tabs[2] + TabsB[Iseg] / Nseg
-
-            # outputs
-            temperature_out[flow][time] = ToutSeg
-            temperature_in[flow][time] = Tin
-            supply_out[flow][time] = qout / 1000  # in kW
-            temperature_m[flow][time] = (Tin + ToutSeg) / 2  # Mean absorber temperature at present
-
-            qgain = 0
-            TavgB = 0
-            TavgA = 0
-            for Iseg in range(1, Nseg + 1):
-                qgain = qgain + qgainSeg * Aseg  # W
-                TavgA = TavgA + TflA[Iseg] / Nseg
-                TavgB = TavgB + TflB[Iseg] / Nseg
-
-            # OUT[9] = qgain/Area_a # in W/m2
-            qmtherm = (TavgB - TavgA) * C_eff * Area_a / delts
-            qbal = qgain - qmtherm - qout
-
-            # OUT[11] = qmtherm
-            # OUT[12] = qbal
-        if flow < 4:
-            Auxiliary[flow] = np.vectorize(calc_Eaux_SC)(specific_flows[flow], specific_pressurelosses[flow],
-                                                         Leq, Area_a)  # in kW
-        if flow == 3:
-            q1 = supply_out[0]
-            q2 = supply_out[1]
-            q3 = supply_out[2]
-            q4 = supply_out[3]
-            E1 = Auxiliary[0]
-            E2 = Auxiliary[1]
-            E3 = Auxiliary[2]
-            E4 = Auxiliary[3]
-            specific_flows[4], specific_pressurelosses[4] = SelectminimumenergySc(q1, q2, q3, q4, E1, E2, E3, E4, 0,
-                                                                                  mB0_r, mB_max_r, mB_min_r, 0,
-                                                                                  dP2, dP3, dP4, Area_a)
-        if flow == 4:
-            Auxiliary[flow] = np.vectorize(calc_Eaux_SC)(specific_flows[flow], specific_pressurelosses[flow],
-                                                         Leq, Area_a)  # in kW
-            dp5 = specific_pressurelosses[flow]
-            q5 = supply_out[flow]
-            m5 = specific_flows[flow]
-            ##poits where load is negative
-            specific_flows[5], specific_pressurelosses[5] = Selectminimumenergy2(m5, q5, dp5)
-        if flow == 5:
-            supply_losses[flow] = np.vectorize(Calc_qloss_net)(specific_flows[flow], Le, Area_a, temperature_m[flow],
-                                                               Te_vector, maxmsc)
-            supply_out_pre = supply_out[flow].copy() + supply_losses[flow].copy()
-            Auxiliary[flow] = np.vectorize(calc_Eaux_SC)(specific_flows[flow], specific_pressurelosses[flow],
-                                                         Leq, Area_a)  # in kW
-            supply_out_total = supply_out + 0.5 * Auxiliary[flow] - supply_losses[flow]
-            mcp = specific_flows[flow] * (Cpwg / 1000)  # mcp in kW/c
-
-    result = [supply_losses[5], supply_out_total[5], Auxiliary[5], temperature_out[flow], temperature_in[flow], mcp]
-    return result
+                    # the last segment keeps the inlet temperature
+                    if Iseg < Nseg - 1:
+                        T_flow[Iseg] = (TinSeg + ToutSeg) / 2
+            else:
+                # no flow: the fluid is at the temperature of the collector without flow
+                ToutSeg = Te[time] + qrad[time] / (c1[time] + 0.5)
+                for Iseg in range(Nseg - 1):
+                    T_flow[Iseg] = ToutSeg
+
+            T_out[flow][time] = ToutSeg
+            q_out[flow][time] = Mfl * Cpwg * (ToutSeg - Tin) / 1000  # in kW
 
 
 def calc_qrad(n0, IAM_b, I_direct, IAM_d, I_diffuse, tilt):
@@ -337,41 +317,6 @@ def calc_qrad(n0, IAM_b, I_direct, IAM_d, I_diffuse, tilt):
     return qrad
 
 
-def calc_qgain(Tfl, Tabs, qrad, DT, TinSub, Tout, Aseg, c1, c2, Mfl, delts, Cpwg, C_eff, Te):
-    xgain = 1
-    xgainmax = 100
-    exit = False
-    while exit == False:
-        qgain = qrad - c1 * (DT[1]) - c2 * abs(DT[1]) * DT[1]
-        if Mfl > 0:
-            Tout = ((Mfl * Cpwg * TinSub) / Aseg - (C_eff * TinSub) / (2 * delts) + qgain + (
-                C_eff * Tfl[1]) / delts) / (Mfl * Cpwg / Aseg + C_eff / (2 * delts))
-            Tfl[2] = (TinSub + Tout) / 2
-            DT[2] = Tfl[2] - Te
-            qdiff = Mfl / Aseg * Cpwg * 2 * (DT[2] - DT[1])
-        else:
-            Tout = Tfl[1] + (qgain * delts) / C_eff
-            Tfl[2] = Tout
-            DT[2] = Tfl[2] - Te
-            qdiff = 5 * (DT[2] - DT[1])
-        if abs(qdiff < 0.1):
-            DT[1] = DT[2]
-            exit = True
-        else:
-            if xgain > 40:
-                DT[1] = (DT[1] + DT[2]) / 2
-                if xgain == xgainmax:
-                    exit = True
-            else:
-                DT[1] = DT[2]
-    qout = Mfl * Cpwg * (Tout - TinSub) / Aseg
-    qmtherm = (Tfl[2] - Tfl[1]) * C_eff / delts
-    qbal = qgain - qout - qmtherm
-    if abs(qbal) > 1:
-        qbal = qbal
-    return qgain
-
-
 def Calc_qloss_net(Mfl, Le, Area_a, Tm, Te, maxmsc):
     qloss = 0.217 * Le * Area_a * (Tm - Te) * (Mfl / maxmsc) / 1000
     return qloss  # in kW
@@ -517,33 +462,6 @@ def calc_Eaux_SC(qV_des, Dp_collector, Leq, Aa):
     return Eaux  # energy spent in kWh
 
 
-# minimization of Eaux
-
-def SelectminimumenergySc(q1, q2, q3, q4, E1, E2, E3, E4, m1, m2, m3, m4, dP1, dP2, dP3, dP4, Area_a):
-    mopt = np.empty(8760)
-    dpopt = np.empty(8760)
-    const = Area_a / 3600
-    ms = [m1 * const, m2 * const, m3 * const, m4 * const]  # float points
-    dps = [dP1 * Area_a, dP2 * Area_a, dP3 * Area_a, dP4 * Area_a]  # float points
-    balances = [q1 - E1 * 2, q2 - E2 * 2, q3 - E3 * 2,
-                q4 - E4 * 2]  # vectors #quality of electricity is twice as expensive
-    for time in range(8760):
-        balances2 = [balances[0][time], balances[1][time], balances[2][time], balances[3][time]]
-        maxenergy = np.max(balances2)
-        ix_maxenergy = np.where(balances2 == maxenergy)
-        mopt[time] = ms[ix_maxenergy[0][0]]
-        dpopt[time] = dps[ix_maxenergy[0][0]]
-    return mopt, dpopt
-
-
-def Selectminimumenergy2(m, q, dp):
-    for time in range(8760):
-        if q[time] <= 0:
-            m[time] = 0
-            dp[time] = 0
-    return m, dp
-
-
 # optimal angle and tilt
 
 def optimal_angle_and_tilt(observers_all, latitude, worst_sh, worst_Az, transmittivity,
@@ -679,5 +597,8 @@ def test_solar_collector():
             weather_path=weather_path)
 
 
+# use the compiled version of the collector model in this module if available (see `cea.utilities.kernels`)
+calc_collector_flows, = kernels.compile_kernels(__name__, [calc_collector_flows], 'solar_collector_cc')
+
 if __name__ == '__main__':
     test_solar_collector()
@@ -7,6 +7,8 @@ import numpy as np
 from scipy.integrate import odeint
 import math
 
+from cea.utilities import kernels
+
 __author__ = "Shanshan Hsieh"
 __copyright__ = "Copyright 2016, Architecture and Building Systems - ETH Zurich"
 __credits__ = ["ShanShan Hsieh"]
@@ -50,12 +52,7 @@ def calc_Qww_ls_st(ta, te, Tww_st, V, Qww, Qww_ls_r, Qww_ls_nr, gv):
     """
 
     tamb = ta - gv.Bf * (ta - te)         # Calculate tamb in basement according to EN
-    if V > 0:
-        h = ( 4 * V * gv.AR ** 2 / math.pi ) ** ( 1.0 / 3.0 )     # tank height in [m], derived from tank Aspect Ratio(AR)
-        r = ( V / ( math.pi * h ) ) ** ( 1.0 / 2.0 )         # tank radius in [m], assuming tank shape is cylinder
-        Atank = 2 * math.pi * r ** 2 + 2 * math.pi * r * h      # tank surface area in [m2].
-    else:
-        Atank = 0
+    Atank = calc_tank_surface_area(V, gv)
     ql = gv.U_dhwtank * Atank * ( Tww_st - tamb )       # tank heat loss to the room in [Wh]
     qd = Qww + Qww_ls_r + Qww_ls_nr
     if Qww <= 0:
@@ -66,6 +63,64 @@ def calc_Qww_ls_st(ta, te, Tww_st, V, Qww, Qww_ls_r, Qww_ls_nr, gv):
     return ql, qd, qc
 
 
+def calc_tank_surface_area(V, gv):
+    """
+    Calculates the surface area of a cylindrical DHW tank from its volume and aspect ratio.
+
+    :param V: DHW tank size in [m3]
+    :param gv: globalvar.py
+    :return Atank: tank surface area in [m2]
+    :rtype Atank: float
+    """
+    if V > 0:
+        h = ( 4 * V * gv.AR ** 2 / math.pi ) ** ( 1.0 / 3.0 )     # tank height in [m], derived from tank Aspect Ratio(AR)
+        r = ( V / ( math.pi * h ) ) ** ( 1.0 / 2.0 )         # tank radius in [m], assuming tank shape is cylinder
+        Atank = 2 * math.pi * r ** 2 + 2 * math.pi * r * h      # tank surface area in [m2].
+    else:
+        Atank = 0
+    return Atank
+
+
+def calc_dhw_tank_operation(tamb, Qww, qd, Tww_st_0, V, Atank, U_dhwtank, Tww_setpoint, Pwater, Cpw, ql, qc, Tww_st):
+    """
+    Operates the DHW tank hour by hour: the heat flows of each hour are calculated with the tank temperature at the
+    start of the hour (same as `calc_Qww_ls_st`), so the right-hand side of the energy balance (`ode`) is constant
+    within the hour and the tank temperature at the end of the hour is found analytically (same as
+    `solve_ode_storage`, without the numerical integration).
+
+    Only floats and arrays are used, so this function can be compiled with Numba (see
+    ``cea/utilities/compile_pyd_files.py``).
+
+    :param tamb: temperature around the tank in [C], for each hour
+    :param Qww: DHW demand in [Wh], for each hour
+    :param qd: heat discharged from the tank in [Wh], including the distribution losses, for each hour
+    :param Tww_st_0: initial tank temperature in [C]
+    :param V: DHW tank size in [m3]
+    :param Atank: tank surface area in [m2] (see `calc_tank_surface_area`)
+    :param U_dhwtank: tank insulation heat transfer coefficient in [W/m2K]
+    :param Tww_setpoint: DHW tank set point temperature in [C]
+    :param Pwater: water density [kg/m3]
+    :param Cpw: heat capacity of water [kJ/kgK]
+    :param ql: filled with the storage sensible heat loss in [Wh], for each hour
+    :param qc: filled with the heat charged into the tank in [Wh], for each hour
+    :param Tww_st: filled with the tank temperature at the end of each hour in [C]
+    :type tamb: ndarray
+    :type Qww: ndarray
+    :type qd: ndarray
+    :type ql: ndarray
+    :type qc: ndarray
+    :type Tww_st: ndarray
+    """
+    for k in range(len(Qww)):
+        ql[k] = U_dhwtank * Atank * (Tww_st_0 - tamb[k])  # tank heat loss to the room in [Wh]
+        if Qww[k] <= 0:
+            qc[k] = 0.0
+        else:
+            qc[k] = qd[k] + ql[k] + Pwater * V * Cpw * (Tww_setpoint - Tww_st_0) / 3.6
+        Tww_st[k] = Tww_st_0 + (qc[k] - ql[k] - qd[k]) / (Pwater * V * Cpw)
+        Tww_st_0 = Tww_st[k]
+
+
 def ode(y, t, ql, qd, qc, Pwater, Cpw, Vtank):
     """
     This algorithm describe the energy balance of the dhw tank with a differential equation.
@@ -115,11 +170,6 @@ def solve_ode_storage(Tww_st_0, ql, qd, qc, Vtank, gv):
     return y[1]
 
 
-# use the optimized (numba_cc) versions of the ode function in this module if available
-try:
-    # import Numba AOT versions of the functions above, overwriting them
-    from storagetank_cc import (ode)
-except ImportError:
-    # fall back to using the python version
-    print('failed to import from storagetank_cc.pyd, falling back to pure python functions')
-    pass
\ No newline at end of file
+# use the compiled versions of the ode and tank operation functions in this module if available
+# (see `cea.utilities.kernels`)
+ode, calc_dhw_tank_operation = kernels.compile_kernels(__name__, [ode, calc_dhw_tank_operation], 'storagetank_cc')
@@ -6,6 +6,7 @@ import pandas as pd
 import time
 import numpy as np
 import scipy
+from cea.demand.demand_writers import read_demand_results
 
 __author__ = "Jimeno A. Fonseca"
 __copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
@@ -32,6 +33,9 @@ def substation_main(locator, total_demand, building_names, gv, Flag):
     :param gv: path to global variables class
     :param Flag: boolean, True if the function is called by the master optimizaiton. False if the fucntion is
         called during preprocessing
+    :return: the substation results of each building (also stored in
+        locator.get_optimization_substations_results_file)
+    :rtype: dict[str, pd.DataFrame]
     """
 
     t0 = time.clock()
@@ -42,13 +46,12 @@ def substation_main(locator, total_demand, building_names, gv, Flag):
 
     # determine grid target temperatures at costumer side.
     iteration = 0
-    buildings = []
+    buildings = read_demand_results(locator, building_names,
+                                    columns=['Name', 'Thsf_sup_C', 'Thsf_re_C', 'Tcsf_sup_C', 'Tcsf_re_C',
+                                             'Twwf_sup_C', 'Twwf_re_C', 'Qhsf_kWh', 'Qcsf_kWh', 'Qwwf_kWh',
+                                             'mcphsf_kWperC', 'mcpwwf_kWperC', 'mcpcsf_kWperC',
+                                             'Ef_kWh'])
     for name in building_names:
-        buildings.append(pd.read_csv(locator.get_demand_results_folder() + '//' + name + ".csv",
-                                     usecols=['Name', 'Thsf_sup_C', 'Thsf_re_C', 'Tcsf_sup_C', 'Tcsf_re_C',
-                                              'Twwf_sup_C', 'Twwf_re_C', 'Qhsf_kWh', 'Qcsf_kWh', 'Qwwf_kWh',
-                                              'mcphsf_kWperC', 'mcpwwf_kWperC', 'mcpcsf_kWperC',
-                                              'Ef_kWh']))
         Ths = np.vectorize(calc_DH_supply)(Ths.copy(), buildings[iteration].Thsf_sup_C.values)
         Tww = np.vectorize(calc_DH_supply)(Tww.copy(), buildings[iteration].Twwf_sup_C.values)
         Tcs = np.vectorize(calc_DC_supply)(Tcs.copy(), buildings[iteration].Tcsf_sup_C.values)
@@ -58,6 +61,7 @@ def substation_main(locator, total_demand, building_names, gv, Flag):
     T_DCS_supply = np.where(Tcs != 1E6, Tcs - gv.dT_cool, 0)
 
     # Calculate disconnected buildings files and substation operation.
+    substation_results = {}
     if Flag:
         index = 0
         combi = [0] * len(building_names)
@@ -69,15 +73,18 @@ def substation_main(locator, total_demand, building_names, gv, Flag):
             dfRes.to_csv(locator.get_optimization_substations_total_file(key), sep=',', float_format='%.3f')
             combi[index] = 0
             # calculate substation parameters per building
-            substation_model(locator, gv, buildings[index], T_DHS, T_DHS_supply, T_DCS_supply, Ths, Tww)
+            substation_results[name] = substation_model(locator, gv, buildings[index], T_DHS, T_DHS_supply,
+                                                        T_DCS_supply, Ths, Tww)
             index += 1
     else:
         index =0
         # calculate substation parameters per building
         for name in building_names:
-            substation_model(locator, gv, buildings[index], T_DHS, T_DHS_supply, T_DCS_supply, Ths, Tww)
+            substation_results[name] = substation_model(locator, gv, buildings[index], T_DHS, T_DHS_supply,
+                                                        T_DCS_supply, Ths, Tww)
             index += 1
     print time.clock() - t0, "seconds process time for the Substation Routine \n"
+    return substation_results
 
 
 def substation_model(locator, gv, building, t_DH, t_DH_supply, t_DC_supply, t_HS, t_WW):
@@ -9,6 +9,7 @@ import pandas as pd
 import time
 import numpy as np
 import scipy
+from cea.demand.demand_writers import read_demand_results
 
 __author__ = "Jimeno A. Fonseca, Shanshan Hsieh"
 __copyright__ = "Copyright 2015, Architecture and Building Systems - ETH Zurich"
@@ -46,15 +47,14 @@ def substation_HEX_design_main(locator, building_names, gv):
 
     # determine thermal network target temperatures (T_supply_DH,T_supply_DC) at costumer side.
     iteration = 0
-    buildings_demands = []
+    buildings_demands = read_demand_results(locator, building_names,
+                                            columns=['Name', 'Thsf_sup_C', 'Thsf_re_C', 'Twwf_sup_C', 'Twwf_re_C',
+                                                     'Tcsf_sup_C', 'Tcsf_re_C', 'Tcdataf_sup_C', 'Tcdataf_re_C',
+                                                     'Tcref_sup_C', 'Tcref_re_C', 'Qhsf_kWh','Qwwf_kWh', 'Qcsf_kWh',
+                                                     'Qcsf_lat_kWh', 'Qcdataf_kWh', 'Qcref_kWh', 'mcphsf_kWC',
+                                                     'mcpwwf_kWC', 'mcpcsf_kWC', 'Ef_kWh'])
 
     for name in building_names:
-        buildings_demands.append(pd.read_csv(locator.get_demand_results_folder() + '//' + name + ".csv",
-                                     usecols=['Name', 'Thsf_sup_C', 'Thsf_re_C', 'Twwf_sup_C', 'Twwf_re_C',
-                                              'Tcsf_sup_C', 'Tcsf_re_C', 'Tcdataf_sup_C', 'Tcdataf_re_C',
-                                              'Tcref_sup_C', 'Tcref_re_C', 'Qhsf_kWh','Qwwf_kWh', 'Qcsf_kWh',
-                                              'Qcsf_lat_kWh', 'Qcdataf_kWh', 'Qcref_kWh', 'mcphsf_kWC',
-                                              'mcpwwf_kWC', 'mcpcsf_kWC', 'Ef_kWh']))
         Q_substation_heating = buildings_demands[iteration].Qhsf_kWh + buildings_demands[iteration].Qwwf_kWh
         Q_substation_cooling = buildings_demands[iteration].Qcsf_kWh + buildings_demands[iteration].Qcsf_lat_kWh + \
                                buildings_demands[iteration].Qcdataf_kWh + buildings_demands[iteration].Qcref_kWh
@@ -167,8 +167,37 @@ def substation_HEX_sizing(locator, gv, building):
 
     return [A_hex_hs, A_hex_ww, A_hex_cs, UA_heating_hs, UA_heating_ww, UA_cooling_cs]
 
+# demand columns used by the substation return model (see `calc_substation_table`)
+SUBSTATION_DEMAND_COLUMNS = ['Qhsf_kWh', 'Thsf_sup_C', 'Thsf_re_C', 'mcphsf_kWC', 'Qwwf_kWh', 'Twwf_sup_C',
+                             'Twwf_re_C', 'mcpwwf_kWC', 'Qcsf_kWh', 'Tcsf_sup_C', 'Tcsf_re_C', 'mcpcsf_kWC']
+
+
+def calc_substation_table(buildings_demands, substations_HEX_specs):
+    """
+    Collects the demands and heat exchanger specs needed by the substation return model of all buildings in arrays,
+    so the substations can be evaluated for all buildings (and several time steps) at once. The table only depends on
+    the demands, so it is created once per network simulation and reused at every time step and iteration.
+
+    :param buildings_demands: list of building demands (as returned by `substation_HEX_design_main`)
+    :param substations_HEX_specs: DataFrame with substation heat exchanger specs at each building
+    :return: dict with the index of each building (``building_index``), each column of `SUBSTATION_DEMAND_COLUMNS`
+             (t x buildings) and each column of `substations_HEX_specs` (buildings)
+    :rtype: dict
+    """
+    building_index = {}
+    for i, building in enumerate(buildings_demands):
+        building_index[building.Name[0]] = i
+    substation_table = {'building_index': building_index}
+    for column in SUBSTATION_DEMAND_COLUMNS:
+        substation_table[column] = np.column_stack([building[column].values for building in buildings_demands])
+    building_names = [building.Name[0] for building in buildings_demands]
+    for column in substations_HEX_specs.columns:
+        substation_table[column] = substations_HEX_specs[column][building_names].values.astype(float)
+    return substation_table
+
+
 def substation_return_model_main(locator, gv, building_names, buildings_demands, substations_HEX_specs, T_substation_supply, t,
-                                 network_type, t_flag):
+                                 network_type, t_flag, substation_table=None):
     """
     Calculate all substation return temperature and required flow rate at each time-step.
 
@@ -182,76 +211,94 @@ def substation_return_model_main(locator, gv, building_names, buildings_demands,
     :param network_type: a string that defines whether the network is a district heating ('DH') or cooling ('DC')
                          network
     :param t_flag: flag for calculating nominal flow rate, using one target temperature
+    :param substation_table: the result of `calc_substation_table` for `buildings_demands` - pass it when calling this
+                             function repeatedly, it is created on every call otherwise
     :return:
     """
-    index = 0
-    # combi = [0] * len(building_names)
-    T_return_all_K = pd.DataFrame()
-    mdot_sum_all_kgs = pd.DataFrame()
+    building_names = list(building_names)
+    if substation_table is None:
+        substation_table = calc_substation_table(buildings_demands, substations_HEX_specs)
 
-    for name in building_names:
-        for i in range(len(buildings_demands)):
-            # find index of building in the list of buildings_demands
-            if buildings_demands[i].Name[0] == name:
-                index = i
-        # load building demand from list
-        building = buildings_demands[index].loc[[t]]
-
-        if t_flag is True:
-            # for the initialization step
-            T_substation_supply_K = T_substation_supply
-
-        else:
-            # find substation supply temperature
-            T_substation_supply_K = T_substation_supply.loc['T_supply', name]
-
-        if network_type == 'DH':
-            # calculate DH substation return temperature and substation flow rate
-            T_substation_return_K, mcp_sub = calc_substation_return_DH(building, T_substation_supply_K, substations_HEX_specs.ix[name])
-        else:
-            # calculate DC substation return temperature and substation flow rate
-            T_substation_return_K, mcp_sub = calc_substation_return_DC(building, T_substation_supply_K, substations_HEX_specs.ix[name])
-
-        T_return_all_K[name] = [T_substation_return_K]
-        mdot_sum_all_kgs[name] = [mcp_sub/gv.Cpw]   # [kg/s]
-        index += 1
+    if t_flag is True:
+        # for the initialization step
+        T_substation_supply_K = T_substation_supply
+    else:
+        # find substation supply temperature
+        T_substation_supply_K = T_substation_supply[building_names].loc['T_supply'].values
+
+    T_substation_return_K, mdot_sub_kgs = calc_substations_return(substation_table, building_names,
+                                                                  T_substation_supply_K, t, network_type, gv)
+
+    T_return_all_K = pd.DataFrame([T_substation_return_K], columns=building_names)
+    mdot_sum_all_kgs = pd.DataFrame([mdot_sub_kgs], columns=building_names)  # [kg/s]
     return T_return_all_K, mdot_sum_all_kgs
 
+
+def calc_substations_return(substation_table, building_names, T_substation_supply_K, t, network_type, gv):
+    """
+    Calculate the substation return temperatures and required flow rates of several buildings at once.
+
+    :param substation_table: the result of `calc_substation_table`
+    :param building_names: names of the buildings to calculate
+    :param T_substation_supply_K: supply temperature at each substation in [K], anything that broadcasts to the shape
+                                  of the result
+    :param t: time-step, or array of time-steps
+    :param network_type: a string that defines whether the network is a district heating ('DH') or cooling ('DC')
+                         network
+    :param gv: an instance of globalvar.GlobalVariables
+    :return: the substation return temperatures in [K] and the substation flow rates in [kg/s], arrays with one value
+             per building (buildings) - or per time-step and building (t x buildings) if `t` is an array
+    :rtype: (ndarray, ndarray)
+    """
+    index = [substation_table['building_index'][name] for name in building_names]
+    building = {}
+    for column in SUBSTATION_DEMAND_COLUMNS:
+        building[column] = substation_table[column][t][..., index]
+    substation_HEX_specs = {}
+    for column in ['HEX_UA_SH', 'HEX_UA_DHW', 'HEX_UA_SC']:
+        substation_HEX_specs[column] = substation_table[column][index]
+
+    if network_type == 'DH':
+        # calculate DH substation return temperature and substation flow rate
+        T_substation_return_K, mcp_sub = calc_substation_return_DH(building, T_substation_supply_K,
+                                                                   substation_HEX_specs)
+    else:
+        # calculate DC substation return temperature and substation flow rate
+        T_substation_return_K, mcp_sub = calc_substation_return_DC(building, T_substation_supply_K,
+                                                                   substation_HEX_specs)
+    return T_substation_return_K, mcp_sub / gv.Cpw
+
+
 def calc_substation_return_DH(building, T_DH_supply_K, substation_HEX_specs):
     """
     calculate individual substation return temperature and required heat capacity (mcp) of the supply stream
     at each time step.
-    :param building: list of building informations
+    :param building: dict of arrays with the building demands (see `calc_substations_return`)
     :param T_DH_supply_K: matrix of the substation supply temperatures in K
     :param substation_HEX_specs: substation heat exchanger properties
 
     :return t_return_DH: the substation return temperature
     :return mcp_DH: the required heat capacity (mcp) from the DH
     """
-    UA_heating_hs = substation_HEX_specs.HEX_UA_SH
-    UA_heating_ww = substation_HEX_specs.HEX_UA_DHW
+    UA_heating_hs = substation_HEX_specs['HEX_UA_SH']
+    UA_heating_ww = substation_HEX_specs['HEX_UA_DHW']
 
     thi = T_DH_supply_K  # In [K]
-    Qhsf = building.Qhsf_kWh.values * 1000  # in W
-    if Qhsf.max() > 0:
-        tco = building.Thsf_sup_C.values + 273  # in K
-        tci = building.Thsf_re_C.values + 273  # in K
-        cc = building.mcphsf_kWC.values * 1000  # in W/K
-        t_DH_return_hs, mcp_DH_hs = calc_HEX_heating(Qhsf, UA_heating_hs, thi, tco, tci, cc)
-            # calc_required_flow_and_t_return(Qhsf, UA_heating_hs, thi, tco, tci, cc)
-    else:
-        t_DH_return_hs = T_DH_supply_K
-        mcp_DH_hs = 0
-
-    Qwwf = building.Qwwf_kWh.values * 1000  # in W
-    if Qwwf.max() > 0:
-        tco = building.Twwf_sup_C.values + 273  # in K
-        tci = building.Twwf_re_C.values + 273  # in K
-        cc = building.mcpwwf_kWC.values * 1000  # in W/K
-        t_DH_return_ww, mcp_DH_ww = calc_HEX_heating(Qwwf, UA_heating_ww, thi, tco, tci, cc)   #[kW/K]
-    else:
-        t_DH_return_ww = T_DH_supply_K
-        mcp_DH_ww = 0
+    Qhsf = building['Qhsf_kWh'] * 1000  # in W
+    tco = building['Thsf_sup_C'] + 273  # in K
+    tci = building['Thsf_re_C'] + 273  # in K
+    cc = building['mcphsf_kWC'] * 1000  # in W/K
+    t_DH_return_hs, mcp_DH_hs = calc_HEX_heating(Qhsf, UA_heating_hs, thi, tco, tci, cc)
+    t_DH_return_hs = np.where(Qhsf > 0, t_DH_return_hs, T_DH_supply_K)
+    mcp_DH_hs = np.where(Qhsf > 0, mcp_DH_hs, 0)
+
+    Qwwf = building['Qwwf_kWh'] * 1000  # in W
+    tco = building['Twwf_sup_C'] + 273  # in K
+    tci = building['Twwf_re_C'] + 273  # in K
+    cc = building['mcpwwf_kWC'] * 1000  # in W/K
+    t_DH_return_ww, mcp_DH_ww = calc_HEX_heating(Qwwf, UA_heating_ww, thi, tco, tci, cc)   #[kW/K]
+    t_DH_return_ww = np.where(Qwwf > 0, t_DH_return_ww, T_DH_supply_K)
+    mcp_DH_ww = np.where(Qwwf > 0, mcp_DH_ww, 0)
 
     # calculate mix temperature of return DH
     T_DH_return_K = calc_HEX_mix(Qhsf, Qwwf, t_DH_return_ww, mcp_DH_ww, t_DH_return_hs, mcp_DH_hs)
@@ -263,22 +310,20 @@ def calc_substation_return_DC(building, T_DC_supply, substation_HEX_specs):
     """
     calculate individual substation return temperature and required heat capacity (mcp) of the supply stream
     at each time step
-    :param building: list of building information
+    :param building: dict of arrays with the building demands (see `calc_substations_return`)
     :param T_DC_supply: substation supply temperature in K
     :param substation_HEX_specs: substation heat exchanger properties
     :return:
     """
-    UA_cooling_cs = substation_HEX_specs.HEX_UA_SC
-    Qcf = (abs(building.Qcsf_kWh.values)) * 1000  # in W
-    if Qcf.max() > 0:
-        tci = T_DC_supply  # in K
-        tho = building.Tcsf_sup_C.values + 273  # in K
-        thi = building.Tcsf_re_C.values + 273  # in K
-        ch = (abs(building.mcpcsf_kWC.values)) * 1000  # in W/K
-        t_DC_return_cs, mcp_DC_cs = calc_HEX_cooling(Qcf, UA_cooling_cs, thi, tho, tci, ch)
-    else:
-        t_DC_return_cs = T_DC_supply
-        mcp_DC_cs = 0
+    UA_cooling_cs = substation_HEX_specs['HEX_UA_SC']
+    Qcf = (abs(building['Qcsf_kWh'])) * 1000  # in W
+    tci = T_DC_supply  # in K
+    tho = building['Tcsf_sup_C'] + 273  # in K
+    thi = building['Tcsf_re_C'] + 273  # in K
+    ch = (abs(building['mcpcsf_kWC'])) * 1000  # in W/K
+    t_DC_return_cs, mcp_DC_cs = calc_HEX_cooling(Qcf, UA_cooling_cs, thi, tho, tci, ch)
+    t_DC_return_cs = np.where(Qcf > 0, t_DC_return_cs, T_DC_supply)
+    mcp_DC_cs = np.where(Qcf > 0, mcp_DC_cs, 0)
 
     return t_DC_return_cs, mcp_DC_cs
 
@@ -357,6 +402,9 @@ def calc_HEX_cooling(Q, UA, thi, tho, tci, ch):
     and heat exchanger area for a plate heat exchanger.
     Method of Number of Transfer Units (NTU)
 
+    The inputs can be arrays (e.g. of several buildings or time steps), the efficiency is iterated for all elements at
+    once until each of them converged.
+
     :param Q: cooling load
     :param UA: coefficient representing the area of heat exchanger times the coefficient of transmittance of the
     heat exchanger
@@ -368,35 +416,32 @@ def calc_HEX_cooling(Q, UA, thi, tho, tci, ch):
         tco: out temperature of secondary side (district cooling network)
         cc: capacity mass flow rate secondary side
     '''
-
-    if ch > 0:
-        eff = [0.1, 0]  # FIXME
-        Flag = False
-        tol = 0.00000001
-        while abs((eff[0] - eff[1]) / eff[0]) > tol:
-            if Flag == True:
-                eff[0] = eff[1]
-            else:
-                cmin = ch * (thi - tho) / ((thi - tci) * eff[0])
-            if cmin < ch:
-                cc = cmin
-                cmax = ch
-            else:
-                cc = cmin
-                cmax = cc
-                cmin = ch
-            cr = cmin / cmax
-            NTU = UA / cmin
-            eff[1] = calc_plate_HEX(NTU, cr)
-            cmin = ch * (thi - tho) / ((thi - tci) * eff[1])
-            tco = tci + eff[1] * cmin * (thi - tci) / cc
-            Flag = True
-        cc = Q / abs(tci - tco)
-        tco = tco   # in [K]
-    else:
-        tco = 0
-        cc = 0
-    return np.float(tco), np.float(cc / 1000)
+    Q, UA, thi, tho, tci, ch = np.broadcast_arrays(Q, UA, thi, tho, tci, ch)
+    tco_all = np.zeros(Q.shape)
+    cc_all = np.zeros(Q.shape)
+    active = np.flatnonzero(ch > 0)
+    Q, UA, thi, tho, tci, ch = [np.ravel(x)[active] for x in (Q, UA, thi, tho, tci, ch)]
+
+    eff = np.full(active.size, 0.1)  # FIXME
+    tol = 0.00000001
+    cmin = ch * (thi - tho) / ((thi - tci) * eff)
+    while active.size > 0:
+        cc = cmin
+        cmax = np.where(cmin < ch, ch, cc)
+        cmin = np.where(cmin < ch, cmin, ch)
+        cr = cmin / cmax
+        NTU = UA / cmin
+        eff_new = calc_plate_HEX(NTU, cr)
+        cmin = ch * (thi - tho) / ((thi - tci) * eff_new)
+        tco = tci + eff_new * cmin * (thi - tci) / cc
+        tco_all.flat[active] = tco   # in [K]
+        cc_all.flat[active] = Q / abs(tci - tco)
+
+        # continue with the elements that did not converge yet
+        iterate = abs((eff - eff_new) / eff) > tol
+        active, eff = active[iterate], eff_new[iterate]
+        Q, UA, thi, tho, tci, ch, cmin = [x[iterate] for x in (Q, UA, thi, tho, tci, ch, cmin)]
+    return tco_all, cc_all / 1000
 
 
 def calc_plate_HEX(NTU, cr):
@@ -442,11 +487,10 @@ def calc_HEX_mix(Q1, Q2, t1, m1, t2, m2):
     :return:
         tavg: average out temperature.
     '''
-    if Q1.max() > 0 or Q2.max() > 0:
-        tavg = (t1 * m1 + t2 * m2) / (m1 + m2)
-    else:
-        tavg = (t1+t2)/2  # if there is no flow rate, tavg = t1 = t2
-    return np.float(tavg)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        tavg = np.where((Q1 > 0) | (Q2 > 0), (t1 * m1 + t2 * m2) / (m1 + m2),
+                        (t1 + t2) / 2)  # if there is no flow rate, tavg = t1 = t2
+    return tavg
 
 
 def calc_HEX_heating(Q, UA, thi, tco, tci, cc):
@@ -456,6 +500,9 @@ def calc_HEX_heating(Q, UA, thi, tco, tci, cc):
 
     Method of Number of Transfer Units (NTU)
 
+    The inputs can be arrays (e.g. of several buildings or time steps), the efficiency is iterated for all elements at
+    once until each of them converged.
+
     :param Q: load
     :param UA: coefficient representing the area of heat exchanger times the coefficient of transmittance of the
     heat exchanger
@@ -468,34 +515,32 @@ def calc_HEX_heating(Q, UA, thi, tco, tci, cc):
         tho = out temperature of secondary side (district cooling network)
         ch = capacity mass flow rate secondary side
     '''
-
-    if Q > 0:
-        eff = [0.1, 0]  # FIXME
-        Flag = False
-        tol = 0.00000001
-        while abs((eff[0] - eff[1]) / eff[0]) > tol:
-            if Flag == True:
-                eff[0] = eff[1]
-            else:
-                cmin = cc * (tco - tci) / ((thi - tci) * eff[0])
-            if cmin < cc:
-                ch = cmin
-                cmax = cc
-            else:
-                ch = cmin
-                cmax = cmin
-                cmin = cc
-            cr = cmin / cmax
-            NTU = UA / cmin
-            eff[1] = calc_shell_HEX(NTU, cr)
-            cmin = cc * (tco - tci) / ((thi - tci) * eff[1])
-            tho = thi - eff[1] * cmin * (thi - tci) / ch
-            Flag = True
-
-    else:
-        tho = 0
-        ch = 0
-    return np.float(tho), np.float(ch / 1000)
+    Q, UA, thi, tco, tci, cc = np.broadcast_arrays(Q, UA, thi, tco, tci, cc)
+    tho_all = np.zeros(Q.shape)
+    ch_all = np.zeros(Q.shape)
+    active = np.flatnonzero(Q > 0)
+    UA, thi, tco, tci, cc = [np.ravel(x)[active] for x in (UA, thi, tco, tci, cc)]
+
+    eff = np.full(active.size, 0.1)  # FIXME
+    tol = 0.00000001
+    cmin = cc * (tco - tci) / ((thi - tci) * eff)
+    while active.size > 0:
+        ch = cmin
+        cmax = np.where(cmin < cc, cc, ch)
+        cmin = np.where(cmin < cc, cmin, cc)
+        cr = cmin / cmax
+        NTU = UA / cmin
+        eff_new = calc_shell_HEX(NTU, cr)
+        cmin = cc * (tco - tci) / ((thi - tci) * eff_new)
+        tho = thi - eff_new * cmin * (thi - tci) / ch
+        tho_all.flat[active] = tho
+        ch_all.flat[active] = ch
+
+        # continue with the elements that did not converge yet
+        iterate = abs((eff - eff_new) / eff) > tol
+        active, eff = active[iterate], eff_new[iterate]
+        UA, thi, tco, tci, cc, cmin = [x[iterate] for x in (UA, thi, tco, tci, cc, cmin)]
+    return tho_all, ch_all / 1000
 
 
 def calc_dTm_HEX(thi, tho, tci, tco, flag):
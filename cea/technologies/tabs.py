@@ -4,7 +4,8 @@ Termoactivated building surfaces (TABS)
 """
 
 from __future__ import division
-import scipy.optimize
+import numpy as np
+from cea.utilities import solvers
 
 __author__ = "Martin Mosteiro"
 __copyright__ = "Copyright 2016, Architecture and Building Systems - ETH Zurich"
@@ -22,6 +23,8 @@ def calc_floorheating(Qh, tm, Qh0, tsh0, trh0, Af):
     equation with the simple calculation for TABS from SIA 2044, which in turn is based on Koschenz & Lehmann
     "Thermoaktive Bauteilsysteme (TABS)".
 
+    The return temperature of all the hours with a heating load is solved at once (``Qh`` and ``tm`` are arrays).
+
     :param Qh: heating demand
     :param tm: Temperature of the thermal mass
     :param Qh0: nominal heating power of the heating system
@@ -33,11 +36,16 @@ def calc_floorheating(Qh, tm, Qh0, tsh0, trh0, Af):
              - ``trh``, return temperature from the TABS system
              - ``mCw``, flow rate in the TABS system
     """
-
-    if Qh > 0:
+    Qh, tm = np.broadcast_arrays(np.asarray(Qh, dtype=float), np.asarray(tm, dtype=float))
+    tsh = np.zeros(Qh.shape)
+    trh = np.zeros(Qh.shape)
+    mCw = np.zeros(Qh.shape)
+    heating = Qh > 0
+    if heating.any():
+        Qh = Qh[heating]
         tsh0 = tsh0 + 273
         trh0 = trh0 + 273
-        tm = tm + 273
+        tm = tm[heating] + 273
         mCw0 = Qh0 / (tsh0 - trh0)
         # minimum
         k1 = 1 / mCw0
@@ -46,17 +54,16 @@ def calc_floorheating(Qh, tm, Qh0, tsh0, trh0, Af):
         A_tabs = 0.8 * Af   # m2
         H_tabs = A_tabs / R_tabs
 
-        def fh(x):
+        def fh(x, k2, tm):
             Eq = mCw0 * k2 - (x+k2-tm) * H_tabs
             return Eq
 
         k2 = Qh * k1
-        result = scipy.optimize.newton(fh, trh0, maxiter=1000, tol=0.1) - 273
-        trh = result.real
-        tsh = trh + k2
-        mCw = Qh / (tsh - trh)
-    else:
-        mCw = 0
-        tsh = 0
-        trh = 0
+        result, converged = solvers.newton(fh, trh0, args=(k2, tm), maxiter=1000, tol=0.1)
+        if not converged.all():
+            raise RuntimeError('Failed to converge after 1000 iterations, value is %s' % (result[~converged][0] - 273))
+        result = result - 273
+        trh[heating] = result
+        tsh[heating] = result + k2
+        mCw[heating] = Qh / (tsh[heating] - trh[heating])
     return tsh, trh, mCw # C,C, W/C
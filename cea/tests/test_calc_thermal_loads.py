@@ -6,7 +6,7 @@ import json
 import pandas as pd
 
 from cea.demand.occupancy_model import schedule_maker
-from cea.demand.thermal_loads import calc_thermal_loads, BuildingProperties
+from cea.demand.thermal_loads import calc_thermal_loads, calc_thermal_loads_batch, BuildingProperties
 from cea.globalvar import GlobalVariables
 from cea.inputlocator import InputLocator
 from cea.utilities import epwreader
@@ -55,8 +55,7 @@ class TestCalcThermalLoads(unittest.TestCase):
                                     self.usage_schedules, self.date, self.gv, self.locator)
         self.assertIsNone(result)
         self.assertTrue(os.path.exists(self.locator.get_demand_results_file('B01')), 'Building csv not produced')
-        self.assertTrue(os.path.exists(self.locator.get_temporary_file('B01T.csv')),
-                        'Building temp file not produced')
+        self.assertIn('B01', self.gv.demand_writer.totals, 'Building totals not produced')
 
         # test the building csv file (output of the `calc_thermal_loads` call above)
         df = pd.read_csv(self.locator.get_demand_results_file('B01'))
@@ -70,6 +69,22 @@ class TestCalcThermalLoads(unittest.TestCase):
                 column, values[i], df[column].sum()), places=3)
 
 
+    def test_calc_thermal_loads_fast_rc_model(self):
+        """The whole-year engine (``use_fast_rc_model=True``) must produce the same results as the hourly loop"""
+        import numpy as np
+        bpr = self.building_properties['B01']
+        calc_thermal_loads('B01', bpr, self.weather_data, self.usage_schedules, self.date, self.gv, self.locator,
+                           use_fast_rc_model=False)
+        df_hourly = pd.read_csv(self.locator.get_demand_results_file('B01'))
+        calc_thermal_loads('B01', bpr, self.weather_data, self.usage_schedules, self.date, self.gv, self.locator,
+                           use_fast_rc_model=True)
+        df_fast = pd.read_csv(self.locator.get_demand_results_file('B01'))
+
+        self.assertEqual(list(df_hourly.columns), list(df_fast.columns))
+        for column in df_hourly.select_dtypes(include=[np.number]).columns:
+            self.assertTrue(np.allclose(df_hourly[column], df_fast[column], rtol=1e-9, atol=1e-6, equal_nan=True),
+                            msg='Column %s differs between the hourly and the whole-year engine' % column)
+
     def test_calc_thermal_loads_other_buildings(self):
         """Test some other buildings just to make sure we have the proper data"""
         # randomly selected except for B302006716, which has `Af == 0`
@@ -110,6 +125,175 @@ class TestCalcThermalLoads(unittest.TestCase):
                                        msg="qhf_kwh for %(b)s should be: %(qhf_kwh).5f, was %(b1).5f" % locals(),
                                        places=3)
 
+    def test_calc_thermal_loads_batch(self):
+        """Calculating the buildings as a batch must produce the same results as calculating them one by one"""
+        import numpy as np
+        buildings = json.loads(self.config.get('test_calc_thermal_loads_other_buildings', 'results'))
+        building_names = sorted(buildings.keys())
+        bprs = [self.building_properties[building] for building in building_names]
+        result = calc_thermal_loads_batch(building_names, bprs, self.weather_data, self.usage_schedules, self.date,
+                                          self.gv, self.locator)
+        self.assertIsNone(result)
+        df_batch = dict((b, pd.read_csv(self.locator.get_demand_results_file(b))) for b in building_names)
+        for b, bpr in zip(building_names, bprs):
+            df = df_batch[b]
+            qcf_kwh, qhf_kwh = df['QCf_kWh'].sum(), df['QHf_kWh'].sum()
+            b0 = buildings[b][0]
+            b1 = buildings[b][1]
+            self.assertAlmostEqual(b0, qcf_kwh,
+                                   msg="qcf_kwh for %(b)s should be: %(qcf_kwh).5f, was %(b0).5f" % locals(),
+                                   places=3)
+            self.assertAlmostEqual(b1, qhf_kwh,
+                                   msg="qhf_kwh for %(b)s should be: %(qhf_kwh).5f, was %(b1).5f" % locals(),
+                                   places=3)
+
+        for b, bpr in zip(building_names, bprs):
+            df = df_batch[b]
+            calc_thermal_loads(b, bpr, self.weather_data, self.usage_schedules, self.date, self.gv, self.locator,
+                               use_fast_rc_model=True)
+            df_single = pd.read_csv(self.locator.get_demand_results_file(b))
+            self.assertEqual(list(df_single.columns), list(df.columns))
+            for column in df_single.select_dtypes(include=[np.number]).columns:
+                self.assertTrue(np.allclose(df_single[column], df[column], rtol=1e-9, atol=1e-6, equal_nan=True),
+                                msg='Column %s of %s differs between the batch and the single building engine' % (
+                                    column, b))
+
+    def test_rc_model_batch_radiative_cooling(self):
+        """The batch R-C-model must produce the same time series as the single building R-C-model"""
+        import copy
+        import numpy as np
+        from cea.demand import rc_model_crank_nicholson_year
+        from cea.demand.thermal_loads import initialize_thermal_loads
+        # the buildings of the reference case are cooled by AC systems
+        bprs = [copy.deepcopy(self.building_properties[building]) for building in ['B01', 'B03']]
+        for bpr in bprs:
+            bpr.hvac['type_cs'] = 'T1'
+        tsds_batch = [initialize_thermal_loads(bpr, self.weather_data, self.usage_schedules, self.date, self.gv)[0]
+                      for bpr in bprs]
+        tsds_single = copy.deepcopy(tsds_batch)
+        rc_model_crank_nicholson_year.calc_rc_model_demand_heating_cooling_buildings(bprs, tsds_batch, self.gv)
+        for bpr, tsd in zip(bprs, tsds_single):
+            rc_model_crank_nicholson_year.calc_rc_model_demand_heating_cooling_year(bpr, tsd, self.gv)
+        for tsd_batch, tsd_single in zip(tsds_batch, tsds_single):
+            self.assertTrue((tsd_single['Qcs_sen'] < 0).any())
+            for key, value in tsd_single.items():
+                if isinstance(value, np.ndarray) and value.dtype.kind == 'f':
+                    self.assertTrue(np.allclose(value, tsd_batch[key], rtol=1e-9, atol=1e-6, equal_nan=True),
+                                    msg='%s differs between the batch and the single building R-C-model' % key)
+
+    def test_columnar_demand_writer(self):
+        """The results written by the ``ColumnarDemandWriter`` must read back the same as the csv files"""
+        import numpy as np
+        from cea.demand.demand_writers import ColumnarDemandWriter, read_demand_results
+        bpr = self.building_properties['B01']
+        calc_thermal_loads('B01', bpr, self.weather_data, self.usage_schedules, self.date, self.gv, self.locator)
+        df_csv = pd.read_csv(self.locator.get_demand_results_file('B01'))
+
+        demand_writer = self.gv.demand_writer
+        try:
+            self.gv.demand_writer = ColumnarDemandWriter(self.gv)
+            calc_thermal_loads('B01', bpr, self.weather_data, self.usage_schedules, self.date, self.gv,
+                               self.locator)
+            self.assertEqual([self.locator.get_demand_building_store('B01')],
+                             self.gv.demand_writer.get_result_files('B01', self.locator))
+            # only B01 of the zone was calculated
+            self.gv.demand_writer.write_totals_csv(self.building_properties, self.locator)
+        finally:
+            self.gv.demand_writer = demand_writer
+        self.assertFalse(os.path.exists(self.locator.get_demand_results_file('B01')), 'Stale csv file not removed')
+
+        df_store = read_demand_results(self.locator, ['B01'])[0]
+        self.assertEqual(list(df_csv.columns), list(df_store.columns))
+        self.assertTrue((df_store.Name == 'B01').all())
+        value_columns = [column for column in df_csv.columns if column not in ('DATE', 'Name')]
+        np.testing.assert_allclose(df_csv[value_columns].values, df_store[value_columns].values, atol=1e-3)
+
+    def test_columnar_demand_writer_without_totals(self):
+        """Without ``gv.print_totals`` the results file is not collected, the buildings are read from their files"""
+        import numpy as np
+        from cea.demand.demand_main import demand_calculation
+        from cea.demand.demand_writers import ColumnarDemandWriter, read_demand_results
+        demand_writer = self.gv.demand_writer
+        try:
+            self.gv.demand_writer = ColumnarDemandWriter(self.gv)
+            # a results file of an earlier run, without B02
+            calc_thermal_loads('B01', self.building_properties['B01'], self.weather_data, self.usage_schedules,
+                               self.date, self.gv, self.locator)
+            self.gv.demand_writer.write_results_store(['B01'], self.locator)
+            os.utime(self.locator.get_demand_results_store(),
+                     (0, os.path.getmtime(self.locator.get_demand_building_store('B01')) - 10))
+
+            self.gv.print_totals = False
+            self.gv.simulate_building_list = ['B01', 'B02']
+            self.assertIsNone(demand_calculation(self.locator, self.locator.get_default_weather(), self.gv))
+        finally:
+            self.gv.demand_writer = demand_writer
+            self.gv.print_totals = True
+            self.gv.simulate_building_list = None
+
+        for building, df in zip(['B01', 'B02'], read_demand_results(self.locator, ['B01', 'B02'])):
+            self.assertFalse(os.path.exists(self.locator.get_demand_results_file(building)))
+            self.assertTrue((df.Name == building).all())
+            self.assertEqual(8760, len(df))
+        # the results of the buildings are newer than the results file of the earlier run
+        with np.load(self.locator.get_demand_building_store('B01')) as data:
+            np.testing.assert_array_equal(data['QHf_kWh'],
+                                          read_demand_results(self.locator, ['B01'], ['QHf_kWh'])[0]['QHf_kWh'])
+
+    def test_building_fingerprint(self):
+        """The fingerprints used by ``demand_calculation(incremental=True)`` must only change with the inputs"""
+        from cea.demand import demand_cache
+        scenario_fingerprints = demand_cache.calc_scenario_fingerprints(self.weather_data, self.date,
+                                                                        self.usage_schedules, self.gv, False)
+        fingerprint = demand_cache.calc_building_fingerprint(self.building_properties['B01'], scenario_fingerprints)
+        self.assertEqual(fingerprint, demand_cache.calc_building_fingerprint(self.building_properties['B01'],
+                                                                             scenario_fingerprints))
+        self.assertNotEqual(fingerprint, demand_cache.calc_building_fingerprint(self.building_properties['B02'],
+                                                                                scenario_fingerprints))
+        self.assertNotEqual(scenario_fingerprints, demand_cache.calc_scenario_fingerprints(
+            self.weather_data, self.date, self.usage_schedules, self.gv, True))
+
+        # the yearly totals collected by the demand writer are not an input
+        totals = dict(self.gv.demand_writer.totals)
+        try:
+            self.gv.demand_writer.totals['B99'] = {'Name': 'B99', 'QHf_MWhyr': 1.0}
+            self.assertEqual(scenario_fingerprints, demand_cache.calc_scenario_fingerprints(
+                self.weather_data, self.date, self.usage_schedules, self.gv, False))
+        finally:
+            self.gv.demand_writer.totals.clear()
+            self.gv.demand_writer.totals.update(totals)
+
+    def test_calc_air_flows_mass_balance(self):
+        """The zone pressure found by ``calc_air_flows`` must balance the air mass flows of each air path"""
+        import numpy as np
+        from cea.demand import ventilation_air_flows_detailed as vent
+        from cea.utilities.physics import calc_rho_air
+        dict_props_nat_vent = vent.get_properties_natural_ventilation(self.building_properties['B01'], self.gv)
+        temp_ext = self.weather_data['drybulb_C'].values[:48]
+        u_wind = self.weather_data['windspd_ms'].values[:48]
+        temp_zone = np.linspace(18.0, 26.0, 48)
+        qm_sum_in, qm_sum_out, p_zone = vent.calc_air_flows(temp_zone, u_wind, temp_ext, dict_props_nat_vent)
+
+        for t in range(48):
+            # Eq. (60) to (69) in [DIN-16798-7], path by path
+            qm_in = qm_out = 0.0
+            for kind, calc_qv_path in [('lea', vent.calc_qv_lea_path), ('vent', vent.calc_qv_vent_path)]:
+                delta_p_path = vent.calc_delta_p_path(p_zone[t], dict_props_nat_vent['height_%s_path' % kind],
+                                                      temp_zone[t],
+                                                      dict_props_nat_vent['coeff_wind_pressure_path_%s' % kind],
+                                                      vent.calc_u_wind_site(u_wind[t]), temp_ext[t])
+                qv_path = calc_qv_path(dict_props_nat_vent['coeff_%s_path' % kind], delta_p_path)
+                qm_in += qv_path[qv_path > 0].sum() * calc_rho_air(temp_ext[t])
+                qm_out += qv_path[qv_path < 0].sum() * calc_rho_air(temp_zone[t])
+            self.assertGreater(qm_in, 0.0)
+            self.assertAlmostEqual(qm_in, qm_sum_in[t], places=6)
+            self.assertAlmostEqual(qm_out, qm_sum_out[t], places=6)
+            self.assertLess(abs(qm_in + qm_out), 1e-5 * qm_in)
+
+            # the zones are solved independently
+            self.assertAlmostEqual(p_zone[t], vent.calc_air_flows(temp_zone[t], u_wind[t], temp_ext[t],
+                                                                  dict_props_nat_vent)[2], places=5)
+
 
 def run_for_single_building(building, bpr, weather_data, usage_schedules, date, gv, locator):
     calc_thermal_loads(building, bpr, weather_data, usage_schedules, date, gv, locator)
@@ -0,0 +1,52 @@
+"""
+Test the startup of the cea command line interface (cli.py): the light subcommands, which are called many times from
+scripts and the ArcGIS toolbox, must not import the heavy modules (numpy, pandas, geopandas...).
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+HEAVY_MODULES = ['numpy', 'pandas', 'geopandas', 'scipy', 'deap']
+
+LIGHT_SUBCOMMANDS = [['weather-files'],
+                     ['weather-path', 'Zurich'],
+                     ['locate', 'get_zone_geometry'],
+                     ['read-config', '--section', 'general', '--key', 'weather'],
+                     ['--scenario', '{scenario}', 'latitude']]
+
+
+class TestCliStartup(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        """Create a scenario with a building geometry for the subcommands that read it (e.g. `latitude`)"""
+        import fiona
+        import cea.inputlocator
+        cls.scenario = tempfile.mkdtemp()
+        zone_geometry = cea.inputlocator.InputLocator(cls.scenario).get_zone_geometry()
+        crs = {'proj': 'tmerc', 'lat_0': 47.1, 'lon_0': 8.5, 'k': 1, 'x_0': 0, 'y_0': 0, 'ellps': 'WGS84',
+               'units': 'm', 'no_defs': True}
+        schema = {'geometry': 'Polygon', 'properties': {'Name': 'str'}}
+        with fiona.open(zone_geometry, 'w', driver='ESRI Shapefile', crs=crs, schema=schema) as shp:
+            shp.write({'geometry': {'type': 'Polygon', 'coordinates': [[(0, 0), (10, 0), (10, 10), (0, 0)]]},
+                       'properties': {'Name': 'B01'}})
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.scenario)
+
+    def test_light_subcommands(self):
+        for subcommand in LIGHT_SUBCOMMANDS:
+            subcommand = [arg.format(scenario=self.scenario) for arg in subcommand]
+            script = ('import sys; sys.argv = %r; import cea.cli; cea.cli.main(); '
+                      'print([m for m in %r if m in sys.modules])' % (['cea'] + subcommand, HEAVY_MODULES))
+            output = subprocess.check_output([sys.executable, '-c', script], cwd=os.path.dirname(__file__))
+            imported = output.strip().splitlines()[-1]
+            self.assertEqual(imported, '[]', 'cea %s imports %s' % (' '.join(subcommand), imported))
+
+
+if __name__ == '__main__':
+    unittest.main()
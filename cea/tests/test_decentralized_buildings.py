@@ -0,0 +1,222 @@
+"""
+Test the optimization/preprocessing/decentralized_buildings.py file and the efficiency curves it evaluates for all the
+hours at once, against the hour by hour (scalar) calculation
+"""
+from __future__ import division
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+
+def calc_Cop_boiler_scalar(Q_load_W, Q_design_W, T_return_to_boiler_K):
+    """`boilers.calc_Cop_boiler` for one time step"""
+    from cea.technologies import boilers
+    if Q_design_W > 0:
+        phi = float(Q_load_W) / float(Q_design_W)
+    else:
+        phi = 0
+    eff_score = boilers._eff_of_phi(phi) / boilers._eff_of_phi(1)
+    return (eff_score * boilers._eff_of_T_return(T_return_to_boiler_K - 273)) / 100.0
+
+
+def calc_eta_FC_scalar(Q_load_W, Q_design_W):
+    """`cogeneration.calc_eta_FC` (approach B) for one time step"""
+    if Q_design_W > 0:
+        phi = float(Q_load_W) / float(Q_design_W)
+    else:
+        phi = 0
+    eta_el = 0.39 * (-0.220 + 5.277 * phi - 9.127 * phi ** 2 + 7.172 * phi ** 3 - 2.103 * phi ** 4)
+    eta_therm = 0.58 * (0.9 - 0.07 * phi + 0.17 * phi ** 2)
+    if phi < 0.2:
+        eta_el = 0
+    return eta_el, eta_therm
+
+
+def calc_Cop_GHP_scalar(mdot_kgpers, T_DH_sup_K, T_re_K, tground_K, gV):
+    """`heatpumps.calc_Cop_GHP` for one time step"""
+    tsup2_K = T_DH_sup_K
+    tcond_K = T_DH_sup_K + gV.HP_deltaT_cond
+    if tcond_K > gV.HP_maxT_cond:
+        tcond_K = gV.HP_maxT_cond
+        tsup2_K = tcond_K - gV.HP_deltaT_cond
+    tevap_K = tground_K - gV.HP_deltaT_evap
+    COP = gV.GHP_etaex / (1 - tevap_K / tcond_K)
+    qhotdot_W = mdot_kgpers * gV.cp * (tsup2_K - T_re_K)
+    qhotdot_missing_W = mdot_kgpers * gV.cp * (T_DH_sup_K - tsup2_K)
+    wdot_W = qhotdot_W / COP
+    return wdot_W / gV.GHP_Auxratio, qhotdot_W - wdot_W, qhotdot_missing_W, tsup2_K
+
+
+def calc_decentralized_building_hourly(mdot, TsupDH, Tret, gv):
+    """
+    The operation of the supply options of a disconnected building, hour by hour as `decentralized_main` calculated it
+    before `calc_decentralized_building`. Returns the operation results, the resources, the heat of the boiler backing
+    up the GHP and the maximum power of the GHP.
+    """
+    Qload = np.maximum(mdot * gv.cp * (TsupDH - Tret) * (1 + gv.Qloss_Disc), 0)
+    Qnom = Qload.max() * (1 + gv.Qmargin_Disc)
+    Tret = Tret.copy()
+    result = np.zeros((13, 7))
+    resourcesRes = np.zeros((13, 4))
+    QannualB_GHP = np.zeros(10)
+    Wel_GHP = np.zeros(10)
+
+    def add_boiler(i, QtoBoiler, QnomBoiler, Tboiler):
+        Qgas = QtoBoiler / calc_Cop_boiler_scalar(QtoBoiler, QnomBoiler, Tboiler)
+        result[3 + i][4] += gv.NG_PRICE * Qgas
+        result[3 + i][5] += gv.NG_BACKUPBOILER_TO_CO2_STD * Qgas * 3600E-6
+        result[3 + i][6] += gv.NG_BACKUPBOILER_TO_OIL_STD * Qgas * 3600E-6
+        QannualB_GHP[i] += QtoBoiler
+        resourcesRes[3 + i][0] += QtoBoiler
+
+    def add_GHP(i, wdot_el, QfromGHP, qhotdot_missing, tsup2, QnomBoiler):
+        Wel_GHP[i] = max(Wel_GHP[i], wdot_el)
+        result[3 + i][4] += gv.ELEC_PRICE * wdot_el
+        result[3 + i][5] += gv.SMALL_GHP_TO_CO2_STD * wdot_el * 3600E-6
+        result[3 + i][6] += gv.SMALL_GHP_TO_OIL_STD * wdot_el * 3600E-6
+        resourcesRes[3 + i][2] -= wdot_el
+        resourcesRes[3 + i][3] += QfromGHP
+        if qhotdot_missing > 0:
+            add_boiler(i, qhotdot_missing, QnomBoiler, tsup2)
+
+    for hour in range(len(Qload)):
+        if Tret[hour] == 0:
+            Tret[hour] = TsupDH[hour]
+
+        Qgas = Qload[hour] / calc_Cop_boiler_scalar(Qload[hour], Qnom, Tret[hour])
+        result[0][4] += gv.NG_PRICE * Qgas
+        result[0][5] += gv.NG_BACKUPBOILER_TO_CO2_STD * Qgas * 3600E-6
+        result[0][6] += gv.NG_BACKUPBOILER_TO_OIL_STD * Qgas * 3600E-6
+        resourcesRes[0][0] += Qload[hour]
+        result[1][4] += gv.BG_PRICE * Qgas
+        result[1][5] += gv.BG_BACKUPBOILER_TO_CO2_STD * Qgas * 3600E-6
+        result[1][6] += gv.BG_BACKUPBOILER_TO_OIL_STD * Qgas * 3600E-6
+        resourcesRes[1][1] += Qload[hour]
+
+        FC_Effel, FC_Effth = calc_eta_FC_scalar(Qload[hour], Qnom)
+        Qgas = Qload[hour] / (FC_Effth + FC_Effel)
+        Qelec = Qgas * FC_Effel
+        result[2][4] += gv.NG_PRICE * Qgas - gv.ELEC_PRICE * Qelec
+        result[2][5] += 0.0874 * Qgas * 3600E-6 + 773 * 0.45 * Qelec * 1E-6 - gv.EL_TO_CO2 * Qelec * 3600E-6
+        result[2][6] += 1.51 * Qgas * 3600E-6 - gv.EL_TO_OIL_EQ * Qelec * 3600E-6
+        resourcesRes[2][0] += Qload[hour]
+        resourcesRes[2][2] += Qelec
+
+        for i in range(10):
+            QnomBoiler = i / 10 * Qnom
+            QnomGHP = Qnom - QnomBoiler
+            if Qload[hour] <= QnomGHP:
+                wdot_el, _, qhotdot_missing, tsup2 = calc_Cop_GHP_scalar(mdot[hour], TsupDH[hour], Tret[hour],
+                                                                         gv.TGround, gv)
+                add_GHP(i, wdot_el, Qload[hour] - qhotdot_missing, qhotdot_missing, tsup2, QnomBoiler)
+            else:
+                TexitGHP = QnomGHP / (mdot[hour] * gv.cp) + Tret[hour]
+                wdot_el, _, qhotdot_missing, tsup2 = calc_Cop_GHP_scalar(mdot[hour], TexitGHP, Tret[hour],
+                                                                         gv.TGround, gv)
+                add_GHP(i, wdot_el, QnomGHP - qhotdot_missing, qhotdot_missing, tsup2, QnomBoiler)
+                add_boiler(i, Qload[hour] - QnomGHP, QnomBoiler, TexitGHP)
+    return result, resourcesRes, QannualB_GHP, Wel_GHP
+
+
+class TestEfficiencyCurves(unittest.TestCase):
+    def test_calc_Cop_boiler(self):
+        from cea.technologies import boilers
+        Q_load_W = np.array([0.0, 1.0, 500.0, 2500.0, 9999.0, 10000.0])
+        T_return_K = np.array([273.0, 288.5, 303.0, 333.0, 344.1, 373.0])
+        for Q_design_W in [10000.0, 0.0]:
+            expected = [calc_Cop_boiler_scalar(Q, Q_design_W, T) for Q, T in zip(Q_load_W, T_return_K)]
+            np.testing.assert_allclose(boilers.calc_Cop_boiler(Q_load_W, Q_design_W, T_return_K), expected,
+                                       rtol=1e-14)
+            self.assertAlmostEqual(float(boilers.calc_Cop_boiler(Q_load_W[2], Q_design_W, T_return_K[2])),
+                                   expected[2], places=14)
+
+    def test_calc_eta_FC(self):
+        from cea.technologies import cogeneration
+        # around the minimum part load (phi = 0.2) of the electric efficiency
+        Q_load_W = np.array([0.0, 100.0, 1999.9, 2000.0, 2000.1, 5000.0, 10000.0])
+        for Q_design_W in [10000.0, 0.0]:
+            eta_el, eta_therm = cogeneration.calc_eta_FC(Q_load_W, Q_design_W, 1, "B")
+            expected_el, expected_therm = zip(*[calc_eta_FC_scalar(Q, Q_design_W) for Q in Q_load_W])
+            np.testing.assert_allclose(eta_el, expected_el, rtol=1e-14)
+            np.testing.assert_allclose(eta_therm, expected_therm, rtol=1e-14)
+            if Q_design_W > 0:
+                self.assertEqual(list(eta_el == 0), [True, True, True, False, False, False, False])
+
+    def test_calc_Cop_GHP(self):
+        import cea.globalvar
+        from cea.technologies import heatpumps
+        gv = cea.globalvar.GlobalVariables()
+        # below, at and above the maximum condenser temperature
+        T_DH_sup_K = np.array([323.0, 353.0, gv.HP_maxT_cond - gv.HP_deltaT_cond, gv.HP_maxT_cond - 1.0, 420.0])
+        T_re_K = np.array([303.0, 313.0, 320.0, 330.0, 330.0])
+        mdot_kgpers = np.array([0.0, 0.5, 1.0, 2.0, 0.3])
+        results = heatpumps.calc_Cop_GHP(mdot_kgpers, T_DH_sup_K, T_re_K, gv.TGround, gv)
+        expected = zip(*[calc_Cop_GHP_scalar(mdot, T_sup, T_re, gv.TGround, gv)
+                         for mdot, T_sup, T_re in zip(mdot_kgpers, T_DH_sup_K, T_re_K)])
+        for values, expected_values in zip(results, expected):
+            np.testing.assert_allclose(values, expected_values, rtol=1e-14)
+        qhotdot_missing_W = results[2]
+        self.assertEqual(list(qhotdot_missing_W > 0), [False, False, False, True, True])
+
+
+class TestDecentralizedBuilding(unittest.TestCase):
+    def test_equals_hourly_calculation(self):
+        import cea.globalvar
+        from cea.optimization.preprocessing import decentralized_buildings
+        from cea.technologies import boilers, heatpumps
+        gv = cea.globalvar.GlobalVariables()
+        # a lower condenser temperature limit, so the GHP needs the backup boiler at some hours (within the range of
+        # the boiler efficiency curves)
+        gv.HP_maxT_cond = 342.5
+
+        hours = np.arange(48)
+        mdot = 0.5 + 0.4 * np.sin(2 * np.pi * hours / 24.0)
+        TsupDH = 333.0 + 8 * np.cos(2 * np.pi * hours / 12.0)
+        Tret = TsupDH - 5.0 - 20 * mdot
+        mdot[[3, 5, 30, 40]] = 0.0  # no flow
+        Tret[[5, 40]] = 0.0  # and no return temperature
+        Tret[7] = TsupDH[7] + 1.0  # no load
+
+        folder = tempfile.mkdtemp()
+
+        class Locator(object):
+            def get_optimization_substations_results_file(self, building_name):
+                return os.path.join(folder, '%s_substation.csv' % building_name)
+
+            def get_optimization_disconnected_folder_building_result(self, building_name):
+                return os.path.join(folder, '%s_result.csv' % building_name)
+
+        try:
+            locator = Locator()
+            pd.DataFrame({'T_supply_DH_result_K': TsupDH, 'T_return_DH_result_K': Tret,
+                          'mdot_DH_result_kgpers': mdot}).to_csv(
+                locator.get_optimization_substations_results_file('B01'), index=False)
+            decentralized_buildings.calc_decentralized_building(locator, 'B01', 1000.0, gv)
+            calculated = pd.read_csv(locator.get_optimization_disconnected_folder_building_result('B01'))
+        finally:
+            shutil.rmtree(folder)
+
+        result, resourcesRes, QannualB_GHP, Wel_GHP = calc_decentralized_building_hourly(mdot, TsupDH, Tret, gv)
+        Qload = decentralized_buildings.calc_new_load(mdot, TsupDH, Tret, gv)
+        Qnom = Qload.max() * (1 + gv.Qmargin_Disc)
+        # the boiler backs up the GHP above the condenser temperature limit (without share) and at nominal load
+        self.assertTrue(QannualB_GHP[0] > 0)
+        self.assertTrue(QannualB_GHP[-1] > QannualB_GHP[0])
+
+        for i, name in enumerate(["Operation Costs [CHF]", "CO2 Emissions [kgCO2-eq]",
+                                  "Primary Energy Needs [MJoil-eq]"]):
+            np.testing.assert_allclose(calculated[name], result[:, 4 + i], rtol=1e-12, err_msg=name)
+        for i, name in enumerate(["QfromNG", "QfromBG", "EforGHP", "QfromGHP"]):
+            np.testing.assert_allclose(calculated[name], resourcesRes[:, i], rtol=1e-12, err_msg=name)
+        InvCosts_GHP = [boilers.calc_Cinv_boiler(i / 10 * Qnom, QannualB_GHP[i], gv) +
+                        heatpumps.GHP_InvCost(Wel_GHP[i], gv) * gv.EURO_TO_CHF for i in range(10)]
+        np.testing.assert_allclose(calculated["Annualized Investment Costs [CHF]"][3:], InvCosts_GHP, rtol=1e-12)
+
+
+if __name__ == '__main__':
+    unittest.main()
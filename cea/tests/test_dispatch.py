@@ -0,0 +1,41 @@
+"""
+Test the optimization/slave/dispatch.py file
+"""
+
+import unittest
+
+import numpy as np
+
+
+class TestDispatch(unittest.TestCase):
+    def test_merit_order(self):
+        import cea.globalvar
+        from cea.optimization.slave import dispatch
+        from cea.optimization.slave_data import SlaveData
+        gv = cea.globalvar.GlobalVariables()
+        master_to_slave_vars = SlaveData()
+        master_to_slave_vars.Boiler_on = 1
+        master_to_slave_vars.Boiler_Q_max = 1000.0
+        master_to_slave_vars.BoilerPeak_on = 1
+        master_to_slave_vars.BoilerPeak_Q_max = 500.0
+
+        Q_therm_req_W = np.array([0.0, 0.05, 0.3, 40.0, 800.0, 1200.0, 2000.0])
+        T_DH_return_K = np.ones(len(Q_therm_req_W)) * (273.0 + 50)
+        cost, source_info, Q_source_W, E_coldsource_W, E_PP_el_W, E_gas_W, E_wood_W, Q_excess_W = \
+            dispatch.calc_dispatch(Q_therm_req_W, np.ones(len(Q_therm_req_W)), T_DH_return_K, 273.0 + 70, None,
+                                   master_to_slave_vars, gv)
+
+        # base boiler first (above its minimum load), then the peak boiler, the rest is uncovered - less than 1 Wh is
+        # neglected
+        np.testing.assert_allclose(Q_source_W[:, dispatch.BOILER_BASE], [0, 0, 0, 0, 800, 1000, 1000])
+        np.testing.assert_allclose(Q_source_W[:, dispatch.BOILER_PEAK], [0, 0, 0, 40, 0, 200, 500])
+        np.testing.assert_allclose(Q_source_W[:, dispatch.UNCOVERED], [0, 0, 0, 0, 0, 0, 500])
+        np.testing.assert_array_equal(source_info[:, dispatch.BOILER_PEAK], [0, 0, 0, 1, 0, 1, 1])
+        self.assertTrue((cost[Q_source_W[:, :dispatch.UNCOVERED] > 0] > 0).all())
+        self.assertEqual(np.count_nonzero(E_gas_W[:, dispatch.BOILER_BASE] > Q_source_W[:, dispatch.BOILER_BASE]), 3)
+        self.assertFalse(Q_excess_W.any())
+        self.assertFalse(E_wood_W.any() or E_coldsource_W.any())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Test the parsed weather cache and the sky temperature of cea/utilities/epwreader.py
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+WEATHER_FILE = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'databases', 'weather', 'Zug.epw')
+
+
+class TestEpwReader(unittest.TestCase):
+    def setUp(self):
+        from cea.utilities import epwreader
+        # the cache files are written to a cache folder of the test
+        self.folder = tempfile.mkdtemp()
+        self.xdg_cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = os.path.join(self.folder, 'cache')
+        self.weather_path = os.path.join(self.folder, 'weather.epw')
+        shutil.copy(WEATHER_FILE, self.weather_path)
+        self.parse_epw = epwreader.parse_epw
+        epwreader._weather_data.clear()
+
+    def tearDown(self):
+        from cea.utilities import epwreader
+        epwreader.parse_epw = self.parse_epw
+        epwreader._weather_data.clear()
+        if self.xdg_cache_home is None:
+            del os.environ['XDG_CACHE_HOME']
+        else:
+            os.environ['XDG_CACHE_HOME'] = self.xdg_cache_home
+        shutil.rmtree(self.folder)
+
+    def test_cache(self):
+        from cea.utilities import epwreader
+        parsed = []
+
+        def parse_epw(weather_path):
+            parsed.append(weather_path)
+            return self.parse_epw(weather_path)
+
+        epwreader.parse_epw = parse_epw
+
+        # the same data as parsing the weather file, also when read from memory or from the cache file
+        weather_data = epwreader.epw_reader(self.weather_path)
+        pd.testing.assert_frame_equal(weather_data, self.parse_epw(self.weather_path))
+        weather_data['drybulb_C'] = 0.0
+        pd.testing.assert_frame_equal(epwreader.epw_reader(self.weather_path), self.parse_epw(self.weather_path))
+        epwreader._weather_data.clear()
+        pd.testing.assert_frame_equal(epwreader.epw_reader(self.weather_path), self.parse_epw(self.weather_path))
+        self.assertEqual(len(parsed), 1)
+
+        # a modified weather file is parsed again
+        with open(self.weather_path) as f:
+            lines = f.readlines()
+        fields = lines[8].split(',')
+        fields[6] = str(float(fields[6]) + 10.0)
+        lines[8] = ','.join(fields)
+        with open(self.weather_path, 'w') as f:
+            f.writelines(lines)
+        os.utime(self.weather_path, (os.path.getatime(self.weather_path), os.path.getmtime(self.weather_path) + 10))
+        weather_data = epwreader.epw_reader(self.weather_path)
+        self.assertEqual(len(parsed), 2)
+        pd.testing.assert_frame_equal(weather_data, self.parse_epw(self.weather_path))
+        self.assertEqual(weather_data['drybulb_C'][0], float(fields[6]))
+
+    def test_skytemp_equals_hourly_calculation(self):
+        from cea.utilities import epwreader
+        from cea.utilities.physics import BOLTZMANN
+
+        def calc_skytemp(Tdrybulb, Tdewpoint, N):
+            sky_e = (0.787 + 0.764 * ((Tdewpoint + 273) / 273)) * 1 + 0.0224 * N + 0.0035 * N ** 2 + 0.00025 * N ** 3
+            hor_IR = sky_e * BOLTZMANN * (Tdrybulb + 273) ** 4
+            return ((hor_IR / BOLTZMANN) ** 0.25) - 273
+
+        weather_data = epwreader.epw_reader(self.weather_path)
+        # including the hours without radiation (no sky cover ratio)
+        self.assertTrue(weather_data['ratio_diffhout'].isnull().any())
+        expected = [calc_skytemp(Tdrybulb, Tdewpoint, N) for Tdrybulb, Tdewpoint, N in
+                    zip(weather_data['drybulb_C'], weather_data['dewpoint_C'], weather_data['skycover'])]
+        np.testing.assert_allclose(weather_data['skytemp_C'], expected, rtol=1e-12)
+        self.assertAlmostEqual(epwreader.calc_skytemp(20.0, 10.0, 0.5), calc_skytemp(20.0, 10.0, 0.5), places=12)
+
+
+if __name__ == '__main__':
+    unittest.main()
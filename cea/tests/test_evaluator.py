@@ -0,0 +1,130 @@
+"""
+Test the optimization/master/evaluator.py file
+"""
+
+import os
+import random
+import shutil
+import tempfile
+import unittest
+
+
+def objective_function(individual):
+    """Modifies the individual, uses the random generator and changes the working directory, like `evaluation_main`"""
+    if individual[0] < 0:
+        raise ValueError('invalid individual')
+    individual[1] = random.random()
+    os.chdir(tempfile.gettempdir())
+    return individual[0] * 2, individual[1], float(len(individual))
+
+
+# the individuals evaluated by `counted_objective_function`
+evaluated = []
+
+
+def counted_objective_function(individual):
+    """Modifies the individual and records the evaluation"""
+    evaluated.append(list(individual))
+    individual[1] = individual[0] * 10.0
+    return individual[0] * 2, individual[1], float(sum(individual))
+
+
+class TestEvaluator(unittest.TestCase):
+    def test_serial_and_processes(self):
+        import cea.globalvar
+        from cea.optimization.master import evaluator
+        gv = cea.globalvar.GlobalVariables()
+        gv.number_of_processes = 2
+        working_directory = os.getcwd()
+
+        results = {}
+        for backend in ['serial', 'processes']:
+            gv.optimization_evaluator = backend
+            population_evaluator = evaluator.create_evaluator(gv)
+            self.assertIsInstance(population_evaluator, evaluator.EVALUATORS[backend])
+            random.seed(42)
+            individuals = [[i, 0] for i in [3, -1, 1, 2]]
+            try:
+                fitnesses = population_evaluator.map(objective_function, individuals)
+            finally:
+                population_evaluator.close()
+            self.assertEqual(os.getcwd(), working_directory)
+            results[backend] = individuals, fitnesses
+
+        # same order, same results and the failure of an individual does not affect the others
+        individuals, fitnesses = results['serial']
+        self.assertEqual(results['processes'], results['serial'])
+        self.assertEqual([fitness[0] for fitness in fitnesses], [6, evaluator.FAILED_FITNESS[0], 2, 4])
+        self.assertEqual(individuals[1], [-1, 0])
+        for individual, fitness in zip(individuals, fitnesses):
+            if individual[0] >= 0:
+                self.assertEqual(individual[1], fitness[1])
+
+        gv.optimization_evaluator = 'cluster'
+        self.assertRaises(ValueError, evaluator.create_evaluator, gv)
+
+    def test_terminate(self):
+        """A failed optimization stops the worker processes and removes their scratch folders"""
+        import cea.globalvar
+        from cea.optimization.master import evaluator
+        gv = cea.globalvar.GlobalVariables()
+        gv.number_of_processes = 2
+        gv.optimization_evaluator = 'processes'
+        population_evaluator = evaluator.create_evaluator(gv)
+        population_evaluator.map(objective_function, [[1, 0], [2, 0]])
+        workers = list(population_evaluator.pool._pool)
+        self.assertTrue(os.listdir(population_evaluator.scratch_folder))
+        population_evaluator.terminate()
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+        self.assertFalse(os.path.exists(population_evaluator.scratch_folder))
+
+
+class TestFitnessCache(unittest.TestCase):
+    def test_hit_miss_and_resume(self):
+        import cea.globalvar
+        from cea.optimization.master import evaluator, fitness_cache
+        gv = cea.globalvar.GlobalVariables()
+        gv.optimization_evaluator = 'serial'
+        folder = tempfile.mkdtemp()
+        cache_file = os.path.join(folder, 'FitnessCache.json')
+        genes = [0.0] * ((gv.nHeat + gv.nSolar) * 2 + gv.nHR + 1)
+
+        def create_individuals(*barcodes):
+            return [[float(i + 1)] + genes[1:] + barcode for i, barcode in enumerate(barcodes)]
+
+        try:
+            # misses and a hit of an identical individual in the same generation
+            del evaluated[:]
+            cache = fitness_cache.FitnessCache(cache_file, gv)
+            population_evaluator = evaluator.create_evaluator(gv, cache)
+            individuals = create_individuals([1, 0, 1], [1, 1, 0])
+            individuals.append(list(individuals[0]))
+            fitnesses = population_evaluator.map(counted_objective_function, individuals)
+            self.assertEqual(len(evaluated), 2)
+            self.assertEqual((cache.hits, cache.misses), (1, 2))
+            self.assertEqual(fitnesses[2], fitnesses[0])
+            self.assertEqual(individuals[2], individuals[0])
+            self.assertEqual(individuals[0][1], 10.0)
+            self.assertEqual(cache.get(cache.get_key(create_individuals([1, 1, 0])[0])), None)
+
+            # resumed from a checkpoint: the individuals of the previous run are not evaluated again
+            del evaluated[:]
+            cache = fitness_cache.FitnessCache(cache_file, gv, resume=True)
+            population_evaluator = evaluator.create_evaluator(gv, cache)
+            resumed_individuals = create_individuals([1, 0, 1], [1, 1, 0], [0, 1, 1])
+            resumed_fitnesses = population_evaluator.map(counted_objective_function, resumed_individuals)
+            self.assertEqual(evaluated, [create_individuals([1, 0, 1], [1, 1, 0], [0, 1, 1])[2]])
+            self.assertEqual(resumed_individuals[:2], individuals[:2])
+            self.assertEqual(resumed_fitnesses[:2], fitnesses[:2])
+
+            # a new optimization starts with an empty cache
+            del evaluated[:]
+            cache = fitness_cache.FitnessCache(cache_file, gv)
+            evaluator.create_evaluator(gv, cache).map(counted_objective_function, create_individuals([1, 0, 1]))
+            self.assertEqual(len(evaluated), 1)
+        finally:
+            shutil.rmtree(folder)
+
+
+if __name__ == '__main__':
+    unittest.main()
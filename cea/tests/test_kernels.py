@@ -0,0 +1,69 @@
+"""
+Test the selection of the compiled kernels of cea/utilities/kernels.py
+"""
+
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# imports the kernels in a new process, with the cache folder of the user in XDG_CACHE_HOME
+CACHE_FOLDER_SCRIPT = """
+import os
+from cea.utilities import filecache, kernels
+
+
+def increment(x):
+    return x + 1
+
+
+print(os.path.exists(filecache.get_cache_folder()))
+kernels.compile_kernels('cache_folder', [increment])
+if kernels.JIT_AVAILABLE:
+    import numba
+    print(numba.config.CACHE_DIR == kernels.get_cache_dir())
+"""
+
+
+class TestKernels(unittest.TestCase):
+    def test_report(self):
+        from cea.utilities import kernels
+        report = dict(kernels.report())
+        self.assertIn('cea.technologies.storagetank.calc_dhw_tank_operation', report)
+        self.assertIn('cea.demand.rc_model_crank_nicholson_year._calc_year', report)
+        for name, version in report.items():
+            self.assertIn(version, ['aot', 'jit', 'python'], name)
+            if version == 'jit':
+                self.assertTrue(kernels.JIT_AVAILABLE)
+
+    def test_python_kernel_equals_compiled_kernel(self):
+        import cea.demand.rc_model_SIA as rc_model_SIA
+        from cea.utilities import kernels
+        calc_phi_m = kernels.get_python_kernel('cea.demand.rc_model_SIA', 'calc_phi_m')
+        args = (1200.0, 300.0, 250.0, 5000.0, 0.4, 0.3, 0.5)
+        self.assertAlmostEqual(rc_model_SIA.calc_phi_m(*args), calc_phi_m(*args), places=9)
+        if dict(kernels.report())['cea.demand.rc_model_SIA.calc_phi_m'] == 'python':
+            self.assertIs(rc_model_SIA.calc_phi_m, calc_phi_m)
+
+
+    def test_cache_folder_created_on_first_kernel(self):
+        """Importing the kernels module doesn't create the cache folder, compiling the first kernel does"""
+        import cea
+        from cea.utilities import kernels
+        folder = tempfile.mkdtemp()
+        environment = dict(os.environ, XDG_CACHE_HOME=os.path.join(folder, 'cache'))
+        environment.pop('NUMBA_CACHE_DIR', None)
+        script = os.path.join(folder, 'cache_folder.py')
+        try:
+            with open(script, 'w') as f:
+                f.write(CACHE_FOLDER_SCRIPT)
+            output = subprocess.check_output([sys.executable, script], env=environment,
+                                             cwd=os.path.dirname(os.path.dirname(cea.__file__)))
+        finally:
+            shutil.rmtree(folder)
+        self.assertEqual(output.split(), ['False', 'True'] if kernels.JIT_AVAILABLE else ['False'])
+
+if __name__ == '__main__':
+    unittest.main()
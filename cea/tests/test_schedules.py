@@ -18,6 +18,7 @@ from cea.demand.preprocessing.properties import calculate_average_multiuse
 from cea.demand.preprocessing.properties import correct_archetype_areas
 from cea.demand.preprocessing.properties import get_database
 from cea.demand.occupancy_model import calc_schedules
+from cea.demand.occupancy_model import get_building_schedules
 from cea.demand.occupancy_model import schedule_maker
 
 
@@ -80,6 +81,24 @@ class TestScheduleCreation(unittest.TestCase):
                     REFERENCE_TIME],
                 reference_results[schedule]))
 
+    def test_building_schedules_cache(self):
+        locator = ReferenceCaseOpenLocator()
+        list_uses = ['OFFICE', 'INDUSTRIAL']
+        gv = GlobalVariables()
+        date = pd.date_range(gv.date_start, periods=8760, freq='H')
+        archetype_schedules, archetype_values = schedule_maker(date, locator, list_uses)
+        usage_schedules = {'list_uses': list_uses, 'archetype_schedules': archetype_schedules,
+                           'archetype_values': archetype_values}
+
+        schedules = get_building_schedules(usage_schedules, {'OFFICE': 0.5, 'INDUSTRIAL': 0.5})
+        self.assertIs(schedules, get_building_schedules(usage_schedules, {'OFFICE': 0.5, 'INDUSTRIAL': 0.5}))
+        other_schedules = get_building_schedules(usage_schedules, {'OFFICE': 0.25, 'INDUSTRIAL': 0.75})
+        expected_schedules = calc_schedules(list_uses, archetype_schedules, {'OFFICE': 0.25, 'INDUSTRIAL': 0.75},
+                                            archetype_values)
+        for schedule in expected_schedules:
+            self.assertTrue((expected_schedules[schedule] == other_schedules[schedule]).all(),
+                            "Schedule '%s' differs from calc_schedules" % schedule)
+
 
 def get_test_config_path():
     """return the path to the test data configuration file (``cea/tests/test_schedules.config``)"""
@@ -0,0 +1,143 @@
+"""
+Test the collector model of cea/technologies/solar_collector.py (used for solar collectors and photovoltaic thermal
+panels)
+"""
+from __future__ import division
+
+import unittest
+
+import numpy as np
+
+
+def calc_collector_module_reference(qrad, c1, Te, c2, mB0_r, mB_max_r, mB_min_r, C_eff, Area_a, dP2, dP3, dP4, Tin,
+                                    Leq, Le, Nseg):
+    """
+    The segment model of `Calc_SC_module2` before `calc_collector_module`: each flow case is calculated for all the
+    hours, one after the other, with the heat gain iteration of `calc_qgain` (with its iteration counter incremented).
+    """
+    from cea.technologies.solar_collector import calc_Eaux_SC, Calc_qloss_net
+    Cpwg = 3680  # J/kgK
+    delts = 3600
+    hours = len(qrad)
+    m_cases = [np.zeros(hours) + m * Area_a / 3600 for m in [0, mB0_r, mB_max_r, mB_min_r]] + [None, None]
+    dP_cases = [np.zeros(hours) + dP * Area_a for dP in [0, dP2, dP3, dP4]] + [None, None]
+    temperature_out = np.zeros((6, hours))
+    supply_out = np.zeros((6, hours))
+    for flow in range(6):
+        if flow == 4:
+            # the flow with the highest balance of heat output and (twice) the auxiliary electricity of each hour
+            balances = np.array([supply_out[case] - calc_Eaux_SC(m_cases[case], dP_cases[case], Leq, Area_a) * 2
+                                 for case in range(4)])
+            best = balances.argmax(axis=0)
+            m_cases[4] = np.choose(best, m_cases[:4])
+            dP_cases[4] = np.choose(best, dP_cases[:4])
+        elif flow == 5:
+            m_cases[5] = np.where(supply_out[4] <= 0, 0, m_cases[4])
+            dP_cases[5] = np.where(supply_out[4] <= 0, 0, dP_cases[4])
+        stored = np.zeros(Nseg) + Tin
+        for time in range(hours):
+            Mfl = m_cases[flow][time]
+            Tfl = stored.mean()
+            if Mfl > 0:
+                Tout = Tin + (qrad[time] - (c1 + 0.5) * (Tin - Te[time])) / (Mfl * Cpwg / Area_a)
+                DT = (Tin + Tout) / 2 - Te[time]
+                for xgain in range(1, 101):
+                    qgain = qrad[time] - c1 * DT - c2 * abs(DT) * DT
+                    Tout = ((Mfl * Cpwg * Tin) / Area_a - (C_eff * Tin) / (2 * delts) + qgain + (C_eff * Tfl) / delts) / (
+                        Mfl * Cpwg / Area_a + C_eff / (2 * delts))
+                    DT2 = (Tin + Tout) / 2 - Te[time]
+                    if Mfl / Area_a * Cpwg * 2 * (DT2 - DT) < 0.1:
+                        break
+                    DT = (DT + DT2) / 2 if xgain > 40 else DT2
+                Aseg = Area_a / Nseg
+                ToutSeg = Tin
+                segments = np.zeros(Nseg)
+                for Iseg in range(Nseg):
+                    TinSeg = ToutSeg
+                    ToutSeg = ((Mfl * Cpwg * (TinSeg + 273)) / Aseg - (C_eff * (TinSeg + 273)) / (2 * delts) + qgain +
+                               (C_eff * (stored[Iseg] + 273) / delts)) / (Mfl * Cpwg / Aseg + C_eff / (2 * delts)) - 273
+                    segments[Iseg] = (TinSeg + ToutSeg) / 2
+            else:
+                ToutSeg = Te[time] + qrad[time] / (c1 + 0.5)
+                segments = np.zeros(Nseg) + ToutSeg
+            # the temperature of the last segment is not stored for the next hour
+            stored[:-1] = segments[:-1]
+            temperature_out[flow][time] = ToutSeg
+            supply_out[flow][time] = Mfl * Cpwg * (ToutSeg - Tin) / 1000  # in kW
+
+    Auxiliary = calc_Eaux_SC(m_cases[5], dP_cases[5], Leq, Area_a)
+    supply_losses = Calc_qloss_net(m_cases[5], Le, Area_a, (Tin + temperature_out[5]) / 2, Te,
+                                   mB_max_r * Area_a / 3600)
+    return [supply_losses, supply_out[5] + 0.5 * Auxiliary - supply_losses, Auxiliary, temperature_out[5],
+            np.zeros(hours) + Tin, m_cases[5] * (Cpwg / 1000)]
+
+
+class TestCollectorModule(unittest.TestCase):
+    def calc_collector_module(self, type_SCpanel, qrad, Te, Tin):
+        from cea.technologies.solar_collector import calc_properties_SC, calc_collector_module
+        n0, c1, c2, mB0_r, mB_max_r, mB_min_r, C_eff, t_max, IAM_d, Aratio, Apanel, dP1, dP2, dP3, dP4 = \
+            calc_properties_SC(type_SCpanel)
+        Nseg = 100 if type_SCpanel == 2 else 10
+        return calc_collector_module(qrad, np.zeros(len(qrad)) + c1, Te, c2, mB0_r, mB_max_r, mB_min_r, C_eff,
+                                     Aratio * Apanel, dP2, dP3, dP4, Tin, 0.8, 0.3, Nseg)
+
+    def test_no_radiation(self):
+        for type_SCpanel in [1, 2]:
+            qloss, qout, Eaux, Tout, Tin, mcp = self.calc_collector_module(type_SCpanel, np.zeros(48),
+                                                                           np.zeros(48) + 60.0, 60.0)
+            self.assertTrue((mcp == 0).all())
+            self.assertTrue((qout == 0).all())
+            self.assertTrue((Eaux == 0).all())
+            np.testing.assert_allclose(Tout, 60.0)
+            np.testing.assert_allclose(Tin, 60.0)
+
+    def test_sunny_day(self):
+        hour = np.arange(72)
+        qrad = np.clip(800 * np.sin(2 * np.pi * (hour % 24 - 6) / 24.0), 0, None)
+        Te = np.zeros(72) + 20.0
+        for type_SCpanel in [1, 2]:
+            qloss, qout, Eaux, Tout, Tin, mcp = self.calc_collector_module(type_SCpanel, qrad, Te, 40.0)
+            # heat is only produced with sun, at the outlet temperature
+            self.assertTrue((mcp[qrad == 0] == 0).all())
+            self.assertTrue((mcp[36:40] > 0).all())
+            producing = mcp > 0
+            np.testing.assert_allclose(qout[producing] + qloss[producing] - 0.5 * Eaux[producing],
+                                       mcp[producing] * (Tout[producing] - Tin[producing]), rtol=1e-9)
+
+    def test_equals_segment_model(self):
+        from cea.technologies.solar_collector import calc_properties_SC
+        hour = np.arange(48)
+        qrad = np.clip(700 * np.sin(2 * np.pi * (hour % 24 - 7) / 24.0), 0, None)
+        qrad[30:33] *= 0.2  # clouds
+        Te = 12.0 + 8 * np.sin(2 * np.pi * (hour % 24 - 9) / 24.0)
+        for type_SCpanel in [1, 2]:
+            n0, c1, c2, mB0_r, mB_max_r, mB_min_r, C_eff, t_max, IAM_d, Aratio, Apanel, dP1, dP2, dP3, dP4 = \
+                calc_properties_SC(type_SCpanel)
+            Nseg = 100 if type_SCpanel == 2 else 10
+            results = self.calc_collector_module(type_SCpanel, qrad, Te, 35.0)
+            expected = calc_collector_module_reference(qrad, c1, Te, c2, mB0_r, mB_max_r, mB_min_r, C_eff,
+                                                       Aratio * Apanel, dP2, dP3, dP4, 35.0, 0.8, 0.3, Nseg)
+            self.assertTrue((expected[5] > 0).any())
+            for name, values, expected_values in zip(['qloss', 'qout', 'Eaux', 'Tout', 'Tin', 'mcp'], results,
+                                                     expected):
+                np.testing.assert_allclose(values, expected_values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+    def test_stability_check_without_minimum_flow(self):
+        import sys
+        from StringIO import StringIO
+        from cea.technologies.solar_collector import calc_properties_SC, calc_collector_module
+        n0, c1, c2, mB0_r, mB_max_r, mB_min_r, C_eff, t_max, IAM_d, Aratio, Apanel, dP1, dP2, dP3, dP4 = \
+            calc_properties_SC(1)
+        stdout = sys.stdout
+        sys.stdout = StringIO()
+        try:
+            calc_collector_module(np.zeros(4) + 500.0, np.zeros(4) + c1, np.zeros(4) + 20.0, c2, mB0_r, mB_max_r, 0.0,
+                                  C_eff, Aratio * Apanel, dP2, dP3, dP4, 35.0, 0.8, 0.3, 10)
+            output = sys.stdout.getvalue()
+        finally:
+            sys.stdout = stdout
+        self.assertNotIn('ERROR', output)
+
+
+if __name__ == '__main__':
+    unittest.main()
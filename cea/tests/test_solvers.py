@@ -0,0 +1,80 @@
+"""
+Test the root finding of cea/utilities/solvers.py
+"""
+
+import unittest
+
+import numpy as np
+
+
+def scipy_0_19_newton(func, x0, args=(), tol=1.48e-8, maxiter=50):
+    """The secant method of ``scipy.optimize.newton`` in scipy 0.19.1 (the version in environment.yml)"""
+    p0 = x0
+    p1 = x0 * (1 + 1e-4) + (1e-4 if x0 >= 0 else -1e-4)
+    q0 = func(*((p0,) + args))
+    q1 = func(*((p1,) + args))
+    for _ in range(maxiter):
+        if q1 == q0:
+            return (p1 + p0) / 2.0
+        p = p1 - q1 * (p1 - p0) / (q1 - q0)
+        if abs(p - p1) < tol:
+            return p
+        p0, q0 = p1, q1
+        p1 = p
+        q1 = func(*((p1,) + args))
+    raise RuntimeError('Failed to converge after %d iterations, value is %s' % (maxiter, p))
+
+
+class TestNewton(unittest.TestCase):
+    def test_equals_scipy_newton(self):
+        import scipy.optimize
+        from cea.utilities import solvers
+
+        def func(x, a, b):
+            return a * np.log(x) + b * x ** 0.5 - 10.0
+
+        a = np.linspace(0.5, 5.0, 50)
+        for tol in [1e-8, 0.01]:
+            roots, converged = solvers.newton(func, 2.0, args=(a, 3.0), tol=tol, maxiter=100)
+            self.assertTrue(converged.all())
+            for i in range(len(a)):
+                self.assertAlmostEqual(roots[i], scipy_0_19_newton(func, 2.0, args=(a[i], 3.0), tol=tol,
+                                                                   maxiter=100), places=12)
+                # the installed version of scipy may iterate differently
+                self.assertAlmostEqual(roots[i], scipy.optimize.newton(func, 2.0, args=(a[i], 3.0), tol=tol,
+                                                                       maxiter=100), delta=tol)
+
+    def test_not_converged(self):
+        from cea.utilities import solvers
+        roots, converged = solvers.newton(lambda x, c: x ** 2 + c, np.array([1.0, 1.0]), args=(np.array([-4.0, 1.0]),),
+                                          maxiter=20)
+        self.assertAlmostEqual(roots[0], 2.0)
+        self.assertEqual(list(converged), [True, False])
+
+
+class TestRegulaFalsi(unittest.TestCase):
+    def test_roots_of_monotonic_functions(self):
+        from cea.utilities import solvers
+
+        def func(x, c, n):
+            # decreasing, with a kink at the root
+            return -np.sign(x - c) * np.abs(x - c) ** n
+
+        c = np.array([-25.0, -0.3, 0.0, 1.0, 1.5, 40.0])
+        for n in [0.5, 0.667, 1.0]:
+            roots, converged = solvers.regula_falsi(func, 1.0, args=(c, n), xtol=1e-8)
+            self.assertTrue(converged.all())
+            np.testing.assert_allclose(roots, c, rtol=0, atol=1e-8)
+
+    def test_warm_start(self):
+        from cea.utilities import solvers
+        x0 = np.array([2.0, 3.0])
+        roots, converged = solvers.regula_falsi(lambda x: x ** 3 - 8, x0)
+        self.assertEqual(list(converged), [True, True])
+        self.assertEqual(roots[0], 2.0)
+        self.assertAlmostEqual(roots[1], 2.0)
+        self.assertEqual(list(x0), [2.0, 3.0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+"""
+Test the storage operation kernel of optimization/slave/seasonal_storage/SolarPowerHandler_incl_Losses.py
+"""
+
+import unittest
+
+import numpy as np
+
+
+class TestStorageOperation(unittest.TestCase):
+    def test_batch_equals_storage_operator(self):
+        import cea.globalvar
+        import cea.optimization.slave.seasonal_storage.SolarPowerHandler_incl_Losses as SPH_fn
+        from cea.optimization.slave_data import SlaveData
+        from cea.optimization.slave.seasonal_storage.design_operation import calc_storage_operation
+        gv = cea.globalvar.GlobalVariables()
+        context = SlaveData()
+
+        hours = np.arange(500)
+        Q_uncontrollable_Wh = np.maximum(0, np.sin(2 * np.pi * hours / 24.0)) * 3e5
+        Q_network_demand_W = 1e5 + 5e4 * np.cos(2 * np.pi * hours / 24.0)
+        Q_network_demand_W[10:12] = 0
+        inputs = {'Q_uncontrollable_Wh': Q_uncontrollable_Wh,
+                  'Q_DH_networkload_W': Q_network_demand_W,
+                  'T_DH_sup_K': 273.0 + 70 + np.zeros(len(hours)),
+                  'T_DH_return_K': 273.0 + 45 + np.zeros(len(hours)),
+                  'mdot_DH_kgpers': Q_network_demand_W / (4185 * 25.0),
+                  'E_aux_HP_uncontrollable_Wh': Q_uncontrollable_Wh * 0.1}
+        V_storage_m3 = np.array([50.0, 200.0, 1000.0])
+        P_HP_max_W = np.array([1e12, 1e12, 5e4])
+        operation = calc_storage_operation(inputs, V_storage_m3, 273.0 + 40, 5e6, P_HP_max_W, context, gv)
+
+        for storage in range(len(V_storage_m3)):
+            # the storages are operated independently
+            single = calc_storage_operation(inputs, V_storage_m3[storage], 273.0 + 40, 5e6, P_HP_max_W[storage],
+                                            context, gv)
+            for name in operation:
+                np.testing.assert_array_equal(operation[name][storage], single[name][0])
+
+            # same as operating the storage hour by hour
+            T_storage_K, Q_in_storage_W = 273.0 + 40, 5e6
+            for hour in range(len(hours)):
+                Storage_Data = SPH_fn.Storage_Operator(Q_uncontrollable_Wh[hour], Q_network_demand_W[hour],
+                                                       T_storage_K, inputs['T_DH_sup_K'][hour], 283.0,
+                                                       Q_in_storage_W, inputs['T_DH_return_K'][hour],
+                                                       inputs['mdot_DH_kgpers'][hour], V_storage_m3[storage],
+                                                       context, P_HP_max_W[storage], gv)
+                if Storage_Data[1] >= context.T_ST_MAX - 0.001:
+                    break
+                Q_in_storage_W = Storage_Data[0] if Storage_Data[0] >= 0.0001 else 0
+                T_storage_K = Storage_Data[1]
+                self.assertEqual(operation['Q_storage_content_W'][storage, hour], Q_in_storage_W)
+                self.assertEqual(operation['T_storage_K'][storage, hour], T_storage_K)
+                self.assertEqual(operation['Q_missing_W'][storage, hour], Storage_Data[6])
+
+
+if __name__ == '__main__':
+    unittest.main()
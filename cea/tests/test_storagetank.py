@@ -0,0 +1,41 @@
+"""
+Test the DHW tank operation of cea/technologies/storagetank.py
+"""
+
+import unittest
+
+import numpy as np
+
+
+class TestDhwTankOperation(unittest.TestCase):
+    def test_tank_operation_equals_ode(self):
+        import cea.globalvar
+        import cea.technologies.storagetank as storagetank
+        gv = cea.globalvar.GlobalVariables()
+
+        hours = np.arange(200)
+        T_ext = 5 + 5 * np.sin(2 * np.pi * hours / 24.0)
+        Ta = 20 + np.zeros(len(hours))
+        Qww = np.where(hours % 5 < 2, 2000.0 + 10 * hours, 0)
+        Qww_ls_r = np.where(Qww > 0, 50.0, 0)
+        Qww_ls_nr = 20 + np.zeros(len(hours))
+        V = 0.15
+
+        tamb = Ta - gv.Bf * (Ta - T_ext)
+        ql, qc, Tww_st = np.zeros(len(hours)), np.zeros(len(hours)), np.zeros(len(hours))
+        storagetank.calc_dhw_tank_operation(tamb, Qww, Qww + Qww_ls_r + Qww_ls_nr, float(gv.Tww_setpoint), V,
+                                            storagetank.calc_tank_surface_area(V, gv), gv.U_dhwtank,
+                                            float(gv.Tww_setpoint), gv.Pwater, gv.Cpw, ql, qc, Tww_st)
+
+        Tww_st_0 = gv.Tww_setpoint
+        for k in hours:
+            ql_k, qd_k, qc_k = storagetank.calc_Qww_ls_st(Ta[k], T_ext[k], Tww_st_0, V, Qww[k], Qww_ls_r[k],
+                                                          Qww_ls_nr[k], gv)
+            Tww_st_0 = storagetank.solve_ode_storage(Tww_st_0, ql_k, qd_k, qc_k, V, gv)[0]
+            self.assertAlmostEqual(ql[k], ql_k, places=6)
+            self.assertAlmostEqual(qc[k], qc_k, places=6)
+            self.assertAlmostEqual(Tww_st[k], Tww_st_0, places=6)
+
+
+if __name__ == '__main__':
+    unittest.main()
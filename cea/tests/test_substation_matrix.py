@@ -0,0 +1,69 @@
+"""
+Test the substation return model of cea/technologies/substation_matrix.py
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+
+class TestSubstationReturnModel(unittest.TestCase):
+    def setUp(self):
+        hours = np.arange(48)
+        self.buildings_demands = []
+        for i, name in enumerate(['B01', 'B02', 'B03']):
+            Qhsf_kWh = np.maximum(0, 20 * np.cos(2 * np.pi * hours / 24.0) + 5 * i)
+            Qwwf_kWh = np.where(hours % (i + 2) == 0, 3.0 + i, 0.0)
+            Qcsf_kWh = -np.maximum(0, 15 * np.sin(2 * np.pi * hours / 24.0) - 5 * i)
+            self.buildings_demands.append(pd.DataFrame({
+                'Name': name,
+                'Qhsf_kWh': Qhsf_kWh, 'Thsf_sup_C': 55.0 + i, 'Thsf_re_C': 35.0, 'mcphsf_kWC': Qhsf_kWh / (20.0 + i),
+                'Qwwf_kWh': Qwwf_kWh, 'Twwf_sup_C': 60.0, 'Twwf_re_C': 10.0, 'mcpwwf_kWC': Qwwf_kWh / 50.0,
+                'Qcsf_kWh': Qcsf_kWh, 'Tcsf_sup_C': 7.0, 'Tcsf_re_C': 15.0, 'mcpcsf_kWC': Qcsf_kWh / 8.0}))
+        self.substations_HEX_specs = pd.DataFrame(
+            {'HEX_UA_SH': [4000.0, 5000.0, 6000.0], 'HEX_UA_DHW': [800.0, 900.0, 0.0],
+             'HEX_UA_SC': [3000.0, 3500.0, 4000.0]}, index=['B01', 'B02', 'B03'])
+
+    def test_heat_balance(self):
+        import cea.globalvar
+        from cea.technologies.substation_matrix import calc_substation_table, calc_substations_return
+        gv = cea.globalvar.GlobalVariables()
+        table = calc_substation_table(self.buildings_demands, self.substations_HEX_specs)
+        names = ['B01', 'B02']  # B03 has no DHW heat exchanger
+        hours = np.arange(48)
+        T_supply_K = 273.0 + 75
+        T_return_K, mdot_kgs = calc_substations_return(table, names, T_supply_K, hours, 'DH', gv)
+        Q_kW = sum(table[column][hours][:, :2] for column in ['Qhsf_kWh', 'Qwwf_kWh'])
+        np.testing.assert_allclose(mdot_kgs * gv.Cpw * (T_supply_K - T_return_K), Q_kW, atol=1e-6)
+        self.assertTrue((T_return_K[Q_kW == 0] == T_supply_K).all())
+        self.assertTrue((mdot_kgs[Q_kW == 0] == 0).all())
+
+        T_supply_K = 273.0 + 4
+        T_return_K, mdot_kgs = calc_substations_return(table, names, T_supply_K, hours, 'DC', gv)
+        Q_kW = abs(table['Qcsf_kWh'][hours][:, :2])
+        np.testing.assert_allclose(mdot_kgs * gv.Cpw * (T_return_K - T_supply_K), Q_kW, atol=1e-6)
+
+    def test_time_steps_equal_single_time_step(self):
+        import cea.globalvar
+        from cea.technologies.substation_matrix import calc_substation_table, calc_substations_return, \
+            substation_return_model_main
+        gv = cea.globalvar.GlobalVariables()
+        table = calc_substation_table(self.buildings_demands, self.substations_HEX_specs)
+        names = ['B03', 'B01', 'B02']
+        for network_type, T_supply_K in [('DH', [340.0, 345.0, 350.0]), ('DC', [276.0, 277.0, 278.0])]:
+            T_supply = pd.DataFrame([T_supply_K], index=['T_supply'], columns=['B01', 'B02', 'B03'])
+            hours = np.arange(48)
+            T_return_K, mdot_kgs = calc_substations_return(table, names, T_supply[names].values, hours, network_type,
+                                                           gv)
+            for t in hours:
+                T_return_t, mdot_t = substation_return_model_main(None, gv, names, self.buildings_demands,
+                                                                  self.substations_HEX_specs, T_supply, t,
+                                                                  network_type, t_flag=False)
+                self.assertEqual(list(T_return_t.columns), names)
+                np.testing.assert_array_equal(T_return_t.values[0], T_return_K[t])
+                np.testing.assert_array_equal(mdot_t.values[0], mdot_kgs[t])
+
+
+if __name__ == '__main__':
+    unittest.main()
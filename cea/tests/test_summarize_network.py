@@ -0,0 +1,87 @@
+"""
+Test the optimization/master/summarize_network.py file
+"""
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+
+class TestSummarizeNetwork(unittest.TestCase):
+    def test_building_loads_equal_results_files(self):
+        """The summary of a network from the building loads in memory is the same as from the results files"""
+        import cea.globalvar
+        import cea.inputlocator
+        from cea.optimization.master import summarize_network
+        gv = cea.globalvar.GlobalVariables()
+        building_names = ['B01', 'B02', 'B03']
+        hours = np.arange(8760)
+        random = np.random.RandomState(42)
+        # as set by the preprocessing of the optimization
+        gv.ground_temperature = 283.0 + 5 * np.sin(2 * np.pi * hours / 8760.0)
+
+        demands = {}
+        substations = {}
+        for i, building_name in enumerate(building_names):
+            demands[building_name] = pd.DataFrame(dict(
+                (column, random.uniform(0, 10, 8760)) for column in summarize_network.DEMAND_COLUMNS))
+            mdot_DH_kgpers = np.where(hours % (i + 2) == 0, 0.0, random.uniform(0.1, 2.0, 8760))
+            mdot_DC_kgpers = np.where(hours % 24 < 8 + i, 0.0, random.uniform(0.1, 1.0, 8760))
+            substations[building_name] = pd.DataFrame({
+                'Electr_array_all_flat_W': random.uniform(0, 5000, 8760),
+                'mdot_DH_result_kgpers': mdot_DH_kgpers, 'mdot_DC_result_kgpers': mdot_DC_kgpers,
+                'Q_heating_W': mdot_DH_kgpers * 4185 * 20.0, 'Q_dhw_W': random.uniform(0, 1000, 8760),
+                'Q_cool_W': mdot_DC_kgpers * 4185 * 8.0,
+                'T_return_DH_result_K': np.where(mdot_DH_kgpers > 0, random.uniform(313, 323, 8760), 0.0),
+                'T_return_DC_result_K': np.where(mdot_DC_kgpers > 0, random.uniform(287, 290, 8760), 0.0),
+                'T_supply_DH_result_K': random.uniform(333, 343, 8760)})
+
+        # the hours without any flow in the network
+        self.assertTrue((sum(substations[building_name]['mdot_DH_result_kgpers'] for building_name in building_names)
+                         == 0).any())
+
+        scenario = tempfile.mkdtemp()
+        try:
+            locator = cea.inputlocator.InputLocator(scenario)
+            pd.DataFrame({'LENGTH': [120.0, 80.0, 45.5]}).to_csv(locator.get_optimization_network_layout_pipes_file())
+            for building_name in building_names:
+                demands[building_name].to_csv(locator.get_demand_results_file(building_name), index=False)
+                # as written by `substation.substation_main`
+                substations[building_name].to_csv(locator.get_optimization_substations_results_file(building_name),
+                                                  index=False, float_format='%.3f')
+
+            building_loads = summarize_network.BuildingLoads(building_names)
+            for i, building_name in enumerate(building_names):
+                for column in summarize_network.DEMAND_COLUMNS:
+                    building_loads.values[column][i] = demands[building_name][column].values
+            building_loads.update_substations(substations)
+
+            for network in [building_names, ['B03', 'B01']]:
+                total_demand = pd.DataFrame({'Name': network})
+                summarize_network.network_main(locator, total_demand, network, gv, 'files')
+                summarize_network.network_main(locator, total_demand, network, gv, 'memory', building_loads)
+                from_files = pd.read_csv(locator.get_optimization_network_results_summary('files'))
+                from_memory = pd.read_csv(locator.get_optimization_network_results_summary('memory'))
+                self.assertEqual(list(from_memory.columns), list(from_files.columns))
+                for column in from_files.columns:
+                    np.testing.assert_allclose(from_memory[column], from_files[column], rtol=1e-12, atol=1e-9,
+                                               err_msg=column)
+        finally:
+            shutil.rmtree(scenario)
+
+    def test_calc_min_flows(self):
+        from cea.optimization.master import summarize_network
+        mdot_kgpers = np.array([[0.0, 0.5, 0.0, 2.0, 1E7],
+                                [0.0, 0.0, 0.3, 1.0, 1E7],
+                                [0.0, 0.7, 0.3, 3.0, 0.0]])
+        expected = np.zeros(mdot_kgpers.shape[1]) + 1E6
+        for mdot in mdot_kgpers:
+            expected = np.vectorize(summarize_network.calc_min_flow)(expected, mdot)
+        np.testing.assert_array_equal(summarize_network.calc_min_flows(mdot_kgpers), expected)
+        np.testing.assert_array_equal(summarize_network.calc_min_flows(mdot_kgpers[:0]), np.zeros(5) + 1E6)
+
+
+if __name__ == '__main__':
+    unittest.main()
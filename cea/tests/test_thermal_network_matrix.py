@@ -0,0 +1,265 @@
+"""
+Test the hydraulic and thermal calculation of cea/technologies/heating_network/thermal_network_matrix.py on a small
+radial network and a small network with a loop
+"""
+
+import unittest
+
+import numpy as np
+import pandas as pd
+
+
+def create_edge_node(number_of_nodes, pipes):
+    """The edge-node matrix of the pipes (start node, end node), the flow goes from the start to the end node"""
+    edge_node = np.zeros((number_of_nodes, len(pipes)))
+    for edge, (start_node, end_node) in enumerate(pipes):
+        edge_node[start_node, edge] = -1
+        edge_node[end_node, edge] = 1
+    return edge_node
+
+
+# plant (0) -> 1 -> 2 (B01), 1 -> 3 -> 4 (B02), 3 -> 5 (B03)
+RADIAL_PIPES = [(0, 1), (1, 2), (1, 3), (3, 4), (3, 5)]
+RADIAL_CONSUMERS = {2: 'B01', 4: 'B02', 5: 'B03'}
+# plant (0) -> 1 -> 2 -> 3 (B01) and 1 -> 3 (the loop 1-2-3), 3 -> 4 (B02), 2 -> 5 (B03)
+LOOPED_PIPES = [(0, 1), (1, 2), (1, 3), (2, 3), (3, 4), (2, 5)]
+LOOPED_CONSUMERS = {3: 'B01', 4: 'B02', 5: 'B03'}
+
+
+class TestNetworkHydraulics(unittest.TestCase):
+    def setUp(self):
+        # substation mass flows of 3 time steps (the plant supplies the consumers)
+        self.mass_flow_consumers = np.array([[0.3, 0.4, 0.5], [0.1, 0.0, 0.7], [0.2, 0.6, 0.05]])
+
+    def calc_mass_flow_nodes(self, number_of_nodes, consumers):
+        mass_flow_nodes = np.zeros((len(self.mass_flow_consumers), number_of_nodes))
+        for i, node in enumerate(sorted(consumers)):
+            mass_flow_nodes[:, node] = self.mass_flow_consumers[:, i]
+        mass_flow_nodes[:, 0] = -self.mass_flow_consumers.sum(axis=1)
+        return mass_flow_nodes
+
+    def test_network_tree(self):
+        from cea.technologies.heating_network.thermal_network_matrix import calc_network_tree
+        node_order, parent_edge, parent_node = calc_network_tree(create_edge_node(6, RADIAL_PIPES), 0)
+        self.assertEqual(node_order, [0, 1, 2, 3, 4, 5])
+        self.assertEqual(parent_edge, [-1, 0, 1, 2, 3, 4])
+        self.assertEqual(parent_node, [-1, 0, 1, 1, 3, 3])
+        # the tree does not depend on the flow directions
+        self.assertEqual(calc_network_tree(-create_edge_node(6, RADIAL_PIPES), 0)[0], node_order)
+
+        self.assertIsNone(calc_network_tree(create_edge_node(6, LOOPED_PIPES), 0))
+        # as many edges as a tree, but not connected
+        self.assertIsNone(calc_network_tree(create_edge_node(6, [(0, 1), (1, 2), (2, 0), (3, 4), (4, 3)]), 0))
+
+    def test_edge_mass_flows_tree_equals_splu(self):
+        import scipy.sparse
+        import scipy.sparse.linalg
+        from cea.technologies.heating_network.thermal_network_matrix import calc_mass_flow_edges
+        edge_node = create_edge_node(6, RADIAL_PIPES)
+        edge_node_df = pd.DataFrame(edge_node, index=['NODE%i' % i for i in range(6)])
+        all_nodes_df = pd.DataFrame({'Type': ['PLANT', 'NONE', 'CONSUMER', 'NONE', 'CONSUMER', 'CONSUMER']},
+                                    index=edge_node_df.index)
+        mass_flow_nodes = self.calc_mass_flow_nodes(6, RADIAL_CONSUMERS)
+        mass_flow_edges = calc_mass_flow_edges(edge_node_df, pd.DataFrame(mass_flow_nodes), all_nodes_df)
+
+        # the solution of the whole system of equations, without the equation at the plant node
+        expected = scipy.sparse.linalg.splu(scipy.sparse.csc_matrix(edge_node[1:])).solve(mass_flow_nodes[:, 1:].T)
+        np.testing.assert_allclose(mass_flow_edges, expected.T, atol=1e-5)
+        np.testing.assert_allclose(mass_flow_edges[:, 0], self.mass_flow_consumers.sum(axis=1), atol=1e-5)
+
+        # a missing substation flow leaves the time step unsolved
+        mass_flow_nodes[1, 4] = np.nan
+        mass_flow_edges = calc_mass_flow_edges(edge_node_df, pd.DataFrame(mass_flow_nodes), all_nodes_df)
+        self.assertTrue(np.isnan(mass_flow_edges[1]).all())
+        np.testing.assert_allclose(mass_flow_edges[[0, 2]], expected.T[[0, 2]], atol=1e-5)
+
+    def test_node_pressures_tree_equals_lstsq(self):
+        from cea.technologies.heating_network.thermal_network_matrix import calc_network_tree, calc_tree_node_values
+        edge_node = create_edge_node(6, RADIAL_PIPES)
+        pressure_loss_edges = np.array([[1200.0, 300.0, 800.0, 150.0, 450.0], [900.0, 0.0, 700.0, 20.0, 610.0]])
+        for sign in [1, -1]:
+            # supply and return line
+            network_tree = calc_network_tree(sign * edge_node, 0)
+            pressure_nodes = calc_tree_node_values(sign * edge_node, network_tree, -pressure_loss_edges.T)
+            expected = np.linalg.lstsq(sign * edge_node.T, -pressure_loss_edges.T)[0]
+            np.testing.assert_allclose(pressure_nodes, expected, atol=1e-9)
+            # the pressure drops along the direction of flow
+            np.testing.assert_allclose(np.dot(sign * edge_node.T, pressure_nodes), -pressure_loss_edges.T, atol=1e-9)
+
+    def test_node_pressures_looped_network(self):
+        import cea.globalvar
+        from cea.technologies.heating_network.thermal_network_matrix import calc_pressure_nodes, calc_network_tree
+        gv = cea.globalvar.GlobalVariables()
+        edge_node = create_edge_node(6, LOOPED_PIPES)
+        edge_node_df = pd.DataFrame(edge_node)
+        self.assertIsNone(calc_network_tree(edge_node, 0))
+        mass_flow_edges = np.array([1.2, 0.7, 0.5, 0.2, 0.4, 0.5])
+        T_supply_nodes_K = np.array([350.0, 349.0, 348.5, 348.0, 347.0, 347.5])
+        T_return_nodes_K = T_supply_nodes_K - 30.0
+        pressure_nodes_supply, pressure_nodes_return, pressure_loss_system = calc_pressure_nodes(
+            edge_node_df, np.array([[0.1, 0.08, 0.06, 0.05, 0.05, 0.05]]), np.array([100.0, 80, 60, 50, 40, 30]),
+            mass_flow_edges, T_supply_nodes_K, T_return_nodes_K, gv)
+        # the least squares solution of the system of equations
+        self.assertAlmostEqual(pressure_nodes_supply.sum(), 0.0, places=6)
+        self.assertTrue((np.diff(pressure_nodes_supply[0, [0, 1, 2, 5]]) < 0).all())
+        self.assertTrue((np.diff(pressure_nodes_return[0, [0, 1, 2, 5]]) > 0).all())
+
+
+class TestNetworkTemperatures(unittest.TestCase):
+    """
+    The node temperatures calculated along the direction of flow must solve the heat balances of all the nodes at once
+    """
+
+    def setUp(self):
+        import cea.globalvar
+        self.gv = cea.globalvar.GlobalVariables()
+        self.T_ground_K = np.array([280.0, 285.0])
+        # substation mass flows of 2 time steps, B01, B02 and B03
+        self.mass_flow_consumers = np.array([[0.3, 0.4, 0.5], [0.1, 0.2, 0.7]])
+        self.T_substation_return_K = np.array([[318.0, 320.0, 315.0], [310.0, 325.0, 317.0]])
+        self.networks = {
+            'radial': (RADIAL_PIPES, RADIAL_CONSUMERS, self.mass_flow_consumers.dot(
+                [[1, 1, 0, 0, 0], [1, 0, 1, 1, 0], [1, 0, 1, 0, 1]])),
+            # 0.15 kg/s flows through the pipe 2 -> 3 of the loop
+            'looped': (LOOPED_PIPES, LOOPED_CONSUMERS, self.mass_flow_consumers.dot(
+                [[1, 0, 1, 0, 0, 0], [1, 0, 1, 0, 1, 0], [1, 1, 0, 0, 0, 1]]) + [0, 0.15, -0.15, 0.15, 0, 0])}
+
+    def calc_pipe_coefficients(self, mass_flow_edges, K_edge):
+        """The outlet temperature of each pipe is ``a * T_in + b`` (see `calc_pipe_outlet_temperature`)"""
+        mcp = mass_flow_edges * self.gv.Cpw
+        return (mcp - K_edge / 2) / (mcp + K_edge / 2), K_edge * self.T_ground_K[:, None] / (mcp + K_edge / 2)
+
+    def test_supply_node_temperatures(self):
+        from cea.technologies.heating_network.thermal_network_matrix import calc_flow_order, \
+            calc_supply_node_temperatures
+        for name, (pipes, consumers, mass_flow_edges) in sorted(self.networks.items()):
+            K_edge = np.linspace(0.01, 0.05, len(pipes))
+            flow_order = calc_flow_order(create_edge_node(6, pipes))
+            self.assertEqual(list(flow_order[0][0]), [0], msg=name)
+            T_node, T_edge_in, T_edge_out = calc_supply_node_temperatures(
+                flow_order, np.array([350.0, 345.0]), self.T_ground_K, mass_flow_edges.T, K_edge, self.gv)
+
+            a, b = self.calc_pipe_coefficients(mass_flow_edges, K_edge)
+            for t in range(2):
+                # the plant node is at the plant supply temperature, the others at the mixing temperature
+                A = np.zeros((6, 6))
+                rhs = np.zeros(6)
+                A[0, 0] = 1.0
+                rhs[0] = [350.0, 345.0][t]
+                for edge, (start_node, end_node) in enumerate(pipes):
+                    A[end_node, end_node] += mass_flow_edges[t, edge]
+                    A[end_node, start_node] -= mass_flow_edges[t, edge] * a[t, edge]
+                    rhs[end_node] += mass_flow_edges[t, edge] * b[t, edge]
+                np.testing.assert_allclose(T_node[:, t], np.linalg.solve(A, rhs), rtol=1e-12, err_msg=name)
+                np.testing.assert_allclose(T_edge_out[:, t], a[t] * T_edge_in[:, t] + b[t], rtol=1e-12)
+
+    def test_return_node_temperatures(self):
+        from cea.technologies.heating_network.thermal_network_matrix import calc_flow_order, \
+            calc_return_node_temperatures
+        for name, (pipes, consumers, mass_flow_edges) in sorted(self.networks.items()):
+            K_edge = np.linspace(0.01, 0.05, len(pipes))
+            mass_flow_nodes = np.zeros((6, 2))
+            T_substation_return_K = np.full((6, 2), np.nan)
+            for i, node in enumerate(sorted(consumers)):
+                mass_flow_nodes[node] = self.mass_flow_consumers[:, i]
+                T_substation_return_K[node] = self.T_substation_return_K[:, i]
+            mass_flow_nodes[0] = -self.mass_flow_consumers.sum(axis=1)
+            # the water flows from the consumers to the plant
+            flow_order = calc_flow_order(-create_edge_node(6, pipes))
+            T_node = calc_return_node_temperatures(flow_order, T_substation_return_K, self.T_ground_K,
+                                                   mass_flow_edges.T, mass_flow_nodes, K_edge, self.gv)
+
+            a, b = self.calc_pipe_coefficients(mass_flow_edges, K_edge)
+            for t in range(2):
+                # the water of the pipes and of the substation flowing into each node is mixed
+                mass_flow_substations = np.maximum(mass_flow_nodes[:, t], 0)
+                A = np.diag(mass_flow_substations)
+                rhs = mass_flow_substations * np.nan_to_num(T_substation_return_K[:, t])
+                for edge, (end_node, start_node) in enumerate(pipes):
+                    A[end_node, end_node] += mass_flow_edges[t, edge]
+                    A[end_node, start_node] -= mass_flow_edges[t, edge] * a[t, edge]
+                    rhs[end_node] += mass_flow_edges[t, edge] * b[t, edge]
+                np.testing.assert_allclose(T_node[:, t], np.linalg.solve(A, rhs), rtol=1e-12, err_msg=name)
+
+    def test_flow_order(self):
+        from cea.technologies.heating_network.thermal_network_matrix import calc_flow_order
+        flow_order = calc_flow_order(create_edge_node(6, LOOPED_PIPES))
+        # node 3 is reached after both pipes of the loop
+        self.assertEqual([list(nodes) for nodes, _, _, _, _ in flow_order], [[0], [1], [2], [3, 5], [4]])
+        self.assertEqual(list(flow_order[3][1]), [2, 3, 5])
+        # flow directions forming a loop
+        self.assertRaises(ValueError, calc_flow_order, create_edge_node(3, [(0, 1), (1, 2), (2, 1)]))
+
+
+class TestSolveTimeSteps(unittest.TestCase):
+    def test_chunks_equal_sequential(self):
+        """The time steps solved in chunks (in worker processes) must give the same results as solved one by one"""
+        import multiprocessing as mp
+        import cea.globalvar
+        from cea.technologies import substation_matrix
+        from cea.technologies.heating_network import thermal_network_matrix
+        gv = cea.globalvar.GlobalVariables()
+        hours = np.arange(12)
+        building_names = np.array(['B01', 'B02', 'B03'])
+        buildings_demands = []
+        for i, name in enumerate(building_names):
+            Qhsf_kWh = 20 * np.cos(2 * np.pi * hours / 24.0) + 25.0 + 5 * i
+            Qwwf_kWh = np.where(hours % (i + 2) == 0, 3.0 + i, 0.0)
+            buildings_demands.append(pd.DataFrame({
+                'Name': name,
+                'Qhsf_kWh': Qhsf_kWh, 'Thsf_sup_C': 55.0 + i, 'Thsf_re_C': 35.0, 'mcphsf_kWC': Qhsf_kWh / (20.0 + i),
+                'Qwwf_kWh': Qwwf_kWh, 'Twwf_sup_C': 60.0, 'Twwf_re_C': 10.0, 'mcpwwf_kWC': Qwwf_kWh / 50.0,
+                'Qcsf_kWh': 0.0, 'Tcsf_sup_C': 7.0, 'Tcsf_re_C': 15.0, 'mcpcsf_kWC': 0.0}))
+        substations_HEX_specs = pd.DataFrame(
+            {'HEX_UA_SH': [4000.0, 5000.0, 6000.0], 'HEX_UA_DHW': [800.0, 900.0, 1000.0],
+             'HEX_UA_SC': [3000.0, 3500.0, 4000.0]}, index=building_names)
+        substation_table = substation_matrix.calc_substation_table(buildings_demands, substations_HEX_specs)
+
+        nodes = ['NODE%i' % i for i in range(6)]
+        edges = ['PIPE%i' % i for i in range(len(RADIAL_PIPES))]
+        edge_node_df = pd.DataFrame(create_edge_node(6, RADIAL_PIPES), index=nodes, columns=edges)
+        all_nodes_df = pd.DataFrame({'Type': ['PLANT', 'NONE', 'CONSUMER', 'NONE', 'CONSUMER', 'CONSUMER'],
+                                     'Building': ['NONE', 'NONE', 'B01', 'NONE', 'B02', 'B03']}, index=nodes)
+        t_target_supply_df = thermal_network_matrix.write_substation_temperatures_to_nodes_df(
+            all_nodes_df, pd.DataFrame(dict((name, 60.0 + i) for i, name in enumerate(building_names)), index=hours))
+
+        # nominal edge mass flows, for a supply temperature of 70 C at the substations
+        T_return_K, mdot_kgs = substation_matrix.calc_substations_return(substation_table, building_names,
+                                                                         273.15 + 70.0, hours, 'DH', gv)
+        mass_flow_nodes_df = pd.concat([thermal_network_matrix.write_substation_massflows_to_nodes_df(
+            all_nodes_df, pd.DataFrame([mdot], columns=building_names)) for mdot in mdot_kgs], ignore_index=True)
+        edge_mass_flow_df_kgs = pd.DataFrame(thermal_network_matrix.calc_mass_flow_edges(
+            edge_node_df, mass_flow_nodes_df, all_nodes_df), columns=edges)
+
+        network_inputs = (None, gv, np.zeros(len(hours)) + 283.0, edge_node_df, all_nodes_df, edge_mass_flow_df_kgs,
+                          np.diag([0.05, 0.02, 0.04, 0.02, 0.02]), t_target_supply_df, building_names,
+                          buildings_demands, substations_HEX_specs, substation_table,
+                          np.array([[0.1, 0.05, 0.08, 0.05, 0.05]]), np.array([100.0, 50.0, 80.0, 60.0, 40.0]), 'DH')
+
+        sequential = {}
+        for t in hours:
+            time_steps, results = thermal_network_matrix.solve_thermal_network_time_steps([t], *network_inputs)
+            for name, values in results.items():
+                sequential.setdefault(name, []).append(values[0])
+
+        # as in `thermal_network_main`
+        chunks = [range(0, 5), range(5, 10), range(10, 12)]
+        pool = mp.Pool(2, initializer=thermal_network_matrix._initialize_worker, initargs=network_inputs)
+        try:
+            solved_chunks = list(pool.imap_unordered(thermal_network_matrix._solve_time_steps_worker, chunks))
+        finally:
+            pool.close()
+            pool.join()
+        solved_chunks.append(thermal_network_matrix.solve_thermal_network_time_steps(list(hours), *network_inputs))
+        for time_steps, results in solved_chunks:
+            self.assertEqual(sorted(results.keys()), sorted(sequential.keys()))
+            for name, values in results.items():
+                np.testing.assert_array_equal(values, np.array(sequential[name])[time_steps], err_msg=name)
+        self.assertFalse(np.isnan(sequential['T_supply_nodes_K']).any())
+        # the convergence of the supply temperatures is reported instead of printed in each iteration
+        self.assertTrue((np.array(sequential['max_node_dT']) < 1).all())
+        self.assertTrue((np.array(sequential['supply_temperature_iterations']) < 10).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
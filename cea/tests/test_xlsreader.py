@@ -0,0 +1,58 @@
+"""
+Test the utilities/xlsreader.py file
+"""
+
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import unittest
+
+import pandas as pd
+from pandas.util.testing import assert_frame_equal
+
+
+class TestXlsReader(unittest.TestCase):
+    def test_read_excel(self):
+        from cea.inputlocator import ReferenceCaseOpenLocator
+        from cea.utilities import xlsreader
+        path = ReferenceCaseOpenLocator().get_envelope_systems()
+
+        # parsed, from the cache file and from memory
+        if os.path.exists(xlsreader.get_cache_file(path)):
+            os.remove(xlsreader.get_cache_file(path))
+        xlsreader._workbooks.clear()
+        for _ in range(2):
+            for sheet in ['WALL', 'WINDOW']:
+                assert_frame_equal(pd.read_excel(path, sheet), xlsreader.read_excel(path, sheet))
+            xlsreader._workbooks.clear()
+        self.assertTrue(os.path.exists(xlsreader.get_cache_file(path)))
+        xlsreader.read_excel(path, 'WALL')
+
+        # the DataFrames returned can be modified without changing the cache
+        wall = xlsreader.read_excel(path, 'WALL')
+        wall['code'] = 'modified'
+        assert_frame_equal(pd.read_excel(path, 'WALL'), xlsreader.read_excel(path, 'WALL'))
+
+    @unittest.skipIf(sys.platform == 'win32', 'the cache folder is in the user profile on Windows')
+    def test_cache_folder_is_private(self):
+        from cea.utilities import filecache
+        xdg_cache_home = os.environ.get('XDG_CACHE_HOME')
+        os.environ['XDG_CACHE_HOME'] = tempfile.mkdtemp()
+        try:
+            cache_file = filecache.get_cache_file('test', 'data.pickle')
+            filecache.write_cache_file(cache_file, 'signature', [1, 2, 3])
+            self.assertEqual(0o700, stat.S_IMODE(os.stat(filecache.get_cache_folder()).st_mode))
+            self.assertEqual([1, 2, 3], filecache.read_cache_file(cache_file, 'signature'))
+            self.assertIsNone(filecache.read_cache_file(cache_file, 'other signature'))
+
+            # the files of a cache folder others can write to are not used
+            os.chmod(filecache.get_cache_folder(), 0o777)
+            self.assertIsNone(filecache.read_cache_file(cache_file, 'signature'))
+        finally:
+            shutil.rmtree(os.environ['XDG_CACHE_HOME'])
+            if xdg_cache_home is None:
+                del os.environ['XDG_CACHE_HOME']
+            else:
+                os.environ['XDG_CACHE_HOME'] = xdg_cache_home
@@ -1,93 +1,98 @@
 """
-Compile the .pyd files using Numba pycc to speed up the calculation of certain modules.
-Currently used for:
+Compile the extension modules (``.pyd`` on Windows, ``.so`` on Linux / Mac) using Numba pycc to speed up the calculation
+of certain modules. Currently used for:
 
-- calc_tm.pyd (used in demand/sensible_loads.py)
-- calc_radiator.pyd (used in technologies/radiators.py)
+- rc_model_sia_cc (used in demand/rc_model_SIA.py)
+- storagetank_cc (used in technologies/storagetank.py)
+- storage_operation_cc (used in optimization/slave/seasonal_storage/SolarPowerHandler_incl_Losses.py)
+- solar_collector_cc (used in technologies/solar_collector.py and technologies/photovoltaic_thermal.py)
+
+The extension modules are only used on the platform they were compiled on, the other platforms compile the same
+functions with Numba on first use instead (see :py:mod:`cea.utilities.kernels`). ``cea kernels`` shows which version
+of each function is in use.
 
 In order to run this script, you will need to install Numba. Try: `conda install numba`
 """
 from numba.pycc import CC
-import shutil
+import importlib
 import os
 
+from cea.utilities import kernels
+
 
 def main():
-    delete_pyd('..', 'demand', 'rc_model_sia_cc.pyd')
-    delete_pyd('rc_model_sia_cc.pyd')
     compile_rc_model_sia()
-    copy_pyd('rc_model_sia_cc.pyd', ['..', 'demand', 'rc_model_sia_cc.pyd'])
-    delete_pyd('rc_model_sia_cc.pyd')
-
-    delete_pyd('..', 'technologies', 'calc_radiator.pyd')
-    delete_pyd('calc_radiator.pyd')
-    compile_radiators()
-    copy_pyd('calc_radiator.pyd', ['..', 'technologies', 'calc_radiator.pyd'])
-    delete_pyd('calc_radiator.pyd')
-
-    delete_pyd('..', 'technologies', 'storagetank_cc.pyd')
-    delete_pyd('storagetank_cc.pyd')
     compile_storagetank()
-    copy_pyd('storagetank_cc.pyd', ['..', 'technologies', 'storagetank_cc.pyd'])
-    delete_pyd('storagetank_cc.pyd')
+    compile_storage_operation()
+    compile_solar_collector()
 
 
-def delete_pyd(*pathspec):
-    """Delete the file with the pathspec. `pathspec` is an array of path segments."""
-    path_to_calc_tm_pyd = os.path.join(os.path.dirname(__file__), *pathspec)
-    if os.path.exists(path_to_calc_tm_pyd):
-        os.remove(path_to_calc_tm_pyd)
+def compile_extension_module(cc, module_name):
+    """Compile the extension module next to the module with the python versions of its functions"""
+    cc.output_dir = os.path.dirname(os.path.abspath(importlib.import_module(module_name).__file__))
+    output_file = os.path.join(cc.output_dir, cc.output_file)
+    if os.path.exists(output_file):
+        os.remove(output_file)
+    cc.compile()
 
-def copy_pyd(source, destination):
-    parent = os.path.dirname(__file__)
-    shutil.copy(os.path.join(parent, source),
-                os.path.join(parent, *destination))
+
+def export(cc, module_name, function_name, signature):
+    """Export the python version of a function of the module (the module attribute may be the compiled version)"""
+    cc.export(function_name, signature)(kernels.get_python_kernel(module_name, function_name))
 
 
 def compile_rc_model_sia():
-    import cea.demand.rc_model_SIA
-    reload(cea.demand.rc_model_SIA)
+    module_name = 'cea.demand.rc_model_SIA'
     cc = CC('rc_model_sia_cc')
 
-    # cc.export('calc_h_ec', "f8(f8)")(cea.demand.rc_model_SIA.calc_h_ec)
-    # cc.export('calc_h_ac', "f8(f8)")(cea.demand.rc_model_SIA.calc_h_ac)
-    # cc.export('calc_h_ea', "f8(f8, f8, f8)")(cea.demand.rc_model_SIA.calc_h_ea)
-    # cc.export('calc_f_sc', "f8(f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_f_sc)
-    cc.export('calc_phi_m', "f8(f8, f8, f8, f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_phi_m)
-    cc.export('calc_phi_c', "f8(f8, f8, f8, f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_phi_c)
-    cc.export('calc_theta_c', "f8(f8, f8, f8, f8, f8, f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_theta_c)
-    cc.export('calc_phi_m_tot', "f8(f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8)")(
-        cea.demand.rc_model_SIA.calc_phi_m_tot)
-    cc.export('calc_phi_a', "f8(f8, f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_phi_a)
-    cc.export('calc_theta_m', "f8(f8, f8)")(cea.demand.rc_model_SIA.calc_theta_m)
-    cc.export('calc_h_ea', "f8(f8, f8, f8)")(cea.demand.rc_model_SIA.calc_h_ea)
-    cc.export('calc_theta_m_t', "f8(f8, f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_theta_m_t)
-    cc.export('calc_theta_ea', "f8(f8, f8, f8, f8, f8)")(cea.demand.rc_model_SIA.calc_theta_ea)
-    cc.export('calc_h_em', "f8(f8, f8)")(cea.demand.rc_model_SIA.calc_h_em)
-    cc.export('calc_h_3', "f8(f8, f8)")(cea.demand.rc_model_SIA.calc_h_3)
+    # export(cc, module_name, 'calc_h_ec', "f8(f8)")
+    # export(cc, module_name, 'calc_h_ac', "f8(f8)")
+    # export(cc, module_name, 'calc_f_sc', "f8(f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_phi_m', "f8(f8, f8, f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_phi_c', "f8(f8, f8, f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_theta_c', "f8(f8, f8, f8, f8, f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_phi_m_tot', "f8(f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_phi_a', "f8(f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_theta_m', "f8(f8, f8)")
+    export(cc, module_name, 'calc_h_ea', "f8(f8, f8, f8)")
+    export(cc, module_name, 'calc_theta_m_t', "f8(f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_theta_ea', "f8(f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_h_em', "f8(f8, f8)")
+    export(cc, module_name, 'calc_h_3', "f8(f8, f8)")
 
-    cc.compile()
+    compile_extension_module(cc, module_name)
+
+
+def compile_storagetank():
+    module_name = 'cea.technologies.storagetank'
+    cc = CC('storagetank_cc')
 
+    export(cc, module_name, 'ode', "f8(f8[:], f8, f8, f8, f8, f8, f8, f8)")
+    export(cc, module_name, 'calc_dhw_tank_operation',
+           "void(f8[:], f8[:], f8[:], f8, f8, f8, f8, f8, f8, f8, f8[:], f8[:], f8[:])")
 
-def compile_radiators():
-    import cea.technologies.radiators
-    reload(cea.technologies.radiators)
-    cc = CC('calc_radiator')
+    compile_extension_module(cc, module_name)
 
-    cc.export('fh', "f8(f8, f8, f8, f8, f8, f8, f8)")(cea.technologies.radiators.fh)
-    cc.export('lmrt', "f8(f8, f8, f8)")(cea.technologies.radiators.lmrt)
 
-    cc.compile()
+def compile_storage_operation():
+    module_name = 'cea.optimization.slave.seasonal_storage.SolarPowerHandler_incl_Losses'
+    cc = CC('storage_operation_cc')
 
+    export(cc, module_name, 'storage_operation_kernel',
+           "void(f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:], f8[:,:,:], f8[:,:])")
 
-def compile_storagetank():
-    import cea.technologies.storagetank
-    reload(cea.technologies.storagetank)
-    cc = CC('storagetank_cc')
+    compile_extension_module(cc, module_name)
 
-    cc.export('ode', "f8(f8[:], f8, f8, f8, f8, f8, f8, f8)")(cea.technologies.storagetank.ode)
 
-    cc.compile()
+def compile_solar_collector():
+    module_name = 'cea.technologies.solar_collector'
+    cc = CC('solar_collector_cc')
+
+    export(cc, module_name, 'calc_collector_flows',
+           "void(f8[:], f8[:], f8[:], f8, f8, f8, f8, f8[:], f8[:], f8[:,:], f8[:,:], f8[:,:], i8[:])")
+
+    compile_extension_module(cc, module_name)
+
 
 if __name__ == '__main__':
     main()
@@ -1,14 +1,17 @@
 """
 Energyplus file reader
+
+The parsed weather data is cached by the hash of the weather file: in memory for the rest of the process and in a
+binary cache file of the user (see `cea.utilities.filecache`), so the weather file is only parsed once.
 """
-import pandas as pd
+import hashlib
+import os
 
-import cea.inputlocator
-import cea.globalvar as globalvar
 import numpy as np
-from cea.utilities.physics import BOLTZMANN
+import pandas as pd
 
-gv = globalvar.GlobalVariables()
+from cea.utilities import filecache
+from cea.utilities.physics import BOLTZMANN
 
 __author__ = "Clayton Miller"
 __copyright__ = "Copyright 2014, Architecture and Building Systems - ETH Zurich"
@@ -19,8 +22,46 @@ __maintainer__ = "Daren Thomas"
 __email__ = "cea@arch.ethz.ch"
 __status__ = "Production"
 
+# the weather data read by this process: hash of the weather file -> DataFrame
+_weather_data = {}
+
+# the hashes of the weather files read by this process: path -> (modification time, size, hash)
+_weather_hashes = {}
+
 
 def epw_reader(weather_path):
+    """
+    Read an EnergyPlus weather file (.epw).
+
+    :param weather_path: path to the weather file
+    :type weather_path: str
+    :returns: the weather data, a row per hour of the year. The DataFrame is a copy and can be modified by the caller.
+    :rtype: pandas.DataFrame
+    """
+    weather_hash = get_weather_hash(weather_path)
+    if weather_hash not in _weather_data:
+        cache_file = filecache.get_cache_file('epw', '%s.pickle' % weather_hash)
+        signature = (weather_hash, pd.__version__)
+        result = filecache.read_cache_file(cache_file, signature)
+        if result is None:
+            result = parse_epw(weather_path)
+            filecache.write_cache_file(cache_file, signature, result)
+        _weather_data[weather_hash] = result
+    return _weather_data[weather_hash].copy()
+
+
+def get_weather_hash(weather_path):
+    """The hash of the contents of a weather file (only calculated again if the file was modified)"""
+    path = os.path.abspath(weather_path)
+    stat = os.stat(path)
+    if path not in _weather_hashes or _weather_hashes[path][:2] != (stat.st_mtime, stat.st_size):
+        with open(path, 'rb') as f:
+            _weather_hashes[path] = (stat.st_mtime, stat.st_size, hashlib.sha1(f.read()).hexdigest())
+    return _weather_hashes[path][2]
+
+
+def parse_epw(weather_path):
+    """Parse an EnergyPlus weather file (.epw) - use `epw_reader` to read weather files"""
     epw_labels = ['year', 'month', 'day', 'hour', 'minute', 'datasource', 'drybulb_C', 'dewpoint_C', 'relhum_percent',
                   'atmos_Pa', 'exthorrad_Whm2', 'extdirrad_Whm2', 'horirsky_Whm2', 'glohorrad_Whm2',
                   'dirnorrad_Whm2', 'difhorrad_Whm2', 'glohorillum_lux', 'dirnorillum_lux', 'difhorillum_lux',
@@ -32,12 +73,14 @@ def epw_reader(weather_path):
     result['dayofyear'] = pd.date_range('1/1/2016', periods=8760, freq='H').dayofyear
     result['ratio_diffhout'] = result['difhorrad_Whm2'] / result['glohorrad_Whm2']
     result['skycover'] = result['ratio_diffhout'].fillna(1)
-    result['skytemp_C'] = np.vectorize(calc_skytemp)(result['drybulb_C'], result['dewpoint_C'], result['skycover'])
+    result['skytemp_C'] = calc_skytemp(result['drybulb_C'].values, result['dewpoint_C'].values,
+                                       result['skycover'].values)
 
     return result
 
 
 def calc_skytemp(Tdrybulb, Tdewpoint, N):
+    """sky temperature in C - the arguments can be floats or arrays"""
     sky_e = (0.787 + 0.764 * ((Tdewpoint + 273) / 273)) * 1 + 0.0224 * N + 0.0035 * N ** 2 + 0.00025 * N ** 3
     hor_IR = sky_e * BOLTZMANN * (Tdrybulb + 273) ** 4
     sky_T = ((hor_IR / BOLTZMANN) ** 0.25) - 273
@@ -46,6 +89,7 @@ def calc_skytemp(Tdrybulb, Tdewpoint, N):
 
 
 def test_reader():
+    import cea.inputlocator
     locator = cea.inputlocator.InputLocator(r'C:\reference-case\baseline')
     # for the interface, the user should pick a file out of of those in ...DB/Weather/...
     weather_path = locator.get_default_weather()
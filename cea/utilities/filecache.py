@@ -0,0 +1,98 @@
+"""
+Binary cache files for parsed input files (see `cea.utilities.xlsreader` and `cea.utilities.epwreader`). The cache files
+are stored together with a signature of the source they were created from, a cache file is only used if the signature
+still matches.
+
+The cache files are unpickled (and the code compiled by Numba, see `cea.utilities.kernels`, is executed), so they are
+kept in a cache folder of the current user that no other user can write to (see `make_cache_folder`) - never in the
+shared temporary folder.
+"""
+from __future__ import division
+
+import os
+import pickle
+import sys
+import tempfile
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+
+def get_cache_folder():
+    """
+    The cache folder of the current user: ``%LOCALAPPDATA%\\cea\\cache`` on Windows, ``$XDG_CACHE_HOME/cea`` (by default
+    ``~/.cache/cea``) on the other platforms.
+    """
+    if sys.platform == 'win32':
+        return os.path.join(os.environ.get('LOCALAPPDATA') or tempfile.gettempdir(), 'cea', 'cache')
+    return os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache'), 'cea')
+
+
+def make_cache_folder():
+    """
+    Create the cache folder, only accessible by the current user (mode 0700).
+
+    :returns: True if the cache folder can be used: it is owned by the current user and no other user can write to it
+        (the files of a folder others could write to are not trusted, even if it is made private now)
+    :rtype: bool
+    """
+    folder = get_cache_folder()
+    try:
+        if not os.path.isdir(folder):
+            os.makedirs(folder, 0o700)
+        # not available on Windows, where the folders of the user profile are private
+        if hasattr(os, 'getuid'):
+            folder_stat = os.stat(folder)
+            if folder_stat.st_uid != os.getuid() or folder_stat.st_mode & 0o022:
+                return False
+    except OSError:
+        return False
+    return True
+
+
+def get_cache_file(folder, filename):
+    """The path to a cache file ``filename`` in the sub-folder ``folder`` of the cache folder"""
+    return os.path.join(get_cache_folder(), folder, filename)
+
+
+def read_cache_file(cache_file, signature):
+    """
+    Read the data stored in a cache file.
+
+    :returns: the data or None if the cache file does not exist or was not written with the same ``signature``
+    """
+    if not os.path.exists(cache_file) or not make_cache_folder():
+        return None
+    try:
+        with open(cache_file, 'rb') as f:
+            cached_signature, data = pickle.load(f)
+    except Exception:
+        # the cache file is corrupt or was written by another version of pandas - it will be overwritten
+        return None
+    if cached_signature != signature:
+        return None
+    return data
+
+
+def write_cache_file(cache_file, signature, data):
+    """Write the cache file - via a temporary file, so other processes never read a partially written file"""
+    if not make_cache_folder():
+        return
+    try:
+        if not os.path.exists(os.path.dirname(cache_file)):
+            os.makedirs(os.path.dirname(cache_file))
+        temporary_file = '%s.%i' % (cache_file, os.getpid())
+        with open(temporary_file, 'wb') as f:
+            pickle.dump((signature, data), f, pickle.HIGHEST_PROTOCOL)
+        if os.path.exists(cache_file):
+            os.remove(cache_file)  # os.rename does not overwrite on Windows
+        os.rename(temporary_file, cache_file)
+    except (IOError, OSError):
+        # the cache is an optimization - the source is parsed again next time
+        pass
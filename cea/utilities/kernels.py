@@ -0,0 +1,186 @@
+"""
+Compiled versions of the numerical kernels of the CEA (functions working only on floats and numpy arrays, like
+``cea.demand.rc_model_SIA.calc_phi_m`` or ``cea.technologies.storagetank.calc_dhw_tank_operation``).
+
+Each kernel uses the fastest version available on this machine:
+
+- ``aot``: the extension module compiled ahead of time with ``cea compile`` (see
+  :py:mod:`cea.utilities.compile_pyd_files`), if it was built for this platform
+- ``jit``: compiled with Numba on first use. The machine code is cached on disk (in a folder per platform and python
+  version of the private cache folder of the user, see :py:mod:`cea.utilities.filecache`, unless ``NUMBA_CACHE_DIR``
+  is set), so each kernel is compiled once per machine (except the kernels Numba can not cache, see the ``cache``
+  parameter of :py:func:`compile_kernels`)
+- ``python``: the pure python function (Numba is not installed, or disabled with ``NUMBA_DISABLE_JIT=1``)
+
+The modules with kernels call :py:func:`compile_kernels` at the end of the module. :py:func:`report` lists the
+version of each kernel in use (``cea kernels`` prints it).
+"""
+from __future__ import division
+
+import contextlib
+import importlib
+import os
+import platform
+import sys
+
+from cea.utilities import filecache
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+# the modules with kernels, imported by `report`
+KERNEL_MODULES = ['cea.demand.rc_model_SIA',
+                  'cea.demand.rc_model_crank_nicholson_year',
+                  'cea.technologies.solar_collector',
+                  'cea.technologies.storagetank',
+                  'cea.optimization.slave.seasonal_storage.SolarPowerHandler_incl_Losses']
+
+# the version in use of each kernel ('module.function') - 'aot', 'jit' or 'python'
+_active_kernels = {}
+
+# the python version of each kernel ('module.function')
+_python_kernels = {}
+
+
+def get_cache_dir():
+    """The folder of the Numba cache, the compiled code of different platforms and python versions is kept apart"""
+    return filecache.get_cache_file('numba', '%s-%s-py%i%i' % (sys.platform, platform.machine(),
+                                                                sys.version_info[0], sys.version_info[1]))
+
+
+# whether Numba can cache the machine code on disk, set by `_prepare_cache` when the first kernel is compiled
+_cache_available = None
+
+
+def _prepare_cache():
+    """
+    Point Numba to the cache folder, the first time a kernel is compiled (importing this module doesn't create any
+    folders). Numba loads the cached machine code as it is, so the kernels are only cached in the private cache folder of
+    the user (or the folder set with ``NUMBA_CACHE_DIR``).
+
+    :return: True if the kernels can be cached
+    :rtype: bool
+    """
+    global _cache_available
+    if _cache_available is None:
+        if 'NUMBA_CACHE_DIR' in os.environ:
+            _cache_available = True
+        elif filecache.make_cache_folder():
+            # Numba reads its configuration from the environment when imported, it is read again by `reload_config`
+            os.environ['NUMBA_CACHE_DIR'] = get_cache_dir()
+            numba.config.reload_config()
+            _cache_available = True
+        else:
+            _cache_available = False
+    return _cache_available
+
+
+try:
+    import numba
+
+    JIT_AVAILABLE = not numba.config.DISABLE_JIT
+    objmode = numba.objmode
+except ImportError:
+    JIT_AVAILABLE = False
+
+    @contextlib.contextmanager
+    def objmode(**kwargs):
+        """Stand-in for ``numba.objmode`` (switching back to python inside a compiled kernel) for the python kernels"""
+        yield
+
+
+def compile_kernels(module_name, functions, aot_module_name=None, cache=True):
+    """
+    Get the fastest available version of the kernels of a module (see the module docstring).
+
+    :param module_name: name of the module of the kernels (``__name__``)
+    :param functions: the python kernels
+    :type functions: list[function]
+    :param aot_module_name: name of the ahead of time compiled extension module with the kernels, in the same package
+        as the module (e.g. ``'storagetank_cc'``), None if the kernels are not compiled ahead of time
+    :param cache: False if Numba can not cache the machine code of the kernels (kernels with ``objmode`` blocks and
+        the kernels calling them), they are then compiled again in each process
+    :return: the versions of the kernels to use, in the same order as `functions`
+    :rtype: list
+    """
+    aot_module = _import_aot_module(module_name, aot_module_name) if aot_module_name else None
+    compiled = []
+    for function in functions:
+        name = '%s.%s' % (module_name, function.__name__)
+        _python_kernels[name] = function
+        if aot_module is not None and hasattr(aot_module, function.__name__):
+            compiled.append(getattr(aot_module, function.__name__))
+            _active_kernels[name] = 'aot'
+        elif JIT_AVAILABLE:
+            compiled.append(numba.njit(cache=cache and _prepare_cache())(function))
+            _active_kernels[name] = 'jit'
+        else:
+            compiled.append(function)
+            _active_kernels[name] = 'python'
+    return compiled
+
+
+def get_python_kernel(module_name, function_name):
+    """The python version of a kernel (the module attribute is the compiled version, see `compile_kernels`)"""
+    importlib.import_module(module_name)
+    return _python_kernels['%s.%s' % (module_name, function_name)]
+
+
+def is_compiled(module_name):
+    """True if all the kernels of the module are compiled (with Numba or ahead of time)"""
+    versions = [version for name, version in _active_kernels.items() if name.rsplit('.', 1)[0] == module_name]
+    return bool(versions) and 'python' not in versions
+
+
+def _import_aot_module(module_name, aot_module_name):
+    """Import the extension module `aot_module_name` from the package of `module_name`, None if it is not available"""
+    if '.' in module_name:
+        aot_module_name = '%s.%s' % (module_name.rsplit('.', 1)[0], aot_module_name)
+    try:
+        return importlib.import_module(aot_module_name)
+    except ImportError:
+        # not compiled for this platform
+        return None
+
+
+def report():
+    """
+    List the version in use of each kernel of the CEA.
+
+    :return: the pairs (kernel, version) sorted by kernel, the version is 'aot', 'jit' or 'python'
+    :rtype: list[(str, str)]
+    """
+    for module_name in KERNEL_MODULES:
+        importlib.import_module(module_name)
+    return sorted(_active_kernels.items())
+
+
+def summarize():
+    """A one line summary of the report, e.g. 'aot: 0, jit: 19, python: 0'"""
+    versions = [version for _, version in report()]
+    return ', '.join('%s: %i' % (version, versions.count(version)) for version in ['aot', 'jit', 'python'])
+
+
+def main():
+    """Print the version in use of each kernel"""
+    kernel_versions = report()
+    width = max(len(name) for name, _ in kernel_versions)
+    for name, version in kernel_versions:
+        print('%s  %s' % (name.ljust(width), version))
+    if JIT_AVAILABLE:
+        cache_folder = os.environ['NUMBA_CACHE_DIR'] if _prepare_cache() else 'none, compiled in each process'
+        print('Numba %s, cache folder: %s' % (numba.__version__, cache_folder))
+    else:
+        print('Numba is not available, install it to compile the kernels: `conda install numba`')
+
+
+if __name__ == '__main__':
+    # the kernels are registered with the `cea.utilities.kernels` module, not with `__main__`
+    import cea.utilities.kernels
+    cea.utilities.kernels.main()
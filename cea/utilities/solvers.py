@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Root finding for arrays of independent equations (e.g. one equation per hour of the year)
+"""
+from __future__ import division
+import numpy as np
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+
+def newton(func, x0, args=(), tol=1.48e-8, maxiter=50):
+    """
+    Finds the roots of ``func(x, *args) = 0`` with the secant method, for all the elements of `x0` at once.
+
+    Each element follows the same steps as ``scipy.optimize.newton`` (without `fprime`) of scipy 0.19.1, the version
+    of the environment of the CEA, called with that element, and stops iterating as soon as it converged - so the roots
+    are the same as calling ``scipy.optimize.newton`` for each element with ``np.vectorize``, without the overhead of a
+    python function call per element and iteration. (Later versions of scipy order the two estimates by the absolute
+    value of `func` and have a slightly different convergence test, their roots agree within `tol`.)
+
+    :param func: the function, evaluated element-wise on arrays of x (and of the arguments)
+    :param x0: initial estimates of the roots
+    :param args: extra arguments of `func`, scalars or arrays (broadcast to the shape of `x0`)
+    :param tol: allowed error of the roots
+    :param maxiter: maximum number of iterations
+    :type x0: ndarray
+
+    :return: the roots (the last estimate where the iteration did not converge) and whether each one converged
+    :rtype: (ndarray, ndarray)
+    """
+    p0 = 1.0 * np.asarray(x0, dtype=float)
+    shape = np.broadcast(p0, *args).shape
+    p0 = np.broadcast_to(p0, shape).ravel()
+    args = [np.broadcast_to(arg, shape).ravel() if np.ndim(arg) else arg for arg in args]
+    root = np.full(p0.size, np.nan)
+    converged = np.zeros(p0.size, dtype=bool)
+    remaining = np.arange(p0.size)
+
+    eps = 1e-4
+    p1 = p0 * (1 + eps)
+    p1 += np.where(p1 >= 0, eps, -eps)
+    q0 = func(p0, *args)
+    q1 = func(p1, *args)
+    for _ in range(maxiter):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            p = np.where(q1 == q0, (p1 + p0) / 2.0, p1 - q1 * (p1 - p0) / (q1 - q0))
+        done = (q1 == q0) | (abs(p - p1) < tol)
+        root[remaining] = p
+        converged[remaining[done]] = True
+
+        # continue with the equations that did not converge yet
+        iterate = ~done
+        if not iterate.any():
+            break
+        remaining = remaining[iterate]
+        args = [arg[iterate] if np.ndim(arg) else arg for arg in args]
+        p0, q0 = p1[iterate], q1[iterate]
+        p1 = p[iterate]
+        q1 = func(p1, *args)
+    return root.reshape(shape), converged.reshape(shape)
+
+
+def regula_falsi(func, x0, args=(), step=1.0, xtol=1e-6, maxiter=100):
+    """
+    Finds the roots of the monotonic functions ``func(x, *args) = 0`` for all the elements of `x0` at once, starting
+    from the estimates `x0` (e.g. the roots of the previous time step).
+
+    First a bracket of each root is found by stepping away from `x0` in the direction in which ``abs(func)``
+    decreases, doubling the step until the sign of `func` changes. The bracket is then narrowed down with the
+    Illinois variant of the regula falsi method, which (unlike the secant method) can not leave the bracket and
+    converges super-linearly also for functions with kinks, like sums of ``sign(x) * abs(x) ** n`` terms.
+
+    :param func: the function, evaluated element-wise on arrays of x (and of the arguments)
+    :param x0: initial estimates of the roots
+    :param args: extra arguments of `func`, scalars or arrays (broadcast to the shape of `x0`)
+    :param step: initial step to search the bracket of the roots
+    :param xtol: allowed width of the bracket of the roots
+    :param maxiter: maximum number of iterations (of the bracket search and of the narrowing down each)
+    :type x0: ndarray
+
+    :return: the roots (the last estimate where the iteration did not converge) and whether each one converged
+    :rtype: (ndarray, ndarray)
+    """
+    a = np.asarray(x0, dtype=float)
+    shape = np.broadcast(a, *args).shape
+    a = np.array(np.broadcast_to(a, shape)).ravel()
+    args = [np.broadcast_to(arg, shape).ravel() if np.ndim(arg) else arg for arg in args]
+    root = a.copy()
+    converged = np.zeros(a.size, dtype=bool)
+
+    # search the brackets [a, b] of the roots
+    fa = func(a, *args)
+    b = a + step
+    fb = func(b, *args)
+    # reverse the direction of the search where the first step did not cross the root and made ``abs(func)`` grow
+    reverse = (np.sign(fa) == np.sign(fb)) & (abs(fb) > abs(fa))
+    step = np.where(reverse, -step, step)
+    b[reverse] = a[reverse] + step[reverse]
+    fb[reverse] = func(b[reverse], *[arg[reverse] if np.ndim(arg) else arg for arg in args])
+    for _ in range(maxiter):
+        search = (np.sign(fa) == np.sign(fb)) & (fa != 0)
+        if not search.any():
+            break
+        a[search], fa[search] = b[search], fb[search]
+        step[search] *= 2
+        b[search] += step[search]
+        fb[search] = func(b[search], *[arg[search] if np.ndim(arg) else arg for arg in args])
+    bracketed = (np.sign(fa) != np.sign(fb)) | (fa == 0)
+    converged[fa == 0] = True
+
+    # narrow down the brackets, the elements are dropped as soon as they converged
+    remaining = np.flatnonzero(bracketed & (fa != 0))
+    a, fa, b, fb = a[remaining], fa[remaining], b[remaining], fb[remaining]
+    args = [arg[remaining] if np.ndim(arg) else arg for arg in args]
+    root[remaining] = b
+    for _ in range(maxiter):
+        if not remaining.size:
+            break
+        c = b - fb * (b - a) / (fb - fa)
+        fc = func(c, *args)
+        # keep the end of the bracket with the other sign, halving its value if it is kept twice in a row (Illinois)
+        flip = np.sign(fc) != np.sign(fb)
+        a, fa = np.where(flip, b, a), np.where(flip, fb, fa / 2)
+        b, fb = c, fc
+        root[remaining] = c
+
+        done = (fc == 0) | (abs(b - a) <= xtol)
+        converged[remaining[done]] = True
+        iterate = ~done
+        remaining = remaining[iterate]
+        a, fa, b, fb = a[iterate], fa[iterate], b[iterate], fb[iterate]
+        args = [arg[iterate] if np.ndim(arg) else arg for arg in args]
+    return root.reshape(shape), converged.reshape(shape)
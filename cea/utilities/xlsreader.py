@@ -0,0 +1,87 @@
+"""
+===========================
+Excel database reader
+===========================
+
+Reads the worksheets of the Excel databases (archetypes, systems, life cycle inventory...) as DataFrames. Parsing Excel
+files is slow, so each workbook is parsed only once: all of its worksheets are stored in a binary cache file (see
+`cea.utilities.filecache`, invalidated when the workbook is modified) and kept in memory for the rest of the process.
+
+"""
+from __future__ import division
+
+import hashlib
+import os
+import pickle
+
+import pandas as pd
+
+from cea.utilities import filecache
+
+__author__ = "Daren Thomas"
+__copyright__ = "Copyright 2017, Architecture and Building Systems - ETH Zurich"
+__credits__ = ["Daren Thomas"]
+__license__ = "MIT"
+__version__ = "0.1"
+__maintainer__ = "Daren Thomas"
+__email__ = "cea@arch.ethz.ch"
+__status__ = "Production"
+
+# the workbooks read by this process: path -> (signature, {sheet name: DataFrame})
+_workbooks = {}
+
+
+def read_excel(path, sheet_name):
+    """
+    Read a worksheet of an Excel database - same as ``pd.read_excel(path, sheet_name)``.
+
+    The DataFrame returned is a copy and can be modified by the caller.
+
+    :param path: path to the Excel file (.xls, .xlsx)
+    :type path: str
+    :param sheet_name: the name of the worksheet to read
+    :type sheet_name: str
+    :rtype: pandas.DataFrame
+    """
+    sheets = read_workbook(path)
+    if sheet_name not in sheets:
+        raise ValueError('No sheet named <%r> in %s' % (sheet_name, path))
+    return sheets[sheet_name].copy()
+
+
+def read_workbook(path):
+    """
+    Read all the worksheets of an Excel database (from the cache if the file didn't change).
+
+    The DataFrames returned are shared - use :py:func:`read_excel` if you need to modify them.
+
+    :param path: path to the Excel file (.xls, .xlsx)
+    :type path: str
+    :rtype: dict[str, pandas.DataFrame]
+    """
+    path = os.path.abspath(path)
+    signature = _get_signature(path)
+    if path in _workbooks and _workbooks[path][0] == signature:
+        return _workbooks[path][1]
+
+    cache_file = get_cache_file(path)
+    sheets = filecache.read_cache_file(cache_file, signature)
+    if sheets is None:
+        sheets = pd.read_excel(path, sheetname=None)
+        filecache.write_cache_file(cache_file, signature, sheets)
+
+    _workbooks[path] = (signature, sheets)
+    return sheets
+
+
+def get_cache_file(path):
+    """The binary cache file of the Excel file ``path``"""
+    return filecache.get_cache_file('xls', '%s-%s.pickle' % (
+        os.path.basename(path), hashlib.sha1(os.path.abspath(path)).hexdigest()))
+
+
+def _get_signature(path):
+    """The cache of a workbook is valid as long as the file, pandas version and cache format are unchanged"""
+    stat = os.stat(path)
+    return stat.st_mtime, stat.st_size, pd.__version__, pickle.HIGHEST_PROTOCOL
+